@@ -0,0 +1,25 @@
+"""
+Performance benchmarks for ingestion, PatientInfo population and the API.
+
+Every scenario runs against a throw-away database (created like the test
+database, then destroyed) filled from seeded, reproducible datasets, so two
+runs at the same scale and seed do exactly the same work:
+
+  upload_fhir             POST /api/patient-info/upload_fhir/   (bundles of UPLOAD_BATCH patients)
+  upload_csv              POST /api/patient-info/upload_csv/    (CSV_BATCH rows per file)
+  populate_patient_info   manage.py populate_patient_info --force-update
+  load_from_healthtree_bq manage.py load_from_healthtree_bq     (local BigQuery stub)
+  patient_info_list       GET  /api/patient-info/
+  patient_info_retrieve   GET  /api/patient-info/<person_id>/
+  bulk_delete             DELETE /api/patient-info/bulk_delete/
+
+Each reports throughput (patients or requests per second), p50/p95 latency
+per operation, SQL query count and peak RSS, and can be compared against a
+stored baseline (benchmarks/baselines/<scale>.json).
+
+Run through the management command::
+
+    python manage.py run_benchmarks --scale 1k
+    python manage.py run_benchmarks --scale 10k --scenarios upload_fhir populate_patient_info
+    python manage.py run_benchmarks --scale 1k --save-baseline
+"""
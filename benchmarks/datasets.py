@@ -0,0 +1,199 @@
+"""
+Seeded benchmark datasets.
+
+The same (count, seed) always yields the same data: FHIR bundles come from
+generate_fhir_bundle's sharded generator, OMOP cohorts from
+generate_breast_cancer_patients, and CSV / HealthTree rows from a
+``random.Random(seed)`` of their own.
+"""
+
+import csv
+import json
+import random
+from datetime import date, datetime, timedelta, timezone
+from io import StringIO
+
+from django.core.management import call_command
+
+from omop_core.management.commands.generate_fhir_bundle import Command as FhirBundleGenerator
+from omop_core.models import Concept, ConceptClass, Domain, Vocabulary
+from omop_core.source_concepts import BUILTIN_SOURCE_MAPS
+
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+
+DEFAULT_SEED = 20240601
+
+# Fixed "today" so generated ages and dates never drift between runs
+AS_OF = '2025-01-01'
+
+DISEASES = ['Breast Cancer', 'Multiple Myeloma', 'Chronic Lymphocytic Leukemia', 'Follicular Lymphoma']
+GENDERS = ['female', 'male', 'F', 'M', 'unknown']
+RACES = ['white', 'black or african american', 'asian', 'other', '']
+
+
+def parse_scale(value: str) -> int:
+    """'1k' / '10k' / '100k', or a plain patient count."""
+    if value in SCALES:
+        return SCALES[value]
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f'Unknown scale {value!r}: use one of {", ".join(SCALES)} or a number') from None
+    if count < 1:
+        raise ValueError('Scale must be at least 1 patient')
+    return count
+
+
+def scale_label(count: int) -> str:
+    return next((label for label, n in SCALES.items() if n == count), str(count))
+
+
+def fhir_bundles(count: int, seed: int, batch: int):
+    """Yield (patients, bundle JSON bytes) with ``batch`` patients per bundle."""
+    generator = FhirBundleGenerator()
+    generator.configure(seed=seed, as_of=AS_OF)
+    entries, patients = [], 0
+    for patient_entries in generator.iter_patient_entries(count):
+        entries.extend(patient_entries)
+        patients += 1
+        if patients == batch:
+            yield patients, _bundle(entries)
+            entries, patients = [], 0
+    if patients:
+        yield patients, _bundle(entries)
+
+
+def _bundle(entries) -> bytes:
+    return json.dumps({'resourceType': 'Bundle', 'type': 'collection', 'entry': entries}).encode()
+
+
+def patient_csvs(count: int, seed: int, batch: int, first_person_id: int = 500_000):
+    """Yield (rows, CSV bytes) in upload_csv's format with ``batch`` rows per file."""
+    rng = random.Random(seed)
+    for start in range(0, count, batch):
+        out = StringIO()
+        writer = csv.DictWriter(out, ['person_id', 'gender', 'year_of_birth', 'date_of_birth', 'disease'])
+        writer.writeheader()
+        rows = min(batch, count - start)
+        for i in range(start, start + rows):
+            born = date(1940, 1, 1) + timedelta(days=rng.randrange(365 * 60))
+            writer.writerow({
+                'person_id': first_person_id + i,
+                'gender': rng.choice(GENDERS),
+                'year_of_birth': born.year,
+                'date_of_birth': born.isoformat(),
+                'disease': rng.choice(DISEASES),
+            })
+        yield rows, out.getvalue().encode()
+
+
+def healthtree_tables(count: int, seed: int) -> dict[str, list[dict]]:
+    """Rows for the three HealthTree BigQuery tables, keyed by table name."""
+    rng = random.Random(seed)
+    updated = datetime(2024, 12, 1, tzinfo=timezone.utc)
+    patients, lot, surveys = [], [], []
+    for i in range(count):
+        user_id = f'ht-{seed}-{i:07d}'
+        patients.append({
+            'user_id': user_id,
+            'person_id': 700_000 + i,
+            'first_name': f'Given{i}',
+            'middle_name': None,
+            'last_name': f'Family{i}',
+            'gender': rng.choice(GENDERS),
+            'date_of_birth': date(1940, 1, 1) + timedelta(days=rng.randrange(365 * 60)),
+            'marital_status': None,
+            'race': rng.choice(RACES),
+            'ethnicity': None,
+            'email': f'{user_id}@example.org',
+            'phone': None,
+            'city': 'Boston',
+            'state': 'MA',
+            'postal_code': '02115',
+            'median_income': None,
+            'created_at': updated,
+            'updated_at': updated,
+        })
+        start = date(2018, 1, 1) + timedelta(days=rng.randrange(1500))
+        for line in range(1, rng.randint(1, 4) + 1):
+            end = start + timedelta(days=rng.randint(60, 400))
+            lot.append({
+                'ai_lines_of_therapy_summary_id': f'{user_id}-lot-{line}',
+                'user_id': user_id,
+                'line_number': line,
+                'disease': 'Multiple Myeloma',
+                'outcome': rng.choice(['CR', 'VGPR', 'PR', 'SD', 'PD']),
+                'start_date': start,
+                'end_date': end,
+                'is_ongoing_line_of_therapy': False,
+                'active_ingredients': rng.choice(['lenalidomide, dexamethasone', 'daratumumab, bortezomib']),
+                'active_ingredients_induction': None,
+                'active_ingredients_maintenance': None,
+                'has_bispecifics': rng.random() < 0.1,
+                'line_has_procedures': False,
+                'procedures': None,
+                'has_transplant': rng.random() < 0.2,
+                'has_cart': rng.random() < 0.1,
+                'is_clinical_trial': False,
+                'clinical_trial_identifier': None,
+                'censoring_date': None,
+                'notes': None,
+                'is_validated': True,
+                'prompt_version': 'v1',
+                'created_at': updated,
+                'updated_at': updated,
+            })
+            start = end + timedelta(days=rng.randint(10, 120))
+        for position in range(rng.randint(0, 5)):
+            surveys.append({
+                'response_id': f'{user_id}-r{position}',
+                'user_id': user_id,
+                'survey_id': 'intake',
+                'question_id': f'q{position}',
+                'survey_name': 'Intake',
+                'global_question_position': position,
+                'answer_scalar': rng.choice(['yes', 'no']),
+                'answered_at': updated,
+            })
+    return {
+        'core__patients': patients,
+        'core__ai_lines_of_therapy': lot,
+        'core__survey_responses': surveys,
+    }
+
+
+def seed_omop_cohort(count: int, seed: int) -> None:
+    """Persons with conditions, measurements, drugs and PatientInfo (generate_breast_cancer_patients)."""
+    call_command('generate_breast_cancer_patients', count=count, seed=seed, stdout=StringIO())
+
+
+def seed_demographic_concepts() -> None:
+    """
+    Concept rows for every built-in gender/race target and 0 ("No matching
+    concept"), which person's concept foreign keys point at. A production
+    database has them from the Athena vocabulary.
+    """
+    Domain.objects.get_or_create(domain_id='Gender', defaults={'domain_name': 'Gender', 'domain_concept_id': 0})
+    Vocabulary.objects.get_or_create(
+        vocabulary_id='None', defaults={'vocabulary_name': 'None', 'vocabulary_concept_id': 0},
+    )
+    ConceptClass.objects.get_or_create(
+        concept_class_id='Undefined', defaults={'concept_class_name': 'Undefined', 'concept_class_concept_id': 0},
+    )
+    concept_ids = {0} | {cid for codes in BUILTIN_SOURCE_MAPS.values() for cid in codes.values()}
+    Concept.objects.bulk_create(
+        [
+            Concept(
+                concept_id=concept_id,
+                concept_name=f'Concept {concept_id}',
+                domain_id='Gender',
+                vocabulary_id='None',
+                concept_class_id='Undefined',
+                concept_code=str(concept_id),
+                valid_start_date=date(1970, 1, 1),
+                valid_end_date=date(2099, 12, 31),
+            )
+            for concept_id in sorted(concept_ids)
+        ],
+        ignore_conflicts=True,
+    )
@@ -0,0 +1,81 @@
+"""
+Measurement and baseline comparison for benchmark scenarios.
+"""
+
+import sys
+import time
+
+from omop_core.instrumentation import QueryProfile, percentile
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# Relative slowdown tolerated before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.20
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process so far (monotonic across scenarios)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(operations, *, unit: str) -> dict:
+    """
+    Run ``operations`` (callables returning how many ``unit`` each handled)
+    and return throughput, per-operation latency, query count and peak RSS.
+    """
+    latencies, handled = [], 0
+    with QueryProfile() as profile:
+        for operation in operations:
+            started = time.perf_counter()
+            handled += operation()
+            latencies.append(time.perf_counter() - started)
+    elapsed = profile.elapsed
+    peak = peak_rss_mb()
+    return {
+        'unit': unit,
+        'count': handled,
+        'operations': len(latencies),
+        'seconds': round(elapsed, 3),
+        'throughput': round(handled / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'queries': profile.queries,
+        'queries_per_unit': round(profile.queries / handled, 2) if handled else None,
+        'peak_rss_mb': round(peak, 1) if peak is not None else None,
+    }
+
+
+def compare(results: dict, baseline: dict, *, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Regressions of ``results`` against ``baseline`` (both {scenario: metrics}).
+
+    Throughput and p95 latency may move by ``tolerance`` (timing noise);
+    query counts are deterministic for a given scale and seed, so any
+    increase is reported.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous.get('throughput') and current.get('throughput') is not None:
+            if current['throughput'] < previous['throughput'] * (1 - tolerance):
+                regressions.append(
+                    f'{name}: throughput {current["throughput"]:,.1f} {current["unit"]}/s '
+                    f'< baseline {previous["throughput"]:,.1f}'
+                )
+        if previous.get('p95_ms') and current.get('p95_ms') is not None:
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: p95 {current["p95_ms"]:,.1f} ms > baseline {previous["p95_ms"]:,.1f} ms'
+                )
+        if previous.get('queries') is not None and current['queries'] > previous['queries']:
+            regressions.append(f'{name}: {current["queries"]:,} queries > baseline {previous["queries"]:,}')
+    return regressions
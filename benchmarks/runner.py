@@ -0,0 +1,80 @@
+"""
+Runs benchmark scenarios in an isolated database and builds the report.
+"""
+
+import os
+import platform
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import override_settings
+
+from benchmarks.datasets import scale_label
+from benchmarks.scenarios import SCENARIOS
+from omop_core.concept_search import install_search_index
+from omop_core.patient_info_cache import patient_info_cache
+
+
+@contextmanager
+def isolated_database(name=None):
+    """
+    A fresh database for the run, created and destroyed like the test database.
+
+    Tables are created straight from the models (as pytest does with
+    --no-migrations), then the migration-only search index is added.
+    ``name`` overrides the test database name — for SQLite a file path, so
+    other processes can open it (the default is in memory).
+    """
+    unmigrated = {app.label: None for app in apps.get_app_configs()}
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if name is not None:
+        test_settings['NAME'] = str(name)
+    try:
+        with override_settings(MIGRATION_MODULES=unmigrated):
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            install_search_index(connection)
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        test_settings['NAME'] = old_test_name
+
+
+def run(count: int, seed: int, names=None, *, progress=None) -> dict:
+    """Run the named scenarios (default: all) against the current database; return the report."""
+    results = {}
+    for name in names or SCENARIOS:
+        call_command('flush', interactive=False, verbosity=0, stdout=StringIO())
+        patient_info_cache.invalidate_all()
+        results[name] = SCENARIOS[name](count, seed)
+        if progress:
+            progress(format_result(name, results[name]))
+    return {
+        'meta': {
+            'scale': scale_label(count),
+            'patients': count,
+            'seed': seed,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+
+def format_result(name: str, metrics: dict) -> str:
+    peak = metrics['peak_rss_mb']
+    return (
+        f'  {name:<24} {metrics["throughput"] or 0:>10,.1f} {metrics["unit"]}/s  '
+        f'p50 {metrics["p50_ms"]:>9,.1f} ms  p95 {metrics["p95_ms"]:>9,.1f} ms  '
+        f'{metrics["queries"]:>9,} queries ({metrics["queries_per_unit"] or 0:,.1f}/{metrics["unit"][:-1]})'
+        + (f'  peak RSS {peak:,.0f} MB' if peak is not None else '')
+    )
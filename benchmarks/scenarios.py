@@ -0,0 +1,237 @@
+"""
+Benchmark scenarios.
+
+Each scenario prepares its own data (not timed), then times its operations
+with metrics.measure. Scenarios start from an empty database; the runner
+flushes between them.
+"""
+
+import json
+import random
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks import datasets, startup
+from benchmarks.metrics import measure
+from benchmarks.stubs import StubbedHealthTreeCommand
+from omop_core.models import PatientInfo
+from patient_portal.api.payloads import patient_info_payloads
+from patient_portal.api.renderers import OrjsonRenderer
+from patient_portal.api.serializers import PatientInfoSerializer
+
+# Patients per upload_fhir request — a realistic bundle size
+UPLOAD_BATCH = 100
+
+# Rows per upload_csv file
+CSV_BATCH = 500
+
+# List requests timed (each returns the whole cohort)
+LIST_REPEATS = 5
+
+# Detail requests timed, sampled from the cohort
+RETRIEVE_SAMPLE = 500
+
+# Full-cohort serializations timed per serialization scenario
+SERIALIZE_REPEATS = 3
+
+# Persons deleted, and persons per bulk_delete request
+DELETE_SAMPLE = 1000
+DELETE_BATCH = 100
+
+# Fresh manage.py processes timed per cold_start command
+COLD_START_REPEATS = 2
+
+
+def _api_client() -> Client:
+    user = User.objects.create_superuser('benchmark', 'benchmark@example.org', 'benchmark')
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def _check(response):
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f'{response.request["PATH_INFO"]} returned {response.status_code}: {response.content[:200]!r}'
+        )
+    return response
+
+
+def _person_ids(seed: int, sample: int) -> list[int]:
+    person_ids = sorted(PatientInfo.objects.values_list('person_id', flat=True))
+    return random.Random(seed).sample(person_ids, min(sample, len(person_ids)))
+
+
+# ---------------------------------------------------------------------------
+# Ingestion
+# ---------------------------------------------------------------------------
+
+def upload_fhir(count: int, seed: int) -> dict:
+    client = _api_client()
+    bundles = list(datasets.fhir_bundles(count, seed, UPLOAD_BATCH))
+
+    def post(patients, body):
+        def operation():
+            upload = SimpleUploadedFile('bundle.json', body, content_type='application/json')
+            _check(client.post('/api/patient-info/upload_fhir/', {'file': upload}))
+            return patients
+        return operation
+
+    return measure([post(patients, body) for patients, body in bundles], unit='patients')
+
+
+def upload_csv(count: int, seed: int) -> dict:
+    client = _api_client()
+    files = list(datasets.patient_csvs(count, seed, CSV_BATCH))
+
+    def post(rows, body):
+        def operation():
+            upload = SimpleUploadedFile('patients.csv', body, content_type='text/csv')
+            _check(client.post('/api/patient-info/upload_csv/', {'file': upload}))
+            return rows
+        return operation
+
+    return measure([post(rows, body) for rows, body in files], unit='patients')
+
+
+def populate_patient_info(count: int, seed: int) -> dict:
+    datasets.seed_omop_cohort(count, seed)
+
+    def operation():
+        call_command('populate_patient_info', force_update=True, stdout=StringIO())
+        return count
+
+    return measure([operation], unit='patients')
+
+
+def load_from_healthtree_bq(count: int, seed: int) -> dict:
+    datasets.seed_demographic_concepts()
+    command = StubbedHealthTreeCommand(datasets.healthtree_tables(count, seed))
+
+    def operation():
+        call_command(command, stdout=StringIO(), stderr=StringIO())
+        return count
+
+    metrics = measure([operation], unit='patients')
+    # The loader logs per-patient failures and carries on; don't time a run that wrote nothing
+    loaded = PatientInfo.objects.count()
+    if loaded != count:
+        raise RuntimeError(f'load_from_healthtree_bq stored {loaded} of {count} patients')
+    return metrics
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+def patient_info_list(count: int, seed: int) -> dict:
+    datasets.seed_omop_cohort(count, seed)
+    client = _api_client()
+
+    def operation():
+        _check(client.get('/api/patient-info/'))
+        return 1
+
+    return measure([operation] * LIST_REPEATS, unit='requests')
+
+
+def patient_info_retrieve(count: int, seed: int) -> dict:
+    datasets.seed_omop_cohort(count, seed)
+    client = _api_client()
+
+    def get(person_id):
+        def operation():
+            _check(client.get(f'/api/patient-info/{person_id}/'))
+            return 1
+        return operation
+
+    return measure([get(pid) for pid in _person_ids(seed, RETRIEVE_SAMPLE)], unit='requests')
+
+
+# ---------------------------------------------------------------------------
+# Serialization (the PatientInfo read path without HTTP or the response cache)
+# ---------------------------------------------------------------------------
+
+def _serialize(count, seed, build, renderer):
+    datasets.seed_omop_cohort(count, seed)
+    queryset = PatientInfo.objects.select_related('person__gender_concept').order_by('id')
+
+    def operation():
+        renderer.render(build(queryset.all()))
+        return count
+    return measure([operation] * SERIALIZE_REPEATS, unit='patients')
+
+
+def serialize_drf(count: int, seed: int) -> dict:
+    return _serialize(count, seed, lambda qs: PatientInfoSerializer(qs, many=True).data, JSONRenderer())
+
+
+def serialize_fast(count: int, seed: int) -> dict:
+    return _serialize(count, seed, patient_info_payloads, OrjsonRenderer())
+
+
+def bulk_delete(count: int, seed: int) -> dict:
+    datasets.seed_omop_cohort(count, seed)
+    client = _api_client()
+    person_ids = _person_ids(seed, DELETE_SAMPLE)
+
+    def delete(batch):
+        def operation():
+            _check(client.delete(
+                '/api/patient-info/bulk_delete/', json.dumps({'person_ids': batch}),
+                content_type='application/json',
+            ))
+            return len(batch)
+        return operation
+
+    batches = [person_ids[i:i + DELETE_BATCH] for i in range(0, len(person_ids), DELETE_BATCH)]
+    return measure([delete(batch) for batch in batches], unit='patients')
+
+
+# ---------------------------------------------------------------------------
+# Process start-up
+# ---------------------------------------------------------------------------
+
+def cold_start(count: int, seed: int) -> dict:
+    """
+    Wall time of fresh ``manage.py`` processes for the batch commands: one
+    small real run, which needs no database, plus --help of the others (their
+    imports and Django set-up, without their work). Independent of the scale.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        commands = [
+            ['generate_fhir_bundle', '--count', '1', '--seed', str(seed), '--output', str(Path(workdir) / 'one.json')],
+            ['import_fhir_ndjson', '--help'],
+            ['load_from_healthtree_bq', '--help'],
+            ['export_fhir', '--help'],
+            ['export_omop_cdm', '--help'],
+        ]
+
+        def start(args):
+            def operation():
+                startup.run_manage(args)
+                return 1
+            return operation
+
+        return measure([start(args) for args in commands for _ in range(COLD_START_REPEATS)], unit='starts')
+
+
+SCENARIOS = {
+    'upload_fhir': upload_fhir,
+    'upload_csv': upload_csv,
+    'populate_patient_info': populate_patient_info,
+    'load_from_healthtree_bq': load_from_healthtree_bq,
+    'patient_info_list': patient_info_list,
+    'patient_info_retrieve': patient_info_retrieve,
+    'serialize_drf': serialize_drf,
+    'serialize_fast': serialize_fast,
+    'bulk_delete': bulk_delete,
+    'cold_start': cold_start,
+}
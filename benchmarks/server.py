@@ -0,0 +1,188 @@
+"""
+HTTP throughput of gunicorn configurations (benchmark_gunicorn).
+
+Each configuration is started as a gunicorn subprocess serving the seeded
+benchmark database, then sent the same fixed list of authenticated GET
+requests — PatientInfo detail and list pages, the hot paths of the patient
+portal — from ``concurrency`` client threads, one connection per request:
+
+  * ``stock``: gunicorn without a config file, as the Procfile ran it before
+    gunicorn.conf.py existed (one sync worker, no preload)
+  * ``profile``: gunicorn.conf.py
+  * ``no-preload``: gunicorn.conf.py with GUNICORN_PRELOAD=False, which
+    isolates what preloading and warm-up are worth
+
+The clock starts when gunicorn is launched, so start-up and warm-up are part
+of the measurement, as after every deploy.
+"""
+
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+
+from omop_core.instrumentation import percentile
+from omop_core.models import PatientInfo
+
+CONFIGS = ('stock', 'profile', 'no-preload')
+
+# Share of requests that fetch the patient list (the rest are detail pages)
+LIST_SHARE = 0.05
+
+# Seconds to wait for gunicorn to answer its first health check
+STARTUP_TIMEOUT = 60
+
+
+def database_url() -> str:
+    """A DATABASE_URL for the current (benchmark) database, for the gunicorn subprocess."""
+    db = connection.settings_dict
+    if connection.vendor == 'sqlite':
+        return f"sqlite:///{db['NAME']}"
+    if connection.vendor == 'postgresql':
+        credentials = quote(db['USER'] or '') + (f":{quote(db['PASSWORD'])}" if db['PASSWORD'] else '')
+        return f"postgres://{credentials}@{db['HOST'] or 'localhost'}:{db['PORT'] or 5432}/{db['NAME']}"
+    raise ValueError(f'benchmark_gunicorn does not support {connection.vendor} databases')
+
+
+def session_cookie() -> str:
+    """A logged-in session for a benchmark superuser, stored in the benchmark database."""
+    user, _ = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True, 'is_superuser': True})
+    client = Client()
+    client.force_login(user)
+    return f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+
+def request_paths(count: int, seed: int) -> list[str]:
+    """``count`` GET paths: detail pages of random patients plus an occasional list page."""
+    ids = list(PatientInfo.objects.values_list('person_id', flat=True))
+    rng = random.Random(seed)
+    return [
+        '/api/patient-info/' if rng.random() < LIST_SHARE else f'/api/patient-info/{rng.choice(ids)}/'
+        for _ in range(count)
+    ]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _get(port: int, path: str, cookie: str | None = None) -> int:
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        conn.request('GET', path, headers={'Cookie': cookie} if cookie else {})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def _memory_mb(pid: int) -> float | None:
+    """Proportional set size of gunicorn and its workers (shared pages split between them), Linux only."""
+    try:
+        children = Path(f'/proc/{pid}/task/{pid}/children').read_text().split()
+    except OSError:
+        return None
+    total_kb = 0
+    for process in (pid, *map(int, children)):
+        try:
+            rollup = Path(f'/proc/{process}/smaps_rollup').read_text()
+        except OSError:
+            return None
+        total_kb += next(int(line.split()[1]) for line in rollup.splitlines() if line.startswith('Pss:'))
+    return round(total_kb / 1024, 1)
+
+
+@contextmanager
+def gunicorn(config: str, port: int, workdir: Path):
+    """A running gunicorn for ``config`` on ``port``; yields its Popen."""
+    env = {**os.environ, 'DATABASE_URL': database_url(), 'GUNICORN_LOG_LEVEL': 'warning'}
+    if config == 'stock':
+        config_file = workdir / 'stock.conf.py'
+        config_file.write_text('')
+    else:
+        config_file = Path(settings.BASE_DIR) / 'gunicorn.conf.py'
+        env['GUNICORN_PRELOAD'] = str(config == 'profile')
+    command = [
+        sys.executable, '-m', 'gunicorn', 'ctomop.wsgi:application',
+        '--config', str(config_file), '--bind', f'127.0.0.1:{port}', '--access-logfile', '/dev/null',
+    ]
+    log = open(workdir / f'{config}.log', 'w')
+    process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+
+
+def _wait_until_up(port: int, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+        try:
+            if _get(port, '/api/health/') == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f'gunicorn did not answer within {STARTUP_TIMEOUT}s')
+
+
+def run_config(config: str, paths: list[str], cookie: str, concurrency: int, workdir: Path) -> dict:
+    """Start gunicorn with ``config``, send every path, and return throughput, latency and memory."""
+    port = _free_port()
+    started = time.perf_counter()
+    with gunicorn(config, port, workdir) as process:
+        _wait_until_up(port, process)
+        startup = time.perf_counter() - started
+
+        def timed(path):
+            request_started = time.perf_counter()
+            status = _get(port, path, cookie)
+            return status, time.perf_counter() - request_started
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(timed, paths))
+        elapsed = time.perf_counter() - started
+        memory = _memory_mb(process.pid)
+
+    latencies = [seconds for _, seconds in results]
+    return {
+        'requests': len(results),
+        'errors': sum(1 for status, _ in results if status != 200),
+        'seconds': round(elapsed, 3),
+        'startup_seconds': round(startup, 3),
+        'throughput': round(len(results) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'memory_mb': memory,
+    }
+
+
+def format_result(name: str, result: dict) -> str:
+    memory = result['memory_mb']
+    return (
+        f'  {name:<10} {result["throughput"]:>8,.1f} req/s  p50 {result["p50_ms"]:>8,.1f} ms  '
+        f'p95 {result["p95_ms"]:>8,.1f} ms  start-up {result["startup_seconds"]:.1f}s  '
+        f'{result["errors"]} error(s)' + (f'  {memory:,.0f} MB PSS' if memory is not None else '')
+    )
@@ -0,0 +1,75 @@
+"""
+Cold start of ``python manage.py <command>`` (import_report, the cold_start scenario).
+
+Each run is a fresh interpreter, as under cron or a one-off dyno, so the
+time includes starting Python, importing Django and the project's apps,
+and the command's own imports. With ``importtime`` the run is made with
+``python -X importtime`` and its report is parsed into per-module timings:
+
+    from benchmarks.startup import run_manage, summarize
+
+    result = run_manage(['export_fhir', '--help'], importtime=True)
+    summary = summarize(result['imports'])
+"""
+
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+# One line of ``python -X importtime`` output:
+#   import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """The modules imported in a ``-X importtime`` report, in import order, with their times in µs."""
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append({
+                'module': module,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                # One space, then two more per nesting level
+                'depth': (len(indent) - 1) // 2,
+            })
+    return imports
+
+
+def summarize(imports: list[dict], top: int = 15) -> dict:
+    """Total import time, the top-level packages by self time, and the slowest modules."""
+    packages = defaultdict(lambda: {'modules': 0, 'self_us': 0})
+    for entry in imports:
+        package = packages[entry['module'].split('.')[0]]
+        package['modules'] += 1
+        package['self_us'] += entry['self_us']
+    return {
+        'modules': len(imports),
+        'total_us': sum(entry['self_us'] for entry in imports),
+        'packages': sorted(
+            ({'package': name, **totals} for name, totals in packages.items()),
+            key=lambda package: package['self_us'], reverse=True,
+        )[:top],
+        'slowest': sorted(imports, key=lambda entry: entry['self_us'], reverse=True)[:top],
+    }
+
+
+def run_manage(args: list[str], *, importtime: bool = False) -> dict:
+    """Run ``manage.py`` with ``args`` in a new interpreter; return its wall time and, optionally, imports."""
+    command = [sys.executable, *(['-X', 'importtime'] if importtime else []), 'manage.py', *args]
+    started = time.perf_counter()
+    process = subprocess.run(command, cwd=settings.BASE_DIR, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    if process.returncode:
+        errors = [line for line in process.stderr.splitlines() if not IMPORTTIME_LINE.match(line)]
+        raise RuntimeError(f'manage.py {" ".join(args)} exited with {process.returncode}: {errors[-5:]}')
+    return {
+        'seconds': seconds,
+        'imports': parse_importtime(process.stderr) if importtime else [],
+    }
@@ -0,0 +1,43 @@
+"""
+Local stand-ins for external services used by the benchmarked code paths.
+"""
+
+from omop_core.management.commands.load_from_healthtree_bq import Command as HealthTreeCommand
+
+
+class StubBigQueryClient:
+    """
+    Answers load_from_healthtree_bq's queries from in-memory rows.
+
+    The query builders select from exactly one ``core__*`` table; the stub
+    returns every row of that table (the benchmark never filters by user).
+    """
+
+    def __init__(self, tables: dict[str, list[dict]]):
+        self.tables = tables
+        self.queries = 0
+
+    def query(self, sql: str):
+        self.queries += 1
+        table = next(name for name in self.tables if f'.{name}`' in sql)
+        return _StubJob(self.tables[table])
+
+
+class _StubJob:
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def result(self):
+        return iter(self.rows)
+
+
+class StubbedHealthTreeCommand(HealthTreeCommand):
+    """load_from_healthtree_bq reading from a StubBigQueryClient instead of BigQuery."""
+
+    def __init__(self, tables, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = StubBigQueryClient(tables)
+
+    def get_bigquery_client(self, bq_project, keyfile):
+        return self.client
@@ -2,6 +2,9 @@
 ASGI config for ctomop project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Served by gunicorn with uvicorn workers in the ASGI deployment profile
+(Procfile.asgi, or ``SERVER_PROFILE=asgi`` with start.sh), which is what the
+async views in patient_portal/api/async_views.py are for.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -46,6 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so session/auth queries are counted; inactive unless QUERY_INSTRUMENTATION
+    'omop_core.middleware.QueryInstrumentationMiddleware',
+    # Inactive unless DATABASE_REPLICA_URLS is set
+    'omop_core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -77,12 +81,16 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'ctomop.wsgi.application'
 
-# Database
+# Database. Connections persist for DB_CONN_MAX_AGE seconds (one per worker
+# thread, reused across requests). Set DB_CONN_MAX_AGE=0 under ASGI
+# (Procfile.asgi): every request runs its ORM work on a thread of its own, so
+# persistent connections would pile up
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '600'))
 if 'DATABASE_URL' in os.environ:
     DATABASES = {
         'default': dj_database_url.config(
             default=os.environ.get('DATABASE_URL'),
-            conn_max_age=600,
+            conn_max_age=DB_CONN_MAX_AGE,
             conn_health_checks=True,
         )
     }
@@ -91,9 +99,26 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
         }
     }
 
+# Read replicas (omop_core.replicas): DATABASE_REPLICA_URLS, comma-separated,
+# become replica_1, replica_2, … for the PatientInfo read and export endpoints
+# and the export commands. After a client writes, its reads stay on the
+# primary for DATABASE_REPLICA_PIN_SECONDS (set it above the replication lag)
+DATABASE_REPLICAS = []
+for _url in filter(None, (url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(','))):
+    _alias = f'replica_{len(DATABASE_REPLICAS) + 1}'
+    DATABASES[_alias] = {
+        **dj_database_url.parse(_url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True),
+        # Tests read the replicas' data from the test database
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(_alias)
+DATABASE_ROUTERS = ['omop_core.replicas.ReplicaRouter'] if DATABASE_REPLICAS else []
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DATABASE_REPLICA_PIN_SECONDS', '10'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -145,7 +170,74 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson-backed JSON (falls back to the stock renderer without orjson)
+    'DEFAULT_RENDERER_CLASSES': [
+        'patient_portal.api.renderers.OrjsonRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Query-count / latency instrumentation (omop_core.instrumentation): Server-Timing
+# headers and one JSON log line per request or instrumented command
+QUERY_INSTRUMENTATION = os.environ.get('QUERY_INSTRUMENTATION', 'False') == 'True'
+QUERY_INSTRUMENTATION_SERVER_TIMING = os.environ.get('QUERY_INSTRUMENTATION_SERVER_TIMING', 'True') == 'True'
+# Requests running more queries than this are logged at WARNING
+QUERY_INSTRUMENTATION_MAX_QUERIES = int(os.environ.get('QUERY_INSTRUMENTATION_MAX_QUERIES', '50'))
+
+# Cache. Local memory (per process) by default; CACHE_BACKEND=file shares entries
+# between the processes of one host through CACHE_DIR, CACHE_BACKEND=database
+# between every process and host (table created by ``manage.py createcachetable``)
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '10000'))
+if os.environ.get('CACHE_BACKEND') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / '.cache')),
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+elif os.environ.get('CACHE_BACKEND') == 'database':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'ctomop_cache',
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ctomop',
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+
+# PatientInfo API response cache (omop_core.patient_info_cache); 0 disables it.
+# Its invalidation tokens live in the cache, so it is off by default with the
+# local-memory backend: invalidations from management commands (bulk loads) and
+# from other gunicorn workers would never reach this process's copy, which would
+# serve stale payloads and ETags until they expire. Enable it with a shared
+# CACHE_BACKEND (database, or file when every process runs on one host)
+PATIENT_INFO_CACHE_ALIAS = os.environ.get('PATIENT_INFO_CACHE_ALIAS', 'default')
+_CACHE_IS_SHARED = CACHES[PATIENT_INFO_CACHE_ALIAS]['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+PATIENT_INFO_CACHE_TIMEOUT = int(os.environ.get('PATIENT_INFO_CACHE_TIMEOUT', '300' if _CACHE_IS_SHARED else '0'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'ctomop.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
+
 SOCIAL_AUTH_GOOGLE_OAUTH2_KEY = os.environ.get('SOCIAL_AUTH_GOOGLE_OAUTH2_KEY')
 SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = os.environ.get('SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET')
 
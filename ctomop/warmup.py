@@ -0,0 +1,52 @@
+"""
+Start-up warm-up for gunicorn (gunicorn.conf.py), so the first requests a
+worker serves do not pay for building caches.
+
+  * ``warm_master()`` — pure-Python state, built once in the master after the
+    app is preloaded and shared copy-on-write by every forked worker: the URL
+    resolver and the PatientInfo payload plans
+  * ``warm_worker()`` — per-process, database-backed state, built in each
+    worker after fork (connections must not cross a fork, and cache
+    invalidation signals are per process): the database connection and the
+    compiled source-concept map
+
+Both return the seconds spent per step. gunicorn.conf.py logs a failure and
+lets the worker start cold rather than crash-loop, e.g. while the database is
+unreachable.
+"""
+
+import time
+
+from django.db import close_old_connections, connection
+from django.urls import get_resolver
+
+from omop_core.source_concepts import source_concepts
+from patient_portal.api.payloads import build_plans
+
+
+def _timed(steps) -> dict[str, float]:
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = round(time.perf_counter() - started, 4)
+    return timings
+
+
+def warm_master() -> dict[str, float]:
+    return _timed([
+        ('urls', lambda: get_resolver().reverse_dict),
+        ('payload_plans', build_plans),
+    ])
+
+
+def warm_worker() -> dict[str, float]:
+    try:
+        return _timed([
+            ('database', connection.ensure_connection),
+            ('source_concepts', source_concepts.warm),
+        ])
+    finally:
+        # Keep the connection for the first request only if it is persistent
+        # (CONN_MAX_AGE > 0) and usable
+        close_old_connections()
@@ -0,0 +1,93 @@
+"""
+Gunicorn deployment profile, read automatically from the working directory:
+
+  gunicorn ctomop.wsgi:application                        # threaded sync workers
+  SERVER_PROFILE=asgi gunicorn ctomop.asgi:application    # uvicorn workers (Procfile.asgi)
+
+  * workers: WEB_CONCURRENCY, else 2 × cores + 1 (cores for uvicorn workers,
+    which interleave requests themselves), at most 4 — the count the
+    Dockerfile and nixpacks ran before; GUNICORN_THREADS threads each
+    (default 2, gthread worker). Cores are the CPUs this process may run on,
+    not the host's, and the cap keeps workers × threads persistent database
+    connections well below PostgreSQL's max_connections; raise
+    WEB_CONCURRENCY with the connection limit in mind
+  * the app is preloaded in the master (GUNICORN_PRELOAD=False to turn off),
+    which also builds the URL resolver and serializer plans
+    (ctomop.warmup.warm_master), so workers share that memory copy-on-write
+    instead of each importing Django on its own
+  * every worker opens its database connection and compiles the
+    source-concept map right after fork (warm_worker), before its first request
+  * workers are recycled after GUNICORN_MAX_REQUESTS requests (default 1000,
+    plus up to 10% jitter so they do not all restart together), which bounds
+    memory growth from per-process caches
+  * workers share the PatientInfo response cache only through a shared
+    CACHE_BACKEND; with the default local-memory backend it is off (settings)
+
+Command-line options override these settings. Measure with
+``python manage.py benchmark_gunicorn``.
+"""
+
+import multiprocessing
+import os
+
+ASGI = os.environ.get('SERVER_PROFILE') == 'asgi'
+
+# Default worker count ceiling, without WEB_CONCURRENCY
+MAX_DEFAULT_WORKERS = 4
+
+# CPUs this process may use (affinity / cpuset), where the platform reports them;
+# cpu_count() is the host's, dozens on a shared container host
+cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+if ASGI:
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.environ.get('WEB_CONCURRENCY', min(cores, MAX_DEFAULT_WORKERS)))
+else:
+    worker_class = 'gthread'
+    workers = int(os.environ.get('WEB_CONCURRENCY', min(2 * cores + 1, MAX_DEFAULT_WORKERS)))
+    threads = int(os.environ.get('GUNICORN_THREADS', '2'))
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return  # without preloading, Django is set up later, in each worker
+    from ctomop.warmup import warm_master
+
+    try:
+        server.log.info('Warmed master: %s', warm_master())
+    except Exception:
+        server.log.exception('Master warm-up failed; workers start cold')
+
+
+def pre_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    # Workers must open their own connections, never inherit the master's
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+    from ctomop.warmup import warm_worker
+
+    try:
+        server.log.info('Warmed worker %s: %s', worker.pid, warm_worker())
+    except Exception:
+        server.log.exception('Warm-up of worker %s failed; it starts cold', worker.pid)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class OmopCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'omop_core'
+
+    def ready(self):
+        # Connects the PatientInfo response cache's invalidation signals
+        from omop_core import patient_info_cache  # noqa: F401
@@ -0,0 +1,168 @@
+"""
+Bulk row loading for OMOP tables.
+
+``bulk_load(model, objs)`` writes unsaved model instances straight into the
+model's table without the ORM's per-batch INSERT compilation, which dominates
+``bulk_create`` time once loads reach millions of rows:
+
+  * PostgreSQL (psycopg 3) — ``COPY <table> (<columns>) FROM STDIN``, rows
+                             streamed with ``Copy.write_row``
+  * any other backend      — one prepared ``INSERT`` run with ``executemany``
+                             per batch (SQLite in development and tests)
+
+Values go through each field's ``pre_save`` / ``get_db_prep_save``, so dates,
+decimals, JSON and ``auto_now`` columns are stored exactly as ``bulk_create``
+stores them. As with ``bulk_create``, ``save()`` is not called, no signals are
+sent, and auto-increment primary keys (e.g. ``PatientInfo.id``) are left to
+the database and not set on the instances.
+
+``load_rows(table, columns, rows)`` is the same fast path for plain tuples
+into tables that have no model, such as staging tables.
+
+Usage::
+
+    from omop_core.bulk_load import bulk_load
+
+    bulk_load(Measurement, measurements)
+"""
+
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Field
+from django.db.models.fields import AutoFieldMixin
+
+BATCH_SIZE = 5000
+
+# Internal field types whose values of exactly this Python type are bound as-is
+# (get_db_prep_save would only round-trip them through to_python)
+PASSTHROUGH_TYPES = {
+    'CharField': str,
+    'TextField': str,
+    'IntegerField': int,
+    'BigIntegerField': int,
+    'SmallIntegerField': int,
+    'PositiveIntegerField': int,
+    'PositiveBigIntegerField': int,
+    'PositiveSmallIntegerField': int,
+    'BooleanField': bool,
+}
+
+COPY = 'copy'
+EXECUTEMANY = 'executemany'
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def load_fields(model):
+    """Concrete fields written by bulk_load, minus database-generated primary keys."""
+    return [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key and isinstance(field, AutoFieldMixin))
+    ]
+
+
+def copy_supported(connection) -> bool:
+    """True when ``connection`` is PostgreSQL through psycopg 3 (``cursor.copy``)."""
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+def _field_plan(fields, connection):
+    """Per field: (field, attname, needs pre_save, passthrough type, None is NULL)."""
+    plan = []
+    for field in fields:
+        target = field.target_field if field.is_relation else field
+        plan.append((
+            field,
+            field.attname,
+            type(field).pre_save is not Field.pre_save,  # auto_now / auto_now_add
+            PASSTHROUGH_TYPES.get(target.get_internal_type()),
+            field.get_db_prep_save(None, connection) is None,
+        ))
+    return plan
+
+
+def _prepared_rows(objs, fields, connection):
+    plan = _field_plan(fields, connection)
+    for obj in objs:
+        row = []
+        for field, attname, pre_save, passthrough, none_is_null in plan:
+            value = field.pre_save(obj, True) if pre_save else getattr(obj, attname)
+            if (value is None and none_is_null) or type(value) is passthrough:
+                row.append(value)
+            else:
+                row.append(field.get_db_prep_save(value, connection))
+        yield tuple(row)
+
+
+def _copy(connection, table, columns, rows) -> int:
+    count = 0
+    sql = f'COPY {table} ({columns}) FROM STDIN'
+    with connection.cursor() as cursor:
+        # The psycopg cursor behind Django's wrapper exposes copy()
+        with cursor.cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+    return count
+
+
+def _executemany(connection, table, columns, width, rows, batch_size) -> int:
+    count = 0
+    sql = f'INSERT INTO {table} ({columns}) VALUES ({", ".join(["%s"] * width)})'
+    with connection.cursor() as cursor:
+        for batch in _batched(rows, batch_size):
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
+def _resolve_method(connection, method):
+    if method is None:
+        return COPY if copy_supported(connection) else EXECUTEMANY
+    if method == COPY and not copy_supported(connection):
+        raise ValueError(f'COPY is not supported on the {connection.vendor!r} backend')
+    if method not in (COPY, EXECUTEMANY):
+        raise ValueError(f'Unknown bulk_load method: {method!r}')
+    return method
+
+
+def load_rows(table, columns, rows, *, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE, method=None) -> int:
+    """
+    Insert already-prepared row tuples into ``table`` (unquoted name) and return the count.
+
+    The table-level counterpart of ``bulk_load`` for tables without a model,
+    e.g. staging tables. Values must already be in a form the driver accepts.
+    """
+    connection = connections[using]
+    method = _resolve_method(connection, method)
+    qn = connection.ops.quote_name
+    column_sql = ', '.join(qn(column) for column in columns)
+    if method == COPY:
+        return _copy(connection, qn(table), column_sql, rows)
+    return _executemany(connection, qn(table), column_sql, len(columns), rows, batch_size)
+
+
+def bulk_load(model, objs, *, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE, method=None) -> int:
+    """
+    Insert unsaved ``model`` instances and return how many rows were written.
+
+    ``objs`` may be any iterable, including a generator; rows are streamed to
+    the database rather than collected first. ``method`` forces ``'copy'`` or
+    ``'executemany'``; by default COPY is used wherever it is supported.
+    """
+    connection = connections[using]
+    fields = load_fields(model)
+    return load_rows(
+        model._meta.db_table,
+        [field.column for field in fields],
+        _prepared_rows(objs, fields, connection),
+        using=using, batch_size=batch_size, method=method,
+    )
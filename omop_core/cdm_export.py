@@ -0,0 +1,187 @@
+"""
+Streaming writers for OMOP CDM flat-file extracts (export_omop_cdm).
+
+Tables are read in primary-key order with keyset pagination — each batch is
+``WHERE pk > <last pk> ORDER BY pk LIMIT <chunk>`` — so a table of any size
+is exported with short queries, no long-lived cursor and flat memory:
+
+    from omop_core.cdm_export import CDM_TABLES, open_table_writer, shard_queryset, table_batches
+
+    model = CDM_TABLES['measurement']
+    with open_table_writer(path, model, 'csv', compress=True) as writer:
+        for batch in table_batches(model, shard_queryset(model, 0, 4), 50_000):
+            writer.write(batch)
+
+Columns are the CDM column names (``db_column``) in model field order, minus
+local additions that are not part of the CDM: patient names on person and
+episode_event's surrogate key.
+
+  * CSV: header row, empty cells for NULL, ISO dates; ``compress`` gzips it
+  * Parquet (needs pyarrow): typed columns — int64, string, date32,
+    timestamp[us, UTC], decimal128(p, s), float64; one row group per batch;
+    ``compress`` selects gzip instead of snappy page compression
+
+Sharding splits persons by ``person_id % shards``; episode_event rows follow
+their episode's person (rows of unknown episodes go to shard 0), so a shard
+holds every row of its persons.
+"""
+
+import csv
+from contextlib import closing
+
+from django.db.models import F, Q
+
+from omop_core.fhir_ndjson import open_text
+from omop_core.models import (
+    ConditionOccurrence, DrugExposure, Measurement, Observation, Person, VisitOccurrence,
+)
+from omop_oncology.models import Episode, EpisodeEvent
+
+# CDM table name → model, in load order (persons first, episode_event last)
+CDM_TABLES = {
+    'person': Person,
+    'visit_occurrence': VisitOccurrence,
+    'condition_occurrence': ConditionOccurrence,
+    'drug_exposure': DrugExposure,
+    'measurement': Measurement,
+    'observation': Observation,
+    'episode': Episode,
+    'episode_event': EpisodeEvent,
+}
+
+# Model columns that are not CDM columns (never exported)
+NON_CDM_COLUMNS = {
+    Person: {'given_name', 'family_name'},
+    EpisodeEvent: {'id'},
+}
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def export_fields(model):
+    """Concrete CDM fields exported for ``model``, in model order."""
+    excluded = NON_CDM_COLUMNS.get(model, set())
+    return [field for field in model._meta.concrete_fields if field.column not in excluded]
+
+
+def file_name(table: str, export_format: str, *, compress=False, shard=0, shards=1) -> str:
+    """``measurement.csv.gz``, or ``measurement/measurement-002-of-004.parquet`` when sharded."""
+    suffix = '.csv.gz' if export_format == 'csv' and compress else f'.{export_format}'
+    if shards == 1:
+        return f'{table}{suffix}'
+    return f'{table}/{table}-{shard:03d}-of-{shards:03d}{suffix}'
+
+
+def _in_shard(queryset, column, shard, shards):
+    return queryset.alias(_shard=F(column) % shards).filter(_shard=shard)
+
+
+def shard_queryset(model, shard: int, shards: int):
+    """Rows of ``model`` belonging to persons with ``person_id % shards == shard``."""
+    queryset = model.objects.all()
+    if shards == 1:
+        return queryset
+    if model is EpisodeEvent:
+        episodes = _in_shard(Episode.objects.all(), 'person_id', shard, shards).values('episode_id')
+        in_shard = Q(episode_id__in=episodes)
+        if shard == 0:
+            in_shard |= ~Q(episode_id__in=Episode.objects.values('episode_id'))
+        return queryset.filter(in_shard)
+    return _in_shard(queryset, 'person_id', shard, shards)
+
+
+def table_batches(model, queryset, chunk_size: int):
+    """Lists of row tuples (``export_fields`` order) in primary-key order, ``chunk_size`` at a time."""
+    pk = model._meta.pk.attname
+    attnames = [field.attname for field in export_fields(model)]
+    # A primary key that is not exported is fetched last and dropped from the rows
+    exported = pk in attnames
+    queryset = queryset.order_by(pk).values_list(*attnames, *(() if exported else (pk,)))
+    pk_index = attnames.index(pk) if exported else -1
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(**{f'{pk}__gt': last})
+        batch = list(page[:chunk_size])
+        if not batch:
+            return
+        last = batch[-1][pk_index]
+        yield batch if exported else [row[:-1] for row in batch]
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+class CSVTableWriter:
+    """One CDM table as CSV with a header row of column names."""
+
+    def __init__(self, path, model, compress=False):
+        self.fh = open_text(path, 'wt', compress=compress)
+        self.writer = csv.writer(self.fh, lineterminator='\n')
+        self.writer.writerow([field.column for field in export_fields(model)])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.fh.close()
+
+
+def _arrow_type(pa, field):
+    internal = (field.target_field if field.is_relation else field).get_internal_type()
+    if internal in ('AutoField', 'BigAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+                    'PositiveIntegerField', 'PositiveSmallIntegerField', 'PositiveBigIntegerField'):
+        return pa.int64()
+    if internal == 'DateField':
+        return pa.date32()
+    if internal == 'DateTimeField':
+        return pa.timestamp('us', tz='UTC')
+    if internal == 'DecimalField':
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if internal == 'FloatField':
+        return pa.float64()
+    if internal == 'BooleanField':
+        return pa.bool_()
+    return pa.string()
+
+
+class ParquetTableWriter:
+    """One CDM table as Parquet, one row group per written batch."""
+
+    def __init__(self, path, model, compress=False):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            pa.field(field.column, _arrow_type(pa, field), nullable=field.null)
+            for field in export_fields(model)
+        ])
+        self.writer = pq.ParquetWriter(str(path), self.schema, compression='gzip' if compress else 'snappy')
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        arrays = [
+            self.pa.array(column, type=field.type)
+            for column, field in zip(columns, self.schema)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def open_table_writer(path, model, export_format: str, *, compress=False):
+    """A context manager yielding a writer with ``.write(rows)`` for ``export_format``."""
+    writer_class = {'csv': CSVTableWriter, 'parquet': ParquetTableWriter}[export_format]
+    return closing(writer_class(path, model, compress=compress))
@@ -0,0 +1,302 @@
+"""
+Indexed concept search over ``concept_name`` / ``concept_code``.
+
+Replaces ``Concept.objects.filter(concept_name__icontains=...)`` scans, which
+read the whole concept table once a real vocabulary (~6M rows) is loaded:
+
+  * exact code fast path — ``concept_code = %s`` on ``concept_code_idx``
+  * PostgreSQL           — pg_trgm GIN indexes; matches by substring
+                           (ILIKE) or trigram word similarity, ranked by
+                           ``word_similarity`` / ``similarity``
+  * SQLite               — FTS5 ``concept_search`` table (trigram
+                           tokenizer) kept in sync by triggers, ranked by bm25
+  * anything else, or the index not installed — an ``icontains`` scan, so
+    search keeps working on a database migrated without the extension
+
+Exact (case-insensitive) name matches always rank first. The indexes are
+created by migration 0047 through ``install_search_index``.
+
+Usage::
+
+    from omop_core.concept_search import ConceptMapper, search_concepts
+
+    search_concepts('hemoglobin', vocabulary_id='LOINC', limit=10)
+
+    mapper = ConceptMapper()               # memoizes every lookup
+    mapper.concept_id('Hemoglobin [Mass/volume] in Blood', codes=['718-7'])
+"""
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Case, Value, When
+from django.db.models.functions import Length
+
+from omop_core.models import Concept
+from omop_core.source_concepts import source_concepts
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Trigram indexes can't serve shorter queries
+MIN_TEXT_QUERY = 3
+
+SQLITE_FTS_TABLE = 'concept_search'
+
+CODE = 'code'
+NAME = 'name'
+
+RESULT_FIELDS = (
+    'concept_id', 'concept_name', 'concept_code', 'vocabulary_id', 'domain_id',
+    'concept_class_id', 'standard_concept',
+)
+
+POSTGRES_INSTALL_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS concept_name_trgm_idx ON concept USING gin (concept_name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS concept_code_trgm_idx ON concept USING gin (concept_code gin_trgm_ops)',
+]
+POSTGRES_DROP_SQL = [
+    'DROP INDEX IF EXISTS concept_name_trgm_idx',
+    'DROP INDEX IF EXISTS concept_code_trgm_idx',
+]
+
+# External-content FTS5 table: stores only the index, rows are read from concept
+SQLITE_INSTALL_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+    f"concept_name, concept_code, content='concept', content_rowid='concept_id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ai AFTER INSERT ON concept BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, concept_name, concept_code) "
+    f"VALUES (new.concept_id, new.concept_name, new.concept_code); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_ad AFTER DELETE ON concept BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, concept_name, concept_code) "
+    f"VALUES ('delete', old.concept_id, old.concept_name, old.concept_code); END",
+    f"CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_au AFTER UPDATE ON concept BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, concept_name, concept_code) "
+    f"VALUES ('delete', old.concept_id, old.concept_name, old.concept_code); "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, concept_name, concept_code) "
+    f"VALUES (new.concept_id, new.concept_name, new.concept_code); END",
+    # Index the concepts that already exist
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {SQLITE_FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}',
+]
+
+
+# ---------------------------------------------------------------------------
+# Index management
+# ---------------------------------------------------------------------------
+
+def install_search_index(connection) -> bool:
+    """Create the backend's search index (idempotent). False if the backend has none."""
+    statements = {'postgresql': POSTGRES_INSTALL_SQL, 'sqlite': SQLITE_INSTALL_SQL}.get(connection.vendor)
+    if statements is None:
+        return False
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+    return True
+
+
+def drop_search_index(connection) -> None:
+    statements = {'postgresql': POSTGRES_DROP_SQL, 'sqlite': SQLITE_DROP_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def search_index_available(connection) -> bool:
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'concept_name_trgm_idx'")
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SQLITE_FTS_TABLE])
+        else:
+            return False
+        return cursor.fetchone() is not None
+
+
+# ---------------------------------------------------------------------------
+# Backends: each returns [(concept_id, score)] best first
+# ---------------------------------------------------------------------------
+
+def _filter_sql(alias, vocabulary_id, domain_id, standard_only):
+    clauses, params = [], []
+    if vocabulary_id:
+        clauses.append(f'{alias}.vocabulary_id = %s')
+        params.append(vocabulary_id)
+    if domain_id:
+        clauses.append(f'{alias}.domain_id = %s')
+        params.append(domain_id)
+    if standard_only:
+        clauses.append(f"{alias}.standard_concept = 'S'")
+    return ''.join(f' AND {clause}' for clause in clauses), params
+
+
+def _postgres_search(cursor, query, limit, filters):
+    filter_sql, params = _filter_sql('c', *filters)
+    cursor.execute(
+        f"""
+        SELECT c.concept_id, word_similarity(%s, c.concept_name) AS score
+        FROM concept c
+        WHERE (c.concept_name ILIKE %s OR %s <%% c.concept_name){filter_sql}
+        ORDER BY lower(c.concept_name) = lower(%s) DESC, score DESC,
+                 similarity(c.concept_name, %s) DESC, c.concept_id
+        LIMIT %s
+        """,
+        [query, f'%{_escape_like(query)}%', query, *params, query, query, limit],
+    )
+    return cursor.fetchall()
+
+
+def _sqlite_search(cursor, query, limit, filters):
+    filter_sql, params = _filter_sql('c', *filters)
+    phrase = '"' + query.replace('"', '""') + '"'
+    cursor.execute(
+        f"""
+        SELECT c.concept_id, -bm25({SQLITE_FTS_TABLE}) AS score
+        FROM {SQLITE_FTS_TABLE} JOIN concept c ON c.concept_id = {SQLITE_FTS_TABLE}.rowid
+        WHERE {SQLITE_FTS_TABLE} MATCH %s{filter_sql}
+        ORDER BY lower(c.concept_name) = lower(%s) DESC, score DESC, c.concept_id
+        LIMIT %s
+        """,
+        [phrase, *params, query, limit],
+    )
+    return cursor.fetchall()
+
+
+def _filtered(qs, filters):
+    vocabulary_id, domain_id, standard_only = filters
+    if vocabulary_id:
+        qs = qs.filter(vocabulary_id=vocabulary_id)
+    if domain_id:
+        qs = qs.filter(domain_id=domain_id)
+    if standard_only:
+        qs = qs.filter(standard_concept='S')
+    return qs
+
+
+def _scan_search(query, limit, filters, using):
+    qs = _filtered(Concept.objects.using(using).filter(concept_name__icontains=query), filters)
+    # Exact matches are the shortest names containing the query
+    rows = qs.order_by(Length('concept_name'), 'concept_id').values_list('concept_id', 'concept_name')[:limit]
+    return [(concept_id, len(query) / len(name)) for concept_id, name in rows]
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def search_concepts(
+    query: str,
+    *,
+    vocabulary_id: str | None = None,
+    domain_id: str | None = None,
+    standard_only: bool = False,
+    limit: int = DEFAULT_LIMIT,
+    using: str = DEFAULT_DB_ALIAS,
+) -> list[dict]:
+    """
+    Ranked concepts for ``query``: exact code matches first (score 1.0), then
+    name/code text matches. Each result is a dict of RESULT_FIELDS plus
+    ``score`` and ``match`` ('code' or 'name').
+    """
+    query = (query or '').strip()
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    if not query:
+        return []
+    filters = (vocabulary_id, domain_id, standard_only)
+
+    ranked = [
+        (concept_id, 1.0, CODE)
+        for concept_id in _code_matches([query], filters, using)[:limit]
+    ]
+    seen = {concept_id for concept_id, _, _ in ranked}
+
+    if len(ranked) < limit:
+        connection = connections[using]
+        wanted = limit + len(ranked)
+        if len(query) >= MIN_TEXT_QUERY and search_index_available(connection):
+            backend = _postgres_search if connection.vendor == 'postgresql' else _sqlite_search
+            with connection.cursor() as cursor:
+                hits = backend(cursor, query, wanted, filters)
+        else:
+            hits = _scan_search(query, wanted, filters, using)
+        for concept_id, score in hits:
+            if concept_id not in seen and len(ranked) < limit:
+                seen.add(concept_id)
+                ranked.append((concept_id, float(score), NAME))
+
+    rows = {
+        row['concept_id']: row
+        for row in Concept.objects.using(using).filter(concept_id__in=seen).values(*RESULT_FIELDS)
+    }
+    return [
+        {**rows[concept_id], 'score': round(score, 4), 'match': match}
+        for concept_id, score, match in ranked
+        if concept_id in rows
+    ]
+
+
+def _code_matches(codes, filters, using) -> list[int]:
+    qs = _filtered(Concept.objects.using(using).filter(concept_code__in=codes), filters)
+    # Standard concepts first: a code shared across vocabularies maps to the standard one
+    standard_first = Case(When(standard_concept='S', then=Value(0)), default=Value(1))
+    return list(qs.order_by(standard_first, 'concept_id').values_list('concept_id', flat=True))
+
+
+class ConceptMapper:
+    """
+    Memoized source text / code → concept_id for ingestion.
+
+    A FHIR bundle repeats the same observation names for every patient; each
+    distinct (text, codes, codings) combination is resolved once per mapper.
+    """
+
+    def __init__(self, *, vocabulary_id=None, domain_id=None, using=DEFAULT_DB_ALIAS):
+        self.filters = (vocabulary_id, domain_id, False)
+        self.using = using
+        self._cache: dict[tuple, int | None] = {}
+        self._concepts: dict[int, Concept] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def concept_id(self, text: str, codes=(), codings=()) -> int | None:
+        """
+        Best concept for FHIR ``codings`` (omop_core.source_concepts), else any
+        of ``codes`` or the codings' codes (exact), else ``text`` (search), or None.
+        """
+        codings = tuple(codings)
+        codes = tuple(str(code) for code in (*codes, *(c.get('code') for c in codings)) if code)
+        key = ((text or '').strip().lower(), codes, tuple(c.get('system') for c in codings))
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+        self.misses += 1
+        concept_id = source_concepts.for_codings(codings) or None
+        if concept_id is None and codes:
+            matches = _code_matches(list(codes), self.filters, self.using)
+            concept_id = matches[0] if matches else None
+        if concept_id is None and key[0]:
+            vocabulary_id, domain_id, _ = self.filters
+            results = search_concepts(
+                text, vocabulary_id=vocabulary_id, domain_id=domain_id, limit=1, using=self.using,
+            )
+            concept_id = results[0]['concept_id'] if results else None
+        self._cache[key] = concept_id
+        return concept_id
+
+    def concept(self, text: str, codes=(), codings=()) -> Concept | None:
+        """Like ``concept_id`` but returns the (memoized) Concept instance."""
+        concept_id = self.concept_id(text, codes, codings)
+        if concept_id is None:
+            return None
+        if concept_id not in self._concepts:
+            self._concepts[concept_id] = Concept.objects.using(self.using).get(concept_id=concept_id)
+        return self._concepts[concept_id]
@@ -0,0 +1,119 @@
+"""
+Concept-set expansion over the OMOP vocabulary hierarchy.
+
+Builds concept sets from ``concept_ancestor`` / ``concept_relationship``
+instead of hard-coded code lists or concept-name substring matches:
+
+    from omop_core.concept_sets import descendants, descendants_query
+
+    # Cached frozenset of ids — usable directly in __in filters
+    Measurement.objects.filter(measurement_concept_id__in=descendants([3000963]))
+
+    # Or keep it in SQL: an indexed join on concept_ancestor, no round trip
+    Measurement.objects.filter(measurement_concept_id__in=descendants_query([3000963]))
+
+A concept always belongs to its own expansion, even when concept_ancestor
+has no self row for it (non-standard concepts, or no vocabulary loaded yet),
+so code that switches to expansions keeps matching the exact concept.
+
+Expansions are memoized per process. Saving or deleting ConceptAncestor /
+ConceptRelationship rows through the ORM clears the cache, as does
+``load_omop_vocabulary``; call ``clear_concept_set_cache()`` after any other
+raw change to the hierarchy tables.
+"""
+
+from functools import lru_cache
+from typing import Iterable
+
+from django.db.models.signals import post_delete, post_save
+
+from omop_core.models import Concept, ConceptAncestor, ConceptRelationship
+
+CACHE_SIZE = 1024
+
+MAPS_TO = 'Maps to'
+
+
+def _key(concept_ids: Iterable[int]) -> tuple[int, ...]:
+    return tuple(sorted({int(c) for c in concept_ids}))
+
+
+def descendants_query(concept_ids: Iterable[int], *, max_levels: int | None = None):
+    """Lazy ``descendant_concept_id`` values query, for use as an ``__in`` subquery.
+
+    Unlike ``descendants()`` it does not add the concepts themselves.
+    """
+    qs = ConceptAncestor.objects.filter(ancestor_concept_id__in=_key(concept_ids))
+    if max_levels is not None:
+        qs = qs.filter(min_levels_of_separation__lte=max_levels)
+    return qs.values('descendant_concept_id')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _descendants(key: tuple[int, ...], max_levels: int | None) -> frozenset[int]:
+    ids = set(key)
+    ids.update(
+        descendants_query(key, max_levels=max_levels).values_list('descendant_concept_id', flat=True)
+    )
+    return frozenset(ids)
+
+
+def descendants(concept_ids: Iterable[int], *, max_levels: int | None = None) -> frozenset[int]:
+    """The concepts and all their descendants (up to ``max_levels`` below), cached."""
+    return _descendants(_key(concept_ids), max_levels)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _related(key: tuple[int, ...], relationship_id: str) -> frozenset[int]:
+    return frozenset(
+        ConceptRelationship.objects.filter(
+            concept_1_id__in=key, relationship_id=relationship_id, invalid_reason__isnull=True,
+        ).values_list('concept_2_id', flat=True)
+    )
+
+
+def related(concept_ids: Iterable[int], relationship_id: str) -> frozenset[int]:
+    """Concepts reached from ``concept_ids`` by one valid ``relationship_id`` link, cached."""
+    return _related(_key(concept_ids), relationship_id)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _standard_descendants(key: tuple[int, ...]) -> frozenset[int]:
+    links = ConceptRelationship.objects.filter(
+        concept_1_id__in=key, relationship_id=MAPS_TO, invalid_reason__isnull=True,
+    ).values_list('concept_1_id', 'concept_2_id')
+    mapped_from, targets = set(), set()
+    for source, target in links:
+        mapped_from.add(source)
+        targets.add(target)
+    return descendants(targets | (set(key) - mapped_from))
+
+
+def standard_descendants(concept_ids: Iterable[int]) -> frozenset[int]:
+    """Map source concepts to standard ones ('Maps to'), then expand the hierarchy.
+
+    Concepts without a mapping are expanded as they are.
+    """
+    return _standard_descendants(_key(concept_ids))
+
+
+def concept_ids_for_codes(vocabulary_id: str, codes: Iterable[str]) -> set[int]:
+    """Concept ids for source codes in one vocabulary (e.g. LOINC codes)."""
+    return set(
+        Concept.objects.filter(vocabulary_id=vocabulary_id, concept_code__in=set(codes))
+        .values_list('concept_id', flat=True)
+    )
+
+
+def clear_concept_set_cache(**kwargs) -> None:
+    """Forget every memoized expansion (after the vocabulary tables change)."""
+    _descendants.cache_clear()
+    _related.cache_clear()
+    _standard_descendants.cache_clear()
+
+
+# ORM writes to the hierarchy invalidate too; raw bulk loads must call
+# clear_concept_set_cache() themselves.
+for _model in (ConceptAncestor, ConceptRelationship):
+    post_save.connect(clear_concept_set_cache, sender=_model, dispatch_uid=f'concept_sets_{_model.__name__}_save')
+    post_delete.connect(clear_concept_set_cache, sender=_model, dispatch_uid=f'concept_sets_{_model.__name__}_delete')
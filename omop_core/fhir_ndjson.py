@@ -0,0 +1,155 @@
+"""
+Streaming FHIR readers and writers.
+
+Both writers accept Bundle entries (``{"fullUrl": ..., "resource": {...}}``)
+one at a time and write them straight to disk, so memory stays flat no matter
+how many resources are produced.
+
+  * BundleStreamWriter — a single ``{"resourceType": "Bundle", ...}`` document
+  * NDJSONStreamWriter — FHIR Bulk Data layout: one ``<ResourceType>.ndjson``
+                         file per resource type, one resource per line
+
+Pass ``compress=True`` to gzip the output (``.gz`` is appended to file names).
+Gzip headers carry no timestamp, so identical input gives identical bytes.
+
+``read_ndjson`` is the matching reader: it yields one resource per line from a
+plain or ``.gz`` NDJSON file without loading the file into memory.
+"""
+
+import gzip
+import io
+import json
+from collections import Counter
+from pathlib import Path
+
+
+def open_text(path, mode='wt', compress=False):
+    """Open a UTF-8 text file, transparently gzip-compressed when requested."""
+    path = Path(path)
+    if compress:
+        if 'r' in mode:
+            return gzip.open(path, mode, encoding='utf-8')
+        binary = gzip.GzipFile(path, mode.replace('t', '') or 'wb', compresslevel=6, mtime=0)
+        return io.TextIOWrapper(binary, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def dumps_json(obj, indent=None):
+    """Serialise one entry/resource: compact separators unless indent is given."""
+    if indent is None:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+    return json.dumps(obj, indent=indent, ensure_ascii=False)
+
+
+def read_ndjson(path, errors=None):
+    """
+    Yield resources from an NDJSON file, one parsed line at a time.
+
+    Blank lines are ignored. Malformed lines raise ValueError, or are recorded
+    as ``(line_number, message)`` in ``errors`` when a list is passed.
+    """
+    path = Path(path)
+    with open_text(path, 'rt', compress=path.suffix == '.gz') as fh:
+        for line_number, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                if errors is None:
+                    raise ValueError(f'{path}:{line_number}: {exc}') from exc
+                errors.append((line_number, str(exc)))
+
+
+class BundleStreamWriter:
+    """Write a collection Bundle incrementally, one entry at a time."""
+
+    def __init__(self, path, compress=False, indent=None, bundle_type='collection'):
+        self.path = Path(str(path) + '.gz' if compress and not str(path).endswith('.gz') else path)
+        self.compress = compress
+        self.indent = indent
+        self.bundle_type = bundle_type
+        self.counts = Counter()
+        self._fh = None
+        self._first = True
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open_text(self.path, 'wt', self.compress)
+        header = dumps_json({'resourceType': 'Bundle', 'type': self.bundle_type})
+        # Re-open the object so entries can be appended as they arrive
+        self._fh.write(header[:-1] + (',"entry":[' if self.indent is None else ',\n"entry": [\n'))
+        return self
+
+    def write(self, entry):
+        if not self._first:
+            self._fh.write(',' if self.indent is None else ',\n')
+        self._fh.write(dumps_json(entry, self.indent))
+        self._first = False
+        self.counts[entry['resource']['resourceType']] += 1
+
+    def write_raw(self, resource_type, text):
+        """Append an entry that has already been serialised with dumps_json."""
+        if not self._first:
+            self._fh.write(',' if self.indent is None else ',\n')
+        self._fh.write(text)
+        self._first = False
+        self.counts[resource_type] += 1
+
+    def write_many(self, entries):
+        for entry in entries:
+            self.write(entry)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._fh.write(']}' if self.indent is None else '\n]}\n')
+        self._fh.close()
+        return False
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+
+class NDJSONStreamWriter:
+    """Write FHIR Bulk Data NDJSON, one file per resource type."""
+
+    def __init__(self, directory, compress=False):
+        self.directory = Path(directory)
+        self.compress = compress
+        self.counts = Counter()
+        self._files = {}
+
+    def __enter__(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def path_for(self, resource_type):
+        suffix = '.ndjson.gz' if self.compress else '.ndjson'
+        return self.directory / f'{resource_type}{suffix}'
+
+    def write(self, entry):
+        resource = entry['resource'] if 'resource' in entry else entry
+        self.write_raw(resource['resourceType'], dumps_json(resource))
+
+    def write_raw(self, resource_type, text):
+        """Append one already-serialised resource line to its type's file."""
+        fh = self._files.get(resource_type)
+        if fh is None:
+            fh = self._files[resource_type] = open_text(self.path_for(resource_type), 'wt', self.compress)
+        fh.write(text)
+        fh.write('\n')
+        self.counts[resource_type] += 1
+
+    def write_many(self, entries):
+        for entry in entries:
+            self.write(entry)
+
+    def __exit__(self, exc_type, exc, tb):
+        for fh in self._files.values():
+            fh.close()
+        self._files = {}
+        return False
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
@@ -0,0 +1,138 @@
+"""
+Query-count and latency instrumentation for requests and management commands.
+
+``QueryProfile`` records every SQL statement run on any database connection
+of the current thread while it is active (via ``connection.execute_wrapper``,
+so DEBUG is not required): the number of queries, total database time and
+the slowest statements. Statements are recorded without their parameters, so
+patient data never reaches the logs.
+
+    from omop_core.instrumentation import QueryProfile
+
+    with QueryProfile() as profile:
+        PatientInfo.objects.all()[:10]
+    profile.summary()   # {'queries': 1, 'db_ms': 0.4, 'slowest': [...], ...}
+
+It backs two opt-in entry points, both enabled with the
+``QUERY_INSTRUMENTATION`` setting (environment variable of the same name):
+
+  * omop_core.middleware.QueryInstrumentationMiddleware — per API request,
+    adds a ``Server-Timing`` header and logs one JSON line per request
+  * ``python manage.py instrument <command> [args …]`` — per command run
+
+Log lines go to the ``ctomop.instrumentation`` logger as compact JSON.
+"""
+
+import json
+import logging
+import math
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+logger = logging.getLogger('ctomop.instrumentation')
+
+# Slowest statements kept per profile
+SLOWEST_KEPT = 5
+
+# Longer statements are cut in the logs (huge IN lists, bulk INSERTs)
+MAX_SQL_LENGTH = 300
+
+
+class QueryProfile:
+    """Context manager recording the queries, DB time and slowest statements of a block."""
+
+    def __init__(self, *, slowest_kept=SLOWEST_KEPT):
+        self.slowest_kept = slowest_kept
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest: list[tuple[float, str, str]] = []
+        self.started = None
+        self.elapsed = None
+        self.timings: dict[str, float] = {}
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._record))
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.started
+        self._stack.close()
+        return False
+
+    def _record(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            if len(self.slowest) < self.slowest_kept or duration > self.slowest[-1][0]:
+                self.slowest.append((duration, context['connection'].alias, sql))
+                self.slowest.sort(key=lambda entry: entry[0], reverse=True)
+                del self.slowest[self.slowest_kept:]
+
+    def time(self, name):
+        """Context manager adding a named phase (e.g. 'serialize') to ``timings``."""
+        return _Phase(self, name)
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'total_ms': round(elapsed * 1000, 2),
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in self.timings.items()},
+            'slowest': [
+                {'ms': round(duration * 1000, 2), 'db': alias, 'sql': _shorten(sql)}
+                for duration, alias, sql in self.slowest
+            ],
+        }
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value: db, each named phase and the total."""
+        summary = self.summary()
+        parts = [f'db;dur={summary["db_ms"]};desc="{self.queries} queries"']
+        parts += [f'{name};dur={round(seconds * 1000, 2)}' for name, seconds in self.timings.items()]
+        parts.append(f'total;dur={summary["total_ms"]}')
+        return ', '.join(parts)
+
+
+class _Phase:
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        self.profile.timings[self.name] = self.profile.timings.get(self.name, 0.0) + elapsed
+        return False
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (which must not be empty)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _shorten(sql: str) -> str:
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= MAX_SQL_LENGTH else sql[:MAX_SQL_LENGTH] + '…'
+
+
+def log_profile(kind: str, name: str, profile: QueryProfile, *, level=logging.INFO, **fields) -> dict:
+    """Emit one structured log line for a finished profile and return its payload."""
+    payload = {'event': kind, 'name': name, **fields, **profile.summary()}
+    logger.log(level, json.dumps(payload, default=str))
+    return payload
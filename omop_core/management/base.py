@@ -0,0 +1,30 @@
+"""
+Base class for the data-loading and export commands that run from cron and scripts.
+"""
+
+from django.core.management.base import BaseCommand
+
+from omop_core.replicas import use_replicas
+
+
+class BatchCommand(BaseCommand):
+    """
+    A BaseCommand that skips Django's system checks.
+
+    The checks import the URLconf, and with it DRF and every API view, before
+    each run: about 0.4 s of a 0.9 s start for a command that never serves a
+    request (``python manage.py import_report <command>`` shows the split).
+    They still run for ``check``, ``migrate`` and ``runserver``.
+
+    Read-only commands set ``reads_from_replica`` to run their queries on a
+    read replica when one is configured (omop_core.replicas).
+    """
+
+    requires_system_checks = []
+    reads_from_replica = False
+
+    def execute(self, *args, **options):
+        if not self.reads_from_replica:
+            return super().execute(*args, **options)
+        with use_replicas():
+            return super().execute(*args, **options)
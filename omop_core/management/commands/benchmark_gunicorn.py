@@ -0,0 +1,85 @@
+"""
+Django management command: benchmark_gunicorn
+=============================================
+Measures HTTP throughput of the gunicorn deployment profile
+(gunicorn.conf.py) against gunicorn's stock settings, the way the Procfile
+ran it before: one sync worker, no preloading, no warm-up.
+
+A throw-away database is filled with the seeded benchmark cohort (as for
+run_benchmarks), each configuration is started as a subprocess on a free
+local port, and the same fixed list of logged-in GET requests is sent to
+both (benchmarks/server.py). Reported per configuration: requests/s
+including start-up, p50/p95 latency, start-up time, errors and the memory of
+master plus workers (PSS, so pages shared copy-on-write count once).
+
+Worker count follows the machine (gunicorn.conf.py: 2 × cores + 1, or
+WEB_CONCURRENCY), so run it on hardware like production's and against
+PostgreSQL (DATABASE_URL): extra workers and threads pay off on several cores
+and while requests wait on the database, not on one core with local SQLite.
+
+Usage
+-----
+  python manage.py benchmark_gunicorn
+  python manage.py benchmark_gunicorn --scale 10k --requests 5000 --concurrency 32 --output /tmp/gunicorn.json
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import datasets, runner, server
+from benchmarks.datasets import DEFAULT_SEED, parse_scale
+
+
+class Command(BaseCommand):
+    help = 'Compare HTTP throughput of gunicorn.conf.py with stock gunicorn settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='1k', help='Patients in the seeded cohort (default: 1k)')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per configuration (default: 2000)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients (default: 16)')
+        parser.add_argument(
+            '--configs', nargs='+', choices=server.CONFIGS, default=list(server.CONFIGS),
+            help='Configurations to run (default: all)',
+        )
+        parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'Dataset seed (default: {DEFAULT_SEED})')
+        parser.add_argument('--output', help='Write the JSON report here')
+
+    def handle(self, *args, **options):
+        try:
+            count = parse_scale(options['scale'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'gunicorn: {count:,} patients, {options["requests"]:,} requests, '
+            f'concurrency {options["concurrency"]}'
+        ))
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir, runner.isolated_database(Path(workdir) / 'benchmark.sqlite3'):
+            datasets.seed_demographic_concepts()
+            datasets.seed_omop_cohort(count, options['seed'])
+            paths = server.request_paths(options['requests'], options['seed'])
+            cookie = server.session_cookie()
+            for config in options['configs']:
+                try:
+                    results[config] = server.run_config(
+                        config, paths, cookie, options['concurrency'], Path(workdir),
+                    )
+                except RuntimeError as exc:
+                    log = (Path(workdir) / f'{config}.log').read_text()
+                    raise CommandError(f'{config}: {exc}\n{log}') from exc
+                self.stdout.write(server.format_result(config, results[config]))
+
+        if {'stock', 'profile'} <= results.keys():
+            gain = results['profile']['throughput'] / results['stock']['throughput']
+            self.stdout.write(self.style.SUCCESS(f'profile vs stock: {gain:.2f}× throughput'))
+        if options['output']:
+            report = {'meta': {'patients': count, **{k: options[k] for k in ('requests', 'concurrency', 'seed')}},
+                      'results': results}
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(f'Report written to {options["output"]}')
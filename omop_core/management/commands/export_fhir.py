@@ -0,0 +1,106 @@
+"""
+Django management command: export_fhir
+======================================
+Exports persons and their clinical data from the OMOP tables as FHIR R4
+resources — the reverse of upload_fhir / import_fhir_ndjson:
+
+  Patient, Condition, Observation (measurements and observations),
+  MedicationStatement
+
+Persons are paged by person_id and each page's events are loaded in one
+query per table (omop_core.fhir_export), so throughput does not depend on
+cohort size and memory on page size only. Output is streamed to disk:
+
+  * ``--format ndjson`` (default): FHIR Bulk Data layout, one
+    ``<ResourceType>.ndjson`` file per type in the output directory
+  * ``--format bundle``: one collection Bundle per page of persons,
+    ``bundle-000001.json``, ``bundle-000002.json``, … — each small enough
+    to POST to ``/api/patient-info/upload_fhir/``
+
+Usage
+-----
+  python manage.py export_fhir --output exports/fhir/
+  python manage.py export_fhir --output exports/fhir/ --gzip --page-size 1000
+
+  # Bundles of 100 patients, only Patient and Condition resources
+  python manage.py export_fhir --output exports/bundles/ --format bundle --page-size 100 --types Condition
+
+  # Absolute fullUrls in Bundle entries
+  python manage.py export_fhir --output exports/bundles/ --format bundle --base-url https://fhir.example.org
+"""
+
+import time
+from pathlib import Path
+
+from django.core.management.base import CommandError
+
+from omop_core.fhir_export import DEFAULT_PAGE_SIZE, RESOURCE_TYPES, export_pages
+from omop_core.fhir_ndjson import BundleStreamWriter, NDJSONStreamWriter
+from omop_core.management.base import BatchCommand
+
+
+class Command(BatchCommand):
+    help = 'Export OMOP persons and clinical data as FHIR NDJSON or paged Bundles'
+    reads_from_replica = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', required=True, help='Output directory')
+        parser.add_argument(
+            '--format', choices=['ndjson', 'bundle'], default='ndjson',
+            help='ndjson (one file per resource type) or bundle (one Bundle per page); default: ndjson',
+        )
+        parser.add_argument('--gzip', action='store_true', help='gzip-compress the output files')
+        parser.add_argument(
+            '--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+            help=f'Persons per page (and per Bundle) (default: {DEFAULT_PAGE_SIZE})',
+        )
+        parser.add_argument(
+            '--types', nargs='+', choices=RESOURCE_TYPES[1:], default=list(RESOURCE_TYPES[1:]),
+            help='Clinical resource types to include; Patient is always exported (default: all)',
+        )
+        parser.add_argument(
+            '--base-url',
+            help='Base URL for Bundle entry fullUrls (default: entries carry no fullUrl)',
+        )
+
+    def handle(self, *args, **options):
+        if options['page_size'] < 1:
+            raise CommandError('--page-size must be at least 1')
+        output_dir = Path(options['output'])
+        pages = export_pages(options['page_size'], types=('Patient', *options['types']))
+
+        started = time.perf_counter()
+        if options['format'] == 'ndjson':
+            counts, bundles = self._write_ndjson(output_dir, pages, options['gzip']), 0
+        else:
+            counts, bundles = self._write_bundles(output_dir, pages, options['gzip'], options['base_url'])
+        elapsed = time.perf_counter() - started
+
+        patients = counts.get('Patient', 0)
+        summary = ', '.join(f'{counts.get(t, 0):,} {t}' for t in RESOURCE_TYPES)
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {sum(counts.values()):,} resource(s) to {output_dir} in {elapsed:.1f}s '
+            f'({patients / elapsed if elapsed else 0:,.0f} patients/s)'
+        ))
+        self.stdout.write(f'  {summary}' + (f' in {bundles:,} Bundle(s)' if bundles else ''))
+
+    def _write_ndjson(self, output_dir, pages, compress):
+        with NDJSONStreamWriter(output_dir, compress=compress) as writer:
+            for resources in pages:
+                for resource in resources:
+                    writer.write(resource)
+        return writer.counts
+
+    def _write_bundles(self, output_dir, pages, compress, base_url):
+        counts = {}
+        bundles = 0
+        for bundles, resources in enumerate(pages, start=1):
+            with BundleStreamWriter(output_dir / f'bundle-{bundles:06d}.json', compress=compress) as writer:
+                for resource in resources:
+                    entry = {'resource': resource}
+                    if base_url:
+                        entry = {'fullUrl': f"{base_url.rstrip('/')}/{resource['resourceType']}/{resource['id']}", **entry}
+                    writer.write(entry)
+            for resource_type, count in writer.counts.items():
+                counts[resource_type] = counts.get(resource_type, 0) + count
+        return counts, bundles
@@ -0,0 +1,171 @@
+"""
+Django management command: export_omop_cdm
+==========================================
+Writes OMOP CDM flat-file extracts for research partners, one file (or N
+person shards) per table:
+
+  person, visit_occurrence, condition_occurrence, drug_exposure,
+  measurement, observation, episode, episode_event
+
+Each table is streamed in primary-key order in batches of ``--chunk-size``
+rows (keyset pagination, see omop_core.cdm_export), so memory stays flat and
+re-running on unchanged data gives identical CSV files.
+
+  * ``--format csv`` (default) or ``--format parquet`` (needs pyarrow)
+  * ``--gzip`` compresses CSV files (``.csv.gz``) or selects gzip page
+    compression for Parquet
+  * ``--shards N`` splits every table by ``person_id % N`` into
+    ``<table>/<table>-<k>-of-<N>.<ext>``, so partners can load shards in
+    parallel and each shard holds all rows of its persons
+
+Files are written as ``<name>.partial`` and renamed when complete, and
+``manifest.json`` in the output directory records every finished file with
+its row count. It is the checkpoint: ``--resume`` skips the files it lists
+and redoes the rest, so an interrupted export loses at most one file's work.
+The manifest's ``complete`` flag is set once every file is written.
+
+Usage
+-----
+  python manage.py export_omop_cdm /exports/partner-2024-06
+
+  # Gzipped CSV in 8 person shards, only two tables
+  python manage.py export_omop_cdm /exports/p --gzip --shards 8 --tables person measurement
+
+  # Parquet; pick up where an interrupted run stopped
+  python manage.py export_omop_cdm /exports/p --format parquet --resume
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.core.management.base import CommandError
+
+from omop_core.cdm_export import (
+    CDM_TABLES, DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, file_name, open_table_writer, parquet_available,
+    shard_queryset, table_batches,
+)
+from omop_core.management.base import BatchCommand
+
+MANIFEST = 'manifest.json'
+
+# Options that must match for --resume to reuse finished files
+LAYOUT_OPTIONS = ('format', 'gzip', 'shards')
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def _save_manifest(path: Path, manifest: dict):
+    partial = path.with_name(path.name + '.partial')
+    partial.write_text(json.dumps(manifest, indent=2))
+    os.replace(partial, path)
+
+
+class Command(BatchCommand):
+    help = 'Export OMOP CDM tables to CSV or Parquet files, optionally gzipped and sharded by person'
+    reads_from_replica = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help='Directory to write the extract to (created if missing)')
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(CDM_TABLES), default=list(CDM_TABLES),
+            help='Tables to export (default: all)',
+        )
+        parser.add_argument(
+            '--format', choices=EXPORT_FORMATS, default='csv', dest='export_format',
+            help='File format (default: csv)',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='gzip CSV files; gzip page compression for Parquet (default: snappy)',
+        )
+        parser.add_argument(
+            '--shards', type=int, default=1,
+            help='Split each table into this many files by person_id (default: 1)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows per database batch (default: {DEFAULT_CHUNK_SIZE:,})',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help=f'Skip files already recorded in {MANIFEST} by an earlier run',
+        )
+
+    def handle(self, *args, **options):
+        export_format, compress, shards = options['export_format'], options['gzip'], options['shards']
+        if shards < 1:
+            raise CommandError('--shards must be at least 1')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        if export_format == 'parquet' and not parquet_available():
+            raise CommandError('Parquet output needs pyarrow: pip install pyarrow')
+
+        output_dir = Path(options['output_dir'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = output_dir / MANIFEST
+        layout = {'format': export_format, 'gzip': compress, 'shards': shards}
+        manifest = self._load_manifest(manifest_path, layout, options['resume'])
+        requested = set(manifest['tables']) | set(options['tables'])
+        manifest['tables'] = [table for table in CDM_TABLES if table in requested]
+        manifest['complete'] = False
+        _save_manifest(manifest_path, manifest)
+
+        started = time.perf_counter()
+        written = skipped = 0
+        for table in options['tables']:
+            model = CDM_TABLES[table]
+            for shard in range(shards):
+                name = file_name(table, export_format, compress=compress, shard=shard, shards=shards)
+                if name in manifest['files'] and (output_dir / name).exists():
+                    skipped += 1
+                    self.stdout.write(f'  {name}: already exported, skipping')
+                    continue
+                rows, seconds = self._export_file(
+                    output_dir / name, model, shard_queryset(model, shard, shards),
+                    export_format, compress, options['chunk_size'],
+                )
+                written += rows
+                manifest['files'][name] = {'table': table, 'shard': shard, 'rows': rows}
+                _save_manifest(manifest_path, manifest)
+                self.stdout.write(
+                    f'  {name}: {rows:,} row(s) in {seconds:.1f}s '
+                    f'({rows / seconds if seconds else 0:,.0f} rows/s)'
+                )
+
+        manifest['complete'] = True
+        manifest['finished_at'] = _now()
+        _save_manifest(manifest_path, manifest)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {written:,} row(s) to {output_dir} in {elapsed:.1f}s'
+            + (f' ({skipped} file(s) kept from an earlier run)' if skipped else '')
+        ))
+
+    def _load_manifest(self, path: Path, layout: dict, resume: bool) -> dict:
+        if not resume or not path.exists():
+            return {**layout, 'started_at': _now(), 'tables': [], 'files': {}}
+        manifest = json.loads(path.read_text())
+        changed = [key for key in LAYOUT_OPTIONS if manifest.get(key) != layout[key]]
+        if changed:
+            raise CommandError(
+                f'Cannot resume: {", ".join(changed)} differ from the earlier run in {path} '
+                f'({", ".join(f"{key}={manifest.get(key)!r}" for key in changed)})'
+            )
+        return manifest
+
+    def _export_file(self, path: Path, model, queryset, export_format, compress, chunk_size):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + '.partial')
+        started = time.perf_counter()
+        rows = 0
+        with open_table_writer(partial, model, export_format, compress=compress) as writer:
+            for batch in table_batches(model, queryset, chunk_size):
+                writer.write(batch)
+                rows += len(batch)
+        os.replace(partial, path)
+        return rows, time.perf_counter() - started
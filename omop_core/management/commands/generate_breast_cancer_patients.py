@@ -8,27 +8,86 @@ This script creates realistic synthetic data for breast cancer patients with:
 - Genetic mutations appropriate for each subtype
 - OMOP CDM v6.0 compliant data storage
 
+Patients are generated in chunks. All concepts and locations are resolved
+once up front, ids for every table are pre-allocated from the current
+max(<table>_id), and each chunk's rows are written per table with
+omop_core.bulk_load (COPY on PostgreSQL) inside its own transaction, so
+memory stays flat and million-patient load-test databases can be built in
+one run.
+
 Usage:
     python manage.py generate_breast_cancer_patients
+    python manage.py generate_breast_cancer_patients --count 1000000 --chunk-size 10000
 """
 
 import random
-import json
-from datetime import date, datetime, timedelta
+import time
+from datetime import date, timedelta
 from decimal import Decimal
-from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
 from django.db import transaction
 from django.db.models import Max
-from django.utils import timezone
 
+from omop_core.bulk_load import bulk_load
+from omop_core.management.base import BatchCommand
 from omop_core.models import (
     Person, Location, Concept, Vocabulary, Domain, ConceptClass,
     Measurement, Observation, ConditionOccurrence, DrugExposure, VisitOccurrence,
     PatientInfo
 )
+from omop_core.patient_info_cache import patient_info_cache
+
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Write order respects foreign keys between the generated tables
+WRITE_ORDER = [Person, PatientInfo, VisitOccurrence, ConditionOccurrence, Measurement, DrugExposure]
+
+# Person ids below this are left free for real patients
+FIRST_PERSON_ID = 20001
+
+LOCATIONS = [
+    ('New York', 'NY', '10001', 'US', 40.7128, -74.0060),
+    ('Los Angeles', 'CA', '90001', 'US', 34.0522, -118.2437),
+    ('Chicago', 'IL', '60601', 'US', 41.8781, -87.6298),
+    ('Houston', 'TX', '77001', 'US', 29.7604, -95.3698),
+    ('Boston', 'MA', '02101', 'US', 42.3601, -71.0589),
+]
+
+US_STATES = ['NY', 'CA', 'IL', 'TX', 'MA', 'FL', 'PA', 'OH', 'GA', 'NC']
+STATE_CITIES = {
+    'NY': 'New York', 'CA': 'Los Angeles', 'IL': 'Chicago',
+    'TX': 'Houston', 'MA': 'Boston', 'FL': 'Miami',
+    'PA': 'Philadelphia', 'OH': 'Columbus', 'GA': 'Atlanta', 'NC': 'Charlotte'
+}
+
+RACE_CONCEPTS = [8527, 8516, 8515]  # White, Black, Asian
+ETHNICITY_CONCEPTS = [38003563, 38003564]  # Hispanic, Not Hispanic
+
+FEMALE = 8532
+OUTPATIENT_VISIT = 9202
+EHR_RECORD = 44818517
+EHR_CHIEF_COMPLAINT = 32020
+LAB_RESULT = 44818702
+PRESCRIPTION_WRITTEN = 38000177
+TNBC = 4163261
+BREAST_CANCER = 4112853
+POSITIVE, NEGATIVE, EQUIVOCAL = 4181412, 4132135, 45884084
+GERMLINE, SOMATIC = 255395001, 255461003
+PATHOGENIC, BENIGN, VUS = 30166007, 10828004, 42425007
+ER, PR, HER2 = 3025023, 3020891, 3003740
+BRCA1, BRCA2, TP53 = 3023103, 3005771, 3019550
 
+TNBC_TREATMENTS = [1308216, 1357900, 1551099]  # Carboplatin, Paclitaxel, Pembrolizumab
+NON_TNBC_TREATMENTS = [1551099, 1308216, 1357900]  # Tamoxifen, Doxorubicin, Paclitaxel
 
-class Command(BaseCommand):
+
+def _age_on(dob, today):
+    """Same age rule as PatientInfo.save(), which bulk loading bypasses."""
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+class Command(BatchCommand):
     help = 'Generate 100 synthetic breast cancer patients (50 TNBC) for OMOP tables'
 
     def add_arguments(self, parser):
@@ -50,39 +109,62 @@ class Command(BaseCommand):
             default=42,
             help='Random seed for reproducible data generation',
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Patients generated and written per transaction (default: {DEFAULT_CHUNK_SIZE})',
+        )
 
     def handle(self, *args, **options):
         count = options['count']
         tnbc_ratio = options['tnbc_ratio']
         seed = options['seed']
-        
-        random.seed(seed)
-        
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        self.rng = random.Random(seed)
+        self.today = date.today()
+
         self.stdout.write(f'Generating {count} synthetic breast cancer patients...')
         self.stdout.write(f'TNBC patients: {int(count * tnbc_ratio)} ({tnbc_ratio * 100}%)')
-        
-        # Create required concepts and vocabularies
+
+        # Create required concepts, vocabularies and locations once
         self.create_vocabularies_and_concepts()
-        
-        # Generate patients
+        self.location_ids = self.resolve_locations()
+        self.allocate_ids()
+
         tnbc_count = int(count * tnbc_ratio)
         non_tnbc_count = count - tnbc_count
-        
-        with transaction.atomic():
-            # Generate TNBC patients
-            for i in range(tnbc_count):
-                self.generate_patient(is_tnbc=True, patient_num=i+1)
-                
-            # Generate non-TNBC patients
-            for i in range(non_tnbc_count):
-                self.generate_patient(is_tnbc=False, patient_num=tnbc_count+i+1)
-        
+
+        # TNBC patients first, then non-TNBC, as before
+        subtypes = (is_tnbc for n, is_tnbc in ((tnbc_count, True), (non_tnbc_count, False)) for _ in range(n))
+        started = time.perf_counter()
+        done = 0
+        while done < count:
+            size = min(chunk_size, count - done)
+            rows = {model: [] for model in WRITE_ORDER}
+            for _ in range(size):
+                self.generate_patient(next(subtypes), rows)
+            with transaction.atomic():
+                for model in WRITE_ORDER:
+                    bulk_load(model, rows[model])
+            done += size
+            # bulk_load sends no signals
+            patient_info_cache.invalidate_all()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'  {done:,}/{count:,} patients ({done / elapsed if elapsed else 0:,.0f} patients/s)'
+            )
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'Successfully generated {count} synthetic breast cancer patients:\n'
                 f'  TNBC patients: {tnbc_count}\n'
                 f'  Non-TNBC patients: {non_tnbc_count}\n'
-                f'  Total: {count}'
+                f'  Total: {count}\n'
+                f'  Elapsed: {time.perf_counter() - started:.1f}s'
             )
         )
 
@@ -164,6 +246,7 @@ class Command(BaseCommand):
         condition_domain = Domain.objects.get(domain_id='Condition')
         measurement_domain = Domain.objects.get(domain_id='Measurement')
         observation_domain = Domain.objects.get(domain_id='Observation')
+        drug_domain = Domain.objects.get(domain_id='Drug')
         gender_domain = Domain.objects.get(domain_id='Gender')
         race_domain = Domain.objects.get(domain_id='Race')
         ethnicity_domain = Domain.objects.get(domain_id='Ethnicity')
@@ -222,446 +305,245 @@ class Command(BaseCommand):
             (3036277, 'Body height', '8302-2', measurement_domain, loinc_vocab, lab_test_class, 'S'),
             (3013682, 'Hemoglobin', '718-7', measurement_domain, loinc_vocab, lab_test_class, 'S'),
             (3016723, 'Creatinine', '2160-0', measurement_domain, loinc_vocab, lab_test_class, 'S'),
+
+            # Visit, record type and treatment concepts
+            (OUTPATIENT_VISIT, 'Outpatient Visit', '185349003', observation_domain, snomed_vocab, clinical_finding_class, 'S'),
+            (EHR_RECORD, 'EHR record', 'EHR', observation_domain, snomed_vocab, clinical_finding_class, 'S'),
+            (EHR_CHIEF_COMPLAINT, 'EHR Chief Complaint', 'EHR-CC', observation_domain, snomed_vocab, clinical_finding_class, 'S'),
+            (LAB_RESULT, 'Lab result', 'LAB', measurement_domain, snomed_vocab, lab_test_class, 'S'),
+            (PRESCRIPTION_WRITTEN, 'Prescription written', 'RX', drug_domain, snomed_vocab, clinical_finding_class, 'S'),
+            (1308216, 'Carboplatin', '1308216', drug_domain, snomed_vocab, clinical_finding_class, 'S'),
+            (1357900, 'Paclitaxel', '1357900', drug_domain, snomed_vocab, clinical_finding_class, 'S'),
+            (1551099, 'Pembrolizumab', '1551099', drug_domain, snomed_vocab, clinical_finding_class, 'S'),
         ]
 
-        for concept_id, name, code, domain, vocab, concept_class, standard in concepts:
-            Concept.objects.get_or_create(
-                concept_id=concept_id,
-                defaults={
-                    'concept_name': name,
-                    'domain': domain,
-                    'vocabulary': vocab,
-                    'concept_class': concept_class,
-                    'standard_concept': standard,
-                    'concept_code': code,
-                    'valid_start_date': date(2000, 1, 1),
-                    'valid_end_date': date(2099, 12, 31),
-                }
-            )
+        Concept.objects.bulk_create(
+            [
+                Concept(
+                    concept_id=concept_id,
+                    concept_name=name,
+                    domain=domain,
+                    vocabulary=vocab,
+                    concept_class=concept_class,
+                    standard_concept=standard,
+                    concept_code=code,
+                    valid_start_date=date(2000, 1, 1),
+                    valid_end_date=date(2099, 12, 31),
+                )
+                for concept_id, name, code, domain, vocab, concept_class, standard in concepts
+            ],
+            ignore_conflicts=True,
+        )
+
+    def resolve_locations(self):
+        """Get or create the fixed patient locations once; returns their ids."""
+        location_ids = []
+        for city, state, zip_code, country, lat, lon in LOCATIONS:
+            location = Location.objects.filter(
+                city=city, state=state, zip=zip_code, country=country
+            ).first()
+            if location is None:
+                max_location_id = Location.objects.aggregate(max_id=Max('location_id'))['max_id'] or 20000
+                location = Location.objects.create(
+                    location_id=max_location_id + 1,
+                    city=city,
+                    state=state,
+                    zip=zip_code,
+                    country=country,
+                    latitude=Decimal(str(lat)),
+                    longitude=Decimal(str(lon))
+                )
+            location_ids.append(location.location_id)
+        return location_ids
+
+    def allocate_ids(self):
+        """Start every table's id counter after the current maximum."""
+        def next_id(model, field, floor=1):
+            return max((model.objects.aggregate(m=Max(field))['m'] or 0) + 1, floor)
+
+        self.next_ids = {
+            Person: next_id(Person, 'person_id', FIRST_PERSON_ID),
+            VisitOccurrence: next_id(VisitOccurrence, 'visit_occurrence_id'),
+            ConditionOccurrence: next_id(ConditionOccurrence, 'condition_occurrence_id'),
+            Measurement: next_id(Measurement, 'measurement_id'),
+            DrugExposure: next_id(DrugExposure, 'drug_exposure_id'),
+        }
+
+    def take_id(self, model):
+        value = self.next_ids[model]
+        self.next_ids[model] = value + 1
+        return value
+
+    def generate_patient(self, is_tnbc, rows):
+        """Generate a single synthetic breast cancer patient into ``rows``"""
+        rng = self.rng
 
-    def generate_patient(self, is_tnbc, patient_num):
-        """Generate a single synthetic breast cancer patient"""
-        
         # Generate demographics
-        # Start from a higher ID to avoid conflicts
-        person_id = 20000 + patient_num
-        age = random.randint(35, 75)
-        birth_year = date.today().year - age
-        
-        # Create location and person
-        location = self.create_location(patient_num)
-        person = self.create_person(person_id, birth_year, location)
-        
-        # Create visit
-        visit = self.create_visit(person)
-        
-        # Create breast cancer diagnosis
-        self.create_breast_cancer_diagnosis(person, visit, is_tnbc)
-        
-        # Create biomarker measurements
-        self.create_biomarker_measurements(person, visit, is_tnbc)
-        
-        # Create genetic mutations
-        self.create_genetic_mutations(person, visit, is_tnbc)
-        
-        # Create vital signs and lab values
-        self.create_vital_signs_and_labs(person, visit)
-        
-        # Create treatment history
-        self.create_treatment_history(person, visit, is_tnbc)
-        
-        self.stdout.write(f'Generated patient {person_id} ({"TNBC" if is_tnbc else "non-TNBC"})')
+        person_id = self.take_id(Person)
+        age = rng.randint(35, 75)
+        birth_year = self.today.year - age
 
-    def create_location(self, patient_num):
-        """Create a location for the patient"""
-        
-        locations = [
-            ('New York', 'NY', '10001', 'US', 40.7128, -74.0060),
-            ('Los Angeles', 'CA', '90001', 'US', 34.0522, -118.2437),
-            ('Chicago', 'IL', '60601', 'US', 41.8781, -87.6298),
-            ('Houston', 'TX', '77001', 'US', 29.7604, -95.3698),
-            ('Boston', 'MA', '02101', 'US', 42.3601, -71.0589),
-        ]
-        
-        city, state, zip_code, country, lat, lon = random.choice(locations)
-        
-        # Use filter then create to handle existing locations properly
-        existing_location = Location.objects.filter(
-            city=city,
-            state=state,
-            zip=zip_code,
-            country=country
-        ).first()
-        
-        if existing_location:
-            location = existing_location
-        else:
-            # Find next available location_id
-            max_location_id = Location.objects.aggregate(max_id=Max('location_id'))['max_id'] or 20000
-            location = Location.objects.create(
-                location_id=max_location_id + 1,
-                city=city,
-                state=state,
-                zip=zip_code,
-                country=country,
-                latitude=Decimal(str(lat)),
-                longitude=Decimal(str(lon))
-            )
-        
-        return location
+        self.create_person(person_id, birth_year, rng.choice(self.location_ids), rows)
+        visit_id, visit_date = self.create_visit(person_id, rows)
+        self.create_breast_cancer_diagnosis(person_id, visit_id, visit_date, is_tnbc, rows)
+        self.create_biomarker_measurements(person_id, visit_id, visit_date, is_tnbc, rows)
+        self.create_genetic_mutations(person_id, visit_id, visit_date, is_tnbc, rows)
+        self.create_vital_signs_and_labs(person_id, visit_id, visit_date, rows)
+        self.create_treatment_history(person_id, visit_id, visit_date, is_tnbc, rows)
 
-    def create_person(self, person_id, birth_year, location):
-        """Create a person record"""
-        
-        # Get concepts
-        female_concept = Concept.objects.get(concept_id=8532)  # Female
-        
-        # Random race/ethnicity
-        race_concepts = [8527, 8516, 8515]  # White, Black, Asian
-        ethnicity_concepts = [38003563, 38003564]  # Hispanic, Not Hispanic
-        
-        race_concept = Concept.objects.get(concept_id=random.choice(race_concepts))
-        ethnicity_concept = Concept.objects.get(concept_id=random.choice(ethnicity_concepts))
-        
-        person = Person.objects.create(
+    def create_person(self, person_id, birth_year, location_id, rows):
+        """Create a person record and its PatientInfo"""
+        rng = self.rng
+        rows[Person].append(Person(
             person_id=person_id,
-            gender_concept=female_concept,
+            gender_concept_id=FEMALE,
             year_of_birth=birth_year,
-            race_concept=race_concept,
-            ethnicity_concept=ethnicity_concept
-        )
-        
-        # Create PatientInfo with US location data
-        us_states = ['NY', 'CA', 'IL', 'TX', 'MA', 'FL', 'PA', 'OH', 'GA', 'NC']
-        cities = {
-            'NY': 'New York', 'CA': 'Los Angeles', 'IL': 'Chicago',
-            'TX': 'Houston', 'MA': 'Boston', 'FL': 'Miami',
-            'PA': 'Philadelphia', 'OH': 'Columbus', 'GA': 'Atlanta', 'NC': 'Charlotte'
-        }
-        
-        state = random.choice(us_states)
-        city = cities[state]
+            race_concept_id=rng.choice(RACE_CONCEPTS),
+            ethnicity_concept_id=rng.choice(ETHNICITY_CONCEPTS),
+            location_id=location_id,
+        ))
+
+        # PatientInfo with US location data
+        state = rng.choice(US_STATES)
         # Generate random 5-digit US zip code
-        zip_code = f"{random.randint(10000, 99999)}"
-        
-        PatientInfo.objects.create(
-            person=person,
+        zip_code = f"{rng.randint(10000, 99999)}"
+        date_of_birth = date(birth_year, rng.randint(1, 12), rng.randint(1, 28))
+
+        patient_info = PatientInfo(
+            person_id=person_id,
             country='United States',
             region=state,
-            city=city,
+            city=STATE_CITIES[state],
             postal_code=zip_code,
             gender='F',
-            date_of_birth=date(birth_year, random.randint(1, 12), random.randint(1, 28))
+            date_of_birth=date_of_birth,
+            patient_age=_age_on(date_of_birth, self.today),
         )
-        
-        return person
+        patient_info._update_therapy_computed_fields()
+        rows[PatientInfo].append(patient_info)
 
-    def create_visit(self, person):
-        """Create a visit occurrence"""
-        
-        visit_date = date.today() - timedelta(days=random.randint(30, 365))
-        
-        # Create a basic visit concept (outpatient visit)
-        visit_concept, _ = Concept.objects.get_or_create(
-            concept_id=9202,
-            defaults={
-                'concept_name': 'Outpatient Visit',
-                'domain': Domain.objects.get(domain_id='Observation'),
-                'vocabulary': Vocabulary.objects.get(vocabulary_id='SNOMED'),
-                'concept_class': ConceptClass.objects.get(concept_class_id='Clinical Finding'),
-                'standard_concept': 'S',
-                'concept_code': '185349003',
-                'valid_start_date': date(2000, 1, 1),
-                'valid_end_date': date(2099, 12, 31),
-            }
-        )
-        
-        visit_type_concept, _ = Concept.objects.get_or_create(
-            concept_id=44818517,
-            defaults={
-                'concept_name': 'EHR record',
-                'domain': Domain.objects.get(domain_id='Observation'),
-                'vocabulary': Vocabulary.objects.get(vocabulary_id='SNOMED'),
-                'concept_class': ConceptClass.objects.get(concept_class_id='Clinical Finding'),
-                'standard_concept': 'S',
-                'concept_code': 'EHR',
-                'valid_start_date': date(2000, 1, 1),
-                'valid_end_date': date(2099, 12, 31),
-            }
-        )
-        
-        visit = VisitOccurrence.objects.create(
-            visit_occurrence_id=30000 + person.person_id,
-            person=person,
-            visit_concept=visit_concept,
+    def create_visit(self, person_id, rows):
+        """Create an outpatient visit occurrence"""
+        visit_id = self.take_id(VisitOccurrence)
+        visit_date = self.today - timedelta(days=self.rng.randint(30, 365))
+        rows[VisitOccurrence].append(VisitOccurrence(
+            visit_occurrence_id=visit_id,
+            person_id=person_id,
+            visit_concept_id=OUTPATIENT_VISIT,
             visit_start_date=visit_date,
             visit_end_date=visit_date,
-            visit_type_concept=visit_type_concept
-        )
-        
-        return visit
+            visit_type_concept_id=EHR_RECORD,
+        ))
+        return visit_id, visit_date
 
-    def create_breast_cancer_diagnosis(self, person, visit, is_tnbc):
+    def create_breast_cancer_diagnosis(self, person_id, visit_id, visit_date, is_tnbc, rows):
         """Create breast cancer diagnosis"""
-        
-        if is_tnbc:
-            condition_concept = Concept.objects.get(concept_id=4163261)  # TNBC
-        else:
-            condition_concept = Concept.objects.get(concept_id=4112853)  # General breast cancer
-        
-        # Create condition type concept
-        condition_type_concept, _ = Concept.objects.get_or_create(
-            concept_id=32020,
-            defaults={
-                'concept_name': 'EHR Chief Complaint',
-                'domain': Domain.objects.get(domain_id='Observation'),
-                'vocabulary': Vocabulary.objects.get(vocabulary_id='SNOMED'),
-                'concept_class': ConceptClass.objects.get(concept_class_id='Clinical Finding'),
-                'standard_concept': 'S',
-                'concept_code': 'EHR-CC',
-                'valid_start_date': date(2000, 1, 1),
-                'valid_end_date': date(2099, 12, 31),
-            }
-        )
-        
-        diagnosis_date = visit.visit_start_date - timedelta(days=random.randint(30, 365))
-        
-        ConditionOccurrence.objects.create(
-            condition_occurrence_id=40000 + person.person_id,
-            person=person,
-            condition_concept=condition_concept,
+        diagnosis_date = visit_date - timedelta(days=self.rng.randint(30, 365))
+        rows[ConditionOccurrence].append(ConditionOccurrence(
+            condition_occurrence_id=self.take_id(ConditionOccurrence),
+            person_id=person_id,
+            condition_concept_id=TNBC if is_tnbc else BREAST_CANCER,
             condition_start_date=diagnosis_date,
-            condition_type_concept=condition_type_concept,
-            visit_occurrence=visit
+            condition_type_concept_id=EHR_CHIEF_COMPLAINT,
+            visit_occurrence_id=visit_id,
+        ))
+
+    def _measurement(self, person_id, visit_id, measurement_date, concept_id, **values):
+        return Measurement(
+            measurement_id=self.take_id(Measurement),
+            person_id=person_id,
+            measurement_concept_id=concept_id,
+            measurement_date=measurement_date,
+            measurement_type_concept_id=LAB_RESULT,
+            visit_occurrence_id=visit_id,
+            **values,
         )
 
-    def create_biomarker_measurements(self, person, visit, is_tnbc):
+    def create_biomarker_measurements(self, person_id, visit_id, visit_date, is_tnbc, rows):
         """Create biomarker measurements (ER, PR, HER2)"""
-        
-        measurement_type_concept, _ = Concept.objects.get_or_create(
-            concept_id=44818702,
-            defaults={
-                'concept_name': 'Lab result',
-                'domain': Domain.objects.get(domain_id='Measurement'),
-                'vocabulary': Vocabulary.objects.get(vocabulary_id='SNOMED'),
-                'concept_class': ConceptClass.objects.get(concept_class_id='Lab Test'),
-                'standard_concept': 'S',
-                'concept_code': 'LAB',
-                'valid_start_date': date(2000, 1, 1),
-                'valid_end_date': date(2099, 12, 31),
-            }
-        )
-        
-        measurement_date = visit.visit_start_date
-        measurement_id_base = 50000 + (person.person_id * 10)
-        
-        # Get result concepts
-        positive_concept = Concept.objects.get(concept_id=4181412)
-        negative_concept = Concept.objects.get(concept_id=4132135)
-        equivocal_concept = Concept.objects.get(concept_id=45884084)
-        
+        rng = self.rng
         if is_tnbc:
             # TNBC: ER-, PR-, HER2-
-            biomarkers = [
-                (3025023, negative_concept, 'ER'),  # ER negative
-                (3020891, negative_concept, 'PR'),  # PR negative
-                (3003740, negative_concept, 'HER2'),  # HER2 negative
-            ]
+            biomarkers = [(ER, NEGATIVE), (PR, NEGATIVE), (HER2, NEGATIVE)]
         else:
             # Non-TNBC: Random combinations but not all negative
-            er_status = random.choice([positive_concept, negative_concept])
-            pr_status = random.choice([positive_concept, negative_concept])
-            her2_status = random.choice([positive_concept, negative_concept, equivocal_concept])
-            
+            er_status = rng.choice([POSITIVE, NEGATIVE])
+            pr_status = rng.choice([POSITIVE, NEGATIVE])
+            her2_status = rng.choice([POSITIVE, NEGATIVE, EQUIVOCAL])
+
             # Ensure at least one is positive (not TNBC)
-            if er_status == negative_concept and pr_status == negative_concept and her2_status == negative_concept:
-                er_status = positive_concept  # Make ER positive
-            
-            biomarkers = [
-                (3025023, er_status, 'ER'),
-                (3020891, pr_status, 'PR'),
-                (3003740, her2_status, 'HER2'),
-            ]
-        
-        for i, (concept_id, result_concept, marker) in enumerate(biomarkers):
-            measurement_concept = Concept.objects.get(concept_id=concept_id)
-            
-            Measurement.objects.create(
-                measurement_id=measurement_id_base + i + 1,
-                person=person,
-                measurement_concept=measurement_concept,
-                measurement_date=measurement_date,
-                measurement_type_concept=measurement_type_concept,
-                value_as_concept=result_concept,
-                visit_occurrence=visit
-            )
+            if er_status == NEGATIVE and pr_status == NEGATIVE and her2_status == NEGATIVE:
+                er_status = POSITIVE
 
-    def create_genetic_mutations(self, person, visit, is_tnbc):
+            biomarkers = [(ER, er_status), (PR, pr_status), (HER2, her2_status)]
+
+        rows[Measurement].extend(
+            self._measurement(person_id, visit_id, visit_date, concept_id, value_as_concept_id=result)
+            for concept_id, result in biomarkers
+        )
+
+    def create_genetic_mutations(self, person_id, visit_id, visit_date, is_tnbc, rows):
         """Create genetic mutation measurements"""
-        
-        measurement_type_concept = Concept.objects.get(concept_id=44818702)  # Lab result
-        measurement_date = visit.visit_start_date
-        measurement_id_base = 60000 + (person.person_id * 10)
-        
-        # Get mutation concepts
-        germline_concept = Concept.objects.get(concept_id=255395001)
-        somatic_concept = Concept.objects.get(concept_id=255461003)
-        pathogenic_concept = Concept.objects.get(concept_id=30166007)
-        benign_concept = Concept.objects.get(concept_id=10828004)
-        vus_concept = Concept.objects.get(concept_id=42425007)
-        
+        rng = self.rng
         mutations = []
-        
+
         if is_tnbc:
             # TNBC patients more likely to have BRCA mutations
-            if random.random() < 0.3:  # 30% chance of BRCA1 mutation
-                mutations.append({
-                    'gene_concept_id': 3023103,  # BRCA1
-                    'gene': 'brca1',
-                    'variant': f'c.{random.randint(100, 5000)}G>A',
-                    'origin': germline_concept,
-                    'interpretation': pathogenic_concept,
-                })
-            
-            if random.random() < 0.2:  # 20% chance of BRCA2 mutation
-                mutations.append({
-                    'gene_concept_id': 3005771,  # BRCA2
-                    'gene': 'brca2',
-                    'variant': f'c.{random.randint(100, 5000)}C>T',
-                    'origin': germline_concept,
-                    'interpretation': pathogenic_concept,
-                })
-            
-            if random.random() < 0.5:  # 50% chance of TP53 mutation
-                mutations.append({
-                    'gene_concept_id': 3019550,  # TP53
-                    'gene': 'tp53',
-                    'variant': f'c.{random.randint(100, 1000)}G>T',
-                    'origin': somatic_concept,
-                    'interpretation': random.choice([pathogenic_concept, vus_concept]),
-                })
+            if rng.random() < 0.3:  # 30% chance of BRCA1 mutation
+                mutations.append((BRCA1, f'c.{rng.randint(100, 5000)}G>A', GERMLINE, PATHOGENIC))
+            if rng.random() < 0.2:  # 20% chance of BRCA2 mutation
+                mutations.append((BRCA2, f'c.{rng.randint(100, 5000)}C>T', GERMLINE, PATHOGENIC))
+            if rng.random() < 0.5:  # 50% chance of TP53 mutation
+                mutations.append((TP53, f'c.{rng.randint(100, 1000)}G>T', SOMATIC, rng.choice([PATHOGENIC, VUS])))
         else:
             # Non-TNBC patients
-            if random.random() < 0.1:  # 10% chance of BRCA1 mutation
-                mutations.append({
-                    'gene_concept_id': 3023103,  # BRCA1
-                    'gene': 'brca1',
-                    'variant': f'c.{random.randint(100, 5000)}G>A',
-                    'origin': germline_concept,
-                    'interpretation': random.choice([pathogenic_concept, benign_concept, vus_concept]),
-                })
-            
-            if random.random() < 0.2:  # 20% chance of TP53 mutation
-                mutations.append({
-                    'gene_concept_id': 3019550,  # TP53
-                    'gene': 'tp53',
-                    'variant': f'c.{random.randint(100, 1000)}A>G',
-                    'origin': somatic_concept,
-                    'interpretation': random.choice([pathogenic_concept, benign_concept, vus_concept]),
-                })
-        
-        # Create measurements for each mutation
-        for i, mutation in enumerate(mutations):
-            gene_concept = Concept.objects.get(concept_id=mutation['gene_concept_id'])
-            
-            Measurement.objects.create(
-                measurement_id=measurement_id_base + i + 1,
-                person=person,
-                measurement_concept=gene_concept,
-                measurement_date=measurement_date,
-                measurement_type_concept=measurement_type_concept,
-                value_as_string=mutation['variant'],
-                qualifier_concept=mutation['origin'],
-                value_as_concept=mutation['interpretation'],
-                visit_occurrence=visit
+            if rng.random() < 0.1:  # 10% chance of BRCA1 mutation
+                mutations.append((BRCA1, f'c.{rng.randint(100, 5000)}G>A', GERMLINE, rng.choice([PATHOGENIC, BENIGN, VUS])))
+            if rng.random() < 0.2:  # 20% chance of TP53 mutation
+                mutations.append((TP53, f'c.{rng.randint(100, 1000)}A>G', SOMATIC, rng.choice([PATHOGENIC, BENIGN, VUS])))
+
+        rows[Measurement].extend(
+            self._measurement(
+                person_id, visit_id, visit_date, gene_concept_id,
+                value_as_string=variant,
+                qualifier_concept_id=origin,
+                value_as_concept_id=interpretation,
             )
+            for gene_concept_id, variant, origin, interpretation in mutations
+        )
 
-    def create_vital_signs_and_labs(self, person, visit):
+    def create_vital_signs_and_labs(self, person_id, visit_id, visit_date, rows):
         """Create vital signs and laboratory measurements"""
-        
-        measurement_type_concept = Concept.objects.get(concept_id=44818702)  # Lab result
-        measurement_date = visit.visit_start_date
-        measurement_id_base = 70000 + (person.person_id * 10)
-        
-        # Vital signs and lab values
+        rng = self.rng
         measurements = [
-            (3004249, random.randint(110, 140), None, 'Systolic BP'),  # Systolic BP
-            (3012888, random.randint(70, 90), None, 'Diastolic BP'),   # Diastolic BP
-            (3025315, random.uniform(50, 90), None, 'Weight'),         # Weight (kg)
-            (3036277, random.randint(150, 180), None, 'Height'),       # Height (cm)
-            (3013682, random.uniform(10.5, 15.5), None, 'Hemoglobin'), # Hemoglobin
-            (3016723, random.uniform(0.6, 1.2), None, 'Creatinine'),   # Creatinine
+            (3004249, rng.randint(110, 140)),     # Systolic BP
+            (3012888, rng.randint(70, 90)),       # Diastolic BP
+            (3025315, rng.uniform(50, 90)),       # Weight (kg)
+            (3036277, rng.randint(150, 180)),     # Height (cm)
+            (3013682, rng.uniform(10.5, 15.5)),   # Hemoglobin
+            (3016723, rng.uniform(0.6, 1.2)),     # Creatinine
         ]
-        
-        for i, (concept_id, value, unit_concept_id, name) in enumerate(measurements):
-            measurement_concept = Concept.objects.get(concept_id=concept_id)
-            
-            Measurement.objects.create(
-                measurement_id=measurement_id_base + i + 1,
-                person=person,
-                measurement_concept=measurement_concept,
-                measurement_date=measurement_date,
-                measurement_type_concept=measurement_type_concept,
-                value_as_number=Decimal(str(value)),
-                visit_occurrence=visit
+        rows[Measurement].extend(
+            self._measurement(
+                person_id, visit_id, visit_date, concept_id,
+                value_as_number=Decimal(str(round(value, 5))),
             )
+            for concept_id, value in measurements
+        )
 
-    def create_treatment_history(self, person, visit, is_tnbc):
+    def create_treatment_history(self, person_id, visit_id, visit_date, is_tnbc, rows):
         """Create treatment history (simplified)"""
-        
-        # Create drug type concept
-        drug_type_concept, _ = Concept.objects.get_or_create(
-            concept_id=38000177,
-            defaults={
-                'concept_name': 'Prescription written',
-                'domain': Domain.objects.get(domain_id='Drug'),
-                'vocabulary': Vocabulary.objects.get(vocabulary_id='SNOMED'),
-                'concept_class': ConceptClass.objects.get(concept_class_id='Clinical Finding'),
-                'standard_concept': 'S',
-                'concept_code': 'RX',
-                'valid_start_date': date(2000, 1, 1),
-                'valid_end_date': date(2099, 12, 31),
-            }
-        )
-        
-        # Create drug concepts for common breast cancer treatments
-        if is_tnbc:
-            treatments = [
-                (1308216, 'Carboplatin'),  # Platinum-based chemotherapy
-                (1357900, 'Paclitaxel'),   # Taxane
-                (1551099, 'Pembrolizumab'), # Immunotherapy
-            ]
-        else:
-            treatments = [
-                (1551099, 'Tamoxifen'),    # Hormone therapy
-                (1308216, 'Doxorubicin'),  # Chemotherapy
-                (1357900, 'Paclitaxel'),   # Taxane
-            ]
-        
-        treatment_start = visit.visit_start_date + timedelta(days=random.randint(7, 30))
-        
-        for i, (concept_id, drug_name) in enumerate(treatments):
-            # Create drug concept if it doesn't exist
-            drug_concept, _ = Concept.objects.get_or_create(
-                concept_id=concept_id,
-                defaults={
-                    'concept_name': drug_name,
-                    'domain': Domain.objects.get(domain_id='Drug'),
-                    'vocabulary': Vocabulary.objects.get(vocabulary_id='SNOMED'),
-                    'concept_class': ConceptClass.objects.get(concept_class_id='Clinical Finding'),
-                    'standard_concept': 'S',
-                    'concept_code': str(concept_id),
-                    'valid_start_date': date(2000, 1, 1),
-                    'valid_end_date': date(2099, 12, 31),
-                }
-            )
-            
-            DrugExposure.objects.create(
-                drug_exposure_id=80000 + (person.person_id * 10) + i,
-                person=person,
-                drug_concept=drug_concept,
+        rng = self.rng
+        treatments = TNBC_TREATMENTS if is_tnbc else NON_TNBC_TREATMENTS
+        treatment_start = visit_date + timedelta(days=rng.randint(7, 30))
+
+        for concept_id in treatments:
+            rows[DrugExposure].append(DrugExposure(
+                drug_exposure_id=self.take_id(DrugExposure),
+                person_id=person_id,
+                drug_concept_id=concept_id,
                 drug_exposure_start_date=treatment_start,
-                drug_exposure_end_date=treatment_start + timedelta(days=random.randint(21, 84)),
-                drug_type_concept=drug_type_concept,
-                visit_occurrence=visit
-            )
+                drug_exposure_end_date=treatment_start + timedelta(days=rng.randint(21, 84)),
+                drug_type_concept_id=PRESCRIPTION_WRITTEN,
+                visit_occurrence_id=visit_id,
+            ))
@@ -9,20 +9,90 @@ This command creates a FHIR Bundle including:
 - Genetic mutations (BRCA1, BRCA2, TP53, PIK3CA, etc.)
 - Prior lines of therapy (chemotherapy, targeted therapy)
 
+Entries are generated per patient and streamed to disk, so memory stays flat
+regardless of --count.
+
+Patients are generated in fixed-size shards (--shard-size), each with its own
+random.Random seeded from --seed and the shard index, and all dates are
+relative to --as-of.  Shards can therefore be rendered in parallel
+(--workers) and the output is byte-identical for the same seed, shard size
+and as-of date, whatever the worker count.
+
 Usage:
     python manage.py generate_fhir_bundle --count 200 --output data/patients.json
+    python manage.py generate_fhir_bundle --count 100000 --output data/patients.json --gzip
+    python manage.py generate_fhir_bundle --count 100000 --format ndjson --output data/bulk/
+    python manage.py generate_fhir_bundle --count 1000000 --format ndjson --gzip \\
+        --workers 8 --seed 7 --as-of 2025-01-01 --output data/bench-1m/
 """
 
-import json
+import multiprocessing
 import random
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from pathlib import Path
-from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from omop_core.fhir_ndjson import BundleStreamWriter, NDJSONStreamWriter, dumps_json
+from omop_core.management.base import BatchCommand
+
+DEFAULT_SHARD_SIZE = 1000
+
+
+def _shard_rng(seed, shard_index):
+    """Independent, reproducible RNG for one shard (str seeds hash via SHA-512)."""
+    return random.Random(f'{seed}:{shard_index}')
+
+
+def _render_shard(task):
+    """Worker entry point: generate one shard and serialise it to JSON text."""
+    shard_index, count, config, output_format, indent = task
+    generator = Command()
+    generator.configure(**config)
+    rendered = []
+    for patient_entries in generator.iter_shard_entries(shard_index, count):
+        for entry in patient_entries:
+            resource = entry['resource']
+            if output_format == 'ndjson':
+                text = dumps_json(resource)
+            else:
+                text = dumps_json(entry, indent)
+            rendered.append((resource['resourceType'], text))
+    return rendered
+
 
+def _ordered_results(pool, tasks, in_flight):
+    """
+    ``_render_shard`` over ``tasks`` in ``pool``, yielded in task order with at
+    most ``in_flight`` shards submitted and not yet consumed, so rendered
+    shards cannot pile up in memory when writing is slower than the workers.
+    """
+    pending = deque()
+    for task in tasks:
+        if len(pending) >= in_flight:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(_render_shard, (task,)))
+    while pending:
+        yield pending.popleft().get()
 
-class Command(BaseCommand):
+
+class Command(BatchCommand):
     help = 'Generate comprehensive FHIR Bundle with breast cancer patient data'
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.configure()
+
+    def configure(self, seed=42, tnbc_ratio=0.15, as_of=None, shard_size=DEFAULT_SHARD_SIZE):
+        """Set generation parameters (also used by worker processes)"""
+        self.seed = seed
+        self.tnbc_ratio = tnbc_ratio
+        self.today = datetime.strptime(as_of, '%Y-%m-%d') if as_of else datetime.combine(
+            datetime.now().date(), datetime.min.time()
+        )
+        self.shard_size = shard_size
+        self.rng = _shard_rng(seed, 0)
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--count',
@@ -34,7 +104,30 @@ class Command(BaseCommand):
             '--output',
             type=str,
             default='data/synthetic_patients_fhir.json',
-            help='Output file path (default: data/synthetic_patients_fhir.json)',
+            help=(
+                'Output file path (default: data/synthetic_patients_fhir.json); '
+                'a directory when --format ndjson'
+            ),
+        )
+        parser.add_argument(
+            '--format',
+            choices=['json', 'ndjson'],
+            default='json',
+            help=(
+                'json: a single Bundle document; ndjson: FHIR Bulk Data layout, '
+                'one <ResourceType>.ndjson file per resource type (default: json)'
+            ),
+        )
+        parser.add_argument(
+            '--indent',
+            type=int,
+            default=None,
+            help='Indent Bundle JSON by N spaces (default: compact; ignored for ndjson)',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Gzip-compress the output (.gz suffix is added)',
         )
         parser.add_argument(
             '--seed',
@@ -48,29 +141,81 @@ class Command(BaseCommand):
             default=0.15,
             help='Fraction of patients that are TNBC (default: 0.15)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes rendering shards in parallel (default: 1)',
+        )
+        parser.add_argument(
+            '--shard-size',
+            type=int,
+            default=DEFAULT_SHARD_SIZE,
+            help=f'Patients per seeded shard (default: {DEFAULT_SHARD_SIZE})',
+        )
+        parser.add_argument(
+            '--as-of',
+            type=str,
+            default=None,
+            help='Reference date YYYY-MM-DD for generated dates (default: today)',
+        )
 
     def handle(self, *args, **options):
         count = options['count']
         output_path = options['output']
-        seed = options['seed']
-        self.tnbc_ratio = options['tnbc_ratio']
-
-        random.seed(seed)
+        output_format = options['format']
+        workers = max(1, options['workers'])
+        if options['shard_size'] < 1:
+            raise CommandError('--shard-size must be at least 1')
+        try:
+            self.configure(
+                seed=options['seed'],
+                tnbc_ratio=options['tnbc_ratio'],
+                as_of=options['as_of'],
+                shard_size=options['shard_size'],
+            )
+        except ValueError:
+            raise CommandError('--as-of must be a date in YYYY-MM-DD format')
 
         self.stdout.write('Generating comprehensive FHIR Bundle with breast cancer patients...')
 
-        bundle = self.generate_bundle(count)
-        
-        # Save to file
-        output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_file, 'w') as f:
-            json.dump(bundle, f, indent=2)
-        
+        if output_format == 'ndjson':
+            writer = NDJSONStreamWriter(output_path, compress=options['gzip'])
+            output_location = writer.directory
+        else:
+            writer = BundleStreamWriter(output_path, compress=options['gzip'], indent=options['indent'])
+            output_location = writer.path
+
+        config = {
+            'seed': self.seed,
+            'tnbc_ratio': self.tnbc_ratio,
+            'as_of': self.today.strftime('%Y-%m-%d'),
+            'shard_size': self.shard_size,
+        }
+        tasks = (
+            (shard_index, count, config, output_format, options['indent'])
+            for shard_index in range(self.shard_count(count))
+        )
+
+        started = time.monotonic()
+        with writer:
+            if workers == 1:
+                rendered_shards = map(_render_shard, tasks)
+                self._write_shards(writer, rendered_shards)
+            else:
+                with multiprocessing.get_context().Pool(workers) as pool:
+                    # In shard order, keeping output deterministic; two shards
+                    # per worker keep the pool busy while the writer catches up
+                    self._write_shards(writer, _ordered_results(pool, tasks, workers * 2))
+        elapsed = time.monotonic() - started
+
         self.stdout.write(self.style.SUCCESS(f'✓ Generated FHIR Bundle with {count} patients'))
-        self.stdout.write(self.style.SUCCESS(f'✓ Saved to: {output_file}'))
-        self.stdout.write(self.style.SUCCESS(f'✓ Total resources: {len(bundle["entry"])}'))
+        self.stdout.write(self.style.SUCCESS(f'✓ Saved to: {output_location}'))
+        self.stdout.write(self.style.SUCCESS(f'✓ Total resources: {writer.total}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {elapsed:.1f}s with {workers} worker(s) '
+            f'({count / elapsed if elapsed else 0:,.0f} patients/s)'
+        ))
         self.stdout.write(self.style.SUCCESS('✓ Each patient includes:'))
         self.stdout.write('  - Demographics with US address')
         self.stdout.write('  - Breast cancer diagnosis with stage and histologic type')
@@ -80,86 +225,114 @@ class Command(BaseCommand):
         self.stdout.write('  - Prior lines of therapy (chemotherapy, targeted therapy)')
 
     def generate_bundle(self, num_patients):
-        """Generate FHIR Bundle with all resources"""
+        """Generate FHIR Bundle with all resources (in memory; see iter_patient_entries)"""
         bundle = {
             "resourceType": "Bundle",
             "type": "collection",
             "entry": []
         }
-        
-        # For exactly 10 patients, guarantee exact distribution: 4/3/2/1 for 1/2/3/4 lines
-        if num_patients == 10:
-            therapy_lines = [1, 1, 1, 1, 2, 2, 2, 3, 3, 4]
-            random.shuffle(therapy_lines)
-        else:
+        for patient_entries in self.iter_patient_entries(num_patients):
+            bundle["entry"].extend(patient_entries)
+        return bundle
+
+    def _write_shards(self, writer, rendered_shards):
+        for rendered in rendered_shards:
+            for resource_type, text in rendered:
+                writer.write_raw(resource_type, text)
+
+    def shard_count(self, num_patients):
+        return (num_patients + self.shard_size - 1) // self.shard_size
+
+    def assigned_therapy_lines(self, num_patients):
+        """For exactly 10 patients, guarantee exact distribution: 4/3/2/1 for 1/2/3/4 lines"""
+        if num_patients != 10:
             # For other counts, use probabilistic distribution (all with at least 1 line)
-            therapy_lines = None
+            return None
+        therapy_lines = [1, 1, 1, 1, 2, 2, 2, 3, 3, 4]
+        _shard_rng(self.seed, 'therapy-lines').shuffle(therapy_lines)
+        return therapy_lines
+
+    def iter_patient_entries(self, num_patients):
+        """Yield the list of Bundle entries for each patient, one patient at a time"""
+        for shard_index in range(self.shard_count(num_patients)):
+            yield from self.iter_shard_entries(shard_index, num_patients)
+
+    def iter_shard_entries(self, shard_index, num_patients):
+        """Yield per-patient entries for one shard using that shard's own RNG"""
+        self.rng = _shard_rng(self.seed, shard_index)
+        therapy_lines = self.assigned_therapy_lines(num_patients)
+        first = shard_index * self.shard_size + 1
+        last = min(num_patients, first + self.shard_size - 1)
+        for i in range(first, last + 1):
+            yield self.generate_patient_entries(i, therapy_lines)
+
+    def generate_patient_entries(self, i, therapy_lines=None):
+        """Generate all Bundle entries for patient number i"""
+        entries = []
+        first_name = self.rng.choice(self.get_first_names())
+        last_name = self.rng.choice(self.get_last_names())
         
-        for i in range(1, num_patients + 1):
-            first_name = random.choice(self.get_first_names())
-            last_name = random.choice(self.get_last_names())
-            
-            # Generate patient
-            patient = self.generate_patient(i, first_name, last_name)
-            bundle["entry"].append({
-                "fullUrl": f"http://example.org/Patient/{i}",
-                "resource": patient
-            })
-            
-            birth_date = datetime.strptime(patient['birthDate'], '%Y-%m-%d')
-            diagnosis_date = self.generate_diagnosis_date(birth_date)
-            
-            # Generate condition with stage and histologic type
-            condition = self.generate_condition(i, diagnosis_date)
-            bundle["entry"].append({
-                "fullUrl": f"http://example.org/Condition/condition-{i}",
-                "resource": condition
-            })
-            # Extract stage to enforce M0/M1 consistency in tumor characteristics
-            cancer_stage = condition['stage'][0]['summary']['coding'][0]['code']
+        # Generate patient
+        patient = self.generate_patient(i, first_name, last_name)
+        entries.append({
+            "fullUrl": f"http://example.org/Patient/{i}",
+            "resource": patient
+        })
+        
+        birth_date = datetime.strptime(patient['birthDate'], '%Y-%m-%d')
+        diagnosis_date = self.generate_diagnosis_date(birth_date)
+        
+        # Generate condition with stage and histologic type
+        condition = self.generate_condition(i, diagnosis_date)
+        entries.append({
+            "fullUrl": f"http://example.org/Condition/condition-{i}",
+            "resource": condition
+        })
+        # Extract stage to enforce M0/M1 consistency in tumor characteristics
+        cancer_stage = condition['stage'][0]['summary']['coding'][0]['code']
 
-            # Generate tumor characteristics (size, lymph nodes, metastasis)
-            for obs in self.generate_tumor_characteristics(i, diagnosis_date, cancer_stage):
-                bundle["entry"].append(obs)
-            
-            # Generate lab observations
-            lab_date = datetime.now() - timedelta(days=random.randint(1, 30))
-            for obs in self.generate_lab_observations(i, lab_date):
-                bundle["entry"].append(obs)
-            
-            # Generate biomarker observations
-            for obs in self.generate_biomarker_observations(i, diagnosis_date):
-                bundle["entry"].append(obs)
-            
-            # Generate genetic mutation observations
-            for obs in self.generate_genetic_mutations(i, diagnosis_date):
-                bundle["entry"].append(obs)
-            
-            # Generate prior therapy (medication statements)
-            assigned_lines = therapy_lines[i-1] if therapy_lines else None
-            for med in self.generate_prior_therapy(i, diagnosis_date, assigned_lines):
-                bundle["entry"].append(med)
-            
-            # Generate supportive therapy
-            supportive = self.generate_supportive_therapy(i, diagnosis_date)
-            if supportive:
-                bundle["entry"].append(supportive)
-            
-            # Generate planned therapy
-            planned = self.generate_planned_therapy(i)
-            if planned:
-                bundle["entry"].append(planned)
+        # Generate tumor characteristics (size, lymph nodes, metastasis)
+        for obs in self.generate_tumor_characteristics(i, diagnosis_date, cancer_stage):
+            entries.append(obs)
+        
+        # Generate lab observations
+        lab_date = self.today - timedelta(days=self.rng.randint(1, 30))
+        for obs in self.generate_lab_observations(i, lab_date):
+            entries.append(obs)
+        
+        # Generate biomarker observations
+        for obs in self.generate_biomarker_observations(i, diagnosis_date):
+            entries.append(obs)
+        
+        # Generate genetic mutation observations
+        for obs in self.generate_genetic_mutations(i, diagnosis_date):
+            entries.append(obs)
+        
+        # Generate prior therapy (medication statements)
+        assigned_lines = therapy_lines[i-1] if therapy_lines else None
+        for med in self.generate_prior_therapy(i, diagnosis_date, assigned_lines):
+            entries.append(med)
+        
+        # Generate supportive therapy
+        supportive = self.generate_supportive_therapy(i, diagnosis_date)
+        if supportive:
+            entries.append(supportive)
+        
+        # Generate planned therapy
+        planned = self.generate_planned_therapy(i)
+        if planned:
+            entries.append(planned)
 
-            # Generate bone marrow biopsy observation (~40% of patients have it)
-            if random.random() < 0.4:
-                bm_obs = self.generate_bone_marrow_biopsy(i, diagnosis_date)
-                bundle["entry"].append(bm_obs)
+        # Generate bone marrow biopsy observation (~40% of patients have it)
+        if self.rng.random() < 0.4:
+            bm_obs = self.generate_bone_marrow_biopsy(i, diagnosis_date)
+            entries.append(bm_obs)
 
-        return bundle
+        return entries
 
     def generate_bone_marrow_biopsy(self, patient_id, diagnosis_date):
         """Generate bone marrow biopsy observation for clonal_bone_marrow_b_lymphocytes"""
-        value = round(random.uniform(0.5, 95.0), 1)
+        value = round(self.rng.uniform(0.5, 95.0), 1)
         return {
             "fullUrl": f"http://example.org/Observation/obs-{patient_id}-bone-marrow-biopsy",
             "resource": {
@@ -197,9 +370,9 @@ class Command(BaseCommand):
             ('Denver', 'CO'), ('Portland', 'OR'), ('Atlanta', 'GA'),
         ]
         
-        city, state = random.choice(us_locations)
-        zip_code = f"{random.randint(10000, 99999)}"
-        phone = f"+1-555-{random.randint(100, 999)}-{random.randint(1000, 9999)}"
+        city, state = self.rng.choice(us_locations)
+        zip_code = f"{self.rng.randint(10000, 99999)}"
+        phone = f"+1-555-{self.rng.randint(100, 999)}-{self.rng.randint(1000, 9999)}"
         
         # Generate ethnicity
         ethnicities = [
@@ -209,20 +382,20 @@ class Command(BaseCommand):
             "Asian",
             "Native American"
         ]
-        ethnicity = random.choice(ethnicities)
+        ethnicity = self.rng.choice(ethnicities)
         
         # Generate vital signs
-        weight_kg = round(random.uniform(50, 100), 1)
-        height_cm = round(random.uniform(150, 180), 1)
-        systolic = random.randint(110, 140)
-        diastolic = random.randint(70, 90)
-        heart_rate = random.randint(60, 100)
+        weight_kg = round(self.rng.uniform(50, 100), 1)
+        height_cm = round(self.rng.uniform(150, 180), 1)
+        systolic = self.rng.randint(110, 140)
+        diastolic = self.rng.randint(70, 90)
+        heart_rate = self.rng.randint(60, 100)
         
         # Generate ECOG Performance Status (0-4, where 0 = fully active, 4 = bedridden)
         # Weight toward better performance status (0-2 more common than 3-4)
         ecog_choices = [0, 1, 2, 3, 4]
         ecog_weights = [30, 40, 20, 8, 2]  # Most patients have ECOG 0-2
-        ecog = random.choices(ecog_choices, weights=ecog_weights)[0]
+        ecog = self.rng.choices(ecog_choices, weights=ecog_weights)[0]
         
         return {
             "resourceType": "Patient",
@@ -272,7 +445,7 @@ class Command(BaseCommand):
             "address": [{
                 "use": "home",
                 "type": "both",
-                "line": [f"{random.randint(100, 9999)} {random.choice(['Main', 'Oak', 'Maple', 'Cedar', 'Pine'])} Street"],
+                "line": [f"{self.rng.randint(100, 9999)} {self.rng.choice(['Main', 'Oak', 'Maple', 'Cedar', 'Pine'])} Street"],
                 "city": city,
                 "state": state,
                 "postalCode": zip_code,
@@ -300,14 +473,14 @@ class Command(BaseCommand):
         HISTOLOGIC_III_IV = HISTOLOGIC_I_II + ['Inflammatory carcinoma']
 
         stages = ['0', 'I', 'IA', 'IB', 'II', 'IIA', 'IIB', 'III', 'IIIA', 'IIIB', 'IIIC', 'IV']
-        stage = random.choice(stages)
+        stage = self.rng.choice(stages)
 
         if stage == '0':
-            histologic_type = random.choice(HISTOLOGIC_STAGE0)
+            histologic_type = self.rng.choice(HISTOLOGIC_STAGE0)
         elif stage in ('I', 'IA', 'IB', 'II', 'IIA', 'IIB'):
-            histologic_type = random.choice(HISTOLOGIC_I_II)
+            histologic_type = self.rng.choice(HISTOLOGIC_I_II)
         else:  # III, IIIA, IIIB, IIIC, IV
-            histologic_type = random.choice(HISTOLOGIC_III_IV)
+            histologic_type = self.rng.choice(HISTOLOGIC_III_IV)
         
         return {
             "resourceType": "Condition",
@@ -369,19 +542,19 @@ class Command(BaseCommand):
         observations = []
         
         # Tumor size (0.5 to 10 cm, weighted toward smaller sizes)
-        tumor_size = round(random.triangular(0.5, 10.0, 2.5), 1)
+        tumor_size = round(self.rng.triangular(0.5, 10.0, 2.5), 1)
         
         # Lymph node status (Positive/Negative/Unknown)
         lymph_node_choices = ["Positive", "Negative", "Unknown"]
         lymph_node_weights = [40, 55, 5]  # 40% positive, 55% negative, 5% unknown
-        lymph_node_status = random.choices(lymph_node_choices, weights=lymph_node_weights)[0]
+        lymph_node_status = self.rng.choices(lymph_node_choices, weights=lymph_node_weights)[0]
         
         # Metastasis status must be consistent with cancer stage:
         # Stage IV → always Positive (M1); all other stages → never Positive (M0)
         if stage == 'IV':
             metastasis_status = 'Positive'
         else:
-            metastasis_status = random.choices(['Negative', 'Unknown'], weights=[95, 5])[0]
+            metastasis_status = self.rng.choices(['Negative', 'Unknown'], weights=[95, 5])[0]
         
         # Tumor size observation
         tumor_obs = {
@@ -513,31 +686,31 @@ class Command(BaseCommand):
         T_FULL = {
             'Tis': "Tis: Non-invasive Carcinoma in situ (DCIS, LCIS, Paget\u2019s without tumor)",
             'T0':  "T0: No tumor evidence",
-            'T1':  random.choice(["T1: Invasive Tumor \u2264 2 cm", "T1a: 0.1 \u2013 0.5 cm",
+            'T1':  self.rng.choice(["T1: Invasive Tumor \u2264 2 cm", "T1a: 0.1 \u2013 0.5 cm",
                                    "T1b: 0.5 \u2013 1 cm", "T1c: 1 \u2013 2 cm"]),
             'T2':  "T2: Invasive Tumor > 2 \u2013 5 cm",
             'T3':  "T3: Invasive Tumor > 5 cm",
-            'T4':  random.choice(["T4: Invades chest wall or skin, or inflammatory",
+            'T4':  self.rng.choice(["T4: Invades chest wall or skin, or inflammatory",
                                    "T4a: Invades chest wall", "T4b: Invades skin (may be swelling/ulcer)",
                                    "T4c: Invades both skin + chest wall", "T4d: Inflammatory carcinoma"]),
         }
         N_FULL = {
             'N0':   "N0: No lymph node involvement",
             'N1mi': "N1mi: Micrometastasis (0.2\u20132 mm)",
-            'N1':   random.choice(["N1: 1\u20133 axillary lymph nodes or small internal mammary nodes",
+            'N1':   self.rng.choice(["N1: 1\u20133 axillary lymph nodes or small internal mammary nodes",
                                     "N1a: 1\u20133 axillary nodes (>2 mm)",
                                     "N1b: Cancer cells in internal mammary sentinel nodes",
                                     "N1c: 1\u20133 axillary nodes + internal mammary sentinel nodes"]),
-            'N2':   random.choice(["N2: 4\u20139 axillary nodes or internal mammary nodes without axillary nodes",
+            'N2':   self.rng.choice(["N2: 4\u20139 axillary nodes or internal mammary nodes without axillary nodes",
                                     "N2a: 4\u20139 axillary nodes (>2 mm)",
                                     "N2b: Internal mammary nodes only (no axillary)"]),
-            'N3':   random.choice(["N3: 10+ axillary, infraclavicular, or supraclavicular nodes; or both axillary + internal mammary",
+            'N3':   self.rng.choice(["N3: 10+ axillary, infraclavicular, or supraclavicular nodes; or both axillary + internal mammary",
                                     "N3a: \u226510 axillary nodes (\u22652 mm) or infraclavicular",
                                     "N3b: 4\u20139 Axillary + mammary nodes",
                                     "N3c: Supraclavicular nodes"]),
         }
         valid_combos = STAGE_TNM_VALID.get(stage, STAGE_TNM_VALID['IV'])
-        t_cat, n_cat = random.choice(valid_combos)
+        t_cat, n_cat = self.rng.choice(valid_combos)
         t_stage = T_FULL[t_cat]
         n_stage = N_FULL[n_cat]
 
@@ -598,7 +771,7 @@ class Command(BaseCommand):
         })
 
         # Staging modality
-        staging_modality = random.choice(["CT", "PET-CT", "MRI", "CT+MRI", "Clinical exam"])
+        staging_modality = self.rng.choice(["CT", "PET-CT", "MRI", "CT+MRI", "Clinical exam"])
         observations.append({
             "fullUrl": f"http://example.org/Observation/obs-{patient_id}-staging-modality",
             "resource": {
@@ -636,7 +809,7 @@ class Command(BaseCommand):
         })
 
         # Bone-only metastasis (True for ~15% of metastatic patients)
-        bone_only = metastasis_status == "Positive" and random.random() < 0.15
+        bone_only = metastasis_status == "Positive" and self.rng.random() < 0.15
         observations.append({
             "fullUrl": f"http://example.org/Observation/obs-{patient_id}-bone-only",
             "resource": {
@@ -662,40 +835,40 @@ class Command(BaseCommand):
         
         labs = [
             # Complete Blood Count (CBC)
-            ("hemoglobin", round(random.uniform(9.5, 15.0), 1), "g/dL", "718-7", "Hemoglobin", (12.0, 16.0)),
-            ("hematocrit", round(random.uniform(33.0, 48.0), 1), "%", "4544-3", "Hematocrit", (36.0, 46.0)),
-            ("wbc", round(random.uniform(3.5, 11.0), 1), "10*3/uL", "6690-2", "White blood cell count", (4.0, 11.0)),
-            ("rbc", round(random.uniform(3.8, 5.5), 2), "10*6/uL", "789-8", "Red blood cell count", (4.0, 5.2)),
-            ("platelets", random.randint(100, 400), "10*3/uL", "777-3", "Platelets", (150, 400)),
-            ("anc", round(random.uniform(1.5, 7.0), 1), "10*3/uL", "751-8", "Absolute Neutrophil Count", (1.5, 8.0)),
-            ("alc", round(random.uniform(1.0, 4.0), 1), "10*3/uL", "731-0", "Absolute Lymphocyte Count", (1.0, 4.8)),
-            ("amc", round(random.uniform(0.2, 0.9), 1), "10*3/uL", "742-7", "Absolute Monocyte Count", (0.2, 0.8)),
+            ("hemoglobin", round(self.rng.uniform(9.5, 15.0), 1), "g/dL", "718-7", "Hemoglobin", (12.0, 16.0)),
+            ("hematocrit", round(self.rng.uniform(33.0, 48.0), 1), "%", "4544-3", "Hematocrit", (36.0, 46.0)),
+            ("wbc", round(self.rng.uniform(3.5, 11.0), 1), "10*3/uL", "6690-2", "White blood cell count", (4.0, 11.0)),
+            ("rbc", round(self.rng.uniform(3.8, 5.5), 2), "10*6/uL", "789-8", "Red blood cell count", (4.0, 5.2)),
+            ("platelets", self.rng.randint(100, 400), "10*3/uL", "777-3", "Platelets", (150, 400)),
+            ("anc", round(self.rng.uniform(1.5, 7.0), 1), "10*3/uL", "751-8", "Absolute Neutrophil Count", (1.5, 8.0)),
+            ("alc", round(self.rng.uniform(1.0, 4.0), 1), "10*3/uL", "731-0", "Absolute Lymphocyte Count", (1.0, 4.8)),
+            ("amc", round(self.rng.uniform(0.2, 0.9), 1), "10*3/uL", "742-7", "Absolute Monocyte Count", (0.2, 0.8)),
             
             # Kidney Function
-            ("serum_creatinine", round(random.uniform(0.6, 1.8), 2), "mg/dL", "2160-0", "Serum Creatinine", (0.6, 1.2)),
-            ("creatinine", round(random.uniform(0.6, 1.8), 2), "mg/dL", "2160-0", "Creatinine", (0.6, 1.2)),
-            ("creatinine_clearance", round(random.uniform(60.0, 120.0), 1), "mL/min", "2164-2", "Creatinine Clearance", (85.0, 125.0)),
-            ("egfr", round(random.uniform(60.0, 120.0), 1), "mL/min/1.73m2", "33914-3", "eGFR", (90.0, 120.0)),
-            ("bun", round(random.uniform(7.0, 25.0), 1), "mg/dL", "3094-0", "Blood Urea Nitrogen", (7.0, 20.0)),
+            ("serum_creatinine", round(self.rng.uniform(0.6, 1.8), 2), "mg/dL", "2160-0", "Serum Creatinine", (0.6, 1.2)),
+            ("creatinine", round(self.rng.uniform(0.6, 1.8), 2), "mg/dL", "2160-0", "Creatinine", (0.6, 1.2)),
+            ("creatinine_clearance", round(self.rng.uniform(60.0, 120.0), 1), "mL/min", "2164-2", "Creatinine Clearance", (85.0, 125.0)),
+            ("egfr", round(self.rng.uniform(60.0, 120.0), 1), "mL/min/1.73m2", "33914-3", "eGFR", (90.0, 120.0)),
+            ("bun", round(self.rng.uniform(7.0, 25.0), 1), "mg/dL", "3094-0", "Blood Urea Nitrogen", (7.0, 20.0)),
             
             # Electrolytes
-            ("sodium", round(random.uniform(135.0, 145.0), 1), "mEq/L", "2951-2", "Sodium", (136.0, 145.0)),
-            ("potassium", round(random.uniform(3.5, 5.0), 1), "mEq/L", "2823-3", "Potassium", (3.5, 5.0)),
-            ("serum_calcium", round(random.uniform(8.5, 10.5), 1), "mg/dL", "17861-6", "Serum Calcium", (8.6, 10.2)),
-            ("calcium", round(random.uniform(8.5, 10.5), 1), "mg/dL", "17861-6", "Calcium", (8.6, 10.2)),
-            ("magnesium", round(random.uniform(1.7, 2.5), 1), "mg/dL", "19123-9", "Magnesium", (1.7, 2.2)),
+            ("sodium", round(self.rng.uniform(135.0, 145.0), 1), "mEq/L", "2951-2", "Sodium", (136.0, 145.0)),
+            ("potassium", round(self.rng.uniform(3.5, 5.0), 1), "mEq/L", "2823-3", "Potassium", (3.5, 5.0)),
+            ("serum_calcium", round(self.rng.uniform(8.5, 10.5), 1), "mg/dL", "17861-6", "Serum Calcium", (8.6, 10.2)),
+            ("calcium", round(self.rng.uniform(8.5, 10.5), 1), "mg/dL", "17861-6", "Calcium", (8.6, 10.2)),
+            ("magnesium", round(self.rng.uniform(1.7, 2.5), 1), "mg/dL", "19123-9", "Magnesium", (1.7, 2.2)),
             
             # Liver Function
-            ("alt", random.randint(10, 100), "U/L", "1742-6", "ALT", (7, 56)),
-            ("ast", random.randint(10, 100), "U/L", "1920-8", "AST", (8, 48)),
-            ("bilirubin_total", round(random.uniform(0.2, 2.0), 1), "mg/dL", "1975-2", "Total Bilirubin", (0.1, 1.2)),
-            ("albumin", round(random.uniform(3.0, 5.0), 1), "g/dL", "1751-7", "Albumin", (3.5, 5.5)),
-            ("alkaline_phosphatase", random.randint(30, 120), "U/L", "6768-6", "Alkaline Phosphatase", (30, 120)),
+            ("alt", self.rng.randint(10, 100), "U/L", "1742-6", "ALT", (7, 56)),
+            ("ast", self.rng.randint(10, 100), "U/L", "1920-8", "AST", (8, 48)),
+            ("bilirubin_total", round(self.rng.uniform(0.2, 2.0), 1), "mg/dL", "1975-2", "Total Bilirubin", (0.1, 1.2)),
+            ("albumin", round(self.rng.uniform(3.0, 5.0), 1), "g/dL", "1751-7", "Albumin", (3.5, 5.5)),
+            ("alkaline_phosphatase", self.rng.randint(30, 120), "U/L", "6768-6", "Alkaline Phosphatase", (30, 120)),
             
             # Other Labs
-            ("glucose", random.randint(70, 140), "mg/dL", "2345-7", "Glucose", (70, 100)),
-            ("hba1c", round(random.uniform(4.5, 6.5), 1), "%", "4548-4", "HbA1c", (4.0, 5.6)),
-            ("ldh", random.randint(100, 250), "U/L", "2532-0", "LDH", (122, 222)),
+            ("glucose", self.rng.randint(70, 140), "mg/dL", "2345-7", "Glucose", (70, 100)),
+            ("hba1c", round(self.rng.uniform(4.5, 6.5), 1), "%", "4548-4", "HbA1c", (4.0, 5.6)),
+            ("ldh", self.rng.randint(100, 250), "U/L", "2532-0", "LDH", (122, 222)),
         ]
         
         for name, value, unit, loinc_code, display, ref_range in labs:
@@ -743,16 +916,16 @@ class Command(BaseCommand):
         """Generate biomarker observations (HER2, ER, PR, Ki67, PD-L1)"""
         observations = []
         
-        is_tnbc = random.random() < getattr(self, 'tnbc_ratio', 0.15)
+        is_tnbc = self.rng.random() < getattr(self, 'tnbc_ratio', 0.15)
         
         if is_tnbc:
             her2 = "Negative"
             er = "Negative"
             pr = "Negative"
         else:
-            her2 = random.choice(["Positive", "Negative", "Negative"])  # ~30% HER2+
-            er = random.choice(["Positive", "Positive", "Positive", "Negative"])  # ~75% ER+
-            pr = random.choice(["Positive", "Positive", "Negative"])  # ~65% PR+
+            her2 = self.rng.choice(["Positive", "Negative", "Negative"])  # ~30% HER2+
+            er = self.rng.choice(["Positive", "Positive", "Positive", "Negative"])  # ~75% ER+
+            pr = self.rng.choice(["Positive", "Positive", "Negative"])  # ~65% PR+
         
         biomarkers = [
             ("HER2", her2, "48676-1", "HER2 receptor"),
@@ -798,7 +971,7 @@ class Command(BaseCommand):
             observations.append(obs)
         
         # Ki67 Proliferation Index (percentage 5-95%, weighted toward lower values)
-        ki67_index = round(random.triangular(5, 95, 20))
+        ki67_index = round(self.rng.triangular(5, 95, 20))
         
         ki67_obs = {
             "fullUrl": f"http://example.org/Observation/obs-{patient_id}-ki67",
@@ -835,7 +1008,7 @@ class Command(BaseCommand):
         observations.append(ki67_obs)
         
         # PD-L1 Status (percentage 0-100%, or Positive/Negative)
-        pd_l1_percentage = random.randint(0, 100)
+        pd_l1_percentage = self.rng.randint(0, 100)
         pd_l1_status = "Positive" if pd_l1_percentage >= 1 else "Negative"
         
         pdl1_obs = {
@@ -944,32 +1117,32 @@ class Command(BaseCommand):
         interpretation_weights = [0.30, 0.25, 0.30, 0.10, 0.05]
         
         # Generate 0-4 mutations per patient
-        num_mutations = random.choices([0, 1, 2, 3, 4], weights=[0.30, 0.35, 0.20, 0.10, 0.05])[0]
+        num_mutations = self.rng.choices([0, 1, 2, 3, 4], weights=[0.30, 0.35, 0.20, 0.10, 0.05])[0]
         
         selected_genes = []
         if num_mutations > 0:
             # Weight genes by their frequency
             gene_names = list(bc_genes.keys())
             gene_weights = [bc_genes[g]["weight"] for g in gene_names]
-            selected_genes = random.sample(
-                random.choices(gene_names, weights=gene_weights, k=num_mutations*2),
+            selected_genes = self.rng.sample(
+                self.rng.choices(gene_names, weights=gene_weights, k=num_mutations*2),
                 k=min(num_mutations, len(gene_names))
             )
         
         for gene in selected_genes:
-            mutation = random.choice(bc_genes[gene]["mutations"])
+            mutation = self.rng.choice(bc_genes[gene]["mutations"])
             
             # BRCA and PALB2 are more likely germline, others more likely somatic
             if gene in ["BRCA1", "BRCA2", "PALB2", "CHEK2", "ATM"]:
-                origin = random.choices(["Germline", "Somatic"], weights=[0.70, 0.30])[0]
+                origin = self.rng.choices(["Germline", "Somatic"], weights=[0.70, 0.30])[0]
             else:
-                origin = random.choices(["Germline", "Somatic"], weights=[0.20, 0.80])[0]
+                origin = self.rng.choices(["Germline", "Somatic"], weights=[0.20, 0.80])[0]
             
             # Pathogenic/Likely pathogenic more common for BRCA
             if gene in ["BRCA1", "BRCA2"]:
-                interpretation = random.choices(interpretations, weights=[0.50, 0.30, 0.15, 0.03, 0.02])[0]
+                interpretation = self.rng.choices(interpretations, weights=[0.50, 0.30, 0.15, 0.03, 0.02])[0]
             else:
-                interpretation = random.choices(interpretations, weights=interpretation_weights)[0]
+                interpretation = self.rng.choices(interpretations, weights=interpretation_weights)[0]
             
             gene_loinc_codes = {
                 "BRCA1": "21636-6",
@@ -1079,7 +1252,7 @@ class Command(BaseCommand):
         if assigned_lines is not None:
             num_lines = assigned_lines
         else:
-            num_lines = random.choices([0, 1, 2, 3], weights=[0.4, 0.3, 0.2, 0.1])[0]
+            num_lines = self.rng.choices([0, 1, 2, 3], weights=[0.4, 0.3, 0.2, 0.1])[0]
         
         # Breast cancer treatment regimens
         first_line_regimens = {
@@ -1144,24 +1317,24 @@ class Command(BaseCommand):
         selected_regimens = []
         for line_num in range(1, num_lines + 1):
             if line_num == 1:
-                regimen_name = random.choice(list(first_line_regimens.keys()))
+                regimen_name = self.rng.choice(list(first_line_regimens.keys()))
                 regimen_drugs = first_line_regimens[regimen_name]
             elif line_num == 2:
-                regimen_name = random.choice(list(second_line_regimens.keys()))
+                regimen_name = self.rng.choice(list(second_line_regimens.keys()))
                 regimen_drugs = second_line_regimens[regimen_name]
             else:
-                regimen_name = random.choice(list(later_line_regimens.keys()))
+                regimen_name = self.rng.choice(list(later_line_regimens.keys()))
                 regimen_drugs = later_line_regimens[regimen_name]
             
             # Determine outcome for this line
             # Earlier lines and completed lines tend to have better outcomes
             if line_num < num_lines:  # Not the last line, so it led to progression
-                outcome = random.choices(
+                outcome = self.rng.choices(
                     ['Progressive Disease', 'Partial Response', 'Stable Disease'],
                     weights=[0.6, 0.3, 0.1]
                 )[0]
             else:  # Current/last line
-                outcome = random.choices(
+                outcome = self.rng.choices(
                     ['Partial Response', 'Complete Response', 'Stable Disease', 'Progressive Disease'],
                     weights=[0.4, 0.3, 0.2, 0.1]
                 )[0]
@@ -1174,9 +1347,9 @@ class Command(BaseCommand):
             })
             
             # Start therapy after diagnosis, each line 3-6 months apart
-            months_after_diagnosis = (line_num - 1) * random.randint(4, 7)
+            months_after_diagnosis = (line_num - 1) * self.rng.randint(4, 7)
             therapy_start = diagnosis_date + timedelta(days=30 + months_after_diagnosis * 30)
-            therapy_end = therapy_start + timedelta(days=random.randint(90, 180))
+            therapy_end = therapy_start + timedelta(days=self.rng.randint(90, 180))
             
             # Create MedicationStatement for the regimen
             regimen_resource = {
@@ -1246,17 +1419,17 @@ class Command(BaseCommand):
             # Create Therapy Intent observation (LOINC 42804-5)
             # Most lines should be DEFINITIVE_LOCAL (primary curative treatment)
             if line_num == 1:
-                therapy_intent = random.choices(
+                therapy_intent = self.rng.choices(
                     ['DEFINITIVE_LOCAL', 'ADJUVANT', 'NEOADJUVANT', 'INDUCTION'],
                     weights=[0.70, 0.15, 0.10, 0.05]
                 )[0]
             elif line_num == 2:
-                therapy_intent = random.choices(
+                therapy_intent = self.rng.choices(
                     ['DEFINITIVE_LOCAL', 'METASTATIC_DISEASE_CONTROL', 'CONSOLIDATION', 'MAINTENANCE'],
                     weights=[0.60, 0.20, 0.15, 0.05]
                 )[0]
             else:
-                therapy_intent = random.choices(
+                therapy_intent = self.rng.choices(
                     ['DEFINITIVE_LOCAL', 'METASTATIC_DISEASE_CONTROL', 'SALVAGE', 'PALLIATIVE_SYMPTOM'],
                     weights=[0.50, 0.25, 0.15, 0.10]
                 )[0]
@@ -1294,7 +1467,7 @@ class Command(BaseCommand):
                 elif outcome in ['Partial Response', 'Complete Response']:
                     discontinuation = 'Completion'
                 else:
-                    discontinuation = random.choice(['Toxicity', 'Completion'])
+                    discontinuation = self.rng.choice(['Toxicity', 'Completion'])
                 
                 disc_obs = {
                     "fullUrl": f"http://example.org/Observation/discontinuation-{patient_id}-line{line_num}",
@@ -1327,21 +1500,21 @@ class Command(BaseCommand):
     def generate_supportive_therapy(self, patient_id, diagnosis_date):
         """Generate supportive therapy with intent (adjuvant/neoadjuvant)"""
         # 60% of patients have supportive therapy
-        if random.random() > 0.6:
+        if self.rng.random() > 0.6:
             return None
         
         supportive_intent_options = ['ADJUVANT', 'NEOADJUVANT']
-        supportive_intent = random.choice(supportive_intent_options)
+        supportive_intent = self.rng.choice(supportive_intent_options)
         
         # Generate supportive therapy dates relative to diagnosis
         if supportive_intent == 'NEOADJUVANT':
             # Before primary treatment/surgery
-            start_date = diagnosis_date - timedelta(days=random.randint(30, 90))
-            duration = random.randint(60, 120)  # 2-4 months
+            start_date = diagnosis_date - timedelta(days=self.rng.randint(30, 90))
+            duration = self.rng.randint(60, 120)  # 2-4 months
         else:  # ADJUVANT
             # After primary treatment/surgery
-            start_date = diagnosis_date + timedelta(days=random.randint(90, 180))
-            duration = random.randint(180, 365)  # 6-12 months
+            start_date = diagnosis_date + timedelta(days=self.rng.randint(90, 180))
+            duration = self.rng.randint(180, 365)  # 6-12 months
         
         end_date = start_date + timedelta(days=duration)
         
@@ -1356,7 +1529,7 @@ class Command(BaseCommand):
             'Growth factors'
         ]
         
-        therapy_name = random.choice(supportive_therapies)
+        therapy_name = self.rng.choice(supportive_therapies)
         
         return {
             "fullUrl": f"http://example.org/MedicationStatement/supportive-{patient_id}",
@@ -1390,7 +1563,7 @@ class Command(BaseCommand):
     def generate_planned_therapy(self, patient_id):
         """Generate planned therapy from standard of care options"""
         # 70% of patients have planned therapy
-        if random.random() > 0.7:
+        if self.rng.random() > 0.7:
             return None
         
         planned_therapies = [
@@ -1411,7 +1584,7 @@ class Command(BaseCommand):
             'Clinical Trial'
         ]
         
-        planned_therapy = random.choice(planned_therapies)
+        planned_therapy = self.rng.choice(planned_therapies)
         
         return {
             "fullUrl": f"http://example.org/CarePlan/planned-{patient_id}",
@@ -1440,24 +1613,24 @@ class Command(BaseCommand):
         end_date = datetime(end_year, 12, 31)
         time_between = end_date - start_date
         days_between = time_between.days
-        random_days = random.randrange(days_between)
+        random_days = self.rng.randrange(days_between)
         return start_date + timedelta(days=random_days)
 
     def generate_diagnosis_date(self, birth_date):
         """Generate diagnosis date (between age 30 and current age)"""
-        today = datetime.now()
+        today = self.today
         min_diagnosis = birth_date + timedelta(days=30*365)
         max_diagnosis = min(today, birth_date + timedelta(days=80*365))
         
         if min_diagnosis >= max_diagnosis:
-            return today - timedelta(days=random.randint(365, 3650))
+            return today - timedelta(days=self.rng.randint(365, 3650))
         
         time_between = max_diagnosis - min_diagnosis
         days_between = time_between.days
         if days_between <= 0:
-            return today - timedelta(days=random.randint(365, 3650))
+            return today - timedelta(days=self.rng.randint(365, 3650))
         
-        random_days = random.randrange(days_between)
+        random_days = self.rng.randrange(days_between)
         return min_diagnosis + timedelta(days=random_days)
 
     def get_first_names(self):
@@ -0,0 +1,539 @@
+"""
+Django management command: import_fhir_ndjson
+=============================================
+Streams a FHIR Bulk Data export (one NDJSON file per resource type) into the
+OMOP tables without ever holding a whole file in memory:
+
+  * Patient             → omop_core.Person
+  * Condition           → omop_core.ConditionOccurrence
+  * Observation         → omop_core.Measurement   (valueQuantity)
+                          omop_core.Observation   (any other value)
+  * MedicationStatement → omop_core.DrugExposure
+
+Patients are imported first. Each FHIR Patient id and the person_id assigned
+to it are kept in a SQLite staging index on disk, and the other resource types
+are joined to persons through that index one batch at a time. The index also
+records every imported resource id, so re-running with the same
+``--staging-db`` skips what was already loaded and a crashed import can simply
+be resumed.
+
+Rows are written per batch with ``omop_core.bulk_load`` (COPY on PostgreSQL);
+ids are pre-allocated from ``max(<table>_id)``. Codings are resolved to
+standard concepts through omop_core.source_concepts (source_to_concept_map,
+then the vocabulary) with one lookup per batch, memoized across batches;
+unmapped codes fall back to concept 0 ("No matching concept").
+
+PatientInfo is not built here — run ``populate_patient_info`` afterwards.
+
+Input files
+-----------
+In the input directory, files are picked up per resource type by name:
+``Patient.ndjson``, ``Patient.ndjson.gz``, ``Patient-001.ndjson`` …
+
+Usage
+-----
+  # Import a bulk export directory
+  python manage.py import_fhir_ndjson /data/export
+
+  # Keep the staging index so the import can be resumed / extended later
+  python manage.py import_fhir_ndjson /data/export --staging-db /data/export.staging.sqlite3
+
+  # Only some resource types, bigger batches
+  python manage.py import_fhir_ndjson /data/export --types Patient Condition --batch-size 5000
+"""
+
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from omop_core.bulk_load import bulk_load
+from omop_core.fhir_ndjson import read_ndjson
+from omop_core.management.base import BatchCommand
+from omop_core.models import (
+    Concept, ConditionOccurrence, DrugExposure, Measurement, Observation, Person,
+)
+from omop_core.patient_info_cache import patient_info_cache
+from omop_core.source_concepts import GENDER_VOCABULARY, source_concepts
+from omop_oncology.lines_of_therapy import (
+    EHR_TYPE_CONCEPT_ID, ensure_lot_concepts,
+)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Import order matters: every other type is joined to Patient
+RESOURCE_TYPES = ['Patient', 'Condition', 'Observation', 'MedicationStatement']
+
+BATCH_SIZE = 2000
+
+# SQLite's default limit on bound parameters is 999
+STAGING_LOOKUP_CHUNK = 900
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _safe_date(value: Any) -> date | None:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (ValueError, TypeError):
+        return None
+
+
+def _safe_decimal(value: Any) -> Decimal | None:
+    if value is None:
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return None
+
+
+def _source_value(value: Any) -> str | None:
+    return str(value)[:50] if value not in (None, '') else None
+
+
+def _subject_id(resource: dict) -> str | None:
+    """FHIR id of the Patient a resource refers to (``Patient/<id>``)."""
+    reference = (resource.get('subject') or resource.get('patient') or {}).get('reference', '')
+    if not reference.startswith('Patient/'):
+        return None
+    return reference.split('/', 1)[1] or None
+
+
+def _codings(codeable: dict | None) -> list[dict]:
+    return (codeable or {}).get('coding') or []
+
+
+def _imported_ids(joined) -> list[str]:
+    return [r['id'] for r, _ in joined if r.get('id')]
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _files_for(directory: Path, resource_type: str) -> list[Path]:
+    """NDJSON files in ``directory`` that hold ``resource_type`` resources."""
+    files = []
+    for path in sorted(directory.iterdir()):
+        name = path.name
+        if not (name.endswith('.ndjson') or name.endswith('.ndjson.gz')):
+            continue
+        stem = name.split('.ndjson')[0]
+        if stem == resource_type or stem.startswith((f'{resource_type}-', f'{resource_type}_')):
+            files.append(path)
+    return files
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _next_id(model, field: str) -> int:
+    return (model.objects.aggregate(m=Max(field))['m'] or 0) + 1
+
+
+class StagingIndex:
+    """
+    SQLite-backed FHIR id → person_id index, plus the set of imported ids.
+
+    Lives on disk, so memory stays flat however many patients the export has.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'CREATE TABLE IF NOT EXISTS patient ('
+            '  fhir_id TEXT PRIMARY KEY, person_id INTEGER NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS imported ('
+            '  resource_type TEXT NOT NULL, fhir_id TEXT NOT NULL,'
+            '  PRIMARY KEY (resource_type, fhir_id)) WITHOUT ROWID;'
+        )
+
+    def _lookup(self, sql, params, keys):
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), STAGING_LOOKUP_CHUNK):
+            chunk = keys[start:start + STAGING_LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(self.conn.execute(sql.format(placeholders), [*params, *chunk]))
+        return found
+
+    def person_ids(self, fhir_ids) -> dict[str, int]:
+        return self._lookup(
+            'SELECT fhir_id, person_id FROM patient WHERE fhir_id IN ({})', [], set(fhir_ids),
+        )
+
+    def imported(self, resource_type, fhir_ids) -> set[str]:
+        return set(self._lookup(
+            'SELECT fhir_id, 1 FROM imported WHERE resource_type = ? AND fhir_id IN ({})',
+            [resource_type], set(fhir_ids),
+        ))
+
+    def add_patients(self, pairs):
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO patient VALUES (?, ?)', pairs)
+
+    def mark_imported(self, resource_type, fhir_ids):
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO imported VALUES (?, ?)',
+                [(resource_type, fhir_id) for fhir_id in fhir_ids],
+            )
+
+    def patient_count(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM patient').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Command
+# ---------------------------------------------------------------------------
+
+class Command(BatchCommand):
+    help = 'Stream a FHIR Bulk Data NDJSON export into OMOP tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input_dir',
+            help='Directory containing <ResourceType>.ndjson[.gz] files',
+        )
+        parser.add_argument(
+            '--staging-db',
+            help='SQLite file for the patient/resource staging index '
+                 '(default: a temporary file removed after the run)',
+        )
+        parser.add_argument(
+            '--types', nargs='+', choices=RESOURCE_TYPES, default=RESOURCE_TYPES,
+            help='Resource types to import (default: all)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help=f'Resources read and written per batch (default: {BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        input_dir = Path(options['input_dir'])
+        if not input_dir.is_dir():
+            raise CommandError(f'Not a directory: {input_dir}')
+        self.batch_size = options['batch_size']
+        if self.batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        ensure_lot_concepts()
+        # Another process may have changed the vocabulary or the source map
+        self.concepts = source_concepts
+        self.concepts.clear()
+        self.concepts.reset_metrics()
+        self.gender_concepts = set(
+            Concept.objects.filter(
+                concept_id__in=self.concepts.targets(GENDER_VOCABULARY)
+            ).values_list('concept_id', flat=True)
+        )
+
+        tmpdir = None
+        staging_path = options['staging_db']
+        if not staging_path:
+            tmpdir = tempfile.TemporaryDirectory(prefix='fhir-staging-')
+            staging_path = Path(tmpdir.name) / 'staging.sqlite3'
+        self.staging = StagingIndex(staging_path)
+
+        stats = {}
+        started = time.perf_counter()
+        try:
+            for resource_type in [t for t in RESOURCE_TYPES if t in options['types']]:
+                files = _files_for(input_dir, resource_type)
+                if not files:
+                    continue
+                stats[resource_type] = self._import_type(resource_type, files)
+        finally:
+            self.staging.close()
+            if tmpdir:
+                tmpdir.cleanup()
+            # bulk_load sends no signals
+            patient_info_cache.invalidate_all()
+
+        elapsed = time.perf_counter() - started
+        written = sum(s['written'] for s in stats.values())
+        peak = _peak_rss_mb()
+        self.stdout.write(self.style.SUCCESS(
+            f'\nDone in {elapsed:.1f}s — {written:,} OMOP row(s) written '
+            f'({written / elapsed if elapsed else 0:,.0f} rows/s)'
+            + (f', peak RSS {peak:,.0f} MB' if peak is not None else '')
+        ))
+        mapping = self.concepts.metrics()
+        self.stdout.write(
+            f"Concept mapping: {mapping['hits']:,} hit(s), {mapping['misses']:,} code(s) looked up "
+            f"in {mapping['queries']:,} quer(ies), {mapping['unmapped']:,} unmapped"
+        )
+        if stats.get('Patient', {}).get('written'):
+            self.stdout.write('Run populate_patient_info to build PatientInfo for the new persons.')
+        return None
+
+    # ------------------------------------------------------------------
+    # Per-type streaming
+    # ------------------------------------------------------------------
+
+    def _import_type(self, resource_type, files):
+        converter = {
+            'Patient': self._write_patients,
+            'Condition': self._write_conditions,
+            'Observation': self._write_observations,
+            'MedicationStatement': self._write_medications,
+        }[resource_type]
+        counts = Counter()
+        started = time.perf_counter()
+
+        for path in files:
+            self.stdout.write(f'Importing {path.name} …')
+            errors = []
+            for batch in _batched(read_ndjson(path, errors), self.batch_size):
+                batch = [r for r in batch if r.get('resourceType') == resource_type]
+                counts['read'] += len(batch)
+                batch = self._drop_imported(resource_type, batch, counts)
+                if not batch:
+                    continue
+                with transaction.atomic():
+                    staged = converter(batch, counts)
+                # Only record the batch once its OMOP rows are committed
+                if resource_type == 'Patient':
+                    self.staging.add_patients(staged)
+                else:
+                    self.staging.mark_imported(resource_type, staged)
+            counts['malformed'] += len(errors)
+            for line_number, message in errors[:5]:
+                self.stderr.write(self.style.WARNING(f'  {path.name}:{line_number}: {message}'))
+
+        elapsed = time.perf_counter() - started
+        peak = _peak_rss_mb()
+        self.stdout.write(
+            f'  → {resource_type}: {counts["read"]:,} read, {counts["written"]:,} row(s) written, '
+            f'{counts["already_imported"]:,} already imported, '
+            f'{counts["unmatched"]:,} without a known patient, '
+            f'{counts["skipped"]:,} skipped, {counts["malformed"]:,} malformed — '
+            f'{counts["read"] / elapsed if elapsed else 0:,.0f} resources/s'
+            + (f', peak RSS {peak:,.0f} MB' if peak is not None else '')
+        )
+        return counts
+
+    def _drop_imported(self, resource_type, batch, counts):
+        ids = [r['id'] for r in batch if r.get('id')]
+        if resource_type == 'Patient':
+            seen = set(self.staging.person_ids(ids))
+        else:
+            seen = self.staging.imported(resource_type, ids)
+        kept = []
+        for r in batch:
+            rid = r.get('id')
+            if rid and rid in seen:
+                # Already loaded by an earlier run, or repeated within this one
+                counts['already_imported'] += 1
+                continue
+            if rid:
+                seen.add(rid)
+            kept.append(r)
+        return kept
+
+    def _join_persons(self, batch, counts):
+        """Pair each resource with its person_id; drop resources with no staged patient."""
+        person_ids = self.staging.person_ids(filter(None, map(_subject_id, batch)))
+        joined = []
+        for r in batch:
+            person_id = person_ids.get(_subject_id(r))
+            if person_id is None:
+                counts['unmatched'] += 1
+            else:
+                joined.append((r, person_id))
+        return joined
+
+    # ------------------------------------------------------------------
+    # Resource → OMOP converters
+    #
+    # Each converts one batch inside a transaction and returns what to record
+    # in the staging index: (fhir_id, person_id) pairs for Patient, else ids.
+    # ------------------------------------------------------------------
+
+    def _write_patients(self, batch, counts):
+        next_id = _next_id(Person, 'person_id')
+        persons, staged = [], []
+        for r in batch:
+            fhir_id = r.get('id')
+            if not fhir_id:
+                counts['skipped'] += 1
+                continue
+            birth_date = _safe_date(r.get('birthDate'))
+            gender = (r.get('gender') or '').lower()
+            gender_concept_id = self.concepts.concept_id(GENDER_VOCABULARY, gender)
+            name = (r.get('name') or [{}])[0]
+            persons.append(Person(
+                person_id=next_id,
+                gender_concept_id=gender_concept_id if gender_concept_id in self.gender_concepts else None,
+                gender_source_value=_source_value(r.get('gender')),
+                year_of_birth=birth_date.year if birth_date else None,
+                month_of_birth=birth_date.month if birth_date else None,
+                day_of_birth=birth_date.day if birth_date else None,
+                given_name=' '.join(name.get('given') or [])[:100] or None,
+                family_name=(name.get('family') or '')[:100] or None,
+            ))
+            staged.append((fhir_id, next_id))
+            next_id += 1
+        bulk_load(Person, persons)
+        counts['written'] += len(persons)
+        return staged
+
+    def _write_conditions(self, batch, counts):
+        joined = self._join_persons(batch, counts)
+        self.concepts.prefetch_codings(c for r, _ in joined for c in _codings(r.get('code')))
+        next_id = _next_id(ConditionOccurrence, 'condition_occurrence_id')
+        rows = []
+        for r, person_id in joined:
+            start = _safe_date(
+                r.get('onsetDateTime') or (r.get('onsetPeriod') or {}).get('start') or r.get('recordedDate')
+            )
+            if start is None:
+                counts['skipped'] += 1
+                continue
+            codings = _codings(r.get('code'))
+            rows.append(ConditionOccurrence(
+                condition_occurrence_id=next_id,
+                person_id=person_id,
+                condition_concept_id=self.concepts.for_codings(codings),
+                condition_start_date=start,
+                condition_end_date=_safe_date(r.get('abatementDateTime')),
+                condition_type_concept_id=EHR_TYPE_CONCEPT_ID,
+                condition_source_value=_source_value(
+                    codings[0].get('code') if codings else (r.get('code') or {}).get('text')
+                ),
+            ))
+            next_id += 1
+        bulk_load(ConditionOccurrence, rows)
+        counts['written'] += len(rows)
+        return _imported_ids(joined)
+
+    def _write_observations(self, batch, counts):
+        joined = self._join_persons(batch, counts)
+        self.concepts.prefetch_codings(
+            c for r, _ in joined
+            for c in _codings(r.get('code')) + _codings(r.get('valueCodeableConcept'))
+        )
+        next_measurement_id = _next_id(Measurement, 'measurement_id')
+        next_observation_id = _next_id(Observation, 'observation_id')
+        measurements, observations = [], []
+        for r, person_id in joined:
+            when = _safe_date(
+                r.get('effectiveDateTime') or (r.get('effectivePeriod') or {}).get('start') or r.get('issued')
+            )
+            if when is None:
+                counts['skipped'] += 1
+                continue
+            codings = _codings(r.get('code'))
+            concept_id = self.concepts.for_codings(codings)
+            source_value = _source_value(codings[0].get('code') if codings else (r.get('code') or {}).get('text'))
+            quantity = r.get('valueQuantity')
+            if quantity and _safe_decimal(quantity.get('value')) is not None:
+                measurements.append(Measurement(
+                    measurement_id=next_measurement_id,
+                    person_id=person_id,
+                    measurement_concept_id=concept_id,
+                    measurement_date=when,
+                    measurement_type_concept_id=EHR_TYPE_CONCEPT_ID,
+                    value_as_number=_safe_decimal(quantity.get('value')),
+                    unit_source_value=_source_value(quantity.get('unit') or quantity.get('code')),
+                    measurement_source_value=source_value,
+                ))
+                next_measurement_id += 1
+                continue
+            value_concept = r.get('valueCodeableConcept')
+            value = r.get('valueString')
+            if value is None and value_concept:
+                value = value_concept.get('text') or next(
+                    (c.get('display') or c.get('code') for c in _codings(value_concept)), None
+                )
+            if value is None and 'valueBoolean' in r:
+                value = str(r['valueBoolean']).lower()
+            if value is None and 'valueInteger' in r:
+                value = str(r['valueInteger'])
+            value_concept_id = self.concepts.for_codings(_codings(value_concept)) if value_concept else None
+            observations.append(Observation(
+                observation_id=next_observation_id,
+                person_id=person_id,
+                observation_concept_id=concept_id,
+                observation_date=when,
+                observation_type_concept_id=EHR_TYPE_CONCEPT_ID,
+                value_as_number=_safe_decimal(r.get('valueInteger')),
+                value_as_string=str(value)[:60] if value is not None else None,
+                value_as_concept_id=value_concept_id or None,
+                observation_source_value=source_value,
+                value_source_value=_source_value(value),
+            ))
+            next_observation_id += 1
+        bulk_load(Measurement, measurements)
+        bulk_load(Observation, observations)
+        counts['written'] += len(measurements) + len(observations)
+        return _imported_ids(joined)
+
+    def _write_medications(self, batch, counts):
+        joined = self._join_persons(batch, counts)
+        self.concepts.prefetch_codings(
+            c for r, _ in joined for c in _codings(r.get('medicationCodeableConcept'))
+        )
+        next_id = _next_id(DrugExposure, 'drug_exposure_id')
+        rows = []
+        for r, person_id in joined:
+            period = r.get('effectivePeriod') or {}
+            start = _safe_date(period.get('start') or r.get('effectiveDateTime') or r.get('dateAsserted'))
+            if start is None:
+                counts['skipped'] += 1
+                continue
+            end = _safe_date(period.get('end'))
+            medication = r.get('medicationCodeableConcept') or {}
+            codings = _codings(medication)
+            rows.append(DrugExposure(
+                drug_exposure_id=next_id,
+                person_id=person_id,
+                drug_concept_id=self.concepts.for_codings(codings),
+                drug_exposure_start_date=start,
+                # OMOP requires an end date; an open statement ends where it starts
+                drug_exposure_end_date=end or start,
+                verbatim_end_date=end,
+                drug_type_concept_id=EHR_TYPE_CONCEPT_ID,
+                drug_source_value=_source_value(
+                    medication.get('text') or (codings[0].get('display') if codings else None)
+                ),
+            ))
+            next_id += 1
+        bulk_load(DrugExposure, rows)
+        counts['written'] += len(rows)
+        return _imported_ids(joined)
@@ -0,0 +1,82 @@
+"""
+Django management command: import_report
+========================================
+Start-up profile of another management command: runs
+``python -X importtime manage.py <command> [args]`` in a fresh interpreter
+and summarises the report (benchmarks/startup.py) — wall time, total import
+time, the top-level packages that cost most, and the slowest single modules
+(self time, excluding their own imports).
+
+Use it before and after adding an import to a command that runs from cron or
+a script: a module-level import of a heavy dependency (google-cloud-bigquery,
+pyarrow, DRF) is paid on every run, including --help, whether or not the run
+needs it. Import those inside the function that uses them instead, as
+load_from_healthtree_bq does for BigQuery. The cold_start benchmark scenario
+tracks the same start-up times over time.
+
+Everything after the command name is passed to it, so import_report's own
+options go first.
+
+Usage
+-----
+  python manage.py import_report export_fhir --help
+  python manage.py import_report --top 25 generate_fhir_bundle --count 1 --output /tmp/one.json
+  python manage.py import_report --repeat 5 check
+"""
+
+import argparse
+import statistics
+
+from django.core.management.base import CommandError
+
+from benchmarks.startup import run_manage, summarize
+from omop_core.management.base import BatchCommand
+
+
+class Command(BatchCommand):
+    help = 'Profile the start-up (python -X importtime) of another management command'
+
+    def add_arguments(self, parser):
+        parser.add_argument('command', help='Management command to profile')
+        parser.add_argument(
+            'command_args', nargs=argparse.REMAINDER,
+            help='Arguments for the profiled command (e.g. --help)',
+        )
+        parser.add_argument('--top', type=int, default=15, help='Packages and modules listed (default: 15)')
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Runs timed without -X importtime, which slows imports down (default: 3)',
+        )
+
+    def handle(self, *args, **options):
+        if options['top'] < 1 or options['repeat'] < 1:
+            raise CommandError('--top and --repeat must be at least 1')
+        command = [options['command'], *options['command_args']]
+        try:
+            profiled = run_manage(command, importtime=True)
+            wall = [run_manage(command)['seconds'] for _ in range(options['repeat'])]
+        except RuntimeError as exc:
+            raise CommandError(str(exc)) from exc
+        summary = summarize(profiled['imports'], options['top'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'manage.py {" ".join(command)}'))
+        self.stdout.write(
+            f'  wall time: {statistics.median(wall) * 1000:,.0f} ms median of {len(wall)} '
+            f'(best {min(wall) * 1000:,.0f} ms)'
+        )
+        self.stdout.write(
+            f'  imports:   {summary["total_us"] / 1000:,.0f} ms in {summary["modules"]:,} modules '
+            '(under -X importtime)'
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Packages by import time'))
+        for package in summary['packages']:
+            self.stdout.write(
+                f'  {package["package"]:<32} {package["self_us"] / 1000:>8,.1f} ms  {package["modules"]:>5} modules'
+            )
+        self.stdout.write(self.style.MIGRATE_HEADING('Slowest modules (self time)'))
+        for entry in summary['slowest']:
+            self.stdout.write(
+                f'  {entry["module"]:<56} {entry["self_us"] / 1000:>8,.1f} ms  '
+                f'(cumulative {entry["cumulative_us"] / 1000:,.1f} ms)'
+            )
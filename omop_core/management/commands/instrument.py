@@ -0,0 +1,58 @@
+"""
+Django management command: instrument
+=====================================
+Runs any other management command under omop_core.instrumentation and
+reports how many SQL queries it ran, the total DB time and the slowest
+statements:
+
+  $ python manage.py instrument populate_patient_info --person-id 1001
+  …normal command output…
+  instrument: populate_patient_info — 412 queries, 183.2 ms DB, 1.9 s total
+    41.0 ms  SELECT … FROM "measurement" WHERE …
+
+The same numbers are logged as one JSON line to ``ctomop.instrumentation``
+(``{"event": "command", "name": "populate_patient_info", "queries": 412, …}``)
+so scheduled jobs can be tracked alongside request logs.
+
+Usage
+-----
+  python manage.py instrument <command> [command args …]
+
+  # Keep more of the slowest statements
+  python manage.py instrument --slowest 20 import_fhir_ndjson /data/export
+"""
+
+import argparse
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from omop_core.instrumentation import SLOWEST_KEPT, QueryProfile, log_profile
+
+
+class Command(BaseCommand):
+    help = 'Run a management command and report its SQL query count and DB time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--slowest', type=int, default=SLOWEST_KEPT,
+            help=f'Slowest statements to report (default: {SLOWEST_KEPT})',
+        )
+        parser.add_argument('command_name', help='Management command to run')
+        parser.add_argument(
+            'command_args', nargs=argparse.REMAINDER,
+            help='Arguments passed through to the command',
+        )
+
+    def handle(self, *args, **options):
+        name = options['command_name']
+        with QueryProfile(slowest_kept=options['slowest']) as profile:
+            call_command(name, *options['command_args'], stdout=self.stdout, stderr=self.stderr)
+
+        summary = log_profile('command', name, profile, args=options['command_args'])
+        self.stdout.write(self.style.SUCCESS(
+            f'instrument: {name} — {summary["queries"]:,} queries, '
+            f'{summary["db_ms"]:,.1f} ms DB, {summary["total_ms"] / 1000:,.1f} s total'
+        ))
+        for statement in summary['slowest']:
+            self.stdout.write(f'  {statement["ms"]:8.1f} ms  {statement["sql"]}')
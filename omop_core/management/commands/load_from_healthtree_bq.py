@@ -6,8 +6,10 @@ Reads FHIR patient data from the HealthTree BigQuery warehouse
 
   * omop_core.Person        — core OMOP demographics
   * omop_core.PatientInfo   — extended denormalised patient info including:
-      - ai_lines_of_therapy   (from core__ai_lines_of_therapy)
       - survey_responses      (from core__survey_responses)
+  * omop_oncology.Episode / AILineOfTherapySummary / EpisodeEvent
+                            — one Episode per AI line of therapy
+                              (from core__ai_lines_of_therapy)
 
 BigQuery source
 ---------------
@@ -45,6 +47,9 @@ Usage
   # Force-update existing PatientInfo records
   python manage.py load_from_healthtree_bq --force-update
 
+  # Skip the line-of-therapy Episode materialization stage
+  python manage.py load_from_healthtree_bq --skip-lot-materialization
+
 Environment variables
 ---------------------
   HT_BQ_PROJECT              BigQuery GCP project id
@@ -59,11 +64,15 @@ from datetime import date, datetime, timezone as dt_timezone
 from decimal import Decimal, InvalidOperation
 from typing import Any
 
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
 from django.db import transaction, IntegrityError
 from django.utils import timezone
 
+from omop_core.management.base import BatchCommand
 from omop_core.models import Concept, Location, PatientInfo, Person
+from omop_core.patient_info_cache import patient_info_cache
+from omop_core.source_concepts import GENDER_VOCABULARY, RACE_VOCABULARY, source_concepts
+from omop_oncology.lines_of_therapy import materialize_lines_of_therapy
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -72,24 +81,6 @@ from omop_core.models import Concept, Location, PatientInfo, Person
 DEFAULT_BQ_PROJECT = "ht-analytics-486920"
 DEFAULT_BQ_DATASET = "core"
 
-# OMOP concept IDs for gender (standard OMOP vocabulary)
-GENDER_CONCEPT_MAP = {
-    "male": 8507,
-    "m": 8507,
-    "female": 8532,
-    "f": 8532,
-}
-
-# OMOP concept IDs for race (standard OMOP vocabulary)
-RACE_CONCEPT_MAP = {
-    "white": 8527,
-    "black or african american": 8516,
-    "asian": 8515,
-    "american indian or alaska native": 8657,
-    "native hawaiian or other pacific islander": 8557,
-    "other": 8522,
-}
-
 # OMOP concept ID for unknown (0 means no concept)
 UNKNOWN_CONCEPT_ID = 0
 
@@ -326,7 +317,7 @@ def _q_surveys(project: str, dataset: str, user_id: str | None) -> str:
 # Management command
 # ---------------------------------------------------------------------------
 
-class Command(BaseCommand):
+class Command(BatchCommand):
     help = (
         "Load HealthTree patient data from BigQuery into CTOMOP "
         "(Person + PatientInfo tables, including AI lines of therapy and "
@@ -377,6 +368,14 @@ class Command(BaseCommand):
             action="store_true",
             help="Query BigQuery but do NOT write anything to the Django DB.",
         )
+        parser.add_argument(
+            "--skip-lot-materialization",
+            action="store_true",
+            help=(
+                "Do not write AI lines of therapy into "
+                "Episode / AILineOfTherapySummary / EpisodeEvent."
+            ),
+        )
         parser.add_argument(
             "--verbose",
             action="store_true",
@@ -387,7 +386,8 @@ class Command(BaseCommand):
     # Entry point
     # ------------------------------------------------------------------
 
-    def handle(self, *args, **options):
+    def get_bigquery_client(self, bq_project: str, keyfile: str | None):
+        """BigQuery client used for every query (benchmarks substitute a local stub)."""
         try:
             from google.cloud import bigquery
             from google.oauth2 import service_account
@@ -397,23 +397,25 @@ class Command(BaseCommand):
                 "Run: pip install google-cloud-bigquery"
             )
 
+        if keyfile:
+            credentials = service_account.Credentials.from_service_account_file(
+                keyfile,
+                scopes=["https://www.googleapis.com/auth/bigquery.readonly"],
+            )
+            return bigquery.Client(project=bq_project, credentials=credentials)
+        return bigquery.Client(project=bq_project)
+
+    def handle(self, *args, **options):
         bq_project = options["bq_project"]
         bq_dataset = options["bq_dataset"]
         keyfile = options["keyfile"]
         user_id_filter = options["user_id"]
         force_update = options["force_update"]
         dry_run = options["dry_run"]
+        skip_lot = options["skip_lot_materialization"]
         verbose = options["verbose"]
 
-        # Build BigQuery client
-        if keyfile:
-            credentials = service_account.Credentials.from_service_account_file(
-                keyfile,
-                scopes=["https://www.googleapis.com/auth/bigquery.readonly"],
-            )
-            bq_client = bigquery.Client(project=bq_project, credentials=credentials)
-        else:
-            bq_client = bigquery.Client(project=bq_project)
+        bq_client = self.get_bigquery_client(bq_project, keyfile)
 
         self.stdout.write(
             self.style.MIGRATE_HEADING(
@@ -474,6 +476,7 @@ class Command(BaseCommand):
         updated_pi = 0
         skipped_pi = 0
         errors = 0
+        lot_person_rows: list[tuple[int, list[dict]]] = []
 
         for patient_row in patients_rows:
             user_id = patient_row["user_id"]
@@ -492,6 +495,8 @@ class Command(BaseCommand):
                     created_pi += result["created_pi"]
                     updated_pi += result["updated_pi"]
                     skipped_pi += result["skipped_pi"]
+                    if result["person_id"] and user_id in lot_by_user:
+                        lot_person_rows.append((result["person_id"], lot_by_user[user_id]))
             except Exception as exc:  # noqa: BLE001
                 errors += 1
                 self.stderr.write(
@@ -499,7 +504,21 @@ class Command(BaseCommand):
                 )
 
         # ------------------------------------------------------------------
-        # 5. Summary
+        # 5. Materialize lines of therapy as Episode rows (batched)
+        # ------------------------------------------------------------------
+        lot_stats = None
+        if lot_person_rows and not skip_lot:
+            self.stdout.write("Materializing lines of therapy …")
+            lot_stats = materialize_lines_of_therapy(lot_person_rows, batch_size=BATCH_SIZE)
+            self.stdout.write(
+                f"  → {lot_stats['episodes']:,} episode(s), "
+                f"{lot_stats['events']:,} episode event(s) for "
+                f"{lot_stats['persons']:,} person(s); "
+                f"{lot_stats['skipped_lines']:,} line(s) without start_date skipped."
+            )
+
+        # ------------------------------------------------------------------
+        # 6. Summary
         # ------------------------------------------------------------------
         self.stdout.write(
             self.style.SUCCESS(
@@ -507,6 +526,8 @@ class Command(BaseCommand):
                 f"  Person   — created: {created_persons:,}  updated: {updated_persons:,}\n"
                 f"  PatientInfo — created: {created_pi:,}  updated: {updated_pi:,}  "
                 f"skipped: {skipped_pi:,}\n"
+                f"  Lines of therapy — episodes: "
+                f"{lot_stats['episodes'] if lot_stats else 0:,}\n"
                 f"  Errors: {errors:,}"
             )
         )
@@ -531,6 +552,7 @@ class Command(BaseCommand):
             "created_pi": 0,
             "updated_pi": 0,
             "skipped_pi": 0,
+            "person_id": None,
         }
 
         user_id: str = patient_row["user_id"]
@@ -539,10 +561,10 @@ class Command(BaseCommand):
         person_id = bq_person_id if bq_person_id else _stable_person_id(user_id)
 
         gender_raw = (patient_row.get("gender") or "").lower().strip()
-        gender_concept_id = GENDER_CONCEPT_MAP.get(gender_raw, UNKNOWN_CONCEPT_ID)
+        gender_concept_id = source_concepts.concept_id(GENDER_VOCABULARY, gender_raw, UNKNOWN_CONCEPT_ID)
 
         race_raw = (patient_row.get("race") or "").lower().strip()
-        race_concept_id = RACE_CONCEPT_MAP.get(race_raw, UNKNOWN_CONCEPT_ID)
+        race_concept_id = source_concepts.concept_id(RACE_VOCABULARY, race_raw, UNKNOWN_CONCEPT_ID)
 
         dob = _safe_date(patient_row.get("date_of_birth"))
         year_of_birth = dob.year if dob else None
@@ -559,6 +581,8 @@ class Command(BaseCommand):
             result["created_pi"] = 1
             return result
 
+        result["person_id"] = person_id
+
         # ----- Person -----
         person_defaults = {
             "gender_concept_id": gender_concept_id,
@@ -627,9 +651,9 @@ class Command(BaseCommand):
             "city": patient_row.get("city"),
             "region": patient_row.get("state"),
             "postal_code": patient_row.get("postal_code"),
-            # HealthTree-specific denormalised arrays
-            "ai_lines_of_therapy": lot_rows,
-            "survey_responses": survey_rows,
+            # Lines of therapy are materialized into Episode rows instead (see
+            # stage 5 in handle); the survey_responses column was dropped in
+            # migration 0042, so survey rows are not stored on PatientInfo
         }
 
         # Derive therapy summary fields from LOT rows
@@ -637,7 +661,9 @@ class Command(BaseCommand):
             pi_fields.update(self._derive_therapy_fields(lot_rows))
 
         if pi_exists:
-            PatientInfo.objects.filter(person=person).update(**pi_fields)
+            # update() skips auto_now; bump updated_at so API ETags change
+            PatientInfo.objects.filter(person=person).update(**pi_fields, updated_at=timezone.now())
+            patient_info_cache.invalidate_person(person.person_id)
             result["updated_pi"] = 1
         else:
             pi_fields["person"] = person
@@ -653,7 +679,7 @@ class Command(BaseCommand):
     def _derive_therapy_fields(self, lot_rows: list[dict]) -> dict:
         """
         Populate legacy scalar therapy fields on PatientInfo from the
-        ai_lines_of_therapy JSON array so the existing UI / matching logic
+        core__ai_lines_of_therapy rows so the existing UI / matching logic
         still works without changes.
         """
         fields: dict = {}
@@ -0,0 +1,314 @@
+"""
+Django management command: load_omop_vocabulary
+===============================================
+Loads an OHDSI Athena vocabulary download (tab-separated files with a header
+row) into the OMOP vocabulary tables:
+
+  DOMAIN.csv                → domain
+  VOCABULARY.csv            → vocabulary
+  CONCEPT_CLASS.csv         → concept_class
+  CONCEPT.csv               → concept
+  CONCEPT_RELATIONSHIP.csv  → concept_relationship
+  CONCEPT_ANCESTOR.csv      → concept_ancestor
+  SOURCE_TO_CONCEPT_MAP.csv → source_to_concept_map (local mappings, same format)
+
+A full vocabulary is ~6M concepts, so the ORM is not involved:
+
+  1. Each file is streamed into an empty ``<table>_stage`` table (UNLOGGED on
+     PostgreSQL) with omop_core.bulk_load.load_rows — COPY on PostgreSQL,
+     batched executemany elsewhere.
+  2. In one transaction, the secondary indexes of the live tables are
+     dropped, the staged rows are merged with
+     ``INSERT … SELECT … ON CONFLICT (<key>) DO UPDATE``, and the indexes are
+     recreated from their saved definitions. Building an index once over the
+     finished table is far cheaper than maintaining it row by row.
+  3. The staging tables are dropped, on PostgreSQL the tables ANALYZEd, and
+     the in-process concept caches (omop_core.concept_sets,
+     omop_core.source_concepts) cleared.
+
+Live tables are merged into rather than swapped out: clinical tables hold
+foreign keys to concept, so existing rows keep their concepts and a load can
+never orphan them. Concepts missing from the files are left untouched.
+
+Athena dates (YYYYMMDD) are converted to ISO dates; empty optional fields
+become NULL. Files may be gzip-compressed (``CONCEPT.csv.gz``).
+
+Usage
+-----
+  # Load every vocabulary file found in the Athena download directory
+  python manage.py load_omop_vocabulary /data/athena
+
+  # Only concepts, keeping the staging tables for inspection
+  python manage.py load_omop_vocabulary /data/athena --tables CONCEPT --keep-staging
+
+  # Small incremental load: keep indexes in place instead of rebuilding them
+  python manage.py load_omop_vocabulary /data/athena --keep-indexes
+"""
+
+import csv
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import UniqueConstraint
+from django.db.models.fields import AutoFieldMixin
+
+from omop_core.bulk_load import BATCH_SIZE, load_fields, load_rows
+from omop_core.concept_sets import clear_concept_set_cache
+from omop_core.fhir_ndjson import open_text
+from omop_core.management.base import BatchCommand
+from omop_core.source_concepts import clear_source_concept_cache
+from omop_core.models import (
+    Concept, ConceptAncestor, ConceptClass, ConceptRelationship, Domain, SourceToConceptMap,
+    Vocabulary,
+)
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# Athena file stem → model, in foreign-key order
+VOCABULARY_TABLES = {
+    'DOMAIN': Domain,
+    'VOCABULARY': Vocabulary,
+    'CONCEPT_CLASS': ConceptClass,
+    'CONCEPT': Concept,
+    'CONCEPT_RELATIONSHIP': ConceptRelationship,
+    'CONCEPT_ANCESTOR': ConceptAncestor,
+    'SOURCE_TO_CONCEPT_MAP': SourceToConceptMap,
+}
+
+STAGE_SUFFIX = '_stage'
+
+# Concept names and synonyms can be long; Athena rows are never quoted
+csv.field_size_limit(sys.maxsize)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _find_file(directory: Path, stem: str) -> Path | None:
+    for name in (f'{stem}.csv', f'{stem}.csv.gz', f'{stem.lower()}.csv', f'{stem.lower()}.csv.gz'):
+        path = directory / name
+        if path.exists():
+            return path
+    return None
+
+
+def _athena_date(value: str) -> str | None:
+    """20240131 → 2024-01-31 (ISO input is passed through)."""
+    if not value:
+        return None
+    if len(value) == 8 and value.isdigit():
+        return f'{value[:4]}-{value[4:6]}-{value[6:]}'
+    return value
+
+
+def _column_parsers(model):
+    """db column → parser for the raw TSV string."""
+    parsers = {}
+    for field in load_fields(model):
+        internal = (field.target_field if field.is_relation else field).get_internal_type()
+        if internal == 'DateField':
+            parsers[field.column] = _athena_date
+        elif internal in ('IntegerField', 'BigIntegerField', 'SmallIntegerField'):
+            parsers[field.column] = lambda v: int(v) if v else None
+        elif field.null:
+            parsers[field.column] = lambda v: v or None
+        else:
+            parsers[field.column] = lambda v: v
+    return parsers
+
+
+def _read_tsv(path: Path, model):
+    """Return (columns, row iterator) for an Athena TSV, checking the header first."""
+    parsers = _column_parsers(model)
+    fh = open_text(path, 'rt', compress=path.suffix == '.gz')
+    reader = csv.reader(fh, delimiter='\t', quoting=csv.QUOTE_NONE)
+    header = [column.strip().lower() for column in next(reader)]
+    unknown = [column for column in header if column not in parsers]
+    missing = [column for column in parsers if column not in header]
+    if unknown or missing:
+        fh.close()
+        problems = []
+        if unknown:
+            problems.append(f'unexpected columns {unknown}')
+        if missing:
+            problems.append(f'missing columns {missing}')
+        raise CommandError(f'{path.name}: ' + '; '.join(problems))
+    row_parsers = [parsers[column] for column in header]
+
+    def rows():
+        with fh:
+            for raw in reader:
+                if raw:
+                    yield tuple(parse(value) for parse, value in zip(row_parsers, raw))
+
+    return header, rows()
+
+
+def secondary_indexes(cursor, connection, table):
+    """(name, CREATE statement) for the table's plain indexes — not PK/unique constraints."""
+    if connection.vendor == 'postgresql':
+        cursor.execute(
+            """
+            SELECT i.indexname, i.indexdef FROM pg_indexes i
+            WHERE i.schemaname = current_schema() AND i.tablename = %s
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+            """,
+            [table],
+        )
+    elif connection.vendor == 'sqlite':
+        # Automatic (constraint) indexes have no SQL; unique ones back ON CONFLICT
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s "
+            "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%%'",
+            [table],
+        )
+    else:
+        return []
+    return cursor.fetchall()
+
+
+def _conflict_columns(model):
+    """The natural key: the primary key, or the unique constraint behind a surrogate id."""
+    if not isinstance(model._meta.pk, AutoFieldMixin):
+        return [model._meta.pk.column]
+    unique = next(c for c in model._meta.constraints if isinstance(c, UniqueConstraint))
+    return [model._meta.get_field(name).column for name in unique.fields]
+
+
+def _merge_sql(connection, model, stage, columns):
+    qn = connection.ops.quote_name
+    key_columns = _conflict_columns(model)
+    column_sql = ', '.join(qn(c) for c in columns)
+    updates = ', '.join(f'{qn(c)} = excluded.{qn(c)}' for c in columns if c not in key_columns)
+    # "WHERE 1=1" keeps SQLite from reading ON CONFLICT as a join clause
+    return (
+        f'INSERT INTO {qn(model._meta.db_table)} ({column_sql}) '
+        f'SELECT {column_sql} FROM {qn(stage)} WHERE 1=1 '
+        f'ON CONFLICT ({", ".join(qn(c) for c in key_columns)}) DO UPDATE SET {updates}'
+    )
+
+
+# ---------------------------------------------------------------------------
+# Command
+# ---------------------------------------------------------------------------
+
+class Command(BatchCommand):
+    help = 'Load Athena OMOP vocabulary files via staging tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('vocabulary_dir', help='Directory with the Athena *.csv files')
+        parser.add_argument(
+            '--tables', nargs='+', choices=list(VOCABULARY_TABLES), default=list(VOCABULARY_TABLES),
+            help='Athena files to load (default: all that are present)',
+        )
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help="Don't drop and rebuild secondary indexes around the merge",
+        )
+        parser.add_argument(
+            '--keep-staging', action='store_true',
+            help='Leave the <table>_stage tables in place after the merge',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help=f'Rows per executemany batch when COPY is unavailable (default: {BATCH_SIZE})',
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        directory = Path(options['vocabulary_dir'])
+        if not directory.is_dir():
+            raise CommandError(f'Not a directory: {directory}')
+        using = options['database']
+        connection = connections[using]
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f'Unsupported database backend: {connection.vendor}')
+
+        tables = []
+        for stem, model in VOCABULARY_TABLES.items():
+            if stem not in options['tables']:
+                continue
+            path = _find_file(directory, stem)
+            if path is None:
+                self.stdout.write(self.style.WARNING(f'{stem}: no file found, skipping'))
+                continue
+            tables.append((stem, model, path))
+        if not tables:
+            raise CommandError(f'No Athena vocabulary files found in {directory}')
+
+        started = time.perf_counter()
+        staged = []
+        try:
+            # 1. Stream every file into its staging table
+            for stem, model, path in tables:
+                stage = model._meta.db_table + STAGE_SUFFIX
+                columns, rows = _read_tsv(path, model)
+                self._create_stage(connection, model, stage)
+                t0 = time.perf_counter()
+                count = load_rows(stage, columns, rows, using=using, batch_size=options['batch_size'])
+                elapsed = time.perf_counter() - t0
+                staged.append((model, stage, columns, count))
+                self.stdout.write(
+                    f'  {path.name}: {count:,} row(s) staged '
+                    f'({count / elapsed if elapsed else 0:,.0f} rows/s)'
+                )
+
+            # 2. Merge into the live tables, rebuilding their indexes once
+            t0 = time.perf_counter()
+            with transaction.atomic(using=using), connection.cursor() as cursor:
+                for model, stage, columns, count in staged:
+                    table = model._meta.db_table
+                    indexes = [] if options['keep_indexes'] else secondary_indexes(cursor, connection, table)
+                    for name, _ in indexes:
+                        cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+                    cursor.execute(_merge_sql(connection, model, stage, columns))
+                    for _, definition in indexes:
+                        cursor.execute(definition)
+                    self.stdout.write(
+                        f'  {table}: merged {count:,} row(s), rebuilt {len(indexes)} index(es)'
+                    )
+            self.stdout.write(f'  merge took {time.perf_counter() - t0:.1f}s')
+        finally:
+            if not options['keep_staging']:
+                self._drop_stages(connection, [stage for _, stage, _, _ in staged])
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model, _, _, _ in staged:
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+        clear_concept_set_cache()
+        clear_source_concept_cache()
+
+        total = sum(count for _, _, _, count in staged)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {total:,} vocabulary row(s) in {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else 0:,.0f} rows/s)'
+        ))
+
+    # ------------------------------------------------------------------
+    # Staging tables
+    # ------------------------------------------------------------------
+
+    def _create_stage(self, connection, model, stage):
+        qn = connection.ops.quote_name
+        unlogged = 'UNLOGGED ' if connection.vendor == 'postgresql' else ''
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {qn(stage)}')
+            # Same columns as the live table, no constraints or indexes
+            cursor.execute(
+                f'CREATE {unlogged}TABLE {qn(stage)} AS '
+                f'SELECT * FROM {qn(model._meta.db_table)} WHERE 1=0'
+            )
+
+    def _drop_stages(self, connection, stages):
+        with connection.cursor() as cursor:
+            for stage in stages:
+                cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(stage)}')
@@ -8,25 +8,170 @@ Usage:
     python manage.py populate_patient_info
     python manage.py populate_patient_info --person-id 4001
     python manage.py populate_patient_info --force-update --verbose
+
+    # Per-extractor wall time, query count and rows fetched, with histograms,
+    # the slowest extractors/patients and (optionally) a cProfile dump
+    python manage.py populate_patient_info --force-update --profile
+    python manage.py populate_patient_info --force-update --profile --profile-top 20 \
+        --profile-output populate.pstats      # then: python -m pstats populate.pstats
 """
 
-from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.db import transaction
+from django.db import connections, transaction
+from django.db.models.signals import post_init
+from contextlib import ExitStack
 from decimal import Decimal
+from functools import cached_property
 from datetime import date, datetime, timedelta
+import cProfile
 import json
-from omop_core.models import (
-    Person, PatientInfo, ConditionOccurrence, Concept,
-    Measurement, Observation, DrugExposure, Location
-)
+import time
+from omop_core.management.base import BatchCommand
+from omop_core.models import Person, PatientInfo, Location
+from omop_core.concept_sets import concept_ids_for_codes, descendants
+from omop_core.person_events import PersonEvents
+from omop_core.instrumentation import percentile
 # Extension models have been removed for OMOP compliance
 # All data is now extracted from standard OMOP tables
 
+# Width of the --profile histogram bars
+HISTOGRAM_WIDTH = 40
+HISTOGRAM_BINS = 10
+
+
+class ExtractorProfile:
+    """
+    Wall time, SQL queries and rows fetched per extractor call (--profile).
+
+    Queries are counted with an execute_wrapper on every connection, rows as
+    model instances loaded (post_init), so ``.values()`` results are not
+    included. Timings include the profiler's own small overhead.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        # extractor -> [(seconds, queries, rows), ...]
+        self.calls: dict[str, list[tuple[float, int, int]]] = {}
+        # person_id -> {'seconds', 'queries', 'rows', 'extractors': {name: seconds}}
+        self.patients: dict[int, dict] = {}
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._count_query))
+        post_init.connect(self._count_row, dispatch_uid='populate_patient_info_profile')
+        self._stack.callback(post_init.disconnect, dispatch_uid='populate_patient_info_profile')
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        return False
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def _count_row(self, **kwargs):
+        self.rows += 1
+
+    def call(self, person_id, name, func, *args):
+        """Run ``func(*args)`` and record it as one call of extractor ``name`` for ``person_id``."""
+        queries, rows = self.queries, self.rows
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            seconds = time.perf_counter() - started
+            queries, rows = self.queries - queries, self.rows - rows
+            self.calls.setdefault(name, []).append((seconds, queries, rows))
+            patient = self.patients.setdefault(
+                person_id, {'seconds': 0.0, 'queries': 0, 'rows': 0, 'extractors': {}}
+            )
+            patient['seconds'] += seconds
+            patient['queries'] += queries
+            patient['rows'] += rows
+            patient['extractors'][name] = patient['extractors'].get(name, 0.0) + seconds
+
+    def report(self, top=10) -> list[str]:
+        """Extractor table (slowest first), per-patient histograms and the slowest patients."""
+        if not self.patients:
+            return ['No patients profiled.']
+        patients = len(self.patients)
+        grand_total = sum(p['seconds'] for p in self.patients.values()) or 1.0
+        lines = [
+            f'Extractor profile ({patients:,} patient(s), {grand_total:,.2f} s in extractors)',
+            f'  {"extractor":<26} {"total s":>9} {"share":>7} {"mean ms":>9} {"p95 ms":>9} '
+            f'{"queries/pt":>11} {"rows/pt":>9}',
+        ]
+        ranked = sorted(self.calls.items(), key=lambda item: sum(c[0] for c in item[1]), reverse=True)
+        for name, calls in ranked:
+            total = sum(c[0] for c in calls)
+            lines.append(
+                f'  {name:<26} {total:>9,.2f} {total / grand_total:>7.1%} '
+                f'{total / len(calls) * 1000:>9,.2f} {percentile([c[0] for c in calls], 95) * 1000:>9,.2f} '
+                f'{sum(c[1] for c in calls) / patients:>11,.1f} {sum(c[2] for c in calls) / patients:>9,.1f}'
+            )
 
-class Command(BaseCommand):
+        lines += ['', 'Time per patient (ms)']
+        lines += _histogram([p['seconds'] * 1000 for p in self.patients.values()])
+        lines += ['', 'Queries per patient']
+        lines += _histogram([p['queries'] for p in self.patients.values()])
+
+        lines += ['', f'Slowest {min(top, patients)} patient(s)']
+        slowest = sorted(self.patients.items(), key=lambda item: item[1]['seconds'], reverse=True)[:top]
+        for person_id, p in slowest:
+            name, seconds = max(p['extractors'].items(), key=lambda item: item[1])
+            lines.append(
+                f'  person {person_id}: {p["seconds"] * 1000:,.1f} ms, {p["queries"]:,} queries, '
+                f'{p["rows"]:,} rows — mostly {name} ({seconds * 1000:,.1f} ms)'
+            )
+        return lines
+
+
+def _histogram(values, bins=HISTOGRAM_BINS, width=HISTOGRAM_WIDTH) -> list[str]:
+    """Text histogram of ``values`` in ``bins`` equal-width buckets."""
+    low, high = min(values), max(values)
+    if low == high:
+        return [f'  {low:>10,.1f}            {"█" * width} {len(values):,}']
+    step = (high - low) / bins
+    counts = [0] * bins
+    for value in values:
+        counts[min(int((value - low) / step), bins - 1)] += 1
+    peak = max(counts)
+    return [
+        f'  {low + i * step:>10,.1f} – {low + (i + 1) * step:>10,.1f} '
+        f'{"█" * round(count / peak * width):<{width}} {count:,}'
+        for i, count in enumerate(counts)
+    ]
+
+
+class Command(BatchCommand):
     help = 'Populate PatientInfo from OMOP and extension models for all persons'
 
+    # Extractors run by process_person, in order; each takes (person, events) and
+    # returns {PatientInfo field: value}
+    EXTRACTORS = (
+        'get_demographics',
+        'get_location_data',
+        'get_disease_data',
+        'get_treatment_data',
+        'get_vitals_data',
+        'get_biomarker_data',
+        'get_social_data',
+        'get_behavior_data',
+        'get_infection_data',
+        'get_assessment_data',
+        'get_laboratory_data',
+        'get_performance_data',
+        'get_genetic_mutations',
+        'get_cll_data',
+        'get_lymphoma_data',
+    )
+
+    profile = None
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--person-id',
@@ -43,6 +188,21 @@ class Command(BaseCommand):
             action='store_true',
             help='Show detailed processing information',
         )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='Record wall time, queries and rows fetched per extractor and patient, and print a report',
+        )
+        parser.add_argument(
+            '--profile-top',
+            type=int,
+            default=10,
+            help='Slowest patients listed in the --profile report (default: 10)',
+        )
+        parser.add_argument(
+            '--profile-output',
+            help='With --profile, also write cProfile statistics (pstats format) to this file',
+        )
 
     def handle(self, *args, **options):
         person_id = options.get('person_id')
@@ -50,23 +210,53 @@ class Command(BaseCommand):
         verbose = options.get('verbose')
 
         if person_id:
-            persons = Person.objects.filter(person_id=person_id)
+            persons = Person.objects.filter(person_id=person_id).select_related('gender_concept', 'race_concept')
             if not persons.exists():
                 self.stdout.write(
                     self.style.ERROR(f'Person with ID {person_id} not found')
                 )
                 return
         else:
-            persons = Person.objects.all()
+            persons = Person.objects.select_related('gender_concept', 'race_concept')
 
         total_persons = persons.count()
+        self.stdout.write(f'Processing {total_persons} person(s)...')
+
+        self.profile = None
+        with ExitStack() as stack:
+            if options.get('profile'):
+                self.profile = stack.enter_context(ExtractorProfile())
+                if options.get('profile_output'):
+                    profiler = cProfile.Profile()
+                    stack.callback(profiler.dump_stats, options['profile_output'])
+                    stack.enter_context(profiler)
+            counts = self.process_persons(persons, force_update, verbose)
+        processed_count, created_count, updated_count, skipped_count = counts
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Processing complete:\n'
+                f'  Total processed: {processed_count}\n'
+                f'  Created: {created_count}\n'
+                f'  Updated: {updated_count}\n'
+                f'  Skipped: {skipped_count}'
+            )
+        )
+
+        if self.profile:
+            self.stdout.write('')
+            for line in self.profile.report(top=options.get('profile_top', 10)):
+                self.stdout.write(line)
+            if options.get('profile_output'):
+                self.stdout.write(f'cProfile statistics written to {options["profile_output"]}')
+
+    def process_persons(self, persons, force_update, verbose):
+        """Process each person in its own transaction; returns (processed, created, updated, skipped)."""
         processed_count = 0
         created_count = 0
         updated_count = 0
         skipped_count = 0
 
-        self.stdout.write(f'Processing {total_persons} person(s)...')
-
         for person in persons:
             try:
                 with transaction.atomic():
@@ -88,15 +278,7 @@ class Command(BaseCommand):
                     self.style.ERROR(f'Error processing Person {person.person_id}: {str(e)}')
                 )
 
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Processing complete:\n'
-                f'  Total processed: {processed_count}\n'
-                f'  Created: {created_count}\n'
-                f'  Updated: {updated_count}\n'
-                f'  Skipped: {skipped_count}'
-            )
-        )
+        return processed_count, created_count, updated_count, skipped_count
 
     def process_person(self, person, force_update, verbose):
         """Process a single person and populate their PatientInfo"""
@@ -111,93 +293,32 @@ class Command(BaseCommand):
             patient_info = PatientInfo(person=person)
             action = 'created'
 
-        # Populate demographics from Person
-        demographics = self.get_demographics(person)
-        for field, value in demographics.items():
-            setattr(patient_info, field, value)
-
-        # Populate location data
-        location_data = self.get_location_data(person)
-        for field, value in location_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate disease information
-        disease_data = self.get_disease_data(person)
-        for field, value in disease_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate treatment information
-        treatment_data = self.get_treatment_data(person)
-        for field, value in treatment_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate vital signs and measurements
-        vitals_data = self.get_vitals_data(person)
-        for field, value in vitals_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate biomarkers
-        biomarker_data = self.get_biomarker_data(person)
-        for field, value in biomarker_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate social determinants
-        social_data = self.get_social_data(person)
-        for field, value in social_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate health behaviors
-        behavior_data = self.get_behavior_data(person)
-        for field, value in behavior_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate infection status
-        infection_data = self.get_infection_data(person)
-        for field, value in infection_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate tumor assessments
-        assessment_data = self.get_assessment_data(person)
-        for field, value in assessment_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate laboratory results
-        lab_data = self.get_laboratory_data(person)
-        for field, value in lab_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate performance status
-        performance_data = self.get_performance_data(person)
-        for field, value in performance_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate genetic mutations
-        genetic_data = self.get_genetic_mutations(person)
-        for field, value in genetic_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate CLL-specific data
-        cll_data = self.get_cll_data(person)
-        for field, value in cll_data.items():
-            setattr(patient_info, field, value)
-
-        # Populate lymphoma-specific data
-        lymphoma_data = self.get_lymphoma_data(person)
-        for field, value in lymphoma_data.items():
-            setattr(patient_info, field, value)
+        # Each event table is read once, with concepts joined, and shared by the extractors
+        events = self._run_step(person, 'load_events', PersonEvents(person).load)
+
+        for name in self.EXTRACTORS:
+            data = self._run_step(person, name, getattr(self, name), person, events)
+            for field, value in data.items():
+                setattr(patient_info, field, value)
 
         # Compute derived fields that depend on other fields being set first
-        self._compute_derived_fields(patient_info)
+        self._run_step(person, 'compute_derived_fields', self._compute_derived_fields, patient_info)
 
         # Save the PatientInfo
-        patient_info.save()
+        self._run_step(person, 'save', patient_info.save)
 
         return action
 
-    def get_demographics(self, person):
+    def _run_step(self, person, name, func, *args):
+        """Call ``func(*args)``, recorded as step ``name`` of ``person`` when --profile is on."""
+        if self.profile is None:
+            return func(*args)
+        return self.profile.call(person.person_id, name, func, *args)
+
+    def get_demographics(self, person, events=None):
         """Extract demographic information from Person model"""
         data = {}
-        
+
         # Age calculation from year_of_birth
         if person.year_of_birth:
             today = date.today()
@@ -219,8 +340,8 @@ class Command(BaseCommand):
             data['ethnicity'] = person.race_concept.concept_name
 
         # Language support (from PersonLanguageSkill relation)
-        lang_skills = person.language_skills.select_related('language_concept').all()
-        if lang_skills.exists():
+        lang_skills = list(person.language_skills.select_related('language_concept'))
+        if lang_skills:
             parts = [
                 f'{ls.language_concept.concept_name}: {ls.skill_level}'
                 for ls in lang_skills
@@ -229,10 +350,10 @@ class Command(BaseCommand):
 
         return data
 
-    def get_location_data(self, person):
+    def get_location_data(self, person, events=None):
         """Extract location information"""
         data = {}
-        
+
         if person.location_id:
             try:
                 location = Location.objects.get(location_id=person.location_id)
@@ -249,15 +370,16 @@ class Command(BaseCommand):
 
         return data
 
-    def get_disease_data(self, person):
+    def get_disease_data(self, person, events=None):
         """Extract disease information from ConditionOccurrence"""
         data = {}
-        
+        events = events or PersonEvents(person)
+
         # Get primary cancer diagnosis (most recent)
-        cancer_condition = ConditionOccurrence.objects.filter(
-            person=person,
-            condition_concept__concept_name__icontains='cancer'
-        ).order_by('-condition_start_date').first()
+        cancer_condition = next(
+            (c for c in events.conditions if 'cancer' in c.condition_concept.concept_name.lower()),
+            None,
+        )
 
         if cancer_condition:
             data['disease'] = cancer_condition.condition_concept.concept_name
@@ -266,27 +388,28 @@ class Command(BaseCommand):
 
         return data
 
-    def get_treatment_data(self, person):
+    def get_treatment_data(self, person, events=None):
         """Extract treatment information from DrugExposure table"""
         data = {}
-        
-        # Get drug exposures ordered by start date
-        drug_exposures = DrugExposure.objects.filter(person=person).order_by('-drug_exposure_start_date')
-        
-        if drug_exposures.exists():
-            # Get recent treatments 
+        events = events or PersonEvents(person)
+
+        # Drug exposures, most recent first
+        drug_exposures = events.drug_exposures
+
+        if drug_exposures:
+            # Get recent treatments
             recent_drugs = drug_exposures[:10]  # Last 10 drug exposures
-            
+
             # Extract therapy line information from drug exposure patterns
             unique_dates = set(drug.drug_exposure_start_date for drug in drug_exposures)
             data['therapy_lines_count'] = len(unique_dates)
-            
+
             # Current medications from recent drug exposures
             current_meds = []
             for drug in recent_drugs[:5]:  # Top 5 recent drugs
                 if drug.drug_concept:
                     current_meds.append(drug.drug_concept.concept_name)
-            
+
             if current_meds:
                 data['concomitant_medications'] = ', '.join(current_meds)
 
@@ -341,226 +464,142 @@ class Command(BaseCommand):
 
         return data
 
-        if drug_exposures.exists():
-            # Get recent treatments 
-            recent_drugs = drug_exposures[:10]  # Last 10 drug exposures
-            
-            # Extract therapy line information from drug exposure patterns
-            unique_dates = set(drug.drug_exposure_start_date for drug in drug_exposures)
-            data['therapy_lines_count'] = len(unique_dates)
-            
-            # Current medications from recent drug exposures
-            current_meds = []
-            for drug in recent_drugs[:5]:  # Top 5 recent drugs
-                if drug.drug_concept:
-                    current_meds.append(drug.drug_concept.concept_name)
-            
-            if current_meds:
-                data['concomitant_medications'] = ', '.join(current_meds)
-
-            # Treatment history from drug exposures
-            therapy_details = []
-            for drug in drug_exposures:
-                drug_info = {
-                    'drug': drug.drug_concept.concept_name if drug.drug_concept else 'Unknown',
-                    'start_date': str(drug.drug_exposure_start_date),
-                    'end_date': str(drug.drug_exposure_end_date) if drug.drug_exposure_end_date else None,
-                }
-                therapy_details.append(drug_info)
-
-            # Extract first, second, and later line information from drug patterns
-            if len(therapy_details) >= 1:
-                first_drug = therapy_details[0]
-                data['first_line_therapy'] = first_drug['drug']
-                data['first_line_date'] = first_drug['start_date']
-
-            if len(therapy_details) >= 2:
-                second_drug = therapy_details[1]
-                data['second_line_therapy'] = second_drug['drug']
-                data['second_line_date'] = second_drug['start_date']
-
-            if len(therapy_details) > 2:
-                later_drugs = therapy_details[2:]
-                data['later_therapy'] = '; '.join([drug['drug'] for drug in later_drugs[:3]])
-                data['later_date'] = later_drugs[0]['start_date']
-
-            # Treatment types based on drug concepts
-            drug_names = [drug.drug_concept.concept_name.lower() if drug.drug_concept else '' 
-                         for drug in drug_exposures]
-            
-            # Look for platinum-based drugs
-            platinum_terms = ['platinum', 'carboplatin', 'cisplatin', 'oxaliplatin']
-            if any(any(term in name for term in platinum_terms) for name in drug_names):
-                data['prior_therapy'] = 'Platinum-based chemotherapy'
-                
-            # Look for immunotherapy
-            immuno_terms = ['pembrolizumab', 'nivolumab', 'atezolizumab', 'durvalumab']
-            if any(any(term in name for term in immuno_terms) for name in drug_names):
-                existing_therapy = data.get('prior_therapy', '')
-                data['prior_therapy'] = (existing_therapy + '; Immunotherapy').strip('; ')
-
-        return data
-
-    def get_vitals_data(self, person):
+    # LOINC concepts for vital signs
+    VITAL_SIGN_CODES = {
+        'systolic_bp': '8480-6',     # Systolic blood pressure
+        'diastolic_bp': '8462-4',    # Diastolic blood pressure
+        'heart_rate': '8867-4',      # Heart rate
+        'weight': '29463-7',         # Body weight
+        'height': '8302-2',          # Body height
+        'temperature': '8310-5',     # Body temperature
+    }
+
+    @cached_property
+    def vital_sign_concepts(self):
+        """Vital type -> concept ids (LOINC code expanded to its descendants), resolved once per run."""
+        concepts = {}
+        for vital_type, loinc_code in self.VITAL_SIGN_CODES.items():
+            concept_ids = concept_ids_for_codes('LOINC', [loinc_code])
+            if concept_ids:
+                concepts[vital_type] = descendants(concept_ids)
+        return concepts
+
+    def get_vitals_data(self, person, events=None):
         """Extract vital signs data from standard OMOP Measurement table"""
         data = {}
-        
-        # Define LOINC concepts for vital signs
-        vital_sign_concepts = {
-            'systolic_bp': '8480-6',     # Systolic blood pressure
-            'diastolic_bp': '8462-4',    # Diastolic blood pressure
-            'heart_rate': '8867-4',      # Heart rate
-            'weight': '29463-7',         # Body weight
-            'height': '8302-2',          # Body height
-            'temperature': '8310-5',     # Body temperature
-        }
-        
-        # Get recent measurements for each vital sign type
-        for vital_type, loinc_code in vital_sign_concepts.items():
-            try:
-                # Find concept by LOINC code
-                concept = Concept.objects.filter(
-                    concept_code=loinc_code,
-                    vocabulary__vocabulary_id='LOINC'
-                ).first()
-                
-                if concept:
-                    # Get most recent measurement
-                    measurement = Measurement.objects.filter(
-                        person=person,
-                        measurement_concept=concept,
-                        value_as_number__isnull=False
-                    ).order_by('-measurement_date').first()
-                    
-                    if measurement:
-                        value = float(measurement.value_as_number)
-                        
-                        # Store values with appropriate field names
-                        if vital_type == 'systolic_bp':
-                            data['systolic_blood_pressure'] = int(value)
-                        elif vital_type == 'diastolic_bp':
-                            data['diastolic_blood_pressure'] = int(value)
-                        elif vital_type == 'heart_rate':
-                            data['heartrate'] = int(value)
-                        elif vital_type == 'weight':
-                            # Convert to kg if needed based on unit
-                            data['weight'] = value
-                            data['weight_units'] = 'kg'  # Assuming kg, could check unit_concept
-                        elif vital_type == 'height':
-                            # Convert to cm if needed based on unit
-                            data['height'] = value
-                            data['height_units'] = 'cm'  # Assuming cm, could check unit_concept
-                        elif vital_type == 'temperature':
-                            data['temperature'] = value
-                            
-            except Exception as e:
-                # Skip if concept not found or other error
+        events = events or PersonEvents(person)
+
+        # Get the most recent measurement for each vital sign type
+        for vital_type, concept_ids in self.vital_sign_concepts.items():
+            matches = events.measurements_in(concept_ids, numeric=True)
+            if not matches:
                 continue
+            value = float(matches[0].value_as_number)
+
+            # Store values with appropriate field names
+            if vital_type == 'systolic_bp':
+                data['systolic_blood_pressure'] = int(value)
+            elif vital_type == 'diastolic_bp':
+                data['diastolic_blood_pressure'] = int(value)
+            elif vital_type == 'heart_rate':
+                data['heartrate'] = int(value)
+            elif vital_type == 'weight':
+                # Convert to kg if needed based on unit
+                data['weight'] = value
+                data['weight_units'] = 'kg'  # Assuming kg, could check unit_concept
+            elif vital_type == 'height':
+                # Convert to cm if needed based on unit
+                data['height'] = value
+                data['height_units'] = 'cm'  # Assuming cm, could check unit_concept
+            elif vital_type == 'temperature':
+                data['temperature'] = value
 
         return data
 
-    def get_biomarker_data(self, person):
+    @staticmethod
+    def _receptor_status(measurement):
+        """'POSITIVE' / 'NEGATIVE' from a measurement's value_as_concept name, else None."""
+        if measurement is None or measurement.value_as_concept is None:
+            return None
+        name = measurement.value_as_concept.concept_name.lower()
+        if 'positive' in name:
+            return 'POSITIVE'
+        if 'negative' in name:
+            return 'NEGATIVE'
+        return None
+
+    def get_biomarker_data(self, person, events=None):
         """Extract biomarker information from Measurement table using LOINC concepts"""
         data = {}
-        
-        # Get measurements for this person
-        measurements = Measurement.objects.filter(person=person).order_by('-measurement_date')
-        
+        events = events or PersonEvents(person)
+
         # PD-L1 measurements (LOINC concept for PD-L1 expression)
         # Using example LOINC codes - these would need to be mapped to actual concepts
-        pdl1_measurements = measurements.filter(measurement_concept__concept_code__in=[
+        pdl1_test = events.latest_measurement([
             '85337-4',  # PD-L1 expression example LOINC
         ])
-        if pdl1_measurements.exists():
-            pdl1_test = pdl1_measurements.first()
+        if pdl1_test:
             data['pd_l1_tumor_cels'] = int(pdl1_test.value_as_number) if pdl1_test.value_as_number else None
             data['pd_l1_assay'] = pdl1_test.value_source_value  # Assay method in source value
 
-        # Estrogen Receptor (ER) - LOINC 16112-5
-        er_measurements = measurements.filter(measurement_concept__concept_code='16112-5')
-        if er_measurements.exists():
-            er_test = er_measurements.first()
-            # Map value_as_concept to clinical significance
-            if er_test.value_as_concept_id:
-                concept = Concept.objects.get(pk=er_test.value_as_concept_id)
-                if 'positive' in concept.concept_name.lower():
-                    data['estrogen_receptor_status'] = 'POSITIVE'
-                elif 'negative' in concept.concept_name.lower():
-                    data['estrogen_receptor_status'] = 'NEGATIVE'
-
-        # Progesterone Receptor (PR) - LOINC 16113-3  
-        pr_measurements = measurements.filter(measurement_concept__concept_code='16113-3')
-        if pr_measurements.exists():
-            pr_test = pr_measurements.first()
-            if pr_test.value_as_concept_id:
-                concept = Concept.objects.get(pk=pr_test.value_as_concept_id)
-                if 'positive' in concept.concept_name.lower():
-                    data['progesterone_receptor_status'] = 'POSITIVE'
-                elif 'negative' in concept.concept_name.lower():
-                    data['progesterone_receptor_status'] = 'NEGATIVE'
-
-        # HER2 - LOINC 48676-1
-        her2_measurements = measurements.filter(measurement_concept__concept_code='48676-1')
-        if her2_measurements.exists():
-            her2_test = her2_measurements.first()
-            if her2_test.value_as_concept_id:
-                concept = Concept.objects.get(pk=her2_test.value_as_concept_id)
-                if 'positive' in concept.concept_name.lower():
-                    data['her2_status'] = 'POSITIVE'
-                elif 'negative' in concept.concept_name.lower():
-                    data['her2_status'] = 'NEGATIVE'
+        # Estrogen Receptor (ER) - LOINC 16112-5, Progesterone Receptor (PR) - LOINC 16113-3,
+        # HER2 - LOINC 48676-1; value_as_concept maps to clinical significance
+        for field, loinc_code in (
+            ('estrogen_receptor_status', '16112-5'),
+            ('progesterone_receptor_status', '16113-3'),
+            ('her2_status', '48676-1'),
+        ):
+            status = self._receptor_status(events.latest_measurement([loinc_code]))
+            if status:
+                data[field] = status
 
         # Triple negative status calculation
-        if ('estrogen_receptor_status' in data and 
-            'progesterone_receptor_status' in data and 
+        if ('estrogen_receptor_status' in data and
+            'progesterone_receptor_status' in data and
             'her2_status' in data):
-            is_tnbc = (data['estrogen_receptor_status'] == 'NEGATIVE' and 
-                      data['progesterone_receptor_status'] == 'NEGATIVE' and 
+            is_tnbc = (data['estrogen_receptor_status'] == 'NEGATIVE' and
+                      data['progesterone_receptor_status'] == 'NEGATIVE' and
                       data['her2_status'] == 'NEGATIVE')
             data['tnbc_status'] = is_tnbc
 
         return data
 
-    def get_social_data(self, person):
+    def get_social_data(self, person, events=None):
         """Extract social determinants from Observation table"""
         data = {}
-        
-        # Get observations for social determinants using SNOMED/LOINC concepts
-        observations = Observation.objects.filter(person=person)
-        
+        events = events or PersonEvents(person)
+
         # Employment status observations (example SNOMED concepts)
-        employment_obs = observations.filter(observation_concept__concept_code__in=[
+        employment_obs = events.latest_observation([
             '224362002',  # Employment status
             '160903007',  # Unemployed
         ])
-        if employment_obs.exists():
+        if employment_obs:
             # Map observation values to employment status
-            data['no_pre_existing_conditions'] = employment_obs.first().value_as_string
+            data['no_pre_existing_conditions'] = employment_obs.value_as_string
 
-        # Insurance status observations  
-        insurance_obs = observations.filter(observation_concept__concept_code__in=[
+        # Insurance status observations
+        insurance_obs = events.latest_observation([
             '408729009',  # Insurance status
         ])
-        if insurance_obs.exists():
-            data['concomitant_medication_details'] = insurance_obs.first().value_as_string
+        if insurance_obs:
+            data['concomitant_medication_details'] = insurance_obs.value_as_string
 
         return data
 
-    def get_behavior_data(self, person):
+    def get_behavior_data(self, person, events=None):
         """Extract health behaviors from Observation table"""
         data = {}
-        
-        # Get behavior observations using SNOMED concepts
-        observations = Observation.objects.filter(person=person)
-        
-        # Tobacco use observations (SNOMED concepts)
-        tobacco_obs = observations.filter(observation_concept__concept_code__in=[
+        events = events or PersonEvents(person)
+
+        # Tobacco use observations (SNOMED concepts), oldest first so the latest wins
+        tobacco_obs = events.observations_with_codes([
             '266919005',  # Never smoked tobacco
             '8517006',    # Former smoker
             '77176002',   # Smoker
         ])
-        
-        for obs in tobacco_obs:
+
+        for obs in reversed(tobacco_obs):
             if obs.observation_concept.concept_code == '266919005':  # Never smoked
                 data['no_tobacco_use_status'] = True
                 data['tobacco_use_details'] = 'Never smoker'
@@ -573,110 +612,74 @@ class Command(BaseCommand):
 
         return data
 
-    def get_infection_data(self, person):
+    def get_infection_data(self, person, events=None):
         """Extract infection status from Measurement and Observation tables"""
         data = {}
-        
-        # Get measurements and observations for infectious diseases
-        measurements = Measurement.objects.filter(person=person)
-        observations = Observation.objects.filter(person=person)
-        
-        # HIV status (LOINC concepts for HIV tests)
-        hiv_measurements = measurements.filter(measurement_concept__concept_code__in=[
-            '5221-7',   # HIV 1 Ab
-            '7917-8',   # HIV 1+2 Ab
-        ])
-        for measurement in hiv_measurements:
-            if measurement.value_as_concept_id:
-                concept = Concept.objects.get(pk=measurement.value_as_concept_id)
-                if 'negative' in concept.concept_name.lower():
-                    data['no_hiv_status'] = True
-                    data['hiv_status'] = False
-                elif 'positive' in concept.concept_name.lower():
-                    data['no_hiv_status'] = False
-                    data['hiv_status'] = True
-
-        # Hepatitis B (LOINC concepts)
-        hepb_measurements = measurements.filter(measurement_concept__concept_code__in=[
-            '5195-3',   # Hepatitis B surface antigen
-        ])
-        for measurement in hepb_measurements:
-            if measurement.value_as_concept_id:
-                concept = Concept.objects.get(pk=measurement.value_as_concept_id)
-                if 'negative' in concept.concept_name.lower():
-                    data['no_hepatitis_b_status'] = True
-                    data['hepatitis_b_status'] = False
-                elif 'positive' in concept.concept_name.lower():
-                    data['no_hepatitis_b_status'] = False
-                    data['hepatitis_b_status'] = True
-
-        # Hepatitis C (LOINC concepts)
-        hepc_measurements = measurements.filter(measurement_concept__concept_code__in=[
-            '5196-1',   # Hepatitis C Ab
-        ])
-        for measurement in hepc_measurements:
-            if measurement.value_as_concept_id:
-                concept = Concept.objects.get(pk=measurement.value_as_concept_id)
-                if 'negative' in concept.concept_name.lower():
-                    data['no_hepatitis_c_status'] = True
-                    data['hepatitis_c_status'] = False
-                elif 'positive' in concept.concept_name.lower():
-                    data['no_hepatitis_c_status'] = False
-                    data['hepatitis_c_status'] = True
+        events = events or PersonEvents(person)
+
+        # HIV 1 Ab / HIV 1+2 Ab, Hepatitis B surface antigen, Hepatitis C Ab (LOINC);
+        # tests are read oldest first so the latest result wins
+        infection_tests = (
+            ('hiv_status', ['5221-7', '7917-8']),
+            ('hepatitis_b_status', ['5195-3']),
+            ('hepatitis_c_status', ['5196-1']),
+        )
+        for field, loinc_codes in infection_tests:
+            for measurement in reversed(events.measurements_with_codes(loinc_codes)):
+                if measurement.value_as_concept is None:
+                    continue
+                concept_name = measurement.value_as_concept.concept_name.lower()
+                if 'negative' in concept_name:
+                    data[f'no_{field}'] = True
+                    data[field] = False
+                elif 'positive' in concept_name:
+                    data[f'no_{field}'] = False
+                    data[field] = True
 
         return data
 
-    def get_assessment_data(self, person):
+    def get_assessment_data(self, person, events=None):
         """Extract tumor assessment data from Observation table"""
         data = {}
-        
-        # Get tumor response assessments using SNOMED concepts
-        observations = Observation.objects.filter(person=person).order_by('-observation_date')
-        
+        events = events or PersonEvents(person)
+
         # Response to treatment observations (SNOMED concepts)
-        response_obs = observations.filter(observation_concept__concept_code__in=[
+        latest_response = events.latest_observation([
             '182840001',  # Complete response
             '182841002',  # Partial response
             '182843004',  # Stable disease
             '182842009',  # Progressive disease
         ])
-        
-        if response_obs.exists():
-            latest_response = response_obs.first()
-            
+
+        if latest_response:
             # Response mapping from SNOMED codes
             response_map = {
                 '182840001': 'Complete Response',
-                '182841002': 'Partial Response', 
+                '182841002': 'Partial Response',
                 '182843004': 'Stable Disease',
                 '182842009': 'Progressive Disease'
             }
-            
+
             concept_code = latest_response.observation_concept.concept_code
             if concept_code in response_map:
                 data['best_response'] = response_map[concept_code]
 
         # RECIST measurements from Measurement table
-        measurements = Measurement.objects.filter(person=person).order_by('-measurement_date')
-        
         # Target lesion sum measurements (example LOINC concept)
-        lesion_measurements = measurements.filter(measurement_concept__concept_code__in=[
+        latest_measurement = events.latest_measurement([
             '33747-0',  # Sum of target lesions example
         ])
-        
-        if lesion_measurements.exists():
-            latest_measurement = lesion_measurements.first()
-            if latest_measurement.value_as_number:
-                data['measurable_disease_by_recist_status'] = True
+
+        if latest_measurement and latest_measurement.value_as_number:
+            data['measurable_disease_by_recist_status'] = True
 
         return data
 
-    def get_laboratory_data(self, person):
+    def get_laboratory_data(self, person, events=None):
         """Extract laboratory test results from Measurement"""
         data = {}
-        
-        measurements = Measurement.objects.filter(person=person).order_by('-measurement_date')
-        
+        events = events or PersonEvents(person)
+
         # Common lab mappings
         lab_mappings = {
             'hemoglobin': ['hemoglobin_level', 'G/DL'],
@@ -686,10 +689,10 @@ class Command(BaseCommand):
             'bilirubin': ['serum_bilirubin_level_total', 'MG/DL'],
             'albumin': ['albumin_level', 'G/DL'],
         }
-        
-        for measurement in measurements:
+
+        for measurement in events.measurements:
             concept_name = measurement.measurement_concept.concept_name.lower()
-            
+
             for lab_key, (field_name, unit_field) in lab_mappings.items():
                 if lab_key in concept_name and measurement.value_as_number:
                     data[field_name] = measurement.value_as_number
@@ -700,15 +703,14 @@ class Command(BaseCommand):
 
         return data
 
-    def get_performance_data(self, person):
+    def get_performance_data(self, person, events=None):
         """Extract performance status from Observation"""
         data = {}
-        
-        observations = Observation.objects.filter(person=person).order_by('-observation_date')
-        
-        for obs in observations:
+        events = events or PersonEvents(person)
+
+        for obs in events.observations:
             concept_name = obs.observation_concept.concept_name.lower()
-            
+
             if 'ecog' in concept_name and obs.value_as_number is not None:
                 data['ecog_performance_status'] = int(obs.value_as_number)
                 break
@@ -718,70 +720,68 @@ class Command(BaseCommand):
 
         return data
 
-    def get_genetic_mutations(self, person):
+    def get_genetic_mutations(self, person, events=None):
         """Extract genetic mutations from standard OMOP Measurement table"""
         data = {}
-        
+        events = events or PersonEvents(person)
+
         # LOINC codes for genetic tests
         genetic_loinc_codes = {
             '21636-6': 'BRCA1',    # BRCA1 gene mutation
-            '21637-4': 'BRCA2',    # BRCA2 gene mutation  
+            '21637-4': 'BRCA2',    # BRCA2 gene mutation
             '21667-1': 'TP53',     # TP53 gene mutation
             '48013-7': 'KRAS',     # KRAS gene mutation
             '62862-8': 'EGFR',     # EGFR gene mutation
             '62318-1': 'PIK3CA',   # PIK3CA gene mutation
         }
-        
+
         # SNOMED codes for mutation origin
         origin_concepts = {
             255395001: 'germline',
             255461003: 'somatic'
         }
-        
+
         # SNOMED codes for clinical interpretation
         interpretation_concepts = {
             30166007: 'pathogenic',
-            10828004: 'benign', 
+            10828004: 'benign',
             42425007: 'vus'  # Variant of Unknown Significance - shortened
         }
-        
+
         mutations = []
-        
+
         # Get all genetic test measurements for this person
-        genetic_measurements = Measurement.objects.filter(
-            person=person,
-            measurement_concept__concept_code__in=genetic_loinc_codes.keys()
-        ).order_by('-measurement_date')
-        
+        genetic_measurements = events.measurements_with_codes(genetic_loinc_codes.keys())
+
         for measurement in genetic_measurements:
             # Skip if no result
             if not measurement.value_as_string:
                 continue
-                
+
             gene = genetic_loinc_codes.get(measurement.measurement_concept.concept_code)
             if not gene:
                 continue
-                
+
             mutation_data = {
                 'gene': gene.lower(),  # Lowercase gene name as requested
                 'variant': measurement.value_as_string,  # HGVS notation
                 'test_date': measurement.measurement_date.isoformat() if measurement.measurement_date else None,
             }
-            
+
             # Add origin (germline/somatic) from qualifier_concept_id
             if measurement.qualifier_concept and measurement.qualifier_concept.concept_id in origin_concepts:
                 mutation_data['origin'] = origin_concepts[measurement.qualifier_concept.concept_id]
-            
-            # Add clinical interpretation from value_as_concept_id  
+
+            # Add clinical interpretation from value_as_concept_id
             if measurement.value_as_concept and measurement.value_as_concept.concept_id in interpretation_concepts:
                 mutation_data['interpretation'] = interpretation_concepts[measurement.value_as_concept.concept_id]
-            
+
             # Add assay method if available in qualifier_source_value
             if measurement.qualifier_source_value:
                 mutation_data['assay_method'] = measurement.qualifier_source_value
-                
+
             mutations.append(mutation_data)
-        
+
         # Set the genetic_mutations field
         data['genetic_mutations'] = mutations
 
@@ -791,12 +791,12 @@ class Command(BaseCommand):
     # CLL-specific extraction
     # ------------------------------------------------------------------
 
-    def get_cll_data(self, person):
+    def get_cll_data(self, person, events=None):
         """Extract CLL-specific fields from OMOP Measurement/Observation/Condition tables."""
         data = {}
-        measurements = Measurement.objects.filter(person=person).order_by('-measurement_date')
-        observations = Observation.objects.filter(person=person).order_by('-observation_date')
-        conditions = ConditionOccurrence.objects.filter(person=person)
+        events = events or PersonEvents(person)
+        measurements = events.measurements
+        observations = events.observations
 
         # ------ Numeric measurements ------
         loinc_map = {
@@ -807,10 +807,7 @@ class Command(BaseCommand):
             '21889-1':  'largest_lymph_node_size',         # Lymph node greatest dimension
         }
         for loinc_code, field in loinc_map.items():
-            m = measurements.filter(
-                measurement_concept__concept_code=loinc_code,
-                value_as_number__isnull=False,
-            ).first()
+            m = events.latest_measurement([loinc_code], numeric=True)
             if m:
                 data[field] = float(m.value_as_number)
 
@@ -867,7 +864,7 @@ class Command(BaseCommand):
                 )
 
         # ------ ConditionOccurrence-based booleans ------
-        for cond in conditions:
+        for cond in events.conditions:
             cname = (cond.condition_concept.concept_name or '').lower() if cond.condition_concept else ''
             if 'richter' in cname:
                 data['richter_transformation'] = cond.condition_concept.concept_name
@@ -879,7 +876,7 @@ class Command(BaseCommand):
                 data['lymphadenopathy'] = True
 
         # ------ Drug-based refractoriness ------
-        drug_exposures = DrugExposure.objects.filter(person=person)
+        drug_exposures = events.drug_exposures
         btk_terms = ('ibrutinib', 'zanubrutinib', 'acalabrutinib', 'pirtobrutinib')
         bcl2_terms = ('venetoclax',)
 
@@ -893,9 +890,9 @@ class Command(BaseCommand):
         )
 
         # Refractory only if the drug was used AND the patient had documented progression
-        has_progression = observations.filter(
-            observation_concept__concept_code='182842009'  # Progressive disease SNOMED
-        ).exists()
+        has_progression = bool(events.observations_with_codes([
+            '182842009',  # Progressive disease SNOMED
+        ]))
 
         if had_btk:
             data['btk_inhibitor_refractory'] = has_progression
@@ -904,24 +901,15 @@ class Command(BaseCommand):
 
         # ------ Lymphocyte doubling time ------
         alc_loinc = '731-0'
-        alc_concept = Concept.objects.filter(
-            concept_code=alc_loinc,
-            vocabulary__vocabulary_id='LOINC',
-        ).first()
-        if alc_concept:
-            alc_measurements = (
-                Measurement.objects.filter(
-                    person=person,
-                    measurement_concept=alc_concept,
-                    value_as_number__isnull=False,
-                )
-                .order_by('measurement_date')
-            )
-            if alc_measurements.count() >= 2:
-                pts = list(alc_measurements.values_list('measurement_date', 'value_as_number'))
-                ldt = self._compute_lymphocyte_doubling_time(pts)
-                if ldt is not None:
-                    data['lymphocyte_doubling_time'] = ldt
+        alc_points = [
+            (m.measurement_date, m.value_as_number)
+            for m in reversed(events.measurements_with_codes([alc_loinc], numeric=True))
+            if m.measurement_concept.vocabulary_id == 'LOINC'
+        ]
+        if len(alc_points) >= 2:
+            ldt = self._compute_lymphocyte_doubling_time(alc_points)
+            if ldt is not None:
+                data['lymphocyte_doubling_time'] = ldt
 
         return data
 
@@ -951,13 +939,12 @@ class Command(BaseCommand):
     # Lymphoma-specific extraction
     # ------------------------------------------------------------------
 
-    def get_lymphoma_data(self, person):
+    def get_lymphoma_data(self, person, events=None):
         """Extract Follicular Lymphoma specific fields from OMOP Observation/Measurement."""
         data = {}
-        observations = Observation.objects.filter(person=person).order_by('-observation_date')
-        measurements = Measurement.objects.filter(person=person).order_by('-measurement_date')
+        events = events or PersonEvents(person)
 
-        for obs in observations:
+        for obs in events.observations:
             cname = (obs.observation_concept.concept_name or '').lower() if obs.observation_concept else ''
 
             if 'flipi' in cname:
@@ -969,7 +956,7 @@ class Command(BaseCommand):
             elif 'gelf' in cname:
                 data['gelf_criteria_status'] = obs.value_as_string or cname
 
-        for m in measurements:
+        for m in events.measurements:
             cname = (m.measurement_concept.concept_name or '').lower() if m.measurement_concept else ''
             if 'grade' in cname and 'lymphoma' in cname and m.value_as_number is not None:
                 data['tumor_grade'] = int(m.value_as_number)
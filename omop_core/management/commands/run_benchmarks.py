@@ -0,0 +1,122 @@
+"""
+Django management command: run_benchmarks
+=========================================
+Runs the performance benchmarks in the ``benchmarks`` package (ingestion,
+PatientInfo population, API hot paths) against a throw-away database filled
+with seeded data, prints throughput / p50 / p95 / query counts / peak RSS per
+scenario and compares them with a stored baseline.
+
+The configured database is never touched: a separate test database is
+created for the run and destroyed afterwards. Scales are 1k, 10k or 100k
+patients (or any number); the larger ones take a while.
+
+Usage
+-----
+  # All scenarios at 1k patients, compared with benchmarks/baselines/1k.json
+  python manage.py run_benchmarks --scale 1k
+
+  # Selected scenarios, JSON report written out
+  python manage.py run_benchmarks --scale 10k --scenarios upload_fhir populate_patient_info \\
+      --output /tmp/bench-10k.json
+
+  # Record the current numbers as the new baseline for this scale
+  # (with --scenarios, only those entries of the stored baseline are replaced;
+  # meta.created_at stays that of the stored run and meta.recorded_at gives
+  # the time each scenario was last recorded)
+  python manage.py run_benchmarks --scale 1k --save-baseline
+
+  # CI: exit non-zero on regressions
+  python manage.py run_benchmarks --scale 1k --fail-on-regression
+"""
+
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import runner
+from benchmarks.datasets import DEFAULT_SEED, parse_scale, scale_label
+from benchmarks.metrics import DEFAULT_TOLERANCE, compare
+from benchmarks.scenarios import SCENARIOS
+
+BASELINE_DIR = Path(settings.BASE_DIR) / 'benchmarks' / 'baselines'
+
+
+class Command(BaseCommand):
+    help = 'Run seeded performance benchmarks in an isolated database and compare with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='1k', help='1k, 10k, 100k or a patient count (default: 1k)')
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+            help='Scenarios to run (default: all)',
+        )
+        parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'Dataset seed (default: {DEFAULT_SEED})')
+        parser.add_argument('--output', help='Write the JSON report here')
+        parser.add_argument(
+            '--baseline',
+            help='Baseline report to compare with (default: benchmarks/baselines/<scale>.json if present)',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Store this run as the baseline for its scale',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+            help=f'Allowed relative throughput/p95 change before reporting a regression '
+                 f'(default: {DEFAULT_TOLERANCE})',
+        )
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on regressions')
+
+    def handle(self, *args, **options):
+        try:
+            count = parse_scale(options['scale'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        label = scale_label(count)
+        baseline_path = Path(options['baseline']) if options['baseline'] else BASELINE_DIR / f'{label}.json'
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Benchmarks: {count:,} patients, seed {options["seed"]}'
+        ))
+        with runner.isolated_database():
+            report = runner.run(count, options['seed'], options['scenarios'], progress=self.stdout.write)
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(f'Report written to {options["output"]}')
+
+        regressions = []
+        if baseline_path.exists() and not options['save_baseline']:
+            baseline = json.loads(baseline_path.read_text())
+            if baseline['meta'].get('seed') != options['seed']:
+                self.stdout.write(self.style.WARNING('Baseline used a different seed; query counts may differ'))
+            regressions = compare(report['results'], baseline['results'], tolerance=options['tolerance'])
+            if regressions:
+                self.stdout.write(self.style.ERROR(f'{len(regressions)} regression(s) against {baseline_path}:'))
+                for line in regressions:
+                    self.stdout.write(f'  {line}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
+        elif not options['save_baseline']:
+            self.stdout.write(f'No baseline at {baseline_path}; run with --save-baseline to record one')
+
+        if options['save_baseline']:
+            recorded_at = dict.fromkeys(report['results'], report['meta']['created_at'])
+            # Scenarios not run this time keep their stored numbers, and the file its meta
+            if baseline_path.exists() and set(report['results']) != set(SCENARIOS):
+                stored = json.loads(baseline_path.read_text())
+                stored_at = stored['meta'].get('recorded_at') or dict.fromkeys(
+                    stored['results'], stored['meta']['created_at'],
+                )
+                recorded_at = {**stored_at, **recorded_at}
+                report['meta'] = stored['meta']
+                report['results'] = {**stored['results'], **report['results']}
+            report['meta']['recorded_at'] = recorded_at
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError('Benchmark regressions detected')
@@ -0,0 +1,85 @@
+"""
+Request middleware: opt-in instrumentation and read-replica pinning.
+
+QueryInstrumentationMiddleware (see omop_core.instrumentation) is
+enabled with ``QUERY_INSTRUMENTATION=True``; otherwise Django drops the
+middleware at startup and requests pay nothing. For every request it records
+the SQL query count, DB time, slowest statements and the time spent
+rendering (serializing) the response, then
+
+  * adds ``Server-Timing: db;dur=…;desc="N queries", serialize;dur=…, total;dur=…``
+  * logs one JSON line to ``ctomop.instrumentation``, at WARNING when the
+    request exceeds QUERY_INSTRUMENTATION_MAX_QUERIES queries
+
+ReplicaPinMiddleware (see omop_core.replicas), active only with read
+replicas, keeps a client's reads on the primary for
+DATABASE_REPLICA_PIN_SECONDS after it writes.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from omop_core.instrumentation import QueryProfile, log_profile
+from omop_core.replicas import PIN_COOKIE, pinned_to_primary, replica_aliases
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class QueryInstrumentationMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.max_queries = getattr(settings, 'QUERY_INSTRUMENTATION_MAX_QUERIES', None)
+        self.server_timing = getattr(settings, 'QUERY_INSTRUMENTATION_SERVER_TIMING', True)
+
+    def __call__(self, request):
+        with QueryProfile() as profile:
+            request.query_profile = profile
+            response = self.get_response(request)
+        if self.server_timing:
+            response['Server-Timing'] = profile.server_timing()
+        over_budget = self.max_queries is not None and profile.queries > self.max_queries
+        match = getattr(request, 'resolver_match', None)
+        log_profile(
+            'request', match.view_name if match else request.path, profile,
+            level=logging.WARNING if over_budget else logging.INFO,
+            method=request.method, path=request.path, status=response.status_code,
+            over_budget=over_budget,
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses render (serialize to JSON) after the view returns
+        profile = getattr(request, 'query_profile', None)
+        if profile is not None:
+            phase = profile.time('serialize')
+            phase.__enter__()
+
+            def rendered(response):
+                phase.__exit__(None, None, None)
+                return None  # a non-None value would replace the response
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class ReplicaPinMiddleware:
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+
+    def __call__(self, request):
+        with pinned_to_primary(PIN_COOKIE in request.COOKIES) as routing:
+            response = self.get_response(request)
+            wrote = routing.wrote
+        # Uploads write with COPY, which bypasses the router, so unsafe methods pin too
+        if wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
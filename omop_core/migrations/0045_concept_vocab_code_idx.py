@@ -0,0 +1,11 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [("omop_core", "0044_add_clonal_bone_marrow_b_lymphocytes")]
+    operations = [
+        migrations.AddIndex(
+            model_name="concept",
+            index=models.Index(fields=["vocabulary", "concept_code"], name="concept_vocab_code_idx"),
+        ),
+    ]
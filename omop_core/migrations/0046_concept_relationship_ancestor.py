@@ -0,0 +1,50 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('omop_core', '0045_concept_vocab_code_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConceptRelationship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('relationship_id', models.CharField(max_length=20)),
+                ('valid_start_date', models.DateField()),
+                ('valid_end_date', models.DateField()),
+                ('invalid_reason', models.CharField(blank=True, max_length=1, null=True)),
+                ('concept_1', models.ForeignKey(db_column='concept_id_1', db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='relationships_from', to='omop_core.concept')),
+                ('concept_2', models.ForeignKey(db_column='concept_id_2', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='relationships_to', to='omop_core.concept')),
+            ],
+            options={
+                'db_table': 'concept_relationship',
+            },
+        ),
+        migrations.CreateModel(
+            name='ConceptAncestor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_levels_of_separation', models.IntegerField()),
+                ('max_levels_of_separation', models.IntegerField()),
+                ('ancestor_concept', models.ForeignKey(db_column='ancestor_concept_id', db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='descendant_links', to='omop_core.concept')),
+                ('descendant_concept', models.ForeignKey(db_column='descendant_concept_id', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ancestor_links', to='omop_core.concept')),
+            ],
+            options={
+                'db_table': 'concept_ancestor',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conceptrelationship',
+            constraint=models.UniqueConstraint(fields=('concept_1', 'concept_2', 'relationship_id'), name='concept_relationship_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='conceptancestor',
+            constraint=models.UniqueConstraint(fields=('ancestor_concept', 'descendant_concept'), name='concept_ancestor_uniq'),
+        ),
+    ]
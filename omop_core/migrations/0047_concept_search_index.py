@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    # pg_trgm GIN indexes on PostgreSQL, an FTS5 table + sync triggers on SQLite
+    from omop_core.concept_search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from omop_core.concept_search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [("omop_core", "0046_concept_relationship_ancestor")]
+    operations = [
+        migrations.AddIndex(
+            model_name="concept",
+            index=models.Index(fields=["concept_code"], name="concept_code_idx"),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('omop_core', '0047_concept_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceToConceptMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_code', models.CharField(max_length=50)),
+                ('source_concept_id', models.IntegerField(default=0)),
+                ('source_vocabulary_id', models.CharField(max_length=20)),
+                ('source_code_description', models.CharField(blank=True, max_length=255, null=True)),
+                ('target_vocabulary_id', models.CharField(max_length=20)),
+                ('valid_start_date', models.DateField()),
+                ('valid_end_date', models.DateField()),
+                ('invalid_reason', models.CharField(blank=True, max_length=1, null=True)),
+                ('target_concept', models.ForeignKey(db_column='target_concept_id', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='source_maps', to='omop_core.concept')),
+            ],
+            options={
+                'db_table': 'source_to_concept_map',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sourcetoconceptmap',
+            constraint=models.UniqueConstraint(fields=('source_vocabulary_id', 'source_code', 'target_concept'), name='source_to_concept_map_uniq'),
+        ),
+    ]
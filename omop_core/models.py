@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_save
+from django.utils import timezone
 
 class Vocabulary(models.Model):
     """OMOP CDM Vocabulary table - standardized vocabularies."""
@@ -56,11 +58,104 @@ class Concept(models.Model):
 
     class Meta:
         db_table = 'concept'
+        indexes = [
+            # Source-code lookups: (vocabulary, code) → concept_id
+            models.Index(fields=['vocabulary', 'concept_code'], name='concept_vocab_code_idx'),
+            # Exact-code search across vocabularies (omop_core.concept_search)
+            models.Index(fields=['concept_code'], name='concept_code_idx'),
+        ]
 
     def __str__(self):
         return f"{self.concept_id}: {self.concept_name}"
 
 
+class ConceptRelationship(models.Model):
+    """OMOP CDM Concept Relationship table - directed links between concepts ('Maps to', 'Is a', ...)."""
+    # Concept ids are not constrained: Athena ships relationships for concepts
+    # outside the vocabularies that were downloaded.
+    concept_1 = models.ForeignKey(
+        Concept, on_delete=models.DO_NOTHING, db_column='concept_id_1',
+        related_name='relationships_from', db_constraint=False, db_index=False,
+    )
+    concept_2 = models.ForeignKey(
+        Concept, on_delete=models.DO_NOTHING, db_column='concept_id_2',
+        related_name='relationships_to', db_constraint=False,
+    )
+    relationship_id = models.CharField(max_length=20)
+    valid_start_date = models.DateField()
+    valid_end_date = models.DateField()
+    invalid_reason = models.CharField(max_length=1, null=True, blank=True)
+
+    class Meta:
+        db_table = 'concept_relationship'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['concept_1', 'concept_2', 'relationship_id'],
+                name='concept_relationship_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.concept_1_id} {self.relationship_id} {self.concept_2_id}"
+
+
+class ConceptAncestor(models.Model):
+    """OMOP CDM Concept Ancestor table - transitive closure of the concept hierarchy."""
+    ancestor_concept = models.ForeignKey(
+        Concept, on_delete=models.DO_NOTHING, db_column='ancestor_concept_id',
+        related_name='descendant_links', db_constraint=False, db_index=False,
+    )
+    descendant_concept = models.ForeignKey(
+        Concept, on_delete=models.DO_NOTHING, db_column='descendant_concept_id',
+        related_name='ancestor_links', db_constraint=False,
+    )
+    min_levels_of_separation = models.IntegerField()
+    max_levels_of_separation = models.IntegerField()
+
+    class Meta:
+        db_table = 'concept_ancestor'
+        constraints = [
+            # Leading ancestor column also serves descendant expansion
+            models.UniqueConstraint(
+                fields=['ancestor_concept', 'descendant_concept'],
+                name='concept_ancestor_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_concept_id} > {self.descendant_concept_id}"
+
+
+class SourceToConceptMap(models.Model):
+    """OMOP CDM Source To Concept Map table - local source codes mapped to standard concepts."""
+    source_code = models.CharField(max_length=50)
+    source_concept_id = models.IntegerField(default=0)
+    # Plain ids: local source vocabularies usually have no vocabulary row
+    source_vocabulary_id = models.CharField(max_length=20)
+    source_code_description = models.CharField(max_length=255, null=True, blank=True)
+    target_concept = models.ForeignKey(
+        Concept, on_delete=models.DO_NOTHING, db_column='target_concept_id',
+        related_name='source_maps', db_constraint=False,
+    )
+    target_vocabulary_id = models.CharField(max_length=20)
+    valid_start_date = models.DateField()
+    valid_end_date = models.DateField()
+    invalid_reason = models.CharField(max_length=1, null=True, blank=True)
+
+    class Meta:
+        db_table = 'source_to_concept_map'
+        constraints = [
+            # Leading (vocabulary, code) columns serve source-code lookups
+            models.UniqueConstraint(
+                fields=['source_vocabulary_id', 'source_code', 'target_concept'],
+                name='source_to_concept_map_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.source_vocabulary_id}:{self.source_code} → {self.target_concept_id}"
+
+
 class Location(models.Model):
     """OMOP CDM Location table - geographic locations."""
     location_id = models.BigIntegerField(primary_key=True)
@@ -1045,3 +1140,19 @@ class PatientInfo(models.Model):
         else:
             if self.relapse_count is None:
                 self.relapse_count = computed_relapse_count
+
+
+def _touch_patient_info(sender, instance, created, update_fields=None, **kwargs):
+    """
+    PatientInfo payloads show the Person's name, so renaming a Person is a new
+    version of their PatientInfo: bump its updated_at, which the list ETag and
+    Last-Modified are computed from (patient_portal/api/conditional.py).
+    """
+    if created:
+        return  # no PatientInfo points at a new Person yet
+    if update_fields is not None and not {'given_name', 'family_name'} & set(update_fields):
+        return
+    PatientInfo.objects.filter(person_id=instance.person_id).update(updated_at=timezone.now())
+
+
+post_save.connect(_touch_patient_info, sender=Person, dispatch_uid='patient_info_touch_on_person_save')
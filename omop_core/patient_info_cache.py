@@ -0,0 +1,215 @@
+"""
+Response cache for the PatientInfo read endpoints.
+
+``/api/patient-info/`` and ``/api/patient-info/<person_id>/`` store their
+serialized payload — with the ETag / Last-Modified validators — in Django's
+cache framework, so a repeated read costs no queries and no serialization:
+
+    from omop_core.patient_info_cache import patient_info_cache
+
+    key = patient_info_cache.detail_key(person_id, request.GET)
+    entry = patient_info_cache.get(key)
+    if entry is None:
+        entry = patient_info_cache.set(key, payload, etag, last_modified)
+
+Entries are keyed per person (detail) or for the whole list, and per query
+shape (the normalized query string). Keys embed version tokens instead of
+being deleted one by one:
+
+  * a person's token changes when their PatientInfo, Person or User row is
+    saved or deleted (post_save / post_delete, connected only while caching
+    is enabled), which also changes the list token
+  * the global token changes with ``invalidate_all()``, which bulk writers
+    (COPY / bulk_create / queryset ``update()``) call after loading
+
+Tokens are replaced again when the surrounding transaction commits, so a
+read that re-caches old data mid-transaction is not served afterwards. The
+current UTC date is part of every key because payloads include an age.
+
+Tokens and entries live in the cache backend, so invalidation reaches every
+process only through a shared backend: ``CACHE_BACKEND=database``, or
+``CACHE_BACKEND=file`` on a single host (see CACHES in settings). With the
+default local-memory backend each process, including every management command
+run, would hold its own tokens, so caching is off there unless
+PATIENT_INFO_CACHE_TIMEOUT is set. ``PATIENT_INFO_CACHE_TIMEOUT=0`` disables
+caching; responses read from a replica are not stored (omop_core.replicas).
+``metrics()`` reports hits, misses and hit rate for this process
+(``/api/patient-info/cache-stats/``).
+"""
+
+import hashlib
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from omop_core.models import PatientInfo, Person
+from omop_core.replicas import cache_timeout
+
+KEY_PREFIX = 'patient-info'
+
+
+def _shape(params) -> str:
+    """Stable digest of a request's query parameters (a QueryDict), independent of their order."""
+    if not params:
+        return '-'
+    return hashlib.sha1(repr(sorted(params.lists())).encode()).hexdigest()[:16]
+
+
+class PatientInfoCache:
+    """Versioned response cache for PatientInfo reads, with per-process counters."""
+
+    def __init__(self):
+        self.counters = Counter()
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'PATIENT_INFO_CACHE_ALIAS', 'default')]
+
+    @property
+    def timeout(self) -> int:
+        return getattr(settings, 'PATIENT_INFO_CACHE_TIMEOUT', 300)
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout > 0
+
+    # -- keys ----------------------------------------------------------------
+
+    def _tokens(self, *names) -> list[str]:
+        """Current version tokens; a missing (never set or evicted) token is created fresh."""
+        keys = [f'{KEY_PREFIX}:token:{name}' for name in names]
+        found = self.cache.get_many(keys)
+        tokens = []
+        for key in keys:
+            token = found.get(key)
+            if token is None:
+                self.cache.add(key, uuid.uuid4().hex[:12], timeout=None)
+                token = self.cache.get(key)
+            tokens.append(token)
+        return tokens
+
+    def detail_key(self, person_id, params=None) -> str | None:
+        """Cache key for one patient's detail response (None when caching is disabled)."""
+        if not self.enabled:
+            return None
+        generation, person = self._tokens('all', f'person:{person_id}')
+        day = timezone.now().date().isoformat()
+        return f'{KEY_PREFIX}:{generation}:detail:{person_id}:{person}:{day}:{_shape(params)}'
+
+    def list_key(self, params=None) -> str | None:
+        """Cache key for the patient list response (None when caching is disabled)."""
+        if not self.enabled:
+            return None
+        generation, listing = self._tokens('all', 'list')
+        day = timezone.now().date().isoformat()
+        return f'{KEY_PREFIX}:{generation}:list:{listing}:{day}:{_shape(params)}'
+
+    # -- reads and writes ------------------------------------------------------
+    # Take the key before computing the response and store under that same key:
+    # if the data changes meanwhile, the entry lands under a retired token.
+
+    def get(self, key) -> dict | None:
+        """Cached {'data', 'etag', 'last_modified'} under ``key``, or None."""
+        if key is None:
+            return None
+        entry = self.cache.get(key)
+        self.counters['hits' if entry is not None else 'misses'] += 1
+        return entry
+
+    def set(self, key, data, etag, last_modified) -> dict:
+        """Store a response under ``key`` (a no-op without a key); returns the entry."""
+        entry = {'data': data, 'etag': etag, 'last_modified': last_modified}
+        timeout = cache_timeout(self.timeout)
+        if key is not None and timeout:
+            self.cache.set(key, entry, timeout=timeout)
+            self.counters['stores'] += 1
+        return entry
+
+    # -- invalidation ----------------------------------------------------------
+
+    def _replace_tokens(self, *names):
+        self.cache.set_many(
+            {f'{KEY_PREFIX}:token:{name}': uuid.uuid4().hex[:12] for name in names}, timeout=None,
+        )
+
+    def _invalidate(self, *names):
+        if not self.enabled:
+            return
+        self.counters['invalidations'] += 1
+        self._replace_tokens(*names)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._replace_tokens(*names))
+
+    def invalidate_person(self, person_id) -> None:
+        """Drop one patient's cached detail responses and every cached list."""
+        self._invalidate(f'person:{person_id}', 'list')
+
+    def invalidate_all(self) -> None:
+        """Drop every cached PatientInfo response (after bulk writes that skip signals)."""
+        self._invalidate('all')
+
+    # -- metrics ---------------------------------------------------------------
+
+    def metrics(self) -> dict:
+        """Counters since process start (or the last ``reset_metrics``)."""
+        hits, misses = self.counters['hits'], self.counters['misses']
+        return {
+            'enabled': self.enabled,
+            'backend': self.cache.__class__.__name__,
+            'timeout': self.timeout,
+            'hits': hits,
+            'misses': misses,
+            'stores': self.counters['stores'],
+            'invalidations': self.counters['invalidations'],
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+
+    def reset_metrics(self):
+        self.counters.clear()
+
+
+patient_info_cache = PatientInfoCache()
+
+
+def _invalidate_person(sender, instance, update_fields=None, **kwargs):
+    if sender is User:
+        # Logins only touch last_login, which no PatientInfo response shows
+        if update_fields is not None and set(update_fields) == {'last_login'}:
+            return
+        # The User shown with a patient shares the person's id
+        patient_info_cache.invalidate_person(instance.id)
+    else:
+        patient_info_cache.invalidate_person(instance.person_id)
+
+
+def connect_signals():
+    """
+    Connect the invalidation receivers while caching is enabled, disconnect
+    them otherwise. A post_delete receiver turns off Django's fast delete for
+    its model (one more SELECT per queryset ``delete()``), which is not worth
+    paying while caching is off, the default with the local-memory backend.
+    """
+    for model in (PatientInfo, Person, User):
+        for signal, event in ((post_save, 'save'), (post_delete, 'delete')):
+            dispatch_uid = f'patient_info_cache_{model.__name__}_{event}'
+            if patient_info_cache.enabled:
+                signal.connect(_invalidate_person, sender=model, dispatch_uid=dispatch_uid)
+            else:
+                signal.disconnect(sender=model, dispatch_uid=dispatch_uid)
+
+
+connect_signals()
+
+
+@receiver(setting_changed)
+def _timeout_changed(setting, **kwargs):
+    if setting == 'PATIENT_INFO_CACHE_TIMEOUT':
+        connect_signals()
@@ -0,0 +1,97 @@
+"""
+Per-person clinical event context.
+
+Loads a person's measurements, observations, conditions and drug exposures
+once each, with the concepts the extractors read joined in, so code that
+derives many fields from the same events works on in-memory lists instead of
+re-querying (and lazily loading concepts) per field:
+
+    from omop_core.person_events import PersonEvents
+
+    events = PersonEvents(person).load()     # four queries
+    events.latest_measurement(['731-0'], numeric=True)
+    events.observations_with_codes(['182842009'])
+
+Every list is newest first, with same-day rows in id order. Tables are
+loaded on first access, so ``load()`` is only needed to pay the cost up
+front. The context is a snapshot: it does not see rows written after a
+table was loaded.
+"""
+
+from functools import cached_property
+from typing import Iterable
+
+from omop_core.models import ConditionOccurrence, DrugExposure, Measurement, Observation
+
+
+class PersonEvents:
+    """One person's clinical events, loaded once and shared by all readers."""
+
+    def __init__(self, person):
+        self.person = person
+
+    def load(self) -> 'PersonEvents':
+        """Load every table now; returns self."""
+        self.measurements, self.observations, self.conditions, self.drug_exposures
+        return self
+
+    @cached_property
+    def measurements(self) -> list[Measurement]:
+        return list(
+            Measurement.objects.filter(person=self.person)
+            .select_related('measurement_concept', 'value_as_concept', 'qualifier_concept')
+            .order_by('-measurement_date', 'measurement_id')
+        )
+
+    @cached_property
+    def observations(self) -> list[Observation]:
+        return list(
+            Observation.objects.filter(person=self.person)
+            .select_related('observation_concept')
+            .order_by('-observation_date', 'observation_id')
+        )
+
+    @cached_property
+    def conditions(self) -> list[ConditionOccurrence]:
+        return list(
+            ConditionOccurrence.objects.filter(person=self.person)
+            .select_related('condition_concept')
+            .order_by('-condition_start_date', 'condition_occurrence_id')
+        )
+
+    @cached_property
+    def drug_exposures(self) -> list[DrugExposure]:
+        return list(
+            DrugExposure.objects.filter(person=self.person)
+            .select_related('drug_concept')
+            .order_by('-drug_exposure_start_date', 'drug_exposure_id')
+        )
+
+    def measurements_with_codes(self, codes: Iterable[str], *, numeric: bool = False) -> list[Measurement]:
+        """Measurements whose concept_code is in ``codes`` (with a value_as_number if ``numeric``)."""
+        codes = {codes} if isinstance(codes, str) else set(codes)
+        return [
+            m for m in self.measurements
+            if m.measurement_concept.concept_code in codes
+            and (not numeric or m.value_as_number is not None)
+        ]
+
+    def measurements_in(self, concept_ids, *, numeric: bool = False) -> list[Measurement]:
+        """Measurements of any of ``concept_ids`` (e.g. a concept_sets expansion)."""
+        return [
+            m for m in self.measurements
+            if m.measurement_concept_id in concept_ids
+            and (not numeric or m.value_as_number is not None)
+        ]
+
+    def latest_measurement(self, codes: Iterable[str], *, numeric: bool = False) -> Measurement | None:
+        matches = self.measurements_with_codes(codes, numeric=numeric)
+        return matches[0] if matches else None
+
+    def observations_with_codes(self, codes: Iterable[str]) -> list[Observation]:
+        codes = {codes} if isinstance(codes, str) else set(codes)
+        return [o for o in self.observations if o.observation_concept.concept_code in codes]
+
+    def latest_observation(self, codes: Iterable[str]) -> Observation | None:
+        matches = self.observations_with_codes(codes)
+        return matches[0] if matches else None
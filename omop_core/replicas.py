@@ -0,0 +1,143 @@
+"""
+Read replicas for the API's heavy reads and the export commands.
+
+With ``DATABASE_REPLICA_URLS`` set (comma-separated database URLs), settings
+adds the replicas as database aliases ``replica_1``, ``replica_2``, … and
+installs ReplicaRouter. Reads made inside ``use_replicas()`` then go to one
+replica, picked at random once per block so a request sees a single
+snapshot; every other read, and every write, goes to ``default``:
+
+    from omop_core.replicas import use_replicas
+
+    with use_replicas():
+        rows = list(PatientInfo.objects.values('person_id', 'disease'))
+
+    @use_replicas()
+    def list(self, request):
+        ...
+
+PatientInfoViewSet list / retrieve / export, the lines-of-therapy cohort
+endpoint and the export_patient_info, export_fhir and export_omop_cdm
+commands read from replicas. Querysets evaluated after the block ends (a
+streamed response) must be bound first: ``queryset.using(queryset.db)``.
+
+Replicas lag the primary, so reads stay on ``default`` (read your writes):
+
+  * inside a transaction on ``default``
+  * for the rest of a block once it has written anything
+  * for DATABASE_REPLICA_PIN_SECONDS after a client's write:
+    omop_core.middleware.ReplicaPinMiddleware sets a short-lived cookie on
+    the response to any POST / PUT / PATCH / DELETE, or any request that
+    wrote, and keeps the client's requests on ``default`` while it lasts
+
+PatientInfo responses read from a replica are not stored in the response
+cache (omop_core.patient_info_cache). The cache is shared and looked up before
+any routing, so a replica read that missed a write, stored under the keys the
+write created, would be served to the writer despite its pin. Only reads from
+``default`` fill the cache. Without replicas, ``use_replicas()`` changes
+nothing.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+
+
+@dataclass
+class _Routing:
+    pinned: bool = False   # the client wrote recently (pin cookie)
+    wrote: bool = False    # this request or block wrote
+    replica: str | None = None   # set inside use_replicas()
+
+
+# Shared by reference with the threads sync_to_async runs ASGI views in
+_routing: ContextVar[_Routing | None] = ContextVar('replica_routing', default=None)
+
+
+def replica_aliases() -> list[str]:
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def _scope():
+    routing = _routing.get()
+    if routing is not None:
+        yield routing
+        return
+    routing = _Routing()
+    token = _routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def pinned_to_primary(pinned: bool = True):
+    """Routing state for one request; with ``pinned`` its reads stay on ``default``. Yields the state."""
+    with _scope() as routing:
+        previous = routing.pinned
+        routing.pinned = previous or pinned
+        try:
+            yield routing
+        finally:
+            routing.pinned = previous
+
+
+@contextmanager
+def use_replicas():
+    """Route the block's reads to a replica (a context manager, or a decorator when called)."""
+    with _scope() as routing:
+        previous = routing.replica
+        aliases = replica_aliases()
+        if previous is None and aliases:
+            routing.replica = random.choice(aliases)
+        try:
+            yield
+        finally:
+            routing.replica = previous
+
+
+def read_alias() -> str | None:
+    """The replica reads go to at this point, or None for ``default``."""
+    routing = _routing.get()
+    if routing is None or routing.replica is None or routing.pinned or routing.wrote:
+        return None
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    return routing.replica
+
+
+def cache_timeout(timeout: int) -> int:
+    """``timeout`` for caching a response read now; 0 (do not store) when read from a replica."""
+    return timeout if read_alias() is None else 0
+
+
+class ReplicaRouter:
+    """Reads inside use_replicas() to a replica, everything else to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        # Also for instances read from a replica, which would otherwise be saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas receive the schema from the primary
+        return False if db in replica_aliases() else None
@@ -0,0 +1,272 @@
+"""
+Source code → standard concept mapping shared by every ingestion path.
+
+``(source_vocabulary_id, code)`` pairs resolve, in order, through:
+
+  1. the built-in demographic maps (BUILTIN_SOURCE_MAPS — gender and race
+     strings as they arrive from FHIR, CSV uploads and HealthTree)
+  2. valid ``source_to_concept_map`` rows, which extend or override them
+  3. the vocabulary itself: ``concept`` by (vocabulary_id, concept_code),
+     following 'Maps to' when the concept is not standard
+
+Steps 1–2 are compiled into one dict the first time they are needed. Step 3
+is resolved for all distinct codes of a batch or upload at once
+(``prefetch``) — one query per LOOKUP_CHUNK codes — and memoized. Unmapped
+codes resolve to 0 ("No matching concept").
+
+The process-wide instance is ``source_concepts``::
+
+    from omop_core.source_concepts import GENDER_VOCABULARY, source_concepts
+
+    source_concepts.prefetch_codings(all_codings)       # one round trip
+    source_concepts.for_codings(observation['code']['coding'])
+    source_concepts.concept_id(GENDER_VOCABULARY, 'female')   # 8532
+    source_concepts.metrics()   # {'hits': …, 'misses': …, 'unmapped': …, …}
+
+Saving or deleting SourceToConceptMap rows through the ORM recompiles the
+map, and ``load_omop_vocabulary`` clears it; call
+``clear_source_concept_cache()`` after any other raw change.
+"""
+
+from collections import Counter
+from datetime import date
+from functools import reduce
+from operator import or_
+from typing import Iterable
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+
+from omop_core.models import Concept, ConceptRelationship, SourceToConceptMap
+
+NO_MATCHING_CONCEPT_ID = 0
+
+# FHIR coding system → OMOP vocabulary_id
+FHIR_SYSTEM_VOCABULARY = {
+    'http://loinc.org': 'LOINC',
+    'http://snomed.info/sct': 'SNOMED',
+    'http://www.nlm.nih.gov/research/umls/rxnorm': 'RxNorm',
+    'http://hl7.org/fhir/sid/icd-10-cm': 'ICD10CM',
+    'http://hl7.org/fhir/sid/icd-10': 'ICD10',
+    'http://hl7.org/fhir/sid/icd-o-3': 'ICDO3',
+    'http://unitsofmeasure.org': 'UCUM',
+}
+
+GENDER_VOCABULARY = 'Gender'
+RACE_VOCABULARY = 'Race'
+
+# Free-text source vocabularies: codes are compared lower-cased
+CASE_INSENSITIVE_VOCABULARIES = {GENDER_VOCABULARY, RACE_VOCABULARY}
+
+BUILTIN_SOURCE_MAPS = {
+    GENDER_VOCABULARY: {
+        'male': 8507,
+        'm': 8507,
+        'female': 8532,
+        'f': 8532,
+        'unknown': 8551,
+        'other': 8551,
+        'ambiguous': 8570,
+    },
+    RACE_VOCABULARY: {
+        'white': 8527,
+        'black or african american': 8516,
+        'asian': 8515,
+        'american indian or alaska native': 8657,
+        'native hawaiian or other pacific islander': 8557,
+        'other': 8522,
+    },
+}
+
+MAPS_TO = 'Maps to'
+
+# Codes per concept lookup query (SQLite binds at most 999 parameters)
+LOOKUP_CHUNK = 900
+
+# Vocabulary lookups memoized before the memo is reset
+MAX_RESOLVED = 200_000
+
+
+def _key(vocabulary_id, code):
+    code = str(code).strip()
+    if vocabulary_id in CASE_INSENSITIVE_VOCABULARIES:
+        code = code.lower()
+    return vocabulary_id, code
+
+
+def coding_key(coding) -> tuple[str, str] | None:
+    """(vocabulary_id, code) for a FHIR coding from a known system, else None."""
+    vocabulary_id = FHIR_SYSTEM_VOCABULARY.get(coding.get('system'))
+    code = coding.get('code')
+    if vocabulary_id and code:
+        return _key(vocabulary_id, code)
+    return None
+
+
+class SourceConceptMap:
+    """Compiled source map plus memoized vocabulary lookups, with hit/miss counters."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self._compiled: dict[tuple[str, str], int] | None = None
+        self._resolved: dict[tuple[str, str], int] = {}
+        self.counters = Counter()
+
+    # -- compiled map ------------------------------------------------------
+
+    def _compile(self):
+        compiled = {
+            _key(vocabulary_id, code): concept_id
+            for vocabulary_id, codes in BUILTIN_SOURCE_MAPS.items()
+            for code, concept_id in codes.items()
+        }
+        rows = (
+            SourceToConceptMap.objects.using(self.using)
+            .filter(invalid_reason__isnull=True, valid_end_date__gte=date.today())
+            .order_by('valid_start_date', 'id')
+            .values_list('source_vocabulary_id', 'source_code', 'target_concept_id')
+        )
+        # Latest valid_start_date wins when a code has several targets
+        for vocabulary_id, code, concept_id in rows:
+            compiled[_key(vocabulary_id, code)] = concept_id
+        self._compiled = compiled
+        self.counters['compilations'] += 1
+
+    def clear(self):
+        self._compiled = None
+        self._resolved.clear()
+
+    def warm(self):
+        """Compile the source map now instead of on the first lookup (worker start-up)."""
+        if self._compiled is None:
+            self._compile()
+
+    # -- resolution --------------------------------------------------------
+
+    def prefetch(self, keys: Iterable[tuple[str, str]]) -> None:
+        """Resolve every not-yet-known (vocabulary_id, code) pair in batched queries."""
+        if self._compiled is None:
+            self._compile()
+        pending: dict[str, set[str]] = {}
+        for vocabulary_id, code in keys:
+            key = _key(vocabulary_id, code)
+            if key not in self._compiled and key not in self._resolved:
+                pending.setdefault(key[0], set()).add(key[1])
+        if not pending:
+            return
+        if len(self._resolved) > MAX_RESOLVED:
+            self._resolved.clear()
+
+        wanted = [(v, c) for v, codes in pending.items() for c in codes]
+        self.counters['misses'] += len(wanted)
+        resolved = dict.fromkeys(wanted, NO_MATCHING_CONCEPT_ID)
+        non_standard = {}
+        for start in range(0, len(wanted), LOOKUP_CHUNK):
+            chunk = wanted[start:start + LOOKUP_CHUNK]
+            by_vocabulary: dict[str, list[str]] = {}
+            for vocabulary_id, code in chunk:
+                by_vocabulary.setdefault(vocabulary_id, []).append(code)
+            self.counters['queries'] += 1
+            condition = reduce(or_, (
+                Q(vocabulary_id=vocabulary_id, concept_code__in=codes)
+                for vocabulary_id, codes in by_vocabulary.items()
+            ))
+            for concept_id, vocabulary_id, code, standard in (
+                Concept.objects.using(self.using).filter(condition)
+                .values_list('concept_id', 'vocabulary_id', 'concept_code', 'standard_concept')
+            ):
+                key = _key(vocabulary_id, code)
+                resolved[key] = concept_id
+                if standard != 'S':
+                    non_standard[concept_id] = key
+
+        # Source concepts (ICD10CM, …) map to their standard counterpart
+        source_ids = list(non_standard)
+        for start in range(0, len(source_ids), LOOKUP_CHUNK):
+            self.counters['queries'] += 1
+            for source_id, target_id in (
+                ConceptRelationship.objects.using(self.using)
+                .filter(
+                    concept_1_id__in=source_ids[start:start + LOOKUP_CHUNK],
+                    relationship_id=MAPS_TO, invalid_reason__isnull=True,
+                )
+                .order_by('concept_2_id')
+                .values_list('concept_1_id', 'concept_2_id')
+            ):
+                key = non_standard.pop(source_id, None)
+                if key is not None:
+                    resolved[key] = target_id
+
+        self.counters['unmapped'] += sum(1 for v in resolved.values() if v == NO_MATCHING_CONCEPT_ID)
+        self._resolved.update(resolved)
+
+    def concept_id(self, vocabulary_id: str, code, default: int = NO_MATCHING_CONCEPT_ID) -> int:
+        """Standard concept for one source code, or ``default`` when unmapped."""
+        if not code:
+            return default
+        key = _key(vocabulary_id, code)
+        if self._compiled is None:
+            self._compile()
+        if key in self._compiled or key in self._resolved:
+            self.counters['hits'] += 1
+        else:
+            self.prefetch([key])
+        concept_id = self._compiled.get(key)
+        if concept_id is None:
+            concept_id = self._resolved.get(key, NO_MATCHING_CONCEPT_ID)
+        return concept_id if concept_id != NO_MATCHING_CONCEPT_ID else default
+
+    def prefetch_codings(self, codings) -> None:
+        """``prefetch`` for FHIR codings; codings from unknown systems are ignored."""
+        self.prefetch(filter(None, map(coding_key, codings)))
+
+    def for_codings(self, codings) -> int:
+        """First FHIR coding that maps to a concept, or 0."""
+        for coding in codings:
+            key = coding_key(coding)
+            if key:
+                concept_id = self.concept_id(*key)
+                if concept_id != NO_MATCHING_CONCEPT_ID:
+                    return concept_id
+        return NO_MATCHING_CONCEPT_ID
+
+    def targets(self, vocabulary_id: str) -> set[int]:
+        """Every concept the compiled map sends ``vocabulary_id`` codes to."""
+        if self._compiled is None:
+            self._compile()
+        return {concept_id for (v, _), concept_id in self._compiled.items() if v == vocabulary_id}
+
+    # -- metrics -----------------------------------------------------------
+
+    def metrics(self) -> dict:
+        """
+        Counters since process start (or the last ``reset_metrics``): ``hits``
+        are lookups answered from memory, ``misses`` distinct codes that had
+        to be fetched, ``unmapped`` fetched codes with no concept.
+        """
+        hits, misses = self.counters['hits'], self.counters['misses']
+        return {
+            'hits': hits,
+            'misses': misses,
+            'unmapped': self.counters['unmapped'],
+            'queries': self.counters['queries'],
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+            'compiled_entries': len(self._compiled or ()),
+            'resolved_entries': len(self._resolved),
+        }
+
+    def reset_metrics(self):
+        self.counters.clear()
+
+
+source_concepts = SourceConceptMap()
+
+
+def clear_source_concept_cache(**kwargs) -> None:
+    """Recompile the source map and forget memoized vocabulary lookups."""
+    source_concepts.clear()
+
+
+post_save.connect(clear_source_concept_cache, sender=SourceToConceptMap, dispatch_uid='source_concepts_save')
+post_delete.connect(clear_source_concept_cache, sender=SourceToConceptMap, dispatch_uid='source_concepts_delete')
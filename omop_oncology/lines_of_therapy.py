@@ -0,0 +1,382 @@
+"""
+Line-of-therapy materialization and queries
+===========================================
+
+Turns HealthTree ``core__ai_lines_of_therapy`` rows (one dict per line, as
+produced by ``load_from_healthtree_bq``) into relational OMOP rows:
+
+  * omop_oncology.Episode                — one per line (Treatment Regimen)
+  * omop_oncology.AILineOfTherapySummary — AI metadata for that Episode
+  * omop_oncology.EpisodeEvent           — links the Episode to the person's
+                                           DrugExposure / ProcedureOccurrence
+                                           rows that fall inside the line
+
+Rows are written per batch of persons with ``bulk_create`` and Episode ids are
+pre-allocated from ``max(episode_id)`` so no per-row round trips are needed.
+Re-running for a person replaces that person's previously materialized lines.
+
+``lot_timelines`` reads the materialized lines back for many persons in a
+single joined query (see the Episode / AILineOfTherapySummary indexes).
+"""
+
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Any, Iterable
+
+from django.db import transaction
+from django.db.models import F, Max
+
+from omop_core.models import (
+    Concept, ConceptClass, Domain, DrugExposure, ProcedureOccurrence, Vocabulary,
+)
+from omop_oncology.models import AILineOfTherapySummary, Episode, EpisodeEvent
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+# OMOP Episode concept for a treatment regimen (one line of therapy)
+TREATMENT_REGIMEN_CONCEPT_ID = 32531
+# OMOP type concept for EHR-derived records
+EHR_TYPE_CONCEPT_ID = 32817
+# "No matching concept" — the regimen itself is not coded upstream
+NO_MATCHING_CONCEPT_ID = 0
+# OMOP field concepts identifying which table an EpisodeEvent.event_id points to
+DRUG_EXPOSURE_FIELD_CONCEPT_ID = 1147094
+PROCEDURE_OCCURRENCE_FIELD_CONCEPT_ID = 1147082
+
+# (concept_id, concept_name, domain_id, vocabulary_id, concept_class_id)
+REQUIRED_CONCEPTS = [
+    (TREATMENT_REGIMEN_CONCEPT_ID, 'Treatment Regimen', 'Episode', 'Episode', 'Episode'),
+    (EHR_TYPE_CONCEPT_ID, 'EHR', 'Type Concept', 'Type Concept', 'Type Concept'),
+    (NO_MATCHING_CONCEPT_ID, 'No matching concept', 'Metadata', 'None', 'Undefined'),
+    (DRUG_EXPOSURE_FIELD_CONCEPT_ID, 'drug_exposure.drug_exposure_id', 'Metadata', 'CDM', 'Field'),
+    (PROCEDURE_OCCURRENCE_FIELD_CONCEPT_ID, 'procedure_occurrence.procedure_occurrence_id', 'Metadata', 'CDM', 'Field'),
+]
+
+BATCH_SIZE = 500
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _safe_date(value: Any) -> date | None:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (ValueError, TypeError):
+        return None
+
+
+def _safe_datetime(value: Any) -> datetime | None:
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except (ValueError, TypeError):
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return value
+
+
+def ensure_lot_concepts() -> None:
+    """Create placeholder rows for the concepts the LOT tables reference."""
+    existing = set(
+        Concept.objects.filter(
+            concept_id__in=[c[0] for c in REQUIRED_CONCEPTS]
+        ).values_list('concept_id', flat=True)
+    )
+    missing = [c for c in REQUIRED_CONCEPTS if c[0] not in existing]
+    if not missing:
+        return
+
+    for _, _, domain_id, vocabulary_id, concept_class_id in missing:
+        Domain.objects.get_or_create(
+            domain_id=domain_id,
+            defaults={'domain_name': domain_id, 'domain_concept_id': 0},
+        )
+        Vocabulary.objects.get_or_create(
+            vocabulary_id=vocabulary_id,
+            defaults={'vocabulary_name': vocabulary_id, 'vocabulary_concept_id': 0},
+        )
+        ConceptClass.objects.get_or_create(
+            concept_class_id=concept_class_id,
+            defaults={'concept_class_name': concept_class_id, 'concept_class_concept_id': 0},
+        )
+
+    Concept.objects.bulk_create(
+        [
+            Concept(
+                concept_id=concept_id,
+                concept_name=name,
+                domain_id=domain_id,
+                vocabulary_id=vocabulary_id,
+                concept_class_id=concept_class_id,
+                standard_concept='S' if concept_id else None,
+                concept_code=str(concept_id),
+                valid_start_date=date(1970, 1, 1),
+                valid_end_date=date(2099, 12, 31),
+            )
+            for concept_id, name, domain_id, vocabulary_id, concept_class_id in missing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _find_line(lines: list[tuple[int, date, date | None]], event_date: date | None) -> int | None:
+    """Return the episode_id of the latest-starting line that contains event_date."""
+    if event_date is None:
+        return None
+    match = None
+    for episode_id, start, end in lines:
+        if start <= event_date and (end is None or event_date <= end):
+            match = episode_id
+    return match
+
+
+# ---------------------------------------------------------------------------
+# Materializer
+# ---------------------------------------------------------------------------
+
+class LineOfTherapyMaterializer:
+    """
+    Bulk writer for line-of-therapy rows.
+
+    Usage::
+
+        materializer = LineOfTherapyMaterializer()
+        stats = materializer.materialize(
+            (person_id, lot_rows) for person_id, lot_rows in ...
+        )
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self.stats = {
+            'persons': 0,
+            'episodes': 0,
+            'summaries': 0,
+            'events': 0,
+            'skipped_lines': 0,
+        }
+        self._next_episode_id = None
+
+    def materialize(self, person_lots: Iterable[tuple[int, list[dict]]]) -> dict:
+        """Materialize ``(person_id, lot_rows)`` pairs in batches of persons."""
+        ensure_lot_concepts()
+        self._next_episode_id = (
+            Episode.objects.aggregate(max_id=Max('episode_id'))['max_id'] or 0
+        ) + 1
+
+        batch: list[tuple[int, list[dict]]] = []
+        for person_id, lot_rows in person_lots:
+            batch.append((person_id, lot_rows or []))
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+        return self.stats
+
+    def _allocate_episode_ids(self, count: int) -> range:
+        ids = range(self._next_episode_id, self._next_episode_id + count)
+        self._next_episode_id += count
+        return ids
+
+    @transaction.atomic
+    def _write_batch(self, batch: list[tuple[int, list[dict]]]) -> None:
+        person_ids = [person_id for person_id, _ in batch]
+
+        # Replace previously materialized lines for these persons
+        old_episode_ids = list(
+            Episode.objects.filter(
+                person_id__in=person_ids,
+                episode_concept_id=TREATMENT_REGIMEN_CONCEPT_ID,
+            ).values_list('episode_id', flat=True)
+        )
+        if old_episode_ids:
+            EpisodeEvent.objects.filter(episode_id__in=old_episode_ids).delete()
+            AILineOfTherapySummary.objects.filter(episode_id__in=old_episode_ids).delete()
+            Episode.objects.filter(episode_id__in=old_episode_ids).delete()
+
+        valid_rows = []
+        for person_id, lot_rows in batch:
+            for row in lot_rows:
+                start = _safe_date(row.get('start_date'))
+                if start is None:
+                    self.stats['skipped_lines'] += 1
+                    continue
+                valid_rows.append((person_id, row, start))
+
+        episode_ids = self._allocate_episode_ids(len(valid_rows))
+        episodes = []
+        summaries = []
+        lines_by_person: dict[int, list[tuple[int, date, date | None]]] = {}
+
+        for episode_id, (person_id, row, start) in zip(episode_ids, valid_rows):
+            end = None if row.get('is_ongoing_line_of_therapy') else _safe_date(row.get('end_date'))
+            source_id = row.get('ai_lines_of_therapy_summary_id')
+
+            episodes.append(Episode(
+                episode_id=episode_id,
+                person_id=person_id,
+                episode_concept_id=TREATMENT_REGIMEN_CONCEPT_ID,
+                episode_start_date=start,
+                episode_end_date=end,
+                episode_number=row.get('line_number'),
+                episode_object_concept_id=NO_MATCHING_CONCEPT_ID,
+                episode_type_concept_id=EHR_TYPE_CONCEPT_ID,
+                episode_source_value=str(source_id)[:50] if source_id else None,
+            ))
+            summaries.append(AILineOfTherapySummary(
+                episode_id=episode_id,
+                ai_lines_of_therapy_summary_id=source_id,
+                outcome=row.get('outcome'),
+                active_ingredients=row.get('active_ingredients'),
+                active_ingredients_induction=row.get('active_ingredients_induction'),
+                active_ingredients_maintenance=row.get('active_ingredients_maintenance'),
+                has_bispecifics=bool(row.get('has_bispecifics')),
+                has_transplant=bool(row.get('has_transplant')),
+                has_cart=bool(row.get('has_cart')),
+                procedures=row.get('procedures'),
+                is_clinical_trial=bool(row.get('is_clinical_trial')),
+                clinical_trial_identifier=row.get('clinical_trial_identifier'),
+                censoring_date=_safe_date(row.get('censoring_date')),
+                is_validated=bool(row.get('is_validated')),
+                prompt_version=row.get('prompt_version'),
+                notes=row.get('notes'),
+                source_created_at=_safe_datetime(row.get('created_at')),
+                source_updated_at=_safe_datetime(row.get('updated_at')),
+            ))
+            lines_by_person.setdefault(person_id, []).append((episode_id, start, end))
+
+        Episode.objects.bulk_create(episodes, batch_size=self.batch_size)
+        AILineOfTherapySummary.objects.bulk_create(summaries, batch_size=self.batch_size)
+
+        events = self._build_events(lines_by_person)
+        EpisodeEvent.objects.bulk_create(events, batch_size=self.batch_size)
+
+        self.stats['persons'] += len(batch)
+        self.stats['episodes'] += len(episodes)
+        self.stats['summaries'] += len(summaries)
+        self.stats['events'] += len(events)
+
+    def _build_events(self, lines_by_person: dict) -> list[EpisodeEvent]:
+        """Link each line to the drug/procedure rows that started inside it."""
+        if not lines_by_person:
+            return []
+        for lines in lines_by_person.values():
+            lines.sort(key=lambda line: line[1])
+
+        events = []
+        sources = [
+            (
+                DrugExposure.objects.filter(person_id__in=lines_by_person.keys())
+                .values_list('person_id', 'drug_exposure_id', 'drug_exposure_start_date'),
+                DRUG_EXPOSURE_FIELD_CONCEPT_ID,
+            ),
+            (
+                ProcedureOccurrence.objects.filter(person_id__in=lines_by_person.keys())
+                .values_list('person_id', 'procedure_occurrence_id', 'procedure_date'),
+                PROCEDURE_OCCURRENCE_FIELD_CONCEPT_ID,
+            ),
+        ]
+        for rows, field_concept_id in sources:
+            for person_id, event_id, event_date in rows.iterator(chunk_size=2000):
+                episode_id = _find_line(lines_by_person[person_id], event_date)
+                if episode_id is not None:
+                    events.append(EpisodeEvent(
+                        episode_id=episode_id,
+                        event_id=event_id,
+                        episode_event_field_concept_id=field_concept_id,
+                    ))
+        return events
+
+
+def materialize_lines_of_therapy(person_lots: Iterable[tuple[int, list[dict]]],
+                                 batch_size: int = BATCH_SIZE) -> dict:
+    """Convenience wrapper around :class:`LineOfTherapyMaterializer`."""
+    return LineOfTherapyMaterializer(batch_size=batch_size).materialize(person_lots)
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+LOT_TIMELINE_FIELDS = {
+    'person_id': F('episode__person_id'),
+    'line_number': F('episode__episode_number'),
+    'start_date': F('episode__episode_start_date'),
+    'end_date': F('episode__episode_end_date'),
+}
+
+LOT_SUMMARY_FIELDS = [
+    'episode_id',
+    'ai_lines_of_therapy_summary_id',
+    'outcome',
+    'active_ingredients',
+    'active_ingredients_induction',
+    'active_ingredients_maintenance',
+    'has_bispecifics',
+    'has_transplant',
+    'has_cart',
+    'procedures',
+    'is_clinical_trial',
+    'clinical_trial_identifier',
+    'censoring_date',
+    'is_validated',
+]
+
+
+def lot_queryset(person_ids: Iterable[int] | None = None, *,
+                 has_cart: bool | None = None,
+                 has_bispecifics: bool | None = None,
+                 ongoing: bool | None = None,
+                 ingredient: str | None = None):
+    """
+    Return a ``.values()`` queryset of line-of-therapy rows joined to Episode.
+
+    Every filter maps onto an index: person/line order on
+    ``episode_person_number_idx``, ongoing lines on ``episode_ongoing_idx``,
+    CAR-T / bispecific lines on the partial ``ai_lot_cart_idx`` /
+    ``ai_lot_bispecific_idx`` indexes and ingredient search on the
+    PostgreSQL trigram index over ``active_ingredients``.
+    """
+    qs = AILineOfTherapySummary.objects.filter(
+        episode__episode_concept_id=TREATMENT_REGIMEN_CONCEPT_ID,
+    )
+    if person_ids is not None:
+        qs = qs.filter(episode__person_id__in=list(person_ids))
+    if has_cart is not None:
+        qs = qs.filter(has_cart=has_cart)
+    if has_bispecifics is not None:
+        qs = qs.filter(has_bispecifics=has_bispecifics)
+    if ongoing is not None:
+        qs = qs.filter(episode__episode_end_date__isnull=ongoing)
+    if ingredient:
+        qs = qs.filter(active_ingredients__icontains=ingredient)
+    return (
+        qs.values(*LOT_SUMMARY_FIELDS, **LOT_TIMELINE_FIELDS)
+        .order_by('episode__person_id', 'episode__episode_number', 'episode__episode_start_date')
+    )
+
+
+def lot_timelines(person_ids: Iterable[int] | None = None, **filters) -> dict[int, list[dict]]:
+    """
+    Group line-of-therapy rows by person: ``{person_id: [line, ...]}``.
+
+    Accepts the same keyword filters as :func:`lot_queryset`; all persons are
+    served by one query regardless of cohort size.
+    """
+    timelines: dict[int, list[dict]] = {}
+    for row in lot_queryset(person_ids, **filters).iterator(chunk_size=2000):
+        row['is_ongoing'] = row['end_date'] is None
+        timelines.setdefault(row['person_id'], []).append(row)
+    return timelines
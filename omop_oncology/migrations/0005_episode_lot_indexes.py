@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+TRGM_INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX IF NOT EXISTS ai_lot_ingredients_trgm_idx "
+    "ON ai_line_of_therapy_summary USING gin (UPPER(active_ingredients) gin_trgm_ops);",
+]
+DROP_TRGM_INDEX_SQL = "DROP INDEX IF EXISTS ai_lot_ingredients_trgm_idx;"
+
+
+def create_trgm_index(apps, schema_editor):
+    # Backs active_ingredients__icontains (UPPER(...) LIKE UPPER(...)) on PostgreSQL only
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in TRGM_INDEX_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_TRGM_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('omop_oncology', '0004_ai_line_of_therapy_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(fields=['person', 'episode_number'], name='episode_person_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(fields=['episode_concept', 'person'], name='episode_concept_person_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(
+                condition=models.Q(episode_end_date__isnull=True),
+                fields=['person', 'episode_number'],
+                name='episode_ongoing_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='ailineoftherapysummary',
+            index=models.Index(condition=models.Q(has_cart=True), fields=['episode'], name='ai_lot_cart_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ailineoftherapysummary',
+            index=models.Index(
+                condition=models.Q(has_bispecifics=True), fields=['episode'], name='ai_lot_bispecific_idx',
+            ),
+        ),
+        migrations.RunPython(create_trgm_index, drop_trgm_index),
+    ]
@@ -20,6 +20,15 @@ class Episode(models.Model):
 
     class Meta:
         db_table = 'episode'
+        indexes = [
+            models.Index(fields=['person', 'episode_number'], name='episode_person_number_idx'),
+            models.Index(fields=['episode_concept', 'person'], name='episode_concept_person_idx'),
+            models.Index(
+                fields=['person', 'episode_number'],
+                condition=models.Q(episode_end_date__isnull=True),
+                name='episode_ongoing_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Episode {self.episode_id} for Person {self.person_id}"
@@ -236,6 +245,12 @@ class AILineOfTherapySummary(models.Model):
         indexes = [
             models.Index(fields=['episode']),
             models.Index(fields=['ai_lines_of_therapy_summary_id']),
+            models.Index(
+                fields=['episode'], condition=models.Q(has_cart=True), name='ai_lot_cart_idx',
+            ),
+            models.Index(
+                fields=['episode'], condition=models.Q(has_bispecifics=True), name='ai_lot_bispecific_idx',
+            ),
         ]
 
     def __str__(self):
@@ -245,6 +260,9 @@ class AILineOfTherapySummary(models.Model):
             f"({self.active_ingredients or 'no ingredients'})"
         )
 
+    # The proxies below dereference self.episode; use select_related('episode')
+    # or omop_oncology.lines_of_therapy.lot_queryset when listing many lines.
+
     @property
     def line_number(self) -> int | None:
         """Convenience proxy — line number is stored on the OMOP Episode."""
@@ -0,0 +1,97 @@
+"""
+Async (ASGI) variants of the upload, export and health endpoints.
+
+Served by ``ctomop.asgi`` (see Procfile.asgi: gunicorn with uvicorn workers),
+the event loop reads request bodies and writes responses, so a slow client
+uploading or downloading a large file no longer holds a worker for the whole
+transfer:
+
+  GET  /api/async/health/                    like /api/health/, plus a database check
+  POST /api/async/patient-info/upload_csv/   same as /api/patient-info/upload_csv/
+  POST /api/async/patient-info/upload_fhir/  same as /api/patient-info/upload_fhir/
+  GET  /api/async/patient-info/export/       same as /api/patient-info/export/
+
+The upload and export views run the existing PatientInfoViewSet actions, with
+the same authentication, permissions, validation and responses, through
+``sync_to_async(thread_sensitive=True)``. Django gives every ASGI request its
+own thread-sensitive context, so each request's ORM work stays on one thread
+of its own and off the event loop: a few slow uploads cannot block other
+requests. Exports are pulled from that thread a chunk at a time and streamed;
+Django would otherwise read a synchronous StreamingHttpResponse into memory
+before sending it under ASGI.
+
+Under WSGI these views work but gain nothing over the regular routes.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, connection
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from .views import PatientInfoViewSet
+
+
+def _viewset_action(name: str, method: str):
+    """The PatientInfoViewSet action ``name`` as a plain view, configured as the router does."""
+    action = getattr(PatientInfoViewSet, name)
+    return PatientInfoViewSet.as_view({method: name}, basename='patient-info', detail=False, **action.kwargs)
+
+
+def _in_executor(view):
+    """``view`` as a coroutine view that runs it in the request's thread-sensitive executor."""
+    run = sync_to_async(view, thread_sensitive=True)
+
+    async def async_view(request, *args, **kwargs):
+        return await run(request, *args, **kwargs)
+
+    # csrf_exempt() only wraps coroutine functions from Django 5.0 on
+    async_view.csrf_exempt = getattr(view, 'csrf_exempt', False)
+    return async_view
+
+
+async def _pull(chunks):
+    """Iterate the synchronous ``chunks`` one item at a time in the thread-sensitive executor."""
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while (chunk := await next_chunk(chunks, done)) is not done:
+        yield chunk
+
+
+upload_csv = _in_executor(_viewset_action('upload_csv', 'post'))
+upload_fhir = _in_executor(_viewset_action('upload_fhir', 'post'))
+_export = _in_executor(_viewset_action('export', 'get'))
+
+
+async def export(request):
+    response = await _export(request)
+    if response.streaming:
+        # The database iterator is closed by response.close(), which Django
+        # also runs in the thread-sensitive executor
+        response.streaming_content = _pull(iter(response.streaming_content))
+    return response
+
+
+export.csrf_exempt = True
+
+
+def _database_ok() -> bool:
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return False
+    return True
+
+
+async def health_check(request):
+    """Health check endpoint for monitoring; 503 when the database is unreachable."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    database_ok = await sync_to_async(_database_ok, thread_sensitive=True)()
+    return JsonResponse({
+        'status': 'healthy' if database_ok else 'unhealthy',
+        'service': 'ctomop',
+        'database': 'connected' if database_ok else 'unavailable',
+    }, status=200 if database_ok else 503)
+
+
+health_check.csrf_exempt = True
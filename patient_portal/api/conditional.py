@@ -0,0 +1,93 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the PatientInfo read endpoints.
+
+Validators are computed from narrow queries — ``updated_at`` plus the few
+Person / User columns the serializers copy into the payload — never by
+serializing, so an unchanged resource answers ``304 Not Modified`` without
+touching DRF:
+
+  * detail (``/api/patient-info/<person_id>/``): a strong ETag — the exact
+    version of the PatientInfo row, its Person name/gender and linked User
+  * list (``/api/patient-info/``): a weak ETag over the row count and
+    ``max(updated_at)`` — one aggregate query, whatever the table size — and
+    ``Last-Modified`` = ``max(updated_at)``. Additions and edits raise the
+    maximum, deletions lower the count, and saving a Person bumps its
+    PatientInfo's ``updated_at`` (omop_core.models), since the list shows names
+
+Both payloads contain an ``age`` computed from today's date, so the current
+date is part of each ETag and ``Last-Modified`` is never earlier than
+midnight (UTC) today.
+
+Responses carry ``Cache-Control: private, no-cache``: clients may keep them
+but must revalidate, which is cheap. Writes that bypass ``save()`` (queryset
+``update()``) have to set ``updated_at`` themselves to be seen.
+"""
+
+import hashlib
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from omop_core.models import PatientInfo
+from .serializers import UserSerializer
+
+
+class Validators:
+    """An ETag (already quoted, possibly weak) and a Last-Modified datetime."""
+
+    def __init__(self, etag: str, last_modified: datetime):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def not_modified(self, request):
+        """A 304 (or 412 for failed If-Match) response, or None if the view should run."""
+        response = get_conditional_response(
+            request, etag=self.etag, last_modified=int(self.last_modified.timestamp()),
+        )
+        return self.apply(response) if response is not None else None
+
+    def apply(self, response):
+        """Set ETag, Last-Modified and Cache-Control on ``response``; returns it."""
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified.timestamp())
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+def _day_start() -> datetime:
+    return datetime.combine(timezone.now().astimezone(dt_timezone.utc).date(), dt_time.min, dt_timezone.utc)
+
+
+def _etag(digest, *, weak=False) -> str:
+    return f'{"W/" if weak else ""}"{digest.hexdigest()}"'
+
+
+def patient_validators(person_id) -> Validators | None:
+    """Validators for one patient's detail response, or None if it has no PatientInfo."""
+    row = (
+        PatientInfo.objects.filter(person_id=person_id)
+        .values_list(
+            'id', 'updated_at', 'person__given_name', 'person__family_name',
+            'person__gender_concept__concept_name',
+        )
+        .first()
+    )
+    if row is None:
+        return None
+    user = User.objects.filter(id=person_id).values_list(*UserSerializer.Meta.fields).first()
+    day_start = _day_start()
+    digest = hashlib.sha1(repr((row, user, day_start.date())).encode())
+    return Validators(_etag(digest), max(row[1], day_start))
+
+
+def patient_list_validators(queryset) -> Validators:
+    """Validators for the patient list built from ``queryset``."""
+    day_start = _day_start()
+    stats = queryset.order_by().aggregate(count=Count('id'), last_updated=Max('updated_at'))
+    digest = hashlib.sha1(repr((stats['count'], stats['last_updated'], day_start.date())).encode())
+    last_modified = max(stats['last_updated'] or day_start, day_start)
+    return Validators(_etag(digest, weak=True), last_modified)
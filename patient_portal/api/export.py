@@ -0,0 +1,123 @@
+"""
+Streaming PatientInfo cohort export as CSV or NDJSON.
+
+Used by ``GET /api/patient-info/export/`` and the ``export_patient_info``
+management command. Rows are PatientInfoSerializer payloads (see payloads.py)
+read with a database iterator — a server-side cursor on PostgreSQL — and
+encoded a chunk at a time, so memory stays flat however large the cohort:
+
+    from patient_portal.api.export import export_queryset, stream_export
+
+    queryset = export_queryset({'disease': 'multiple myeloma', 'stage__in': 'III,IV'})
+    for chunk in stream_export(queryset, 'csv', fields=['person_id', 'stage']):
+        out.write(chunk)
+
+Filters are ``<column>`` or ``<column>__<lookup>`` on PatientInfo columns,
+with lookups ``in`` (comma-separated), ``gte``, ``lte`` and ``isnull``;
+values are parsed by the model field, so dates are ``YYYY-MM-DD``. In CSV,
+empty cells are nulls and list / object values are JSON-encoded.
+"""
+
+import csv
+import json
+from io import StringIO
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+
+from omop_core.models import PatientInfo
+from .payloads import iter_patient_info_payloads, patient_info_fields
+from .renderers import OrjsonRenderer
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched per database round trip, and encoded per yielded chunk
+DEFAULT_CHUNK_SIZE = 2000
+
+FILTER_LOOKUPS = ('exact', 'in', 'gte', 'lte', 'isnull')
+
+
+def parse_fields(value) -> list[str] | None:
+    """Field names from a comma-separated string (None / empty = every field)."""
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = sorted(set(fields) - set(patient_info_fields()))
+    if unknown:
+        raise ValueError(f'Unknown field(s): {", ".join(unknown)}')
+    return fields
+
+
+def _filter_value(field, lookup, raw):
+    if lookup == 'isnull':
+        if raw.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(f'{field.name}__isnull must be true or false')
+        return raw.lower() in ('true', '1')
+    try:
+        if lookup == 'in':
+            return [field.to_python(part.strip()) for part in raw.split(',')]
+        return field.to_python(raw)
+    except ValidationError as exc:
+        raise ValueError(f'{field.name}: {"; ".join(exc.messages)}') from exc
+
+
+def export_queryset(filters=None):
+    """PatientInfo rows matching ``filters`` ({'<column>[__<lookup>]': str}), in id order."""
+    queryset = PatientInfo.objects.order_by('id')
+    for key, raw in (filters or {}).items():
+        name, _, lookup = key.partition('__')
+        lookup = lookup or 'exact'
+        try:
+            field = PatientInfo._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ValueError(f'Unknown filter column: {name}') from None
+        if not field.concrete or lookup not in FILTER_LOOKUPS:
+            raise ValueError(f'Unsupported filter: {key}')
+        queryset = queryset.filter(**{f'{field.attname}__{lookup}': _filter_value(field, lookup, raw)})
+    return queryset
+
+
+def _csv_cell(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def _csv_chunks(payloads, fields, chunk_size):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for count, payload in enumerate(payloads, start=1):
+        writer.writerow([_csv_cell(payload[name]) for name in fields])
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _ndjson_chunks(payloads, chunk_size):
+    renderer = OrjsonRenderer()
+    lines = []
+    for payload in payloads:
+        lines.append(renderer.render(payload))
+        if len(lines) == chunk_size:
+            yield b'\n'.join(lines) + b'\n'
+            lines = []
+    if lines:
+        yield b'\n'.join(lines) + b'\n'
+
+
+def stream_export(queryset, export_format, *, fields=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encoded chunks (bytes) of ``queryset`` as ``export_format`` ('csv' or 'ndjson')."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {export_format}')
+    fields = fields or patient_info_fields()
+    payloads = iter_patient_info_payloads(queryset, fields=fields, chunk_size=chunk_size)
+    if export_format == 'csv':
+        return _csv_chunks(payloads, fields, chunk_size)
+    return _ndjson_chunks(payloads, chunk_size)
@@ -0,0 +1,182 @@
+"""
+Fast read-path payloads for PatientInfo.
+
+``PatientInfoSerializer`` (``fields='__all__'``, ~270 fields) spends most of
+a read in DRF's per-field dispatch: building a model instance, then calling
+``get_attribute`` and ``to_representation`` on every field. The builders here
+produce the same dicts straight from ``.values()`` rows:
+
+    from patient_portal.api.payloads import patient_info_payloads
+
+    data = patient_info_payloads(PatientInfo.objects.filter(person_id=pk))
+
+The serializer is still the source of truth for which fields appear, in what
+order and how they are formatted: its fields are read once, per serializer
+class, into a plan of (key, column, converter). Columns whose database value
+already is the JSON value (strings, numbers, booleans, JSON) are copied as
+is; dates, datetimes and decimals get a precomputed converter (the DRF
+field's own ``to_representation`` when a format setting needs it). The
+method fields (name, age, gender) are computed from columns joined in the
+same query.
+
+Output is equal to ``Serializer(instance).data`` for every row; the tests
+check this field by field. Writes still go through the serializers.
+"""
+
+import decimal
+from datetime import date
+from functools import cache
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import PatientInfoSerializer, PatientListSerializer
+
+# Serializer fields that pass database values through unchanged
+_PASSTHROUGH = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.FloatField,
+    serializers.IntegerField,
+    serializers.JSONField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+# Declared fields computed from the row, and the extra columns they read
+_PERSON_COLUMNS = ('person__given_name', 'person__family_name')
+_GENDER_COLUMNS = ('person__gender_concept_id', 'person__gender_concept__concept_name')
+_GENDER_LABELS = {'MALE': 'Male', 'FEMALE': 'Female'}
+
+
+def _decimal_converter(field):
+    if (
+        field.decimal_places is None or field.localize
+        or not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    ):
+        return field.to_representation
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        return '{:f}'.format(value.quantize(quantum, rounding=rounding, context=context))
+    return convert
+
+
+def _converter(field):
+    """A callable turning a non-null column value into ``field``'s representation (None = as is)."""
+    if isinstance(field, _PASSTHROUGH) and not getattr(field, 'binary', False):
+        return None
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.DateField) and getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+        return date.isoformat
+    return field.to_representation
+
+
+@cache
+def _plan(serializer_class) -> tuple:
+    """(key, column, converter) per readable field; column is None for computed fields."""
+    plan = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField) or '.' in field.source:
+            plan.append((name, None, None))
+        else:
+            plan.append((name, field.source, _converter(field)))
+    return tuple(plan)
+
+
+def _patient_name(row) -> str:
+    full_name = f"{row['person__given_name'] or ''} {row['person__family_name'] or ''}".strip()
+    return full_name if full_name else f"Patient {row['person']}"
+
+
+def _age(born, today):
+    if not born:
+        return None
+    return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+
+def _gender(row) -> str:
+    if row['person__gender_concept_id'] is None:
+        return 'Unknown'
+    return _GENDER_LABELS.get(row['person__gender_concept__concept_name'], 'Other')
+
+
+def _iter_payloads(queryset, serializer_class, extra_columns, computed, *, fields=None, chunk_size=None):
+    plan = _plan(serializer_class)
+    if fields is not None:
+        by_name = {entry[0]: entry for entry in plan}
+        plan = [by_name[name] for name in fields]
+    columns = {column for _, column, _ in plan if column is not None}
+    columns.update(('person', 'date_of_birth', *extra_columns))
+    rows = queryset.values(*columns)
+    if chunk_size:
+        rows = rows.iterator(chunk_size=chunk_size)
+    for row in rows:
+        values = computed(row)
+        payload = {}
+        for name, column, convert in plan:
+            if column is None:
+                payload[name] = values[name]
+            else:
+                value = row[column]
+                payload[name] = value if value is None or convert is None else convert(value)
+        yield payload
+
+
+def _patient_info_computed(today):
+    return lambda row: {
+        'person_id': row['person'],
+        'patient_name': _patient_name(row),
+        'age': _age(row['date_of_birth'], today),
+        'gender': _gender(row),
+    }
+
+
+def build_plans() -> None:
+    """Build the serializer plans now instead of on the first request (gunicorn master, before fork)."""
+    _plan(PatientInfoSerializer)
+    _plan(PatientListSerializer)
+
+
+def patient_info_fields() -> list[str]:
+    """The keys of a PatientInfoSerializer payload, in order."""
+    return [name for name, _, _ in _plan(PatientInfoSerializer)]
+
+
+def patient_info_payloads(queryset) -> list[dict]:
+    """``PatientInfoSerializer(..., many=True).data`` for a PatientInfo queryset, in its order."""
+    return list(_iter_payloads(
+        queryset, PatientInfoSerializer, _PERSON_COLUMNS + _GENDER_COLUMNS, _patient_info_computed(date.today()),
+    ))
+
+
+def iter_patient_info_payloads(queryset, *, fields=None, chunk_size=2000):
+    """
+    Stream PatientInfoSerializer payloads for ``queryset`` with a database
+    iterator (a server-side cursor on PostgreSQL) of ``chunk_size`` rows,
+    keeping only ``fields`` (names from ``patient_info_fields()``) if given.
+    """
+    return _iter_payloads(
+        queryset, PatientInfoSerializer, _PERSON_COLUMNS + _GENDER_COLUMNS, _patient_info_computed(date.today()),
+        fields=fields, chunk_size=chunk_size,
+    )
+
+
+def patient_list_payloads(queryset) -> list[dict]:
+    """``PatientListSerializer(..., many=True).data`` for a PatientInfo queryset, in its order."""
+    today = date.today()
+    return list(_iter_payloads(
+        queryset, PatientListSerializer, _PERSON_COLUMNS,
+        lambda row: {
+            'person_id': row['person'],
+            'patient_name': _patient_name(row),
+            'age': _age(row['date_of_birth'], today),
+        },
+    ))
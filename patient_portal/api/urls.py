@@ -1,14 +1,25 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CurrentUserViewSet, PatientInfoViewSet, login_view, logout_view, auth_test
+from .views import (
+    ConceptViewSet, CurrentUserViewSet, LineOfTherapyViewSet, PatientInfoViewSet,
+    login_view, logout_view, auth_test,
+)
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'user', CurrentUserViewSet, basename='user')
 router.register(r'patient-info', PatientInfoViewSet, basename='patient-info')
+router.register(r'concepts', ConceptViewSet, basename='concepts')
+router.register(r'lines-of-therapy', LineOfTherapyViewSet, basename='lines-of-therapy')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/login/', login_view, name='login'),
     path('auth/logout/', logout_view, name='logout'),
     path('auth/test/', auth_test, name='auth_test'),
+    # ASGI variants (patient_portal/api/async_views.py)
+    path('async/health/', async_views.health_check, name='async_health_check'),
+    path('async/patient-info/upload_csv/', async_views.upload_csv, name='async_upload_csv'),
+    path('async/patient-info/upload_fhir/', async_views.upload_fhir, name='async_upload_fhir'),
+    path('async/patient-info/export/', async_views.export, name='async_export'),
 ]
\ No newline at end of file
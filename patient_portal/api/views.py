@@ -8,15 +8,24 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.utils import timezone
 from omop_core.models import Person, PatientInfo, Concept
+from omop_core.concept_search import DEFAULT_LIMIT, ConceptMapper, search_concepts
+from omop_core.patient_info_cache import patient_info_cache
+from omop_core.replicas import use_replicas
+from omop_core.source_concepts import GENDER_VOCABULARY, source_concepts
+from omop_oncology.lines_of_therapy import lot_timelines
 from datetime import datetime
 import csv
 import json
 import logging
 from io import StringIO
+from .conditional import Validators, patient_list_validators, patient_validators
+from .export import CONTENT_TYPES, export_queryset, parse_fields, stream_export
+from .payloads import patient_info_payloads, patient_list_payloads
+from .renderers import CSVExportRenderer, NDJSONExportRenderer
 from .serializers import (
     UserSerializer, PatientInfoSerializer, PatientListSerializer
 )
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 
 logger = logging.getLogger(__name__)
@@ -26,26 +35,10 @@ def get_gender_concept(gender_str):
     """Map gender string to OMOP gender concept"""
     if not gender_str:
         return None
-    
-    gender_map = {
-        'male': 8507,
-        'm': 8507,
-        'female': 8532,
-        'f': 8532,
-        'unknown': 8551,
-        'other': 8551,
-        'ambiguous': 8570,
-    }
-    
-    gender_lower = gender_str.lower().strip()
-    concept_id = gender_map.get(gender_lower)
-    
-    if concept_id:
-        try:
-            return Concept.objects.get(concept_id=concept_id)
-        except Concept.DoesNotExist:
-            return None
-    return None
+    concept_id = source_concepts.concept_id(GENDER_VOCABULARY, gender_str, default=None)
+    if concept_id is None:
+        return None
+    return Concept.objects.filter(concept_id=concept_id).first()
 
 @method_decorator(csrf_exempt, name='dispatch')
 class CurrentUserViewSet(viewsets.ViewSet):
@@ -61,6 +54,84 @@ class CurrentUserViewSet(viewsets.ViewSet):
             'user': user_serializer.data
         })
 
+def _parse_bool_param(value):
+    """Map a 'true'/'false' query param to a bool, or None when absent."""
+    if value is None or value == '':
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LineOfTherapyViewSet(viewsets.ViewSet):
+    """Line-of-therapy timelines from the materialized Episode tables."""
+    permission_classes = [IsAuthenticated]
+
+    @use_replicas()
+    def list(self, request):
+        """
+        GET /api/lines-of-therapy/?person_id=1,2&has_cart=true&ongoing=false&ingredient=dara
+
+        Returns every matching line for all requested persons in one query.
+        """
+        person_ids = None
+        raw_ids = request.query_params.getlist('person_id')
+        if raw_ids:
+            try:
+                person_ids = [int(pid) for raw in raw_ids for pid in raw.split(',') if pid.strip()]
+            except ValueError:
+                return Response({'error': 'person_id must be an integer list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        timelines = lot_timelines(
+            person_ids,
+            has_cart=_parse_bool_param(request.query_params.get('has_cart')),
+            has_bispecifics=_parse_bool_param(request.query_params.get('has_bispecifics')),
+            ongoing=_parse_bool_param(request.query_params.get('ongoing')),
+            ingredient=request.query_params.get('ingredient') or None,
+        )
+        return Response({
+            'count': len(timelines),
+            'results': [
+                {'person_id': person_id, 'lines': lines}
+                for person_id, lines in timelines.items()
+            ],
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ConceptViewSet(viewsets.ViewSet):
+    """Concept lookups backed by the indexed search in omop_core.concept_search."""
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        GET /api/concepts/search/?q=hemoglobin&vocabulary=LOINC&domain=Measurement&standard=true&limit=20
+
+        Exact concept_code matches first, then name matches ranked by relevance.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search_concepts(
+            query,
+            vocabulary_id=request.query_params.get('vocabulary') or None,
+            domain_id=request.query_params.get('domain') or None,
+            standard_only=bool(_parse_bool_param(request.query_params.get('standard'))),
+            limit=limit,
+        )
+        return Response({'count': len(results), 'results': results})
+
+    @action(detail=False, methods=['get'], url_path='mapping-stats')
+    def mapping_stats(self, request):
+        """GET /api/concepts/mapping-stats/ — source code → concept lookup counters for this process."""
+        return Response(source_concepts.metrics())
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class PatientInfoViewSet(viewsets.ModelViewSet):
     serializer_class = PatientInfoSerializer
@@ -74,36 +145,60 @@ class PatientInfoViewSet(viewsets.ModelViewSet):
             return PatientListSerializer
         return PatientInfoSerializer
     
+    @staticmethod
+    def _cached_response(request, entry):
+        """304 / 412 or the cached payload, with its validators."""
+        validators = Validators(entry['etag'], entry['last_modified'])
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        return validators.apply(Response(entry['data']))
+    
+    @use_replicas()
     def list(self, request):
         """List all patients - accessible to authenticated users"""
+        key = patient_info_cache.list_key(request.GET)
+        entry = patient_info_cache.get(key)
+        if entry is not None:
+            return self._cached_response(request, entry)
         queryset = self.get_queryset().order_by('-created_at')
-        serializer = PatientListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        validators = patient_list_validators(queryset)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        data = patient_list_payloads(queryset)
+        entry = patient_info_cache.set(key, data, validators.etag, validators.last_modified)
+        return validators.apply(Response(entry['data']))
     
+    @use_replicas()
     def retrieve(self, request, pk=None):
         """Get detailed patient info for a specific person"""
-        try:
-            person = Person.objects.get(person_id=pk)
-            patient_info = PatientInfo.objects.get(person=person)
-            
-            # Get the User associated with this person (not the logged-in user)
-            try:
-                patient_user = User.objects.get(id=person.person_id)
-                user_serializer = UserSerializer(patient_user)
-                user_data = user_serializer.data
-            except User.DoesNotExist:
-                user_data = None
-            
-            patient_serializer = PatientInfoSerializer(patient_info)
-            
-            return Response({
-                'patient_info': patient_serializer.data,
-                'user': user_data
-            })
-        except Person.DoesNotExist:
-            return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
-        except PatientInfo.DoesNotExist:
+        key = patient_info_cache.detail_key(pk, request.GET)
+        entry = patient_info_cache.get(key)
+        if entry is not None:
+            return self._cached_response(request, entry)
+        validators = patient_validators(pk)
+        if validators is not None:
+            not_modified = validators.not_modified(request)
+            if not_modified is not None:
+                return not_modified
+        payloads = patient_info_payloads(PatientInfo.objects.filter(person_id=pk))
+        if not payloads:
+            if not Person.objects.filter(person_id=pk).exists():
+                return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
             return Response({'error': 'Patient information not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        # The User associated with this person (not the logged-in user)
+        user_data = User.objects.filter(id=pk).values(*UserSerializer.Meta.fields).first()
+        
+        data = {
+            'patient_info': payloads[0],
+            'user': user_data
+        }
+        if validators is None:  # created since the validators were read
+            return Response(data)
+        entry = patient_info_cache.set(key, data, validators.etag, validators.last_modified)
+        return validators.apply(Response(entry['data']))
     
     def update(self, request, pk=None, partial=False):
         """Update patient info for a specific person"""
@@ -252,6 +347,16 @@ class PatientInfoViewSet(viewsets.ModelViewSet):
                     if patient_id in patients_data:
                         patients_data[patient_id]['medications'].append(resource)
             
+            # Observation names repeat across patients; map each one once
+            concept_mapper = ConceptMapper()
+            # Resolve every distinct observation coding in the upload up front
+            source_concepts.prefetch_codings(
+                coding
+                for data in patients_data.values()
+                for observation in data['observations']
+                for coding in observation.get('code', {}).get('coding', [])
+            )
+
             # Process each patient
             for fhir_patient_id, data in patients_data.items():
                 try:
@@ -381,13 +486,7 @@ class PatientInfoViewSet(viewsets.ModelViewSet):
                         condition_id = last_condition.condition_occurrence_id + 1 if last_condition else 1
                         
                         # Get breast cancer concept (using a standard concept ID)
-                        breast_cancer_concept = None
-                        try:
-                            breast_cancer_concept = Concept.objects.filter(
-                                concept_name__icontains='breast cancer'
-                            ).first()
-                        except:
-                            pass
+                        breast_cancer_concept = concept_mapper.concept('breast cancer')
                         
                         if breast_cancer_concept:
                             # Get EHR type concept (32817 = EHR)
@@ -912,13 +1011,9 @@ class PatientInfoViewSet(viewsets.ModelViewSet):
                                 value_string = value_concept['coding'][0].get('display')
                         
                         # Find or create measurement concept
-                        measurement_concept = None
-                        try:
-                            measurement_concept = Concept.objects.filter(
-                                concept_name__icontains=obs_name[:50]
-                            ).first()
-                        except:
-                            pass
+                        measurement_concept = concept_mapper.concept(
+                            obs_name[:50], codings=obs_code.get('coding', []),
+                        )
                         
                         if not measurement_concept:
                             # Use a generic lab test concept if not found
@@ -1273,6 +1368,10 @@ class PatientInfoViewSet(viewsets.ModelViewSet):
                 except Exception as e:
                     errors.append(f"Patient {fhir_patient_id}: {str(e)}")
             
+            logger.info(
+                f"FHIR upload concept mapping: {concept_mapper.hits} memoized, {concept_mapper.misses} resolved; "
+                f"source map {source_concepts.metrics()}"
+            )
             return Response({
                 'success': True,
                 'created_count': created_count,
@@ -1299,6 +1398,37 @@ class PatientInfoViewSet(viewsets.ModelViewSet):
         except PatientInfo.DoesNotExist:
             return Response({'error': 'Patient info not found'}, status=status.HTTP_404_NOT_FOUND)
     
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """GET /api/patient-info/cache-stats/ — response cache counters for this process."""
+        return Response(patient_info_cache.metrics())
+    
+    @action(detail=False, methods=['get'], renderer_classes=[CSVExportRenderer, NDJSONExportRenderer])
+    @use_replicas()
+    def export(self, request):
+        """
+        GET /api/patient-info/export/?format=csv|ndjson&fields=a,b&<column>[__<lookup>]=value
+        
+        Streams the matching PatientInfo rows (all of them by default) as CSV or NDJSON.
+        """
+        params = request.query_params.dict()
+        params.pop('format', None)
+        try:
+            fields = parse_fields(params.pop('fields', None))
+            queryset = export_queryset(params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Streamed after the view returns, outside use_replicas(): pick the database now
+        queryset = queryset.using(queryset.db)
+        
+        export_format = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            stream_export(queryset, export_format, fields=fields),
+            content_type=CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="patient_info.{export_format}"'
+        return response
+    
     @action(detail=False, methods=['delete'])
     def bulk_delete(self, request):
         """Delete multiple patients by person_ids"""
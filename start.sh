@@ -7,6 +7,8 @@ echo "========================================="
 
 echo "Running migrations..."
 python manage.py migrate --noinput
+# No-op unless CACHE_BACKEND=database
+python manage.py createcachetable
 
 echo "Creating/resetting admin user..."
 python reset_admin.py || {
@@ -32,4 +34,10 @@ except User.DoesNotExist:
 echo "========================================="
 echo "Starting gunicorn..."
 echo "========================================="
+# Workers, threads, preloading and warm-up come from gunicorn.conf.py
+if [ "$SERVER_PROFILE" = "asgi" ]; then
+    # Uvicorn workers serving ctomop.asgi (async upload/export views, see Procfile.asgi)
+    export DB_CONN_MAX_AGE=0
+    exec gunicorn ctomop.asgi:application
+fi
 exec gunicorn ctomop.wsgi:application
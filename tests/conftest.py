@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    """Cached API responses outlive each test's rolled-back database."""
+    yield
+    for cache in caches.all():
+        cache.clear()
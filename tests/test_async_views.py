@@ -0,0 +1,124 @@
+"""
+Tests for the ASGI upload/export/health views (patient_portal/api/async_views.py).
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from asgiref.sync import ThreadSensitiveContext, async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient
+from rest_framework.response import Response
+
+from benchmarks.datasets import fhir_bundles
+from omop_core.models import PatientInfo
+from patient_portal.api.views import PatientInfoViewSet
+from tests.factories import PatientInfoFactory
+
+pytestmark = pytest.mark.django_db
+
+BASE = '/api/async/'
+
+
+@pytest.fixture
+def client(admin_user):
+    client = AsyncClient()
+    client.force_login(admin_user)
+    return client
+
+
+def _request(client, method, path, *args, **kwargs):
+    async def call():
+        return await getattr(client, method)(path, *args, **kwargs)
+    return async_to_sync(call)()
+
+
+async def _body(response):
+    if response.streaming:
+        return b''.join([chunk async for chunk in response.streaming_content])
+    return response.content
+
+
+def test_health():
+    response = _request(AsyncClient(), 'get', BASE + 'health/')
+    assert response.status_code == 200
+    assert response.json() == {'status': 'healthy', 'service': 'ctomop', 'database': 'connected'}
+    assert _request(AsyncClient(), 'post', BASE + 'health/').status_code == 405
+
+
+class TestUpload:
+
+    def test_upload_fhir(self):
+        [(patients, body)] = fhir_bundles(3, 7, 3)
+        upload = SimpleUploadedFile('bundle.json', body, content_type='application/json')
+        response = _request(AsyncClient(), 'post', BASE + 'patient-info/upload_fhir/', {'file': upload})
+        assert response.status_code == 200
+        assert PatientInfo.objects.count() == patients == 3
+
+    def test_upload_fhir_keeps_validation(self):
+        upload = SimpleUploadedFile('bundle.json', json.dumps({'resourceType': 'Patient'}).encode())
+        response = _request(AsyncClient(), 'post', BASE + 'patient-info/upload_fhir/', {'file': upload})
+        assert response.status_code == 400
+        assert response.json() == {'error': 'FHIR file must be a Bundle'}
+
+    def test_upload_csv_matches_sync_route(self, client, admin_client):
+        body = b'person_id,gender,year_of_birth,disease\n501,female,1960,multiple myeloma\n'
+
+        def upload():
+            return {'file': SimpleUploadedFile('patients.csv', body, content_type='text/csv')}
+
+        response = _request(client, 'post', BASE + 'patient-info/upload_csv/', upload())
+        assert response.status_code == 200
+        assert response.json() == admin_client.post('/api/patient-info/upload_csv/', upload()).json()
+
+    def test_get_not_allowed(self):
+        assert _request(AsyncClient(), 'get', BASE + 'patient-info/upload_fhir/').status_code == 405
+
+
+class TestExport:
+
+    def test_streams_asynchronously(self, client):
+        PatientInfoFactory.create_batch(3)
+
+        async def export():
+            response = await client.get(BASE + 'patient-info/export/', {'format': 'ndjson', 'fields': 'person_id'})
+            assert response.is_async
+            return response, await _body(response)
+
+        response, body = async_to_sync(export)()
+        assert response['Content-Type'] == 'application/x-ndjson'
+        expected = list(PatientInfo.objects.order_by('id').values_list('person_id', flat=True))
+        assert [json.loads(line)['person_id'] for line in body.decode().splitlines()] == expected
+
+    def test_bad_request(self, client):
+        response = _request(client, 'get', BASE + 'patient-info/export/', {'fields': 'nope'})
+        assert response.status_code == 400
+
+    def test_requires_login(self):
+        assert _request(AsyncClient(), 'get', BASE + 'patient-info/export/').status_code in (401, 403)
+
+
+def test_slow_upload_does_not_block_other_requests(monkeypatch):
+    def slow_upload(self, request):
+        time.sleep(0.5)
+        return Response({'success': True})
+
+    monkeypatch.setattr(PatientInfoViewSet, 'upload_fhir', slow_upload)
+
+    async def request(method, path):
+        # Each ASGI request gets its own thread-sensitive context (django.core.handlers.asgi)
+        async with ThreadSensitiveContext():
+            return await getattr(AsyncClient(), method)(path)
+
+    async def scenario():
+        upload = asyncio.create_task(request('post', BASE + 'patient-info/upload_fhir/'))
+        await asyncio.sleep(0.05)
+        health = await request('get', BASE + 'health/')
+        assert not upload.done()
+        return health, await upload
+
+    health, upload = async_to_sync(scenario)()
+    assert health.status_code == 200
+    assert upload.status_code == 200
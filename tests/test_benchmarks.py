@@ -0,0 +1,109 @@
+"""
+Tests for the benchmarks package (scenarios at a tiny scale, metrics, baseline comparison).
+"""
+
+import json
+from contextlib import nullcontext
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from benchmarks import datasets, runner
+from benchmarks.metrics import compare, measure, percentile
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.stubs import StubbedHealthTreeCommand
+from omop_core.models import Person
+
+pytestmark = pytest.mark.django_db
+
+EXPECTED_KEYS = {
+    'unit', 'count', 'operations', 'seconds', 'throughput', 'p50_ms', 'p95_ms',
+    'queries', 'queries_per_unit', 'peak_rss_mb',
+}
+
+
+# cold_start times subprocesses, which never query this database (tests/test_startup.py)
+@pytest.mark.parametrize('name', [name for name in SCENARIOS if name != 'cold_start'])
+def test_scenario_runs_at_tiny_scale(name):
+    metrics = SCENARIOS[name](3, datasets.DEFAULT_SEED)
+    assert set(metrics) == EXPECTED_KEYS
+    assert metrics['count'] > 0
+    assert metrics['queries'] > 0
+
+
+def test_run_builds_report():
+    report = runner.run(3, 1, ['upload_csv', 'patient_info_list'])
+    assert report['meta']['patients'] == 3
+    assert report['meta']['scale'] == '3'
+    assert set(report['results']) == {'upload_csv', 'patient_info_list'}
+    assert report['results']['upload_csv']['count'] == 3
+
+
+def test_stubbed_healthtree_command_loads_persons():
+    datasets.seed_demographic_concepts()
+    tables = datasets.healthtree_tables(4, seed=7)
+    command = StubbedHealthTreeCommand(tables)
+    call_command(command, stdout=StringIO(), stderr=StringIO())
+    assert Person.objects.count() == 4
+    assert command.client.queries >= 3
+
+
+def test_save_baseline_for_some_scenarios_keeps_stored_meta(tmp_path, monkeypatch):
+    def fake_run(count, seed, names, progress=None):
+        created_at = '2026-01-02T00:00:00+00:00' if len(names) == 1 else '2026-01-01T00:00:00+00:00'
+        return {'meta': {'seed': seed, 'created_at': created_at}, 'results': {name: {} for name in names}}
+
+    monkeypatch.setattr(runner, 'run', fake_run)
+    monkeypatch.setattr(runner, 'isolated_database', nullcontext)
+    path = tmp_path / 'baseline.json'
+    options = {'scale': '3', 'baseline': str(path), 'save_baseline': True, 'stdout': StringIO()}
+    call_command('run_benchmarks', scenarios=list(SCENARIOS), **options)
+    call_command('run_benchmarks', scenarios=['upload_csv'], **options)
+
+    meta = json.loads(path.read_text())['meta']
+    assert meta['created_at'] == '2026-01-01T00:00:00+00:00'
+    assert meta['recorded_at'].pop('upload_csv') == '2026-01-02T00:00:00+00:00'
+    assert set(meta['recorded_at'].values()) == {'2026-01-01T00:00:00+00:00'}
+
+
+class TestDatasets:
+
+    def test_parse_scale(self):
+        assert datasets.parse_scale('10k') == 10_000
+        assert datasets.parse_scale('250') == 250
+        with pytest.raises(ValueError):
+            datasets.parse_scale('lots')
+        with pytest.raises(ValueError):
+            datasets.parse_scale('0')
+
+    def test_seeded_data_is_reproducible(self):
+        assert list(datasets.patient_csvs(5, 3, 2)) == list(datasets.patient_csvs(5, 3, 2))
+        assert [rows for rows, _ in datasets.fhir_bundles(5, 3, 2)] == [2, 2, 1]
+
+
+class TestMetrics:
+
+    def test_percentile_nearest_rank(self):
+        values = [5, 1, 4, 2, 3]
+        assert percentile(values, 50) == 3
+        assert percentile(values, 95) == 5
+        assert percentile([7], 95) == 7
+
+    def test_measure_counts_units(self):
+        metrics = measure([lambda: 2, lambda: 3], unit='patients')
+        assert metrics['count'] == 5
+        assert metrics['operations'] == 2
+        assert metrics['queries'] == 0
+
+    def test_compare_flags_regressions_beyond_tolerance(self):
+        baseline = {'a': {'unit': 'patients', 'throughput': 100.0, 'p95_ms': 10.0, 'queries': 50}}
+        within = {'a': {'unit': 'patients', 'throughput': 85.0, 'p95_ms': 11.5, 'queries': 50}}
+        worse = {'a': {'unit': 'patients', 'throughput': 70.0, 'p95_ms': 13.0, 'queries': 51}}
+        assert compare(within, baseline, tolerance=0.2) == []
+        regressions = compare(worse, baseline, tolerance=0.2)
+        assert len(regressions) == 3
+        assert any('queries' in line for line in regressions)
+
+    def test_compare_ignores_scenarios_missing_from_baseline(self):
+        assert compare({'new': {'unit': 'requests', 'throughput': 1, 'p95_ms': 1, 'queries': 1}}, {}) == []
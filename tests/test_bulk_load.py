@@ -0,0 +1,60 @@
+"""
+Tests for omop_core.bulk_load — COPY / executemany bulk row loading.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+from omop_core.bulk_load import bulk_load, copy_supported, load_fields
+from omop_core.models import Measurement, PatientInfo, Person
+from tests.factories import ConceptFactory, PersonFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class TestBulkLoad:
+
+    def test_round_trips_field_types(self):
+        person = PersonFactory()
+        concept = ConceptFactory()
+        written = bulk_load(Measurement, (
+            Measurement(
+                measurement_id=100 + i,
+                person_id=person.person_id,
+                measurement_concept_id=concept.concept_id,
+                measurement_date=date(2024, 1, i + 1),
+                measurement_type_concept_id=concept.concept_id,
+                value_as_number=Decimal('12.34567'),
+                value_as_string='x' if i else None,
+            )
+            for i in range(3)
+        ), batch_size=2)
+        assert written == 3
+        rows = list(Measurement.objects.order_by('measurement_id'))
+        assert [m.measurement_date for m in rows] == [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)]
+        assert rows[0].value_as_number == Decimal('12.34567')
+        assert rows[0].value_as_string is None
+
+    def test_auto_pk_defaults_and_auto_now(self):
+        person = PersonFactory()
+        bulk_load(PatientInfo, [PatientInfo(person_id=person.person_id, disease='breast cancer')])
+        info = PatientInfo.objects.get(person=person)
+        assert info.pk is not None
+        assert info.genetic_mutations == []
+        assert info.created_at is not None
+
+    def test_auto_pk_not_loaded(self):
+        assert 'id' not in [f.attname for f in load_fields(PatientInfo)]
+        assert 'person_id' in [f.attname for f in load_fields(Person)]
+
+    def test_copy_rejected_without_postgres(self):
+        if copy_supported(connection):
+            pytest.skip('COPY is available on this backend')
+        with pytest.raises(ValueError):
+            bulk_load(Person, [], method='copy')
+
+    def test_empty_input(self):
+        assert bulk_load(Person, []) == 0
@@ -0,0 +1,87 @@
+"""
+Tests for omop_core.concept_search — indexed concept search and the ingestion mapper.
+
+Runs against both the SQLite FTS5 index and the unindexed icontains fallback.
+"""
+
+import pytest
+from django.db import connection
+
+from omop_core.concept_search import ConceptMapper, install_search_index, search_concepts
+from tests.factories import ConceptFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(params=['indexed', 'scan'])
+def concepts(request):
+    # Tests run without migrations, so install the index explicitly
+    if request.param == 'indexed':
+        install_search_index(connection)
+    return {
+        'hgb': ConceptFactory(concept_name='Hemoglobin [Mass/volume] in Blood', concept_code='718-7'),
+        'hgb_exact': ConceptFactory(concept_name='Hemoglobin', concept_code='HGB'),
+        'a1c': ConceptFactory(concept_name='Hemoglobin A1c/Hemoglobin.total in Blood', concept_code='4548-4'),
+        'plt': ConceptFactory(concept_name='Platelets [#/volume] in Blood', concept_code='777-3'),
+    }
+
+
+class TestSearchConcepts:
+
+    def test_exact_name_ranks_first(self, concepts):
+        results = search_concepts('hemoglobin')
+        assert results[0]['concept_id'] == concepts['hgb_exact'].concept_id
+        assert {r['concept_id'] for r in results} == {
+            concepts['hgb'].concept_id, concepts['hgb_exact'].concept_id, concepts['a1c'].concept_id,
+        }
+        assert all(r['match'] == 'name' for r in results)
+
+    def test_exact_code_fast_path(self, concepts):
+        results = search_concepts('777-3')
+        assert results[0]['concept_id'] == concepts['plt'].concept_id
+        assert results[0]['match'] == 'code'
+        assert results[0]['score'] == 1.0
+
+    def test_substring_and_limit(self, concepts):
+        assert [r['concept_id'] for r in search_concepts('platelet')] == [concepts['plt'].concept_id]
+        assert len(search_concepts('in blood', limit=2)) == 2
+
+    def test_filters(self, concepts):
+        ConceptFactory(concept_name='Hemoglobin', concept_code='H1', standard_concept=None)
+        assert all(r['standard_concept'] == 'S' for r in search_concepts('hemoglobin', standard_only=True))
+        assert search_concepts('hemoglobin', vocabulary_id='SNOMED') == []
+
+    def test_blank_query(self, concepts):
+        assert search_concepts('   ') == []
+
+    def test_index_follows_concept_changes(self, concepts):
+        concepts['plt'].concept_name = 'Thrombocytes'
+        concepts['plt'].save()
+        assert search_concepts('platelet') == []
+        assert search_concepts('thrombo')[0]['concept_id'] == concepts['plt'].concept_id
+
+
+class TestConceptMapper:
+
+    def test_memoizes_lookups(self, concepts, django_assert_num_queries):
+        mapper = ConceptMapper()
+        assert mapper.concept_id('Platelets') == concepts['plt'].concept_id
+        with django_assert_num_queries(0):
+            assert mapper.concept_id(' platelets ') == concepts['plt'].concept_id
+        assert (mapper.hits, mapper.misses) == (1, 1)
+
+    def test_code_before_text(self, concepts):
+        mapper = ConceptMapper()
+        assert mapper.concept('Hemoglobin', codes=['4548-4']) == concepts['a1c']
+        assert mapper.concept_id('no such observation') is None
+
+
+class TestSearchEndpoint:
+
+    def test_search(self, concepts, admin_client):
+        response = admin_client.get('/api/concepts/search/', {'q': 'hemoglobin', 'limit': 1})
+        assert response.status_code == 200
+        assert response.json()['results'][0]['concept_id'] == concepts['hgb_exact'].concept_id
+
+    def test_requires_query(self, admin_client):
+        assert admin_client.get('/api/concepts/search/').status_code == 400
@@ -0,0 +1,80 @@
+"""
+Tests for omop_core.concept_sets — hierarchy expansion over concept_ancestor.
+"""
+
+from datetime import date
+
+import pytest
+
+from omop_core.concept_sets import (
+    clear_concept_set_cache, concept_ids_for_codes, descendants, descendants_query,
+    standard_descendants,
+)
+from omop_core.models import ConceptAncestor, ConceptRelationship, Measurement
+from tests.factories import ConceptFactory, MeasurementFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_concept_set_cache()
+    yield
+    clear_concept_set_cache()
+
+
+def _ancestor(ancestor, descendant, levels=1):
+    ConceptAncestor.objects.create(
+        ancestor_concept_id=ancestor, descendant_concept_id=descendant,
+        min_levels_of_separation=levels, max_levels_of_separation=levels,
+    )
+
+
+@pytest.fixture
+def hierarchy():
+    root, child, grandchild, other = (ConceptFactory() for _ in range(4))
+    _ancestor(root.concept_id, child.concept_id, 1)
+    _ancestor(root.concept_id, grandchild.concept_id, 2)
+    _ancestor(child.concept_id, grandchild.concept_id, 1)
+    return root, child, grandchild, other
+
+
+class TestDescendants:
+
+    def test_includes_self_and_all_levels(self, hierarchy):
+        root, child, grandchild, other = hierarchy
+        assert descendants([root.concept_id]) == {root.concept_id, child.concept_id, grandchild.concept_id}
+        assert descendants([root.concept_id], max_levels=1) == {root.concept_id, child.concept_id}
+        assert descendants([other.concept_id]) == {other.concept_id}
+
+    def test_cached_until_hierarchy_changes(self, hierarchy, django_assert_num_queries):
+        root, child, grandchild, other = hierarchy
+        descendants([root.concept_id])
+        with django_assert_num_queries(0):
+            descendants([root.concept_id])
+        _ancestor(root.concept_id, other.concept_id)
+        assert other.concept_id in descendants([root.concept_id])
+
+    def test_usable_in_filters(self, hierarchy):
+        root, child, grandchild, other = hierarchy
+        match = MeasurementFactory(measurement_concept=grandchild)
+        MeasurementFactory(measurement_concept=other)
+        cached = Measurement.objects.filter(measurement_concept_id__in=descendants([root.concept_id]))
+        subquery = Measurement.objects.filter(measurement_concept_id__in=descendants_query([root.concept_id]))
+        assert list(cached) == [match]
+        assert list(subquery) == [match]
+
+    def test_standard_descendants_follow_maps_to(self, hierarchy):
+        root, child, grandchild, other = hierarchy
+        source = ConceptFactory()
+        ConceptRelationship.objects.create(
+            concept_1=source, concept_2=root, relationship_id='Maps to',
+            valid_start_date=date(1970, 1, 1), valid_end_date=date(2099, 12, 31),
+        )
+        assert standard_descendants([source.concept_id, other.concept_id]) == {
+            root.concept_id, child.concept_id, grandchild.concept_id, other.concept_id,
+        }
+
+    def test_concept_ids_for_codes(self):
+        concept = ConceptFactory(concept_code='718-7', vocabulary__vocabulary_id='LOINC')
+        assert concept_ids_for_codes('LOINC', ['718-7', 'nope']) == {concept.concept_id}
@@ -0,0 +1,157 @@
+"""
+Tests for export_fhir and omop_core.fhir_export — OMOP back to FHIR.
+"""
+
+import gzip
+import json
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from omop_core.fhir_export import export_pages
+from omop_core.models import ConditionOccurrence, DrugExposure, Measurement, Observation, Person
+from tests.factories import (
+    ConceptFactory, ConditionOccurrenceFactory, DrugExposureFactory, MeasurementFactory,
+    ObservationFactory, PersonFactory, VocabularyFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def patient():
+    person = PersonFactory(
+        person_id=7, given_name='Jane Ann', family_name='Doe', year_of_birth=1970, month_of_birth=5,
+        day_of_birth=2, gender_concept=ConceptFactory(concept_name='FEMALE', concept_code='F'),
+    )
+    snomed = VocabularyFactory(vocabulary_id='SNOMED', vocabulary_name='SNOMED')
+    local = VocabularyFactory(vocabulary_id='Local', vocabulary_name='Local')
+    ConditionOccurrenceFactory(
+        condition_occurrence_id=1, person=person, condition_source_value='C50.9',
+        condition_concept=ConceptFactory(vocabulary=snomed, concept_code='254837009', concept_name='Breast cancer'),
+    )
+    MeasurementFactory(
+        measurement_id=1, person=person, value_as_number=Decimal('12.5'), unit_source_value='g/dL',
+        measurement_concept=ConceptFactory(
+            vocabulary=VocabularyFactory(vocabulary_id='LOINC'), concept_code='718-7', concept_name='Hemoglobin',
+        ),
+    )
+    ObservationFactory(observation_id=1, person=person, value_as_string='Positive',
+                       observation_concept=ConceptFactory(vocabulary=local, concept_name='ER status'))
+    DrugExposureFactory(drug_exposure_id=1, person=person, drug_source_value='Letrozole',
+                        drug_concept=ConceptFactory(vocabulary=local, concept_name='letrozole'))
+    return person
+
+
+def _resources():
+    return [r for page in export_pages() for r in page]
+
+
+class TestResources:
+
+    def test_patient(self, patient):
+        resource = _resources()[0]
+        assert resource == {
+            'resourceType': 'Patient', 'id': '7', 'name': [{'family': 'Doe', 'given': ['Jane', 'Ann']}],
+            'gender': 'female', 'birthDate': '1970-05-02',
+        }
+
+    def test_events_follow_their_patient(self, patient):
+        types = [r['resourceType'] for r in _resources()]
+        assert types == ['Patient', 'Condition', 'Observation', 'Observation', 'MedicationStatement']
+
+    def test_condition_coding(self, patient):
+        condition = _resources()[1]
+        assert condition['subject'] == {'reference': 'Patient/7'}
+        assert condition['code'] == {
+            'coding': [{'system': 'http://snomed.info/sct', 'code': '254837009', 'display': 'Breast cancer'}],
+            'text': 'C50.9',
+        }
+        assert condition['onsetDateTime'] == '2022-06-01'
+
+    def test_observations(self, patient):
+        measurement, observation = _resources()[2:4]
+        assert measurement['id'] == 'measurement-1'
+        assert measurement['code']['coding'][0] == {
+            'system': 'http://loinc.org', 'code': '718-7', 'display': 'Hemoglobin',
+        }
+        assert measurement['valueQuantity'] == {'value': 12.5, 'unit': 'g/dL'}
+        assert observation['id'] == 'observation-1'
+        assert observation['valueString'] == 'Positive'
+        assert observation['code'] == {'text': 'ER status'}  # no FHIR system for a local vocabulary
+
+    def test_medication_statement(self, patient):
+        medication = _resources()[4]
+        assert medication['status'] == 'completed'
+        assert medication['effectivePeriod'] == {'start': '2023-01-01', 'end': '2023-06-30'}
+        assert medication['medicationCodeableConcept'] == {'text': 'Letrozole'}
+
+    def test_partial_birth_date_and_unknown_gender(self):
+        PersonFactory(person_id=1, year_of_birth=1980, gender_concept=None, gender_source_value='X')
+        resource = _resources()[0]
+        assert resource['birthDate'] == '1980'
+        assert 'gender' not in resource
+
+
+class TestPaging:
+
+    def test_constant_queries_per_page(self, django_assert_num_queries):
+        for pid in range(1, 8):
+            person = PersonFactory(person_id=pid)
+            MeasurementFactory(person=person, measurement_concept=ConceptFactory())
+        # 3 pages × (persons + 4 event tables) + the final empty persons page
+        with django_assert_num_queries(3 * 5 + 1):
+            pages = list(export_pages(page_size=3))
+        assert [sum(r['resourceType'] == 'Patient' for r in page) for page in pages] == [3, 3, 1]
+
+    def test_types_filter(self, patient):
+        pages = list(export_pages(types=('Patient', 'Condition')))
+        assert [r['resourceType'] for r in pages[0]] == ['Patient', 'Condition']
+
+
+class TestCommand:
+
+    def test_ndjson(self, patient, tmp_path):
+        out = StringIO()
+        call_command('export_fhir', output=str(tmp_path), gzip=True, stdout=out)
+        with gzip.open(tmp_path / 'Observation.ndjson.gz', 'rt') as fh:
+            assert len(fh.read().splitlines()) == 2
+        assert '1 Patient, 1 Condition, 2 Observation, 1 MedicationStatement' in out.getvalue()
+
+    def test_paged_bundles(self, tmp_path):
+        for pid in range(1, 6):
+            PersonFactory(person_id=pid)
+        call_command(
+            'export_fhir', output=str(tmp_path), format='bundle', page_size=2,
+            base_url='https://fhir.example.org/', stdout=StringIO(),
+        )
+        bundles = sorted(tmp_path.glob('bundle-*.json'))
+        assert [b.name for b in bundles] == ['bundle-000001.json', 'bundle-000002.json', 'bundle-000003.json']
+        first = json.loads(bundles[0].read_text())
+        assert first['resourceType'] == 'Bundle'
+        assert [e['fullUrl'] for e in first['entry']] == [
+            'https://fhir.example.org/Patient/1', 'https://fhir.example.org/Patient/2',
+        ]
+
+    def test_round_trip_through_import(self, tmp_path):
+        generated, exported = tmp_path / 'generated', tmp_path / 'exported'
+        call_command(
+            'generate_fhir_bundle', count=3, seed=5, as_of='2025-01-01', format='ndjson',
+            output=str(generated), stdout=StringIO(),
+        )
+        call_command('import_fhir_ndjson', str(generated), stdout=StringIO(), stderr=StringIO())
+        before = {
+            'conditions': ConditionOccurrence.objects.count(),
+            'observations': Measurement.objects.count() + Observation.objects.count(),
+            'drugs': DrugExposure.objects.count(),
+        }
+        call_command('export_fhir', output=str(exported), stdout=StringIO())
+
+        Person.objects.all().delete()
+        call_command('import_fhir_ndjson', str(exported), stdout=StringIO(), stderr=StringIO())
+        assert Person.objects.count() == 3
+        assert ConditionOccurrence.objects.count() == before['conditions']
+        assert Measurement.objects.count() + Observation.objects.count() == before['observations']
+        assert DrugExposure.objects.count() == before['drugs']
@@ -0,0 +1,153 @@
+"""
+Tests for export_omop_cdm and omop_core.cdm_export.
+"""
+
+import csv
+import gzip
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from omop_core.cdm_export import CDM_TABLES, export_fields, shard_queryset, table_batches
+from omop_core.models import Measurement
+from omop_oncology.models import Episode, EpisodeEvent
+from tests.factories import (
+    ConceptFactory, ConditionOccurrenceFactory, DrugExposureFactory, MeasurementFactory, PersonFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cdm():
+    """Four persons with a few events each, and one episode with an event for person 1."""
+    persons = [PersonFactory(person_id=pid, given_name='Secret') for pid in (1, 2, 3, 4)]
+    concept = ConceptFactory()
+    for person in persons:
+        MeasurementFactory(person=person, measurement_concept=concept, value_as_number=person.person_id)
+        MeasurementFactory(person=person, measurement_concept=concept)
+        ConditionOccurrenceFactory(person=person, condition_concept=concept)
+    DrugExposureFactory(person=persons[0], drug_concept=concept)
+    Episode.objects.create(
+        episode_id=10, person=persons[0], episode_concept=concept, episode_start_date='2023-01-01',
+        episode_object_concept=concept, episode_type_concept=concept,
+    )
+    EpisodeEvent.objects.create(episode_id=10, event_id=1, episode_event_field_concept=concept)
+    EpisodeEvent.objects.create(episode_id=99, event_id=2, episode_event_field_concept=concept)
+    return persons
+
+
+def _read_csv(path):
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as fh:
+        return list(csv.DictReader(fh))
+
+
+def _export(tmp_path, *args):
+    out = StringIO()
+    call_command('export_omop_cdm', str(tmp_path), *args, stdout=out)
+    return out.getvalue()
+
+
+class TestTableBatches:
+
+    def test_batches_in_pk_order(self, cdm):
+        batches = list(table_batches(Measurement, Measurement.objects.all(), 3))
+        assert [len(batch) for batch in batches] == [3, 3, 2]
+        ids = [row[0] for batch in batches for row in batch]
+        assert ids == sorted(Measurement.objects.values_list('measurement_id', flat=True))
+
+    def test_unexported_pk_is_dropped(self, cdm):
+        rows = [row for batch in table_batches(EpisodeEvent, EpisodeEvent.objects.all(), 1) for row in batch]
+        assert [len(row) for row in rows] == [3, 3]
+        assert [f.column for f in export_fields(EpisodeEvent)] == [
+            'episode_id', 'event_id', 'episode_event_field_concept_id',
+        ]
+
+    def test_shards_partition_every_table(self, cdm):
+        for model in CDM_TABLES.values():
+            total = model.objects.count()
+            sharded = [shard_queryset(model, shard, 3).count() for shard in range(3)]
+            assert sum(sharded) == total
+
+
+class TestCommand:
+
+    def test_exports_every_table_as_csv(self, cdm, tmp_path):
+        output = _export(tmp_path)
+        assert 'Exported' in output
+        for table, model in CDM_TABLES.items():
+            rows = _read_csv(tmp_path / f'{table}.csv')
+            assert len(rows) == model.objects.count()
+        person = _read_csv(tmp_path / 'person.csv')
+        assert 'given_name' not in person[0]
+        assert [r['person_id'] for r in person] == ['1', '2', '3', '4']
+        measurement = _read_csv(tmp_path / 'measurement.csv')
+        assert measurement[0]['measurement_date'] == '2024-01-15'
+        assert measurement[1]['value_as_number'] == ''
+
+        manifest = json.loads((tmp_path / 'manifest.json').read_text())
+        assert manifest['complete'] is True
+        assert manifest['files']['measurement.csv']['rows'] == 8
+
+    def test_gzip_shards(self, cdm, tmp_path):
+        _export(tmp_path, '--gzip', '--shards', '2', '--tables', 'person', 'measurement', 'episode_event')
+        shard_0 = _read_csv(tmp_path / 'person' / 'person-000-of-002.csv.gz')
+        shard_1 = _read_csv(tmp_path / 'person' / 'person-001-of-002.csv.gz')
+        assert [r['person_id'] for r in shard_0] == ['2', '4']
+        assert [r['person_id'] for r in shard_1] == ['1', '3']
+        measurements = _read_csv(tmp_path / 'measurement' / 'measurement-001-of-002.csv.gz')
+        assert {r['person_id'] for r in measurements} == {'1', '3'}
+        # episode 10 belongs to person 1; the orphan event goes to shard 0
+        assert [r['event_id'] for r in _read_csv(tmp_path / 'episode_event' / 'episode_event-001-of-002.csv.gz')] == ['1']
+        assert [r['event_id'] for r in _read_csv(tmp_path / 'episode_event' / 'episode_event-000-of-002.csv.gz')] == ['2']
+
+    def test_identical_reruns(self, cdm, tmp_path):
+        _export(tmp_path / 'a', '--gzip')
+        _export(tmp_path / 'b', '--gzip')
+        for table in CDM_TABLES:
+            name = f'{table}.csv.gz'
+            assert (tmp_path / 'a' / name).read_bytes() == (tmp_path / 'b' / name).read_bytes()
+
+    def test_resume_skips_finished_files(self, cdm, tmp_path):
+        _export(tmp_path, '--tables', 'person', 'measurement')
+        # Simulate an interruption: measurement never finished
+        manifest = json.loads((tmp_path / 'manifest.json').read_text())
+        del manifest['files']['measurement.csv']
+        manifest['complete'] = False
+        (tmp_path / 'manifest.json').write_text(json.dumps(manifest))
+        (tmp_path / 'person.csv').write_text('kept\n')
+
+        output = _export(tmp_path, '--tables', 'person', 'measurement', '--resume')
+        assert 'person.csv: already exported' in output
+        assert (tmp_path / 'person.csv').read_text() == 'kept\n'
+        assert len(_read_csv(tmp_path / 'measurement.csv')) == 8
+        assert json.loads((tmp_path / 'manifest.json').read_text())['complete'] is True
+
+    def test_resume_rejects_other_layout(self, cdm, tmp_path):
+        _export(tmp_path, '--tables', 'person')
+        with pytest.raises(CommandError, match='shards'):
+            _export(tmp_path, '--tables', 'person', '--shards', '2', '--resume')
+
+    def test_no_partial_files_left(self, cdm, tmp_path):
+        _export(tmp_path, '--shards', '2')
+        assert not list(tmp_path.rglob('*.partial'))
+
+
+def test_parquet(cdm, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    _export(tmp_path, '--format', 'parquet', '--tables', 'measurement', 'episode')
+    table = pq.read_table(tmp_path / 'measurement.parquet')
+    assert table.num_rows == 8
+    assert table.schema.field('measurement_date').type == 'date32[day]'
+    assert pq.read_table(tmp_path / 'episode.parquet').num_rows == 1
+
+
+def test_parquet_needs_pyarrow(tmp_path):
+    from omop_core.cdm_export import parquet_available
+    if parquet_available():
+        pytest.skip('pyarrow is installed')
+    with pytest.raises(CommandError, match='pyarrow'):
+        _export(tmp_path, '--format', 'parquet')
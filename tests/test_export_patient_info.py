@@ -0,0 +1,149 @@
+"""
+Tests for the streaming PatientInfo export (API endpoint and export_patient_info command).
+"""
+
+import csv
+import json
+import tracemalloc
+from datetime import date
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from omop_core.models import PatientInfo, Person
+from patient_portal.api.export import export_queryset, stream_export
+from patient_portal.api.payloads import patient_info_payloads
+from tests.factories import PatientInfoFactory
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/patient-info/export/'
+
+
+@pytest.fixture
+def cohort():
+    return [
+        PatientInfoFactory(disease='multiple myeloma', stage='III', date_of_birth=date(1950, 3, 1),
+                           later_therapies=[{'line': 2}]),
+        PatientInfoFactory(disease='multiple myeloma', stage='I', date_of_birth=date(1972, 8, 9)),
+        PatientInfoFactory(disease='follicular lymphoma', stage='IV'),
+    ]
+
+
+def _csv_rows(content):
+    return list(csv.DictReader(StringIO(content.decode())))
+
+
+def _streamed(response):
+    assert response.streaming
+    return b''.join(response.streaming_content)
+
+
+class TestEndpoint:
+
+    def test_csv_is_default_and_matches_payloads(self, admin_client, cohort):
+        response = admin_client.get(URL)
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/csv')
+        assert 'patient_info.csv' in response['Content-Disposition']
+        rows = _csv_rows(_streamed(response))
+        expected = patient_info_payloads(PatientInfo.objects.order_by('id'))
+        assert [int(r['person_id']) for r in rows] == [p['person_id'] for p in expected]
+        assert list(rows[0]) == list(expected[0])
+        assert json.loads(rows[0]['later_therapies']) == [{'line': 2}]
+        assert rows[1]['later_therapies'] == '[]'
+
+    def test_ndjson_with_fields(self, admin_client, cohort):
+        response = admin_client.get(URL, {'format': 'ndjson', 'fields': 'person_id,stage'})
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = _streamed(response).decode().splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {'person_id': p.person_id, 'stage': p.stage} for p in cohort
+        ]
+
+    def test_accept_header_selects_format(self, admin_client, cohort):
+        response = admin_client.get(URL, HTTP_ACCEPT='application/x-ndjson')
+        assert response['Content-Type'] == 'application/x-ndjson'
+
+    def test_filters(self, admin_client, cohort):
+        response = admin_client.get(URL, {
+            'fields': 'person_id', 'disease': 'multiple myeloma', 'date_of_birth__gte': '1960-01-01',
+        })
+        assert [int(r['person_id']) for r in _csv_rows(_streamed(response))] == [cohort[1].person_id]
+
+        response = admin_client.get(URL, {'fields': 'person_id', 'stage__in': 'III,IV'})
+        assert len(_csv_rows(_streamed(response))) == 2
+
+    @pytest.mark.parametrize('params, message', [
+        ({'fields': 'person_id,nope'}, 'Unknown field(s): nope'),
+        ({'nope': '1'}, 'Unknown filter column: nope'),
+        ({'stage__contains': 'I'}, 'Unsupported filter: stage__contains'),
+        ({'date_of_birth': 'yesterday'}, 'date_of_birth'),
+    ])
+    def test_bad_request(self, admin_client, cohort, params, message):
+        response = admin_client.get(URL, params)
+        assert response.status_code == 400
+        assert not response.streaming
+        assert message in _csv_rows(response.content)[0]['error']
+
+    def test_requires_login(self, client):
+        assert client.get(URL).status_code in (401, 403)
+
+
+class TestCommand:
+
+    def test_writes_file(self, cohort, tmp_path):
+        path = tmp_path / 'cohort.ndjson'
+        out = StringIO()
+        call_command('export_patient_info', format='ndjson', output=str(path), stdout=out)
+        lines = path.read_text().splitlines()
+        assert [json.loads(line)['person_id'] for line in lines] == [p.person_id for p in cohort]
+        assert 'Exported NDJSON' in out.getvalue()
+
+    def test_stdout_with_fields_and_filters(self, cohort):
+        out = StringIO()
+        call_command(
+            'export_patient_info', '--fields', 'person_id,disease', '--filter', 'stage=IV',
+            '--chunk-size', '1', stdout=out,
+        )
+        assert _csv_rows(out.getvalue().encode()) == [
+            {'person_id': str(cohort[2].person_id), 'disease': 'follicular lymphoma'},
+        ]
+
+    def test_bad_filter(self):
+        with pytest.raises(CommandError, match='expects'):
+            call_command('export_patient_info', '--filter', 'stage', stdout=StringIO())
+        with pytest.raises(CommandError, match='Unknown filter column'):
+            call_command('export_patient_info', '--filter', 'nope=1', stdout=StringIO())
+
+
+def _bulk_cohort(count):
+    start = Person.objects.count() + 1
+    people = Person.objects.bulk_create(
+        Person(person_id=start + i, year_of_birth=1970, given_name=f'Given {i}', family_name='Family')
+        for i in range(count)
+    )
+    PatientInfo.objects.bulk_create(
+        PatientInfo(person=person, disease='multiple myeloma', date_of_birth=date(1970, 1, 1))
+        for person in people
+    )
+
+
+def _peak_export_memory(export_format):
+    tracemalloc.start()
+    try:
+        for _ in stream_export(export_queryset(), export_format, chunk_size=50):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_memory_does_not_grow_with_row_count(export_format):
+    _bulk_cohort(200)
+    small = _peak_export_memory(export_format)
+    _bulk_cohort(800)
+    large = _peak_export_memory(export_format)
+    assert large < small * 1.5
@@ -0,0 +1,74 @@
+"""
+Tests for omop_core.fhir_ndjson — streaming Bundle / NDJSON writers and reader.
+"""
+
+import gzip
+import json
+
+import pytest
+
+from omop_core.fhir_ndjson import BundleStreamWriter, NDJSONStreamWriter, read_ndjson
+
+
+def _entries():
+    return [
+        {'fullUrl': 'http://example.org/Patient/1', 'resource': {'resourceType': 'Patient', 'id': '1'}},
+        {'fullUrl': 'http://example.org/Condition/c-1', 'resource': {'resourceType': 'Condition', 'id': 'c-1'}},
+        {'fullUrl': 'http://example.org/Patient/2', 'resource': {'resourceType': 'Patient', 'id': '2'}},
+    ]
+
+
+class TestBundleStreamWriter:
+
+    def test_compact_bundle_is_valid_json(self, tmp_path):
+        with BundleStreamWriter(tmp_path / 'bundle.json') as writer:
+            writer.write_many(_entries())
+        bundle = json.loads((tmp_path / 'bundle.json').read_text())
+        assert bundle['resourceType'] == 'Bundle'
+        assert bundle['entry'] == _entries()
+        assert writer.total == 3
+
+    def test_empty_bundle(self, tmp_path):
+        with BundleStreamWriter(tmp_path / 'bundle.json', indent=2):
+            pass
+        assert json.loads((tmp_path / 'bundle.json').read_text())['entry'] == []
+
+    def test_gzip_appends_suffix(self, tmp_path):
+        with BundleStreamWriter(tmp_path / 'bundle.json', compress=True) as writer:
+            writer.write_many(_entries())
+        assert writer.path.name == 'bundle.json.gz'
+        with gzip.open(writer.path, 'rt') as fh:
+            assert len(json.load(fh)['entry']) == 3
+
+
+class TestNDJSONStreamWriter:
+
+    def test_one_file_per_resource_type(self, tmp_path):
+        with NDJSONStreamWriter(tmp_path) as writer:
+            writer.write_many(_entries())
+        patients = (tmp_path / 'Patient.ndjson').read_text().splitlines()
+        assert [json.loads(line)['id'] for line in patients] == ['1', '2']
+        assert (tmp_path / 'Condition.ndjson').exists()
+        assert writer.counts == {'Patient': 2, 'Condition': 1}
+
+
+class TestReadNDJSON:
+
+    def test_round_trip_gzip(self, tmp_path):
+        with NDJSONStreamWriter(tmp_path, compress=True) as writer:
+            writer.write_many(_entries())
+        ids = [r['id'] for r in read_ndjson(tmp_path / 'Patient.ndjson.gz')]
+        assert ids == ['1', '2']
+
+    def test_malformed_lines_collected(self, tmp_path):
+        path = tmp_path / 'Patient.ndjson'
+        path.write_text('{"resourceType": "Patient", "id": "1"}\n\nnot json\n')
+        errors = []
+        assert [r['id'] for r in read_ndjson(path, errors)] == ['1']
+        assert [line for line, _ in errors] == [3]
+
+    def test_malformed_line_raises_without_error_list(self, tmp_path):
+        path = tmp_path / 'Patient.ndjson'
+        path.write_text('not json\n')
+        with pytest.raises(ValueError, match='Patient.ndjson:1'):
+            list(read_ndjson(path))
@@ -0,0 +1,67 @@
+"""
+Tests for generate_fhir_bundle — sharded, seeded and parallel generation.
+"""
+
+from io import StringIO
+
+from django.core.management import call_command
+
+from omop_core.management.commands.generate_fhir_bundle import Command, _ordered_results
+
+
+def _generator(**config):
+    generator = Command()
+    generator.configure(as_of='2025-01-01', **config)
+    return generator
+
+
+class TestShardedGeneration:
+
+    def test_same_seed_same_entries(self):
+        first = list(_generator(seed=7, shard_size=3).iter_patient_entries(7))
+        second = list(_generator(seed=7, shard_size=3).iter_patient_entries(7))
+        assert first == second
+
+    def test_different_seed_different_entries(self):
+        first = list(_generator(seed=7).iter_patient_entries(3))
+        second = list(_generator(seed=8).iter_patient_entries(3))
+        assert first != second
+
+    def test_shard_is_independent_of_preceding_shards(self):
+        full = list(_generator(seed=7, shard_size=3).iter_patient_entries(7))
+        shard_2 = list(_generator(seed=7, shard_size=3).iter_shard_entries(2, 7))
+        assert shard_2 == full[6:]
+
+    def test_output_identical_across_worker_counts(self, tmp_path):
+        outputs = []
+        for workers in (1, 2):
+            path = tmp_path / f'bundle-{workers}.json'
+            call_command(
+                'generate_fhir_bundle', count=6, shard_size=2, workers=workers,
+                seed=3, as_of='2025-01-01', output=str(path), stdout=StringIO(),
+            )
+            outputs.append(path.read_bytes())
+        assert outputs[0] == outputs[1]
+
+    def test_shards_in_flight_are_bounded(self):
+        class Pool:
+            def __init__(self):
+                self.submitted = 0
+                self.collected = 0
+                self.most_in_flight = 0
+
+            def apply_async(self, func, args):
+                self.submitted += 1
+                self.most_in_flight = max(self.most_in_flight, self.submitted - self.collected)
+                pool = self
+
+                class Result:
+                    def get(self):
+                        pool.collected += 1
+                        return args[0]
+                return Result()
+
+        pool = Pool()
+        results = _ordered_results(pool, iter(range(10)), in_flight=3)
+        assert list(results) == list(range(10))
+        assert pool.most_in_flight == 3
@@ -0,0 +1,70 @@
+"""
+Tests for the gunicorn deployment profile (gunicorn.conf.py, ctomop.warmup).
+"""
+
+import runpy
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+
+from benchmarks import server
+from ctomop.warmup import warm_master, warm_worker
+from omop_core.source_concepts import GENDER_VOCABULARY, source_concepts
+from tests.factories import PatientInfoFactory
+
+CONFIG = Path(settings.BASE_DIR) / 'gunicorn.conf.py'
+
+
+def _config(monkeypatch, cores=4, **env):
+    for name in ('SERVER_PROFILE', 'WEB_CONCURRENCY', 'GUNICORN_THREADS', 'GUNICORN_PRELOAD', 'PORT'):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr('multiprocessing.cpu_count', lambda: 64)  # the host's, not ours
+    monkeypatch.setattr('os.sched_getaffinity', lambda pid: set(range(cores)), raising=False)
+    return runpy.run_path(str(CONFIG))
+
+
+class TestConfig:
+
+    def test_sizes_workers_from_cores(self, monkeypatch):
+        config = _config(monkeypatch, cores=1, PORT='9000')
+        assert (config['worker_class'], config['workers'], config['threads']) == ('gthread', 3, 2)
+        assert config['bind'] == '0.0.0.0:9000'
+        assert config['preload_app'] is True
+        assert config['max_requests'] == 1000 and config['max_requests_jitter'] == 100
+
+    def test_default_workers_capped(self, monkeypatch):
+        assert _config(monkeypatch, cores=4)['workers'] == 4
+        assert _config(monkeypatch, cores=64, SERVER_PROFILE='asgi')['workers'] == 4
+
+    def test_environment_overrides(self, monkeypatch):
+        config = _config(monkeypatch, WEB_CONCURRENCY='3', GUNICORN_THREADS='8', GUNICORN_PRELOAD='False')
+        assert (config['workers'], config['threads'], config['preload_app']) == (3, 8, False)
+
+    def test_asgi_profile(self, monkeypatch):
+        config = _config(monkeypatch, cores=2, SERVER_PROFILE='asgi')
+        assert (config['worker_class'], config['workers']) == ('uvicorn.workers.UvicornWorker', 2)
+
+
+class TestWarmup:
+
+    def test_master(self):
+        assert set(warm_master()) == {'urls', 'payload_plans'}
+
+    @pytest.mark.django_db
+    def test_worker_compiles_source_concepts(self, django_assert_num_queries):
+        source_concepts.clear()
+        assert set(warm_worker()) == {'database', 'source_concepts'}
+        with django_assert_num_queries(0):
+            assert source_concepts.concept_id(GENDER_VOCABULARY, 'female') == 8532
+
+
+@pytest.mark.django_db
+def test_benchmark_request_paths():
+    person_ids = {p.person_id for p in PatientInfoFactory.create_batch(3)}
+    paths = server.request_paths(200, seed=1)
+    assert paths == server.request_paths(200, seed=1)
+    assert '/api/patient-info/' in paths
+    assert {int(p.split('/')[3]) for p in paths if p != '/api/patient-info/'} <= person_ids
@@ -0,0 +1,118 @@
+"""
+Tests for import_fhir_ndjson — streaming FHIR Bulk Data import.
+"""
+
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from omop_core.models import (
+    ConditionOccurrence, DrugExposure, Measurement, Observation, Person,
+)
+from tests.factories import ConceptFactory, PersonFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _write(path, resources):
+    path.write_text(''.join(json.dumps(r) + '\n' for r in resources))
+
+
+def _import(directory, **options):
+    out = StringIO()
+    call_command('import_fhir_ndjson', str(directory), stdout=out, stderr=StringIO(), **options)
+    return out.getvalue()
+
+
+@pytest.fixture
+def export_dir(tmp_path):
+    _write(tmp_path / 'Patient.ndjson', [
+        {'resourceType': 'Patient', 'id': 'p1', 'gender': 'female', 'birthDate': '1970-05-02',
+         'name': [{'family': 'Doe', 'given': ['Jane']}]},
+        {'resourceType': 'Patient', 'id': 'p2', 'gender': 'male'},
+    ])
+    _write(tmp_path / 'Condition.ndjson', [
+        {'resourceType': 'Condition', 'id': 'c1', 'subject': {'reference': 'Patient/p1'},
+         'code': {'coding': [{'system': 'http://snomed.info/sct', 'code': '254837009'}]},
+         'onsetDateTime': '2020-01-15'},
+        {'resourceType': 'Condition', 'id': 'c2', 'subject': {'reference': 'Patient/unknown'},
+         'onsetDateTime': '2020-01-15'},
+    ])
+    _write(tmp_path / 'Observation.ndjson', [
+        {'resourceType': 'Observation', 'id': 'o1', 'subject': {'reference': 'Patient/p1'},
+         'code': {'coding': [{'system': 'http://loinc.org', 'code': '718-7'}]},
+         'effectiveDateTime': '2020-02-01', 'valueQuantity': {'value': 12.5, 'unit': 'g/dL'}},
+        {'resourceType': 'Observation', 'id': 'o2', 'subject': {'reference': 'Patient/p2'},
+         'code': {'text': 'ER status'}, 'effectiveDateTime': '2020-02-01',
+         'valueCodeableConcept': {'text': 'Positive'}},
+        {'resourceType': 'Observation', 'id': 'o3', 'subject': {'reference': 'Patient/p2'},
+         'code': {'text': 'undated'}},
+    ])
+    _write(tmp_path / 'MedicationStatement.ndjson', [
+        {'resourceType': 'MedicationStatement', 'id': 'm1', 'subject': {'reference': 'Patient/p1'},
+         'medicationCodeableConcept': {'text': 'Letrozole'},
+         'effectivePeriod': {'start': '2020-03-01'}},
+    ])
+    return tmp_path
+
+
+class TestImportFhirNdjson:
+
+    def test_imports_all_resource_types(self, export_dir):
+        hemoglobin = ConceptFactory(concept_id=3000963, concept_code='718-7', vocabulary__vocabulary_id='LOINC')
+        output = _import(export_dir, batch_size=1)
+
+        jane = Person.objects.get(family_name='Doe')
+        assert (jane.given_name, jane.year_of_birth, jane.gender_source_value) == ('Jane', 1970, 'female')
+        assert Person.objects.count() == 2
+
+        condition = ConditionOccurrence.objects.get()
+        assert condition.person == jane
+        assert condition.condition_concept_id == 0
+        assert condition.condition_source_value == '254837009'
+
+        measurement = Measurement.objects.get()
+        assert measurement.measurement_concept == hemoglobin
+        assert float(measurement.value_as_number) == 12.5
+
+        observation = Observation.objects.get()
+        assert observation.value_as_string == 'Positive'
+
+        drug = DrugExposure.objects.get()
+        assert drug.drug_exposure_end_date == drug.drug_exposure_start_date
+        assert drug.drug_source_value == 'Letrozole'
+
+        assert '1 without a known patient' in output
+        assert '1 skipped' in output
+
+    def test_person_ids_are_allocated_after_existing(self, export_dir):
+        existing = PersonFactory(person_id=500)
+        _import(export_dir, types=['Patient'])
+        assert sorted(Person.objects.exclude(pk=existing.pk).values_list('person_id', flat=True)) == [501, 502]
+
+    def test_rerun_with_staging_db_skips_imported(self, export_dir, tmp_path_factory):
+        staging = tmp_path_factory.mktemp('staging') / 'staging.sqlite3'
+        _import(export_dir, staging_db=str(staging))
+        output = _import(export_dir, staging_db=str(staging))
+        assert Person.objects.count() == 2
+        assert ConditionOccurrence.objects.count() == 1
+        assert Measurement.objects.count() == 1
+        assert '2 already imported' in output
+
+    def test_round_trip_from_generated_export(self, tmp_path):
+        export = tmp_path / 'export'
+        call_command(
+            'generate_fhir_bundle', count=3, seed=5, as_of='2025-01-01', format='ndjson',
+            gzip=True, output=str(export), stdout=StringIO(),
+        )
+        _import(export)
+        assert Person.objects.count() == 3
+        assert ConditionOccurrence.objects.count() >= 3
+        assert DrugExposure.objects.exists()
+
+    def test_missing_directory(self, tmp_path):
+        with pytest.raises(CommandError):
+            _import(tmp_path / 'nope')
@@ -0,0 +1,84 @@
+"""
+Tests for omop_core.instrumentation, the request middleware and the instrument command.
+"""
+
+import json
+import logging
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from omop_core.instrumentation import QueryProfile
+from omop_core.models import PatientInfo
+from tests.factories import PersonFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _propagate(monkeypatch):
+    # settings.LOGGING stops propagation to the root logger caplog listens on
+    monkeypatch.setattr(logging.getLogger('ctomop.instrumentation'), 'propagate', True)
+
+
+class TestQueryProfile:
+
+    def test_counts_queries_and_keeps_slowest(self):
+        with QueryProfile(slowest_kept=2) as profile:
+            for _ in range(3):
+                list(PatientInfo.objects.all())
+        summary = profile.summary()
+        assert summary['queries'] == 3
+        assert len(summary['slowest']) == 2
+        assert summary['slowest'][0]['ms'] >= summary['slowest'][1]['ms']
+        assert 'patient_info' in summary['slowest'][0]['sql']
+
+    def test_stops_recording_on_exit(self):
+        with QueryProfile() as profile:
+            pass
+        list(PatientInfo.objects.all())
+        assert profile.queries == 0
+
+    def test_named_phases_and_server_timing(self):
+        with QueryProfile() as profile:
+            with profile.time('serialize'):
+                list(PatientInfo.objects.all())
+        header = profile.server_timing()
+        assert header.startswith('db;dur=')
+        assert 'desc="1 queries"' in header
+        assert 'serialize;dur=' in header and 'total;dur=' in header
+
+
+class TestMiddleware:
+
+    def test_disabled_by_default(self, admin_client):
+        assert 'Server-Timing' not in admin_client.get('/api/patient-info/')
+
+    def test_server_timing_and_log(self, admin_client, settings, caplog):
+        settings.QUERY_INSTRUMENTATION = True
+        settings.QUERY_INSTRUMENTATION_MAX_QUERIES = 1
+        PersonFactory()
+        with caplog.at_level(logging.INFO, logger='ctomop.instrumentation'):
+            response = admin_client.get('/api/patient-info/')
+        assert response.status_code == 200
+        assert 'serialize;dur=' in response['Server-Timing']
+        record = next(r for r in caplog.records if r.name == 'ctomop.instrumentation')
+        payload = json.loads(record.getMessage())
+        assert payload['name'] == 'patient-info-list'
+        assert payload['status'] == 200
+        assert payload['queries'] >= 2  # session/user + patient list
+        assert payload['over_budget'] is True
+        assert record.levelno == logging.WARNING
+
+
+class TestInstrumentCommand:
+
+    def test_wraps_command(self, caplog):
+        out = StringIO()
+        with caplog.at_level(logging.INFO, logger='ctomop.instrumentation'):
+            call_command('instrument', 'query_patient_info', stdout=out)
+        assert 'instrument: query_patient_info' in out.getvalue()
+        payload = json.loads(caplog.records[-1].getMessage())
+        assert payload['event'] == 'command'
+        assert payload['queries'] >= 1
@@ -0,0 +1,167 @@
+"""
+Tests for omop_oncology.lines_of_therapy — bulk LOT materialization.
+
+Covers:
+  - Episode + AILineOfTherapySummary rows per LOT row, pre-allocated ids
+  - EpisodeEvent linkage of DrugExposure rows by date window
+  - idempotent re-materialization per person
+  - rows without a start_date are skipped
+  - lot_timelines: grouping, filters, single-query access and the REST endpoint
+"""
+
+import pytest
+from omop_core.models import Concept
+from omop_oncology.lines_of_therapy import (
+    DRUG_EXPOSURE_FIELD_CONCEPT_ID, TREATMENT_REGIMEN_CONCEPT_ID,
+    lot_timelines, materialize_lines_of_therapy,
+)
+from omop_oncology.models import AILineOfTherapySummary, Episode, EpisodeEvent
+from tests.factories import ConceptFactory, DrugExposureFactory, PersonFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _lot_row(line_number, start, end=None, **extra):
+    row = {
+        'ai_lines_of_therapy_summary_id': f'lot-{line_number}',
+        'line_number': line_number,
+        'start_date': start,
+        'end_date': end,
+        'is_ongoing_line_of_therapy': end is None,
+        'active_ingredients': 'lenalidomide, dexamethasone',
+        'outcome': 'PR',
+        'has_cart': False,
+        'created_at': '2024-01-01T00:00:00',
+    }
+    row.update(extra)
+    return row
+
+
+class TestMaterializeLinesOfTherapy:
+
+    def test_creates_episode_and_summary_per_line(self):
+        person = PersonFactory()
+        stats = materialize_lines_of_therapy([
+            (person.person_id, [
+                _lot_row(1, '2022-01-01', '2022-12-31'),
+                _lot_row(2, '2023-02-01', has_cart=True),
+            ]),
+        ])
+        assert stats['episodes'] == 2
+        episodes = Episode.objects.filter(person=person).order_by('episode_number')
+        assert [e.episode_number for e in episodes] == [1, 2]
+        assert all(e.episode_concept_id == TREATMENT_REGIMEN_CONCEPT_ID for e in episodes)
+        assert episodes[1].episode_end_date is None
+        summary = AILineOfTherapySummary.objects.get(episode=episodes[1])
+        assert summary.has_cart is True
+        assert summary.ai_lines_of_therapy_summary_id == 'lot-2'
+
+    def test_episode_ids_are_contiguous(self):
+        p1, p2 = PersonFactory(), PersonFactory()
+        materialize_lines_of_therapy([
+            (p1.person_id, [_lot_row(1, '2022-01-01')]),
+            (p2.person_id, [_lot_row(1, '2022-01-01'), _lot_row(2, '2023-01-01')]),
+        ], batch_size=1)
+        ids = sorted(Episode.objects.values_list('episode_id', flat=True))
+        assert ids == list(range(ids[0], ids[0] + 3))
+
+    def test_drug_exposures_linked_by_date_window(self):
+        person = PersonFactory()
+        in_line_1 = DrugExposureFactory(person=person, drug_exposure_start_date='2022-03-01')
+        in_line_2 = DrugExposureFactory(person=person, drug_exposure_start_date='2023-05-01')
+        DrugExposureFactory(person=person, drug_exposure_start_date='2021-01-01')
+        materialize_lines_of_therapy([
+            (person.person_id, [
+                _lot_row(1, '2022-01-01', '2022-12-31'),
+                _lot_row(2, '2023-02-01'),
+            ]),
+        ])
+        line_1 = Episode.objects.get(person=person, episode_number=1)
+        line_2 = Episode.objects.get(person=person, episode_number=2)
+        events = {
+            e.event_id: e.episode_id
+            for e in EpisodeEvent.objects.filter(
+                episode_event_field_concept_id=DRUG_EXPOSURE_FIELD_CONCEPT_ID
+            )
+        }
+        assert events == {
+            in_line_1.drug_exposure_id: line_1.episode_id,
+            in_line_2.drug_exposure_id: line_2.episode_id,
+        }
+
+    def test_rematerialization_replaces_previous_lines(self):
+        person = PersonFactory()
+        materialize_lines_of_therapy([(person.person_id, [_lot_row(1, '2022-01-01')])])
+        materialize_lines_of_therapy([
+            (person.person_id, [_lot_row(1, '2022-01-01'), _lot_row(2, '2023-01-01')]),
+        ])
+        assert Episode.objects.filter(person=person).count() == 2
+        assert AILineOfTherapySummary.objects.count() == 2
+
+    def test_line_without_start_date_is_skipped(self):
+        person = PersonFactory()
+        stats = materialize_lines_of_therapy([
+            (person.person_id, [_lot_row(1, None), _lot_row(2, '2023-01-01')]),
+        ])
+        assert stats['skipped_lines'] == 1
+        assert Episode.objects.filter(person=person).count() == 1
+
+    def test_existing_concepts_are_reused(self):
+        ConceptFactory(concept_id=TREATMENT_REGIMEN_CONCEPT_ID, concept_name='Treatment Regimen')
+        person = PersonFactory()
+        materialize_lines_of_therapy([(person.person_id, [_lot_row(1, '2022-01-01')])])
+        assert Concept.objects.filter(concept_id=TREATMENT_REGIMEN_CONCEPT_ID).count() == 1
+
+
+# ---------------------------------------------------------------------------
+# lot_timelines / lot_queryset
+# ---------------------------------------------------------------------------
+
+class TestLotTimelines:
+
+    @pytest.fixture
+    def cohort(self):
+        p1, p2 = PersonFactory(), PersonFactory()
+        materialize_lines_of_therapy([
+            (p1.person_id, [
+                _lot_row(1, '2022-01-01', '2022-12-31', active_ingredients='Daratumumab'),
+                _lot_row(2, '2023-01-01', has_cart=True),
+            ]),
+            (p2.person_id, [
+                _lot_row(1, '2021-01-01', '2021-06-30', has_bispecifics=True),
+            ]),
+        ])
+        return p1, p2
+
+    def test_timelines_grouped_and_ordered(self, cohort):
+        p1, p2 = cohort
+        timelines = lot_timelines([p1.person_id, p2.person_id])
+        assert [line['line_number'] for line in timelines[p1.person_id]] == [1, 2]
+        assert timelines[p1.person_id][1]['is_ongoing'] is True
+        assert len(timelines[p2.person_id]) == 1
+
+    def test_single_query_for_many_persons(self, cohort, django_assert_num_queries):
+        p1, p2 = cohort
+        with django_assert_num_queries(1):
+            lot_timelines([p1.person_id, p2.person_id])
+
+    def test_filters(self, cohort):
+        p1, p2 = cohort
+        assert list(lot_timelines(has_cart=True)) == [p1.person_id]
+        assert list(lot_timelines(has_bispecifics=True)) == [p2.person_id]
+        assert [l['line_number'] for l in lot_timelines(ongoing=True)[p1.person_id]] == [2]
+        assert list(lot_timelines(ingredient='daratu')) == [p1.person_id]
+
+    def test_endpoint(self, cohort, admin_client):
+        p1, p2 = cohort
+        response = admin_client.get(
+            '/api/lines-of-therapy/', {'person_id': f'{p1.person_id},{p2.person_id}', 'ongoing': 'false'}
+        )
+        assert response.status_code == 200
+        payload = response.json()
+        assert payload['count'] == 2
+        assert {r['person_id'] for r in payload['results']} == {p1.person_id, p2.person_id}
+
+    def test_endpoint_rejects_bad_person_id(self, admin_client):
+        response = admin_client.get('/api/lines-of-therapy/', {'person_id': 'abc'})
+        assert response.status_code == 400
@@ -0,0 +1,111 @@
+"""
+Tests for load_omop_vocabulary — staged Athena vocabulary import.
+"""
+
+from datetime import date
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+from omop_core.models import (
+    Concept, ConceptAncestor, ConceptClass, ConceptRelationship, Domain, Vocabulary,
+)
+from omop_core.source_concepts import source_concepts
+from tests.factories import ConceptFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def _tsv(path, header, rows):
+    path.write_text('\n'.join('\t'.join(r) for r in [header, *rows]) + '\n')
+
+
+@pytest.fixture
+def athena_dir(tmp_path):
+    _tsv(tmp_path / 'DOMAIN.csv', ['domain_id', 'domain_name', 'domain_concept_id'], [
+        ['Measurement', 'Measurement', '21'],
+    ])
+    _tsv(tmp_path / 'VOCABULARY.csv',
+         ['vocabulary_id', 'vocabulary_name', 'vocabulary_reference', 'vocabulary_version', 'vocabulary_concept_id'], [
+        ['LOINC', 'Logical Observation Identifiers Names and Codes (Regenstrief Institute)', '', 'LOINC 2.76', '44819102'],
+    ])
+    _tsv(tmp_path / 'CONCEPT_CLASS.csv', ['concept_class_id', 'concept_class_name', 'concept_class_concept_id'], [
+        ['Lab Test', 'Lab Test', '44819107'],
+    ])
+    _tsv(tmp_path / 'CONCEPT.csv',
+         ['concept_id', 'concept_name', 'domain_id', 'vocabulary_id', 'concept_class_id',
+          'standard_concept', 'concept_code', 'valid_start_date', 'valid_end_date', 'invalid_reason'], [
+        ['3000963', 'Hemoglobin [Mass/volume] in Blood', 'Measurement', 'LOINC', 'Lab Test', 'S', '718-7', '19700101', '20991231', ''],
+        ['3016723', 'Creatinine [Mass/volume] in Serum or Plasma', 'Measurement', 'LOINC', 'Lab Test', 'S', '2160-0', '19700101', '20991231', ''],
+    ])
+    return tmp_path
+
+
+def _load(directory, **options):
+    call_command('load_omop_vocabulary', str(directory), stdout=StringIO(), **options)
+
+
+class TestLoadOmopVocabulary:
+
+    def test_loads_all_tables(self, athena_dir):
+        _load(athena_dir)
+        assert Domain.objects.filter(domain_id='Measurement').exists()
+        assert Vocabulary.objects.get(vocabulary_id='LOINC').vocabulary_reference is None
+        assert ConceptClass.objects.filter(concept_class_id='Lab Test').exists()
+        hemoglobin = Concept.objects.get(concept_id=3000963)
+        assert hemoglobin.concept_code == '718-7'
+        assert hemoglobin.valid_end_date == date(2099, 12, 31)
+        assert hemoglobin.invalid_reason is None
+
+    def test_existing_concepts_are_updated_in_place(self, athena_dir):
+        ConceptFactory(concept_id=3000963, concept_name='old name')
+        _load(athena_dir)
+        assert Concept.objects.get(concept_id=3000963).concept_name == 'Hemoglobin [Mass/volume] in Blood'
+        assert Concept.objects.filter(concept_id__in=[3000963, 3016723]).count() == 2
+
+    def test_indexes_rebuilt_and_staging_dropped(self, athena_dir):
+        _load(athena_dir)
+        tables = connection.introspection.table_names()
+        assert not [t for t in tables if t.endswith('_stage')]
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'concept')
+        assert 'concept_vocab_code_idx' in constraints
+
+    def test_keep_staging(self, athena_dir):
+        _load(athena_dir, tables=['DOMAIN'], keep_staging=True)
+        assert 'domain_stage' in connection.introspection.table_names()
+
+    def test_rejects_unexpected_header(self, tmp_path):
+        _tsv(tmp_path / 'DOMAIN.csv', ['domain_id', 'name'], [['X', 'Y']])
+        with pytest.raises(CommandError, match='DOMAIN.csv'):
+            _load(tmp_path)
+
+
+class TestHierarchyFiles:
+
+    def test_loads_relationship_and_ancestor(self, athena_dir):
+        _tsv(athena_dir / 'CONCEPT_RELATIONSHIP.csv',
+             ['concept_id_1', 'concept_id_2', 'relationship_id', 'valid_start_date', 'valid_end_date', 'invalid_reason'], [
+            ['3000963', '3016723', 'Maps to', '19700101', '20991231', ''],
+        ])
+        _tsv(athena_dir / 'CONCEPT_ANCESTOR.csv',
+             ['ancestor_concept_id', 'descendant_concept_id', 'min_levels_of_separation', 'max_levels_of_separation'], [
+            ['3000963', '3016723', '1', '1'],
+        ])
+        _load(athena_dir)
+        _load(athena_dir, tables=['CONCEPT_ANCESTOR'])  # re-load merges on the natural key
+        assert ConceptRelationship.objects.get().relationship_id == 'Maps to'
+        assert ConceptAncestor.objects.count() == 1
+
+    def test_loads_source_to_concept_map(self, athena_dir):
+        _tsv(athena_dir / 'SOURCE_TO_CONCEPT_MAP.csv', [
+            'source_code', 'source_concept_id', 'source_vocabulary_id', 'source_code_description',
+            'target_concept_id', 'target_vocabulary_id', 'valid_start_date', 'valid_end_date', 'invalid_reason',
+        ], [
+            ['HGB-1', '0', 'LocalLab', 'Hemoglobin', '3000963', 'LOINC', '19700101', '20991231', ''],
+        ])
+        _load(athena_dir)
+        assert source_concepts.concept_id('LocalLab', 'HGB-1') == 3000963
@@ -0,0 +1,103 @@
+"""
+Tests for the PatientInfo read endpoints: conditional GET (ETag / Last-Modified).
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from django.utils.http import http_date
+
+from omop_core.models import PatientInfo
+from tests.factories import PatientInfoFactory
+
+pytestmark = pytest.mark.django_db
+
+LIST_URL = '/api/patient-info/'
+
+
+def _detail_url(patient_info):
+    return f'/api/patient-info/{patient_info.person_id}/'
+
+
+@pytest.fixture
+def patient():
+    return PatientInfoFactory()
+
+
+class TestDetail:
+
+    def test_strong_etag_and_validators(self, admin_client, patient):
+        response = admin_client.get(_detail_url(patient))
+        assert response.status_code == 200
+        assert response['ETag'].startswith('"')
+        assert 'Last-Modified' in response
+        assert 'no-cache' in response['Cache-Control']
+
+    def test_unchanged_returns_304_without_serializing(self, admin_client, patient, django_assert_max_num_queries):
+        etag = admin_client.get(_detail_url(patient))['ETag']
+        with django_assert_max_num_queries(5):  # session + user + two validator queries
+            response = admin_client.get(_detail_url(patient), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert response.content == b''
+
+    def test_save_changes_etag(self, admin_client, patient):
+        etag = admin_client.get(_detail_url(patient))['ETag']
+        patient.disease = 'multiple myeloma'
+        patient.save()
+        response = admin_client.get(_detail_url(patient), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert response.json()['patient_info']['disease'] == 'multiple myeloma'
+
+    def test_person_name_change_changes_etag(self, admin_client, patient):
+        etag = admin_client.get(_detail_url(patient))['ETag']
+        patient.person.given_name = 'Renamed'
+        patient.person.save()
+        assert admin_client.get(_detail_url(patient), HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_if_modified_since(self, admin_client, patient):
+        later = http_date((timezone.now() + timedelta(minutes=1)).timestamp())
+        earlier = http_date((timezone.now() - timedelta(days=2)).timestamp())
+        assert admin_client.get(_detail_url(patient), HTTP_IF_MODIFIED_SINCE=later).status_code == 304
+        assert admin_client.get(_detail_url(patient), HTTP_IF_MODIFIED_SINCE=earlier).status_code == 200
+
+    def test_missing_patient_still_404(self, admin_client):
+        assert admin_client.get('/api/patient-info/999999/').status_code == 404
+
+
+class TestList:
+
+    def test_weak_etag_304_and_invalidation(self, admin_client, patient):
+        response = admin_client.get(LIST_URL)
+        etag = response['ETag']
+        assert etag.startswith('W/"')
+        assert admin_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        other = PatientInfoFactory()
+        assert admin_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+        etag = admin_client.get(LIST_URL)['ETag']
+        PatientInfo.objects.filter(pk=other.pk).delete()
+        response = admin_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert [row['person_id'] for row in response.json()] == [patient.person_id]
+
+    def test_unchanged_returns_304_in_constant_queries(self, admin_client, patient, django_assert_max_num_queries):
+        PatientInfoFactory.create_batch(5)
+        etag = admin_client.get(LIST_URL)['ETag']
+        with django_assert_max_num_queries(4):  # session + user + one aggregate
+            response = admin_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_person_name_change_changes_etag(self, admin_client, patient):
+        etag = admin_client.get(LIST_URL)['ETag']
+        patient.person.family_name = 'Renamed'
+        patient.person.save(update_fields=['family_name'])
+        assert admin_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_last_modified_is_latest_update(self, admin_client, patient):
+        response = admin_client.get(LIST_URL)
+        patient.refresh_from_db()
+        assert response['Last-Modified'] == http_date(patient.updated_at.timestamp())
@@ -0,0 +1,202 @@
+"""
+Tests for the PatientInfo response cache (omop_core.patient_info_cache).
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete
+from django.test import override_settings
+
+from omop_core.models import PatientInfo
+from omop_core.patient_info_cache import patient_info_cache
+from tests.factories import PatientInfoFactory
+
+pytestmark = pytest.mark.django_db
+
+LIST_URL = '/api/patient-info/'
+
+
+def _detail_url(patient_info):
+    return f'/api/patient-info/{patient_info.person_id}/'
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    patient_info_cache.reset_metrics()
+
+
+@pytest.fixture(autouse=True)
+def _enabled(settings):
+    # Off by default with the local-memory backend; a test runs in one process,
+    # where that backend is as coherent as a shared one
+    settings.PATIENT_INFO_CACHE_TIMEOUT = 300
+
+
+def _run_python(script, **env):
+    """Run ``script`` in a new Django process, with ``env`` on top of this one's environment."""
+    env = {**os.environ, 'PATIENT_INFO_CACHE_TIMEOUT': None, **env}
+    return subprocess.run(
+        [sys.executable, '-c', f'import django; django.setup(); {script}'],
+        cwd=django_settings.BASE_DIR, env={name: value for name, value in env.items() if value is not None},
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def patient():
+    return PatientInfoFactory()
+
+
+class TestDetail:
+
+    def test_hit_serves_without_queries_beyond_auth(self, admin_client, patient, django_assert_max_num_queries):
+        first = admin_client.get(_detail_url(patient))
+        with django_assert_max_num_queries(2):  # session + user
+            second = admin_client.get(_detail_url(patient))
+        assert second.status_code == 200
+        assert second.json() == first.json()
+        assert second['ETag'] == first['ETag']
+        assert patient_info_cache.metrics()['hits'] == 1
+
+    def test_hit_answers_conditional_get(self, admin_client, patient):
+        etag = admin_client.get(_detail_url(patient))['ETag']
+        response = admin_client.get(_detail_url(patient), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert patient_info_cache.metrics()['hits'] == 1
+
+    def test_save_invalidates(self, admin_client, patient):
+        admin_client.get(_detail_url(patient))
+        patient.disease = 'multiple myeloma'
+        patient.save()
+        response = admin_client.get(_detail_url(patient))
+        assert response.json()['patient_info']['disease'] == 'multiple myeloma'
+        assert patient_info_cache.metrics()['hits'] == 0
+
+    def test_person_and_user_changes_invalidate(self, admin_client, patient):
+        user = User.objects.create_user(id=patient.person_id, username='patient', first_name='Before')
+        admin_client.get(_detail_url(patient))
+
+        user.first_name = 'After'
+        user.save()
+        assert admin_client.get(_detail_url(patient)).json()['user']['first_name'] == 'After'
+
+        patient.person.given_name = 'Renamed'
+        patient.person.save()
+        admin_client.get(_detail_url(patient))
+        assert patient_info_cache.metrics()['hits'] == 0
+
+    def test_login_does_not_invalidate(self, client, patient):
+        user = User.objects.create_superuser(id=patient.person_id, username='patient', password='pw')
+        client.force_login(user)
+        client.get(_detail_url(patient))
+        client.logout()
+        client.login(username='patient', password='pw')
+        client.get(_detail_url(patient))
+        assert patient_info_cache.metrics()['hits'] == 1
+
+    def test_delete_invalidates(self, admin_client, patient):
+        admin_client.get(_detail_url(patient))
+        patient.delete()
+        assert admin_client.get(_detail_url(patient)).status_code == 404
+
+    def test_other_patients_stay_cached(self, admin_client, patient):
+        admin_client.get(_detail_url(patient))
+        PatientInfoFactory()
+        admin_client.get(_detail_url(patient))
+        assert patient_info_cache.metrics()['hits'] == 1
+
+
+class TestList:
+
+    def test_hit_and_invalidation_on_any_patient_change(self, admin_client, patient):
+        admin_client.get(LIST_URL)
+        admin_client.get(LIST_URL)
+        assert patient_info_cache.metrics()['hits'] == 1
+
+        PatientInfoFactory()
+        assert len(admin_client.get(LIST_URL).json()) == 2
+
+    def test_keyed_by_query_shape(self, admin_client, patient):
+        admin_client.get(LIST_URL, {'a': '1', 'b': '2'})
+        admin_client.get(LIST_URL, {'b': '2', 'a': '1'})
+        admin_client.get(LIST_URL, {'a': '2'})
+        metrics = patient_info_cache.metrics()
+        assert (metrics['hits'], metrics['misses']) == (1, 2)
+
+
+def test_invalidate_all_after_bulk_writes(admin_client, patient):
+    admin_client.get(LIST_URL)
+    admin_client.get(_detail_url(patient))
+    type(patient).objects.filter(pk=patient.pk).update(disease='lymphoma')
+    patient_info_cache.invalidate_all()
+    assert admin_client.get(_detail_url(patient)).json()['patient_info']['disease'] == 'lymphoma'
+    assert admin_client.get(LIST_URL).status_code == 200
+    assert patient_info_cache.metrics()['hits'] == 0
+
+
+@override_settings(PATIENT_INFO_CACHE_TIMEOUT=0)
+def test_disabled(admin_client, patient):
+    admin_client.get(_detail_url(patient))
+    admin_client.get(_detail_url(patient))
+    metrics = patient_info_cache.metrics()
+    assert metrics['enabled'] is False
+    assert (metrics['hits'], metrics['misses'], metrics['stores']) == (0, 0, 0)
+
+
+def test_receivers_connected_only_while_enabled(settings, patient, django_assert_num_queries):
+    assert post_delete.has_listeners(PatientInfo)
+    settings.PATIENT_INFO_CACHE_TIMEOUT = 0
+    assert not post_delete.has_listeners(PatientInfo)
+    with django_assert_num_queries(1):  # fast delete, no SELECT for the receivers
+        PatientInfo.objects.filter(person=patient.person).delete()
+
+
+def test_file_backend(admin_client, patient, tmp_path):
+    caches = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path),
+    }}
+    with override_settings(CACHES=caches):
+        admin_client.get(_detail_url(patient))
+        patient.disease = 'lymphoma'
+        patient.save()
+        assert admin_client.get(_detail_url(patient)).json()['patient_info']['disease'] == 'lymphoma'
+        admin_client.get(_detail_url(patient))
+        assert patient_info_cache.metrics()['backend'] == 'FileBasedCache'
+    assert patient_info_cache.metrics()['hits'] == 1
+
+
+def test_invalidate_all_from_another_process(admin_client, patient, tmp_path):
+    caches = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path),
+    }}
+    with override_settings(CACHES=caches):
+        admin_client.get(_detail_url(patient))
+        admin_client.get(_detail_url(patient))
+        assert patient_info_cache.metrics()['hits'] == 1
+        # A bulk loader (e.g. import_fhir_ndjson) in its own process
+        _run_python(
+            'from omop_core.patient_info_cache import patient_info_cache; patient_info_cache.invalidate_all()',
+            CACHE_BACKEND='file', CACHE_DIR=str(tmp_path),
+        )
+        admin_client.get(_detail_url(patient))
+    assert patient_info_cache.metrics()['misses'] == 2
+
+
+@pytest.mark.parametrize('backend, timeout', [('', '0'), ('file', '300'), ('database', '300')])
+def test_enabled_by_default_only_with_shared_backend(backend, timeout):
+    script = 'from django.conf import settings; print(settings.PATIENT_INFO_CACHE_TIMEOUT)'
+    assert _run_python(script, CACHE_BACKEND=backend) == timeout
+
+
+def test_cache_stats_endpoint(admin_client, patient):
+    admin_client.get(_detail_url(patient))
+    admin_client.get(_detail_url(patient))
+    stats = admin_client.get('/api/patient-info/cache-stats/').json()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
@@ -0,0 +1,111 @@
+"""
+Tests for the fast PatientInfo payload builders and the orjson renderer.
+"""
+
+import json
+from datetime import date, datetime, time, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from omop_core.models import PatientInfo
+from patient_portal.api.payloads import patient_info_payloads, patient_list_payloads
+from patient_portal.api.renderers import OrjsonRenderer
+from patient_portal.api.serializers import PatientInfoSerializer, PatientListSerializer
+from tests.factories import ConceptFactory, PatientInfoFactory
+
+pytestmark = pytest.mark.django_db
+
+SAMPLE_VALUES = {
+    'BooleanField': True,
+    'CharField': 'Ⅱ — “stage”',
+    'DateField': date(1961, 2, 28),
+    'DateTimeField': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+    'DecimalField': Decimal('12.5'),
+    'EmailField': 'patient@example.org',
+    'FloatField': 2.75,
+    'IntegerField': 42,
+    'JSONField': [{'line': 1, 'drugs': ['R', 'CHOP']}],
+    'TextField': 'free text with a line separator',
+}
+
+
+def _fill_every_field(patient_info):
+    """Set every column to a non-null sample value of its type."""
+    for field in PatientInfo._meta.concrete_fields:
+        value = SAMPLE_VALUES.get(field.get_internal_type())
+        automatic = getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        if value is None or field.primary_key or automatic:
+            continue
+        if field.choices:
+            value = field.choices[-1][0]
+        elif field.max_length and isinstance(value, str):
+            value = value[:field.max_length]
+        setattr(patient_info, field.attname, value)
+    patient_info.save()
+    return patient_info
+
+
+@pytest.fixture
+def patients():
+    full = _fill_every_field(PatientInfoFactory(date_of_birth=date(1960, 12, 31)))
+    nameless = PatientInfoFactory(
+        person__given_name=None, person__family_name=None, person__gender_concept=None,
+    )
+    other_gender = PatientInfoFactory(person__gender_concept=ConceptFactory(concept_name='UNKNOWN'))
+    return [full, nameless, other_gender]
+
+
+def _queryset():
+    return PatientInfo.objects.select_related('person__gender_concept').order_by('id')
+
+
+def test_detail_payloads_equal_serializer(patients):
+    expected = PatientInfoSerializer(_queryset(), many=True).data
+    actual = patient_info_payloads(_queryset())
+    assert [list(p) for p in actual] == [list(p) for p in expected]  # same keys, same order
+    for got, want in zip(actual, expected):
+        assert got == dict(want)
+    assert {p['gender'] for p in actual} == {'Male', 'Unknown', 'Other'}
+
+
+def test_list_payloads_equal_serializer(patients):
+    expected = PatientListSerializer(_queryset(), many=True).data
+    assert patient_list_payloads(_queryset()) == [dict(p) for p in expected]
+
+
+def test_payloads_follow_queryset_order(patients):
+    ids = [p['id'] for p in patient_list_payloads(PatientInfo.objects.order_by('-id'))]
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_detail_endpoint_uses_fast_path(admin_client, patients):
+    response = admin_client.get(f'/api/patient-info/{patients[0].person_id}/')
+    assert response.json()['patient_info'] == json.loads(
+        JSONRenderer().render(PatientInfoSerializer(_queryset().first()).data)
+    )
+
+
+class TestOrjsonRenderer:
+
+    def test_same_document_as_json_renderer(self, patients):
+        data = {
+            'patients': PatientInfoSerializer(_queryset(), many=True).data,
+            'at': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'on': date(2024, 5, 1),
+            'time': time(9, 15, 0, 250000),
+            'amount': Decimal('1.50'),
+            'codes': {3: 'int key'},
+        }
+        fast, stock = OrjsonRenderer().render(data), JSONRenderer().render(data)
+        assert json.loads(fast) == json.loads(stock)
+        assert b'\\u2028' in fast and '\u2028'.encode() not in fast
+
+    def test_falls_back_for_indent_and_oversized_ints(self):
+        data = {'big': 2 ** 70}
+        assert OrjsonRenderer().render(data) == JSONRenderer().render(data)
+        assert OrjsonRenderer().render({'a': 1}, 'application/json; indent=2') == b'{\n  "a": 1\n}'
+
+    def test_none_renders_empty(self):
+        assert OrjsonRenderer().render(None) == b''
@@ -0,0 +1,69 @@
+"""
+Tests for omop_core.person_events and its use by populate_patient_info.
+"""
+
+import pytest
+
+from omop_core.management.commands.populate_patient_info import Command
+from omop_core.person_events import PersonEvents
+from tests.factories import (
+    ConceptFactory, ConditionOccurrenceFactory, DrugExposureFactory,
+    MeasurementFactory, ObservationFactory, PersonFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def person():
+    return PersonFactory()
+
+
+def test_each_table_loaded_once(person, django_assert_num_queries):
+    MeasurementFactory.create_batch(3, person=person)
+    ObservationFactory.create_batch(2, person=person)
+    events = PersonEvents(person)
+    with django_assert_num_queries(4):
+        events.load()
+        for m in events.measurements:
+            m.measurement_concept.concept_name
+        for o in events.observations:
+            o.observation_concept.concept_name
+        events.latest_measurement(['CODE-X'])
+        events.observations_with_codes(['CODE-Y'])
+    assert len(events.measurements) == 3
+    assert len(events.observations) == 2
+
+
+def test_newest_first_with_same_day_rows_in_id_order(person):
+    older = MeasurementFactory(person=person, measurement_date='2023-01-01')
+    first = MeasurementFactory(person=person, measurement_date='2024-06-01')
+    second = MeasurementFactory(person=person, measurement_date='2024-06-01')
+    ids = [m.measurement_id for m in PersonEvents(person).measurements]
+    assert ids == [first.measurement_id, second.measurement_id, older.measurement_id]
+
+
+def test_code_lookups(person):
+    alc = ConceptFactory(concept_code='731-0')
+    MeasurementFactory(person=person, measurement_concept=alc, measurement_date='2024-01-01', value_as_number=4)
+    MeasurementFactory(person=person, measurement_concept=alc, measurement_date='2024-03-01')
+    events = PersonEvents(person)
+    assert len(events.measurements_with_codes(['731-0'])) == 2
+    assert events.latest_measurement('731-0').value_as_number is None
+    assert events.latest_measurement(['731-0'], numeric=True).value_as_number == 4
+    assert events.measurements_in({alc.concept_id}, numeric=True)[0].value_as_number == 4
+    assert events.latest_observation(['182842009']) is None
+
+
+def test_extractors_share_the_context(person, django_assert_num_queries):
+    MeasurementFactory.create_batch(2, person=person)
+    ObservationFactory(person=person)
+    ConditionOccurrenceFactory(person=person)
+    DrugExposureFactory(person=person)
+    command = Command()
+    command.vital_sign_concepts  # resolved once per run, not per patient
+    events = PersonEvents(person).load()
+    extractors = [name for name in Command.EXTRACTORS if name not in ('get_demographics', 'get_location_data')]
+    with django_assert_num_queries(0):
+        for name in extractors:
+            getattr(command, name)(person, events)
@@ -10,11 +10,15 @@ Covers:
   - _compute_lymphocyte_doubling_time: pure-Python helper
   - get_lymphoma_data: FLIPI, GELF, tumor grade
   - _compute_derived_fields: measurable_disease_imwg, tp53_disruption
+  - --profile: per-extractor report and cProfile dump
 """
 
+from io import StringIO
+
 import pytest
-from omop_core.management.commands.populate_patient_info import Command
-from omop_core.models import PersonLanguageSkill
+from django.core.management import call_command
+from omop_core.management.commands.populate_patient_info import Command, ExtractorProfile
+from omop_core.models import PatientInfo, PersonLanguageSkill
 from tests.factories import (
     ConceptFactory, PersonFactory, PatientInfoFactory,
     MeasurementFactory, ObservationFactory,
@@ -446,3 +450,43 @@ class TestTp53Disruption:
         ])
         _cmd()._compute_derived_fields(pi)
         assert pi.tp53_disruption is False
+
+
+# ---------------------------------------------------------------------------
+# --profile
+# ---------------------------------------------------------------------------
+
+class TestProfileMode:
+
+    def test_profile_records_queries_and_rows_per_step(self):
+        person = PersonFactory()
+        MeasurementFactory.create_batch(3, person=person)
+        with ExtractorProfile() as profile:
+            data = profile.call(person.person_id, 'get_laboratory_data', _cmd().get_laboratory_data, person)
+        assert isinstance(data, dict)
+        ((seconds, queries, rows),) = profile.calls['get_laboratory_data']
+        assert queries >= 1
+        assert rows >= 3
+        assert profile.patients[person.person_id]['queries'] == queries
+
+    def test_profile_report_and_pstats_file(self, tmp_path):
+        person = PersonFactory()
+        out = StringIO()
+        stats = tmp_path / 'populate.pstats'
+        call_command(
+            'populate_patient_info', person_id=person.person_id,
+            profile=True, profile_top=3, profile_output=str(stats), stdout=out,
+        )
+        output = out.getvalue()
+        assert PatientInfo.objects.filter(person=person).exists()
+        for name in Command.EXTRACTORS + ('compute_derived_fields', 'save'):
+            assert f'  {name} ' in output
+        assert 'Time per patient (ms)' in output
+        assert f'person {person.person_id}:' in output
+        assert stats.stat().st_size > 0
+
+    def test_without_profile_no_report(self):
+        person = PersonFactory()
+        out = StringIO()
+        call_command('populate_patient_info', person_id=person.person_id, stdout=out)
+        assert 'Extractor profile' not in out.getvalue()
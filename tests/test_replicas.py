@@ -0,0 +1,204 @@
+"""
+Tests for read-replica routing (omop_core.replicas) and ReplicaPinMiddleware.
+
+The test database has no replica, so the ``routed`` fixture configures a
+``replica_1`` alias, records every read the router sends to it, and serves
+those reads from ``default`` — what a TEST MIRROR replica does. Tests that
+check routing run outside a transaction (transaction=True), since reads in
+a transaction stay on the primary.
+"""
+
+import os
+import subprocess
+import sys
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, override_settings
+
+from omop_core.middleware import ReplicaPinMiddleware
+from omop_core.models import PatientInfo
+from omop_core.replicas import (
+    PIN_COOKIE, ReplicaRouter, cache_timeout, pinned_to_primary, read_alias, use_replicas,
+)
+from tests.factories import PatientInfoFactory
+
+REPLICAS = override_settings(
+    DATABASE_REPLICAS=['replica_1'],
+    DATABASE_ROUTERS=['omop_core.replicas.ReplicaRouter'],
+    DATABASE_REPLICA_PIN_SECONDS=10,
+)
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    """Models whose reads were routed to the replica, in order."""
+    reads = []
+    route = ReplicaRouter.db_for_read
+
+    def db_for_read(self, model, **hints):
+        alias = route(self, model, **hints)
+        if alias is None:
+            return None
+        reads.append(model)
+        return 'default'
+
+    monkeypatch.setattr(ReplicaRouter, 'db_for_read', db_for_read)
+    with REPLICAS:
+        yield reads
+
+
+class TestRouting:
+
+    @REPLICAS
+    def test_reads_use_replica_only_inside_use_replicas(self):
+        assert read_alias() is None
+        with use_replicas():
+            assert read_alias() == 'replica_1'
+        assert read_alias() is None
+
+    @REPLICAS
+    def test_write_pins_rest_of_block(self):
+        router = ReplicaRouter()
+        with use_replicas():
+            assert router.db_for_write(PatientInfo) == 'default'
+            assert read_alias() is None
+
+    @REPLICAS
+    def test_pinned_request_reads_primary(self):
+        with pinned_to_primary(), use_replicas():
+            assert read_alias() is None
+        with pinned_to_primary(False), use_replicas():
+            assert read_alias() == 'replica_1'
+
+    @REPLICAS
+    def test_decorator(self):
+        @use_replicas()
+        def view():
+            return read_alias()
+
+        assert view() == 'replica_1'
+        assert read_alias() is None
+
+    def test_without_replicas_nothing_changes(self):
+        with use_replicas():
+            assert read_alias() is None
+            assert cache_timeout(300) == 300
+        with pytest.raises(MiddlewareNotUsed):
+            ReplicaPinMiddleware(lambda request: None)
+
+    @REPLICAS
+    def test_replica_reads_are_not_cached(self):
+        assert cache_timeout(300) == 300
+        with use_replicas():
+            assert cache_timeout(300) == 0
+
+    @REPLICAS
+    def test_replicas_are_not_migrated(self):
+        router = ReplicaRouter()
+        assert router.allow_migrate('replica_1', 'omop_core') is False
+        assert router.allow_migrate('default', 'omop_core') is None
+
+    @REPLICAS
+    @pytest.mark.django_db(transaction=True)
+    def test_transaction_reads_primary(self):
+        with use_replicas(), transaction.atomic():
+            assert read_alias() is None
+
+
+@pytest.mark.django_db(transaction=True)
+class TestEndpoints:
+
+    def test_list_and_retrieve_read_replica(self, admin_client, routed):
+        patient = PatientInfoFactory()
+        assert admin_client.get('/api/patient-info/').status_code == 200
+        assert PatientInfo in routed
+        routed.clear()
+        assert admin_client.get(f'/api/patient-info/{patient.person_id}/').status_code == 200
+        assert PatientInfo in routed
+
+    def test_session_and_user_stay_on_primary(self, admin_client, routed):
+        PatientInfoFactory()
+        admin_client.get('/api/patient-info/')
+        assert {model._meta.label for model in routed} <= {'omop_core.PatientInfo', 'omop_core.Person', 'auth.User'}
+        assert 'sessions.Session' not in {model._meta.label for model in routed}
+
+    def test_export_streams_from_replica(self, admin_client, routed):
+        PatientInfoFactory.create_batch(3)
+        response = admin_client.get('/api/patient-info/export/?format=ndjson')
+        assert len(b''.join(response.streaming_content).splitlines()) == 3
+        assert PatientInfo in routed
+
+    def test_write_pins_client_to_primary(self, admin_client, routed):
+        patient = PatientInfoFactory()
+        response = admin_client.patch(
+            f'/api/patient-info/{patient.person_id}/', {'disease': 'multiple myeloma'},
+            content_type='application/json',
+        )
+        assert response.status_code == 200
+        assert response.cookies[PIN_COOKIE]['max-age'] == 10
+        routed.clear()
+
+        detail = admin_client.get(f'/api/patient-info/{patient.person_id}/')
+        assert detail.json()['patient_info']['disease'] == 'multiple myeloma'
+        assert routed == []
+
+        del admin_client.cookies[PIN_COOKIE]  # expired
+        admin_client.get('/api/patient-info/')  # the detail response is cached by now
+        assert PatientInfo in routed
+
+    def test_writer_never_sees_another_clients_stale_replica_read(self, admin_client, admin_user, routed, settings):
+        settings.PATIENT_INFO_CACHE_TIMEOUT = 300  # as with a shared cache backend
+        patient = PatientInfoFactory(disease='breast cancer')
+        other = Client()
+        other.force_login(admin_user)
+        admin_client.patch(
+            f'/api/patient-info/{patient.person_id}/', {'disease': 'multiple myeloma'},
+            content_type='application/json',
+        )
+        # A lagging replica: the other client's read misses the write
+        PatientInfo.objects.filter(pk=patient.pk).update(disease='breast cancer')
+        stale = other.get(f'/api/patient-info/{patient.person_id}/')
+        assert stale.json()['patient_info']['disease'] == 'breast cancer'
+        assert PatientInfo in routed
+        PatientInfo.objects.filter(pk=patient.pk).update(disease='multiple myeloma')
+
+        pinned = admin_client.get(f'/api/patient-info/{patient.person_id}/')
+        assert pinned.json()['patient_info']['disease'] == 'multiple myeloma'
+
+    def test_reads_do_not_pin(self, admin_client, routed):
+        response = admin_client.get('/api/patient-info/')
+        assert PIN_COOKIE not in response.cookies
+
+    def test_lines_of_therapy_read_replica(self, admin_client, routed):
+        assert admin_client.get('/api/lines-of-therapy/').status_code == 200
+        assert routed
+
+    def test_export_command_reads_replica(self, routed):
+        PatientInfoFactory()
+        out = StringIO()
+        call_command('export_patient_info', '--format', 'ndjson', stdout=out, stderr=StringIO())
+        assert PatientInfo in routed
+
+
+def test_replica_urls_become_database_aliases(tmp_path):
+    env = {
+        **os.environ,
+        'DATABASE_REPLICA_URLS': f'sqlite:///{tmp_path}/a.sqlite3, sqlite:///{tmp_path}/b.sqlite3',
+    }
+    script = (
+        'import django; django.setup(); from django.conf import settings; '
+        'print(settings.DATABASE_REPLICAS, settings.DATABASE_ROUTERS, '
+        "settings.DATABASES['replica_2']['NAME'], settings.DATABASES['replica_1']['TEST']['MIRROR'])"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    assert output.strip() == (
+        f"['replica_1', 'replica_2'] ['omop_core.replicas.ReplicaRouter'] "
+        f"{tmp_path}/b.sqlite3 default"
+    )
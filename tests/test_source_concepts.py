@@ -0,0 +1,99 @@
+"""
+Tests for omop_core.source_concepts — the shared source code → concept map.
+"""
+
+from datetime import date
+
+import pytest
+
+from omop_core.models import ConceptRelationship, SourceToConceptMap
+from omop_core.source_concepts import (
+    GENDER_VOCABULARY, LOOKUP_CHUNK, RACE_VOCABULARY, SourceConceptMap, clear_source_concept_cache,
+    source_concepts,
+)
+from tests.factories import ConceptFactory
+
+pytestmark = pytest.mark.django_db
+
+LOINC = 'http://loinc.org'
+
+
+@pytest.fixture(autouse=True)
+def _fresh_map():
+    clear_source_concept_cache()
+    source_concepts.reset_metrics()
+    yield
+    clear_source_concept_cache()
+
+
+def _map_row(vocabulary_id, code, target, **extra):
+    return SourceToConceptMap.objects.create(
+        source_vocabulary_id=vocabulary_id, source_code=code, target_concept=target,
+        target_vocabulary_id=target.vocabulary_id,
+        valid_start_date=date(1970, 1, 1), valid_end_date=date(2099, 12, 31), **extra,
+    )
+
+
+class TestSourceConceptMap:
+
+    def test_builtin_demographics(self, django_assert_num_queries):
+        source_concepts.concept_id(GENDER_VOCABULARY, 'x')  # compile once
+        with django_assert_num_queries(0):
+            assert source_concepts.concept_id(GENDER_VOCABULARY, ' Female ') == 8532
+            assert source_concepts.concept_id(RACE_VOCABULARY, 'Asian') == 8515
+        assert source_concepts.concept_id(GENDER_VOCABULARY, 'x', default=None) is None
+
+    def test_table_rows_extend_and_override(self):
+        target = ConceptFactory()
+        _map_row(GENDER_VOCABULARY, 'woman', target)
+        _map_row('LocalLab', 'HGB-1', target)
+        _map_row('LocalLab', 'OLD', target, invalid_reason='D')
+        assert source_concepts.concept_id(GENDER_VOCABULARY, 'Woman') == target.concept_id
+        assert source_concepts.concept_id('LocalLab', 'HGB-1') == target.concept_id
+        assert source_concepts.concept_id('LocalLab', 'OLD') == 0
+
+    def test_vocabulary_lookup_follows_maps_to(self):
+        standard = ConceptFactory(vocabulary__vocabulary_id='SNOMED')
+        source = ConceptFactory(vocabulary__vocabulary_id='ICD10CM', concept_code='C50.9', standard_concept=None)
+        ConceptRelationship.objects.create(
+            concept_1=source, concept_2=standard, relationship_id='Maps to',
+            valid_start_date=date(1970, 1, 1), valid_end_date=date(2099, 12, 31),
+        )
+        coding = {'system': 'http://hl7.org/fhir/sid/icd-10-cm', 'code': 'C50.9'}
+        assert source_concepts.for_codings([coding]) == standard.concept_id
+
+    def test_prefetch_resolves_upload_in_one_query(self, django_assert_num_queries):
+        concepts = [ConceptFactory(concept_code=f'L-{i}') for i in range(5)]
+        codings = [{'system': LOINC, 'code': c.concept_code} for c in concepts]
+        codings += [{'system': LOINC, 'code': 'unknown'}, {'system': 'urn:local', 'code': 'L-1'}]
+        source_concepts.concept_id(GENDER_VOCABULARY, 'male')  # compile
+        source_concepts.reset_metrics()
+        with django_assert_num_queries(1):
+            source_concepts.prefetch_codings(codings * 3)
+        with django_assert_num_queries(0):
+            assert [source_concepts.for_codings([c]) for c in codings] == [
+                *(c.concept_id for c in concepts), 0, 0,
+            ]
+        metrics = source_concepts.metrics()
+        assert (metrics['misses'], metrics['unmapped'], metrics['hits']) == (6, 1, 6)
+
+    def test_large_prefetch_is_chunked(self):
+        lookup = SourceConceptMap()
+        lookup.prefetch(('LOINC', f'X-{i}') for i in range(LOOKUP_CHUNK + 1))
+        assert lookup.metrics()['queries'] == 2
+
+    def test_saving_a_row_recompiles(self):
+        assert source_concepts.concept_id('LocalLab', 'K') == 0
+        target = ConceptFactory()
+        _map_row('LocalLab', 'K', target)
+        assert source_concepts.concept_id('LocalLab', 'K') == target.concept_id
+
+
+class TestMappingStatsEndpoint:
+
+    def test_reports_counters(self, admin_client):
+        source_concepts.concept_id(GENDER_VOCABULARY, 'male')
+        response = admin_client.get('/api/concepts/mapping-stats/')
+        assert response.status_code == 200
+        assert response.json()['hits'] == 1
+        assert response.json()['compiled_entries'] >= 13
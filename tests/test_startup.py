@@ -0,0 +1,69 @@
+"""
+Tests for command start-up: BatchCommand, benchmarks.startup, import_report and the cold_start scenario.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command, load_command_class
+
+from benchmarks import scenarios
+from benchmarks.startup import parse_importtime, summarize
+from omop_core.management.base import BatchCommand
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        300 |     django.utils.version
+import time:      1500 |       1800 |   django
+import time:        80 |         80 |       django.db.utils
+import time:       400 |        480 |     django.db
+some other stderr line
+"""
+
+
+def test_parse_importtime():
+    imports = parse_importtime(IMPORTTIME)
+    assert [entry['module'] for entry in imports] == [
+        '_io', 'django.utils.version', 'django', 'django.db.utils', 'django.db',
+    ]
+    assert imports[2] == {'module': 'django', 'self_us': 1500, 'cumulative_us': 1800, 'depth': 1}
+    assert [entry['depth'] for entry in imports] == [1, 2, 1, 3, 2]
+
+
+def test_summarize_groups_by_top_level_package():
+    summary = summarize(parse_importtime(IMPORTTIME), top=1)
+    assert summary['modules'] == 5
+    assert summary['total_us'] == 2400
+    assert summary['packages'] == [{'package': 'django', 'modules': 4, 'self_us': 2280}]
+    assert [entry['module'] for entry in summary['slowest']] == ['django']
+
+
+@pytest.mark.parametrize('name', [
+    'load_from_healthtree_bq', 'import_fhir_ndjson', 'populate_patient_info', 'generate_fhir_bundle',
+    'generate_breast_cancer_patients', 'load_omop_vocabulary', 'export_fhir', 'export_omop_cdm',
+    'export_patient_info', 'import_report',
+])
+def test_batch_commands_skip_system_checks(name):
+    command = load_command_class('omop_core', name)
+    assert isinstance(command, BatchCommand)
+    assert command.requires_system_checks == []
+
+
+def test_import_report():
+    out = StringIO()
+    call_command('import_report', '--top', '3', '--repeat', '1', 'export_fhir', '--help', stdout=out)
+    output = out.getvalue()
+    assert 'manage.py export_fhir --help' in output
+    assert 'Packages by import time' in output
+    assert 'django' in output
+
+
+@pytest.mark.django_db
+def test_cold_start_scenario(monkeypatch):
+    monkeypatch.setattr(scenarios, 'COLD_START_REPEATS', 1)
+    metrics = scenarios.SCENARIOS['cold_start'](3, 1)
+    assert metrics['unit'] == 'starts'
+    assert metrics['count'] == metrics['operations'] == 5
+    assert metrics['queries'] == 0
+    assert metrics['p50_ms'] > 0